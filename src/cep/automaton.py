@@ -0,0 +1,653 @@
+from heapq import heappop, heappush
+from itertools import count
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from src.cep.conditions import compile_where, match_environment
+from src.cep.events import Match
+from src.parsers.query_parser import PatternQuery
+from src.parsers.pattern_parser import PatternNode
+from src.utils.operators import Operators
+
+_NO_START = float("-inf")
+
+
+def _bits(mask: int) -> Tuple[int, ...]:
+    states = []
+    while mask:
+        low = mask & -mask
+        states.append(low.bit_length() - 1)
+        mask ^= low
+    return tuple(states)
+
+
+class _JoinRule:
+    """
+    Enters the accept state of an AND once the accept states of all its branches are active.
+    """
+    __slots__ = ("required", "required_mask", "closure_mask", "closure", "stamped")
+
+    def __init__(self, required: Tuple[int, ...], closure_mask: int, stamped_mask: int, shared_mask: int):
+        self.required = required
+        self.required_mask = sum(1 << state for state in set(required))
+        self.closure_mask = closure_mask
+        self.closure = _bits(closure_mask & ~stamped_mask & ~shared_mask)
+        self.stamped = _bits(closure_mask & stamped_mask)
+
+
+class _NegationRule:
+    """
+    Drops the partial matches waiting behind NOT(x) in a SEQ that entered the waiting state before a completed x
+    started, together with the runs of x forked from them.
+    """
+    __slots__ = ("trigger", "waiting", "guarded_mask", "negated", "negated_mask")
+
+    def __init__(self, trigger: int, waiting: int, guarded_mask: int, negated_mask: int):
+        self.trigger = trigger
+        self.waiting = waiting
+        self.guarded_mask = guarded_mask
+        self.negated = _bits(negated_mask)
+        self.negated_mask = negated_mask
+
+
+class PatternAutomaton:
+    """
+    NFA compiled from a PatternNode tree.
+
+    Every state implicitly loops on events it has no transition for (skip-till-any-match), so the set of active states
+    of a case never has to be rebuilt from its history. An AND is compiled to a join rule that enters the accept state
+    once all branches have accepted, a negation inside a SEQ to a rule that kills the state waiting behind it.
+
+    States remember the latest start of the partial matches that reached them. A state waiting behind a negation keeps
+    a short frontier of (entered, start) pairs instead, since a completed negation only invalidates the partial matches
+    that were waiting before it started, and those are not necessarily the ones with the latest start. The negated
+    fragment remembers when it was forked from the waiting state.
+
+    The branches of an AND are joined per state, not per partial match, so an AND must not be entered from a state
+    waiting behind a negation: it could combine a branch that completed before the negation fired with one that started
+    after the state was entered again. `compile_pattern` rejects such patterns; `PatternNetwork` evaluates them.
+    """
+
+    def __init__(self,
+                 pattern: PatternNode,
+                 state_count: int,
+                 initial_mask: int,
+                 accept_state: int,
+                 transitions: Dict[str, List[Tuple[int, int, Tuple[int, ...], Tuple[int, ...], int]]],
+                 rules: List[Union[_JoinRule, _NegationRule]]):
+        """
+        Initialize the automaton. Use `compile_pattern` to build one from a pattern.
+
+        :param pattern: The pattern the automaton was compiled from.
+        :param state_count: The number of states.
+        :param initial_mask: Bit mask of the states active at the start of every case.
+        :param accept_state: The accepting state.
+        :param transitions: Per activity, the source state, the mask of the states entered, the entered states that
+            inherit the start of the source and that record the event timestamp, and the waiting state whose frontier
+            holds the start of the source (-1 if the source stores its own start).
+        :param rules: Join and negation rules, evaluated in order after the symbol transitions of an event.
+        """
+        self.pattern = pattern
+        self.state_count = state_count
+        self.initial_mask = initial_mask
+        self.accept_state = accept_state
+        self.transitions = transitions
+        self.rules = rules
+
+    @property
+    def activities(self) -> List[str]:
+        return list(self.transitions)
+
+    def __repr__(self) -> str:
+        return f"PatternAutomaton({self.pattern}, states={self.state_count})"
+
+
+class _AutomatonBuilder:
+    def __init__(self):
+        self.state_count = 0
+        self.epsilon: List[List[int]] = []
+        self.symbols: List[Tuple[int, str, int]] = []
+        # Joins (join state, required states) and negations (trigger, waiting state, first state, end state), in
+        # the post-order they have to be evaluated in
+        self.rules: List[Tuple[str, Tuple]] = []
+        # Guarded ANDs: per branch, the start of the copy waiting to start and of the copy entered once another
+        # branch has started
+        self.and_splits: List[Tuple[Tuple[int, ...], Tuple[int, ...]]] = []
+        self.negated_depth = 0
+
+    def new_state(self) -> int:
+        self.epsilon.append([])
+        self.state_count += 1
+        return self.state_count - 1
+
+    def build(self, node: PatternNode, guarded: bool = False) -> Tuple[int, int]:
+        """
+        Compile a node into a fragment of the automaton.
+
+        A guarded fragment starts in the epsilon closure of a state waiting behind a negation, and everything in that
+        closure is dropped when the negation fires. A guarded fragment therefore must not fall back into its own
+        start states once it has started: Kleene loops, and the AND branches of negated patterns, get a second, unguarded
+        copy for that.
+
+        :param node: The node to compile.
+        :param guarded: Whether the fragment starts behind a negation.
+        :return: The start and accept state of the fragment.
+        :raises ValueError: If the node cannot be matched against an event stream.
+        """
+        node_type = node.node_type
+        children = node.children
+
+        if not children:
+            if node_type in Operators.OPERATORS:
+                raise ValueError(f"Operator {node_type} has no children")
+            if node_type == "TEMPLATE" or node_type.startswith("∀"):
+                raise ValueError(f"Pattern contains an unexpanded template block: {node_type}")
+            start, accept = self.new_state(), self.new_state()
+            self.symbols.append((start, node_type, accept))
+            return start, accept
+
+        if node_type == Operators.SEQ:
+            return self.build_seq(children, guarded)
+
+        if node_type == Operators.NEGATION:
+            raise ValueError("NOT is only supported between two elements of a SEQ")
+        for child in children:
+            if child.node_type == Operators.NEGATION and child.children:
+                raise ValueError("NOT is only supported between two elements of a SEQ")
+
+        start, accept = self.new_state(), self.new_state()
+        if node_type == Operators.OR:
+            for child in children:
+                child_start, child_accept = self.build(child, guarded)
+                self.epsilon[start].append(child_start)
+                self.epsilon[child_accept].append(accept)
+        elif node_type == Operators.AND:
+            if guarded and not self.negated_depth:
+                raise ValueError("AND behind a NOT is not supported by the automaton, use a PatternNetwork for it")
+            required = []
+            if guarded:
+                waiting_starts, started_starts = [], []
+                for child in children:
+                    branch_accept = self.new_state()
+                    for copy_starts, copy_guarded in ((waiting_starts, True), (started_starts, False)):
+                        child_start, child_accept = self.build(child, copy_guarded)
+                        copy_starts.append(child_start)
+                        self.epsilon[child_accept].append(branch_accept)
+                    self.epsilon[start].append(waiting_starts[-1])
+                    required.append(branch_accept)
+                self.and_splits.append((tuple(waiting_starts), tuple(started_starts)))
+            else:
+                for child in children:
+                    child_start, child_accept = self.build(child)
+                    self.epsilon[start].append(child_start)
+                    required.append(child_accept)
+            self.rules.append((Operators.AND, (accept, tuple(required))))
+        elif node_type == Operators.KLEENE_CLOSURE:
+            if len(children) not in (1, 2):
+                raise ValueError(f"Operator * expects one or two children, got {len(children)}")
+            # *(x) repeats x, *(x, y) repeats x with a y between every two repetitions
+            child_start, child_accept = self.build(children[0], guarded)
+            self.epsilon[start].append(child_start)
+            self.epsilon[child_accept].append(accept)
+            if guarded:
+                repeat_start, repeat_accept = self.build(children[0])
+                self.epsilon[repeat_accept].append(accept)
+                self.build_redo(children, child_accept, repeat_start)
+                self.build_redo(children, repeat_accept, repeat_start)
+            else:
+                self.build_redo(children, child_accept, child_start)
+        else:
+            raise ValueError(f"Unknown operator: {node_type}")
+        return start, accept
+
+    def build_redo(self, children: List[PatternNode], accept: int, repeat_start: int) -> None:
+        """
+        Connect the end of one repetition of a Kleene closure to the start of the next one, through the redo part if
+        the closure has one.
+        """
+        if len(children) == 1:
+            self.epsilon[accept].append(repeat_start)
+            return
+        redo_start, redo_accept = self.build(children[1])
+        self.epsilon[accept].append(redo_start)
+        self.epsilon[redo_accept].append(repeat_start)
+
+    def build_seq(self, children: List[PatternNode], guarded: bool) -> Tuple[int, int]:
+        for position, child in enumerate(children):
+            if child.node_type == Operators.NEGATION and child.children \
+                    and (position == 0 or position == len(children) - 1):
+                raise ValueError("NOT is only supported between two elements of a SEQ")
+
+        start, accept = self.build(children[0], guarded)
+        behind_negation = False
+        for child in children[1:]:
+            if child.node_type == Operators.NEGATION and child.children:
+                if self.negated_depth:
+                    raise ValueError("NOT cannot be nested inside a negated pattern")
+                if not behind_negation:
+                    waiting = self.new_state()
+                    self.epsilon[accept].append(waiting)
+                    accept = waiting
+                    behind_negation = True
+                self.negated_depth += 1
+                for negated in child.children:
+                    first_state = self.state_count
+                    negated_start, negated_accept = self.build(negated, True)
+                    self.epsilon[accept].append(negated_start)
+                    self.rules.append((Operators.NEGATION, (negated_accept, accept, first_state, self.state_count)))
+                self.negated_depth -= 1
+            else:
+                child_start, child_accept = self.build(child, behind_negation)
+                self.epsilon[accept].append(child_start)
+                accept = child_accept
+                behind_negation = False
+        return start, accept
+
+    def closures(self) -> List[int]:
+        masks: List[int] = []
+        for state in range(self.state_count):
+            mask = 1 << state
+            stack = [state]
+            while stack:
+                for target in self.epsilon[stack.pop()]:
+                    if not mask >> target & 1:
+                        mask |= 1 << target
+                        stack.append(target)
+            masks.append(mask)
+        return masks
+
+
+def compile_pattern(pattern: PatternNode) -> PatternAutomaton:
+    """
+    Compile a pattern tree into a matching automaton.
+
+    Leaves match events whose activity equals the node type. SEQ matches its children in order, AND in any order,
+    OR any of them and * one or more repetitions. The branches of an AND may share events, so AND(a, a) matches a
+    single a. NOT(x) is allowed between two SEQ elements and forbids a match of x that starts after the previous element
+    and ends before or with the first event of the next element; x itself must not contain another NOT, and the next
+    element must not begin with an AND.
+
+    :param pattern: The root of the pattern tree.
+    :return: The compiled automaton.
+    :raises ValueError: If the pattern uses an operator in an unsupported position.
+    """
+    builder = _AutomatonBuilder()
+    start, accept = builder.build(pattern)
+    closures = builder.closures()
+
+    # The states entered together with a waiting state share its frontier and store nothing themselves, the states
+    # of a negated fragment entered from it record the fork time
+    negated_masks: Dict[int, int] = {}
+    for kind, arguments in builder.rules:
+        if kind == Operators.NEGATION:
+            trigger, waiting, first_state, end_state = arguments
+            negated_masks[waiting] = negated_masks.get(waiting, 0) | ((1 << end_state) - 1) ^ ((1 << first_state) - 1)
+    stamped_mask = 0
+    frontier_owner: Dict[int, int] = {}
+    for waiting, negated_mask in negated_masks.items():
+        stamped_mask |= closures[waiting] & negated_mask
+        for state in _bits(closures[waiting] & ~negated_mask & ~(1 << waiting)):
+            frontier_owner[state] = waiting
+    negations: List[Tuple[int, int, int, int]] = []
+    for kind, arguments in builder.rules:
+        if kind == Operators.NEGATION:
+            trigger, waiting, first_state, end_state = arguments
+            negated_mask = ((1 << end_state) - 1) ^ ((1 << first_state) - 1)
+            negations.append((trigger, waiting, closures[waiting] & ~negated_masks[waiting], negated_mask))
+    shared_mask = sum(1 << state for state in frontier_owner)
+
+    # Leaving the not-started copy of a guarded AND branch starts the other branches' started copies
+    forks: List[Tuple[int, int]] = []
+    for waiting_starts, started_starts in builder.and_splits:
+        for position, waiting_start in enumerate(waiting_starts):
+            fork_mask = 0
+            for other_position, started_start in enumerate(started_starts):
+                if other_position != position:
+                    fork_mask |= closures[started_start]
+            forks.append((closures[waiting_start], fork_mask))
+
+    transitions: Dict[str, List[Tuple[int, int, Tuple[int, ...], Tuple[int, ...], int]]] = {}
+    for source, activity, target in builder.symbols:
+        entered_mask = closures[target]
+        for waiting_mask, fork_mask in forks:
+            if waiting_mask >> source & 1:
+                entered_mask |= fork_mask
+        transitions.setdefault(activity, []).append(
+            (source, entered_mask, _bits(entered_mask & ~stamped_mask & ~shared_mask),
+             _bits(entered_mask & stamped_mask), frontier_owner.get(source, -1)))
+
+    rules: List[Union[_JoinRule, _NegationRule]] = []
+    negation_index = 0
+    for kind, arguments in builder.rules:
+        if kind == Operators.AND:
+            join_state, required = arguments
+            rules.append(_JoinRule(required, closures[join_state], stamped_mask, shared_mask))
+        else:
+            rules.append(_NegationRule(*negations[negation_index]))
+            negation_index += 1
+
+    return PatternAutomaton(pattern, builder.state_count, closures[start], accept, transitions, rules)
+
+
+class _CaseRun:
+    __slots__ = ("active", "starts", "last", "oldest", "expiry")
+
+    def __init__(self, active: int, starts: Dict[int, Union[float, List[List[float]]]], last: float, oldest: float):
+        self.active = active
+        self.starts = starts
+        # Only maintained with a time window: the latest event, the oldest stored timestamp and the expiry the case
+        # is scheduled with
+        self.last = last
+        self.oldest = oldest
+        self.expiry = _NO_START
+
+
+class PatternMatcher:
+    """
+    Runs a compiled automaton over an event stream and reports matches as soon as the completing event arrives.
+
+    Per case only a bit mask of active states and one timestamp per reached state (a frontier for the states waiting
+    behind a negation) are kept. Cases without any partial match are not stored at all.
+
+    With a time window, partial matches that started longer than the window ago are dropped whenever their case sees
+    an event, and cases that saw no event for longer than the window are evicted through a heap ordered by expiry, so
+    both memory and per-event work stay bounded by the window.
+    """
+
+    def __init__(self,
+                 automaton: PatternAutomaton,
+                 pattern_id: Optional[Hashable] = None,
+                 window: Optional[float] = None,
+                 where: Optional[Callable[[Mapping[str, Any]], bool]] = None):
+        """
+        Initialize the matcher.
+
+        :param automaton: The compiled pattern.
+        :param pattern_id: The identifier reported in the emitted matches.
+        :param window: The maximum time between the first and the last event of a match, None for no limit.
+        :param where: A compiled condition a match has to satisfy, evaluated in `match_environment(match)`.
+        """
+        self.automaton = automaton
+        self.pattern_id = pattern_id
+        self.window = window
+        self.where = where
+        self._waiting_mask = 0
+        self._guarded_masks: Dict[int, int] = {}
+        for rule in automaton.rules:
+            if rule.__class__ is _NegationRule:
+                self._waiting_mask |= 1 << rule.waiting
+                self._guarded_masks[rule.waiting] = rule.guarded_mask
+        self._runs: Dict[Hashable, _CaseRun] = {}
+        self._now = _NO_START
+        self._expiries: List[Tuple[float, int, Hashable]] = []
+        self._sequence = count()
+
+    @property
+    def open_cases(self) -> int:
+        return len(self._runs)
+
+    def process(self, case_id: Hashable, activity: str, timestamp: float) -> List[Match]:
+        """
+        Consume one event.
+
+        :param case_id: The case the event belongs to.
+        :param activity: The activity of the event.
+        :param timestamp: The timestamp of the event; the events of a case must arrive with increasing timestamps.
+        :return: The matches completed by this event.
+        """
+        window = self.window
+        if window is not None and self._expiries and self._expiries[0][0] < timestamp:
+            self.advance_time(timestamp)
+        transitions = self.automaton.transitions.get(activity)
+        if transitions is None:
+            return []
+
+        initial = self.automaton.initial_mask
+        run = self._runs.get(case_id)
+        if run is None:
+            active = initial
+            starts: Dict[int, Union[float, List[List[float]]]] = {}
+        else:
+            active = run.active
+            starts = run.starts
+            if window is not None and run.oldest < timestamp - window:
+                active = self._expire(run, timestamp - window)
+
+        # A fired negation invalidates the runs it drops for this very event too, so the event is replayed without
+        # them until no further negation fires.
+        changed = False
+        while True:
+            entered, pending, fired = self._advance(active, starts, transitions, timestamp)
+            if not fired:
+                break
+            for rule, fork in fired:
+                active = _drop_negated(rule, fork, active, starts)
+            changed = True
+        if not entered and not changed:
+            if run is not None and active == initial:
+                self._runs.pop(case_id, None)
+            return []
+
+        waiting_mask = self._waiting_mask
+        for state, start in pending.items():
+            if waiting_mask >> state & 1:
+                frontier = starts.get(state)
+                if frontier is None:
+                    starts[state] = [[timestamp, start]]
+                    continue
+                # Entries are kept with increasing entry times and decreasing starts
+                while frontier and frontier[-1][1] <= start:
+                    frontier.pop()
+                frontier.append([timestamp, start])
+            elif starts.get(state, _NO_START) < start:
+                starts[state] = start
+        active |= entered
+
+        matches: List[Match] = []
+        accept_state = self.automaton.accept_state
+        if entered >> accept_state & 1:
+            match = Match(case_id, pending[accept_state], timestamp, self.pattern_id)
+            if self.where is None or self.where(match_environment(match)):
+                matches.append(match)
+
+        if active == initial:
+            self._runs.pop(case_id, None)
+        elif run is None:
+            run = self._runs[case_id] = _CaseRun(active, starts, timestamp, min(pending.values(), default=timestamp))
+            if window is not None:
+                run.expiry = timestamp + window
+                heappush(self._expiries, (run.expiry, next(self._sequence), case_id))
+        else:
+            run.active = active
+            run.last = timestamp
+            if window is not None and pending:
+                run.oldest = min(run.oldest, min(pending.values()))
+        return matches
+
+    def advance_time(self, timestamp: float) -> None:
+        """
+        Evict the cases that saw no event within the window before `timestamp`. Called by `process`; call it directly
+        to bound memory while no events arrive.
+
+        :param timestamp: The current time.
+        """
+        if timestamp > self._now:
+            self._now = timestamp
+        window = self.window
+        if window is None:
+            return
+        expiries = self._expiries
+        while expiries and expiries[0][0] < self._now:
+            expiry, _, case_id = heappop(expiries)
+            run = self._runs.get(case_id)
+            if run is None or run.expiry != expiry:
+                continue
+            if run.last + window < self._now:
+                del self._runs[case_id]
+            else:
+                run.expiry = run.last + window
+                heappush(expiries, (run.expiry, next(self._sequence), case_id))
+
+    def _expire(self, run: _CaseRun, cutoff: float) -> int:
+        """
+        Drop the partial matches of a case that started before `cutoff`.
+
+        :return: The remaining active states.
+        """
+        active = run.active
+        starts = run.starts
+        waiting_mask = self._waiting_mask
+        oldest = float("inf")
+        for state in list(starts):
+            value = starts[state]
+            if waiting_mask >> state & 1:
+                while value and value[-1][1] < cutoff:
+                    value.pop()
+                if not value:
+                    active &= ~self._guarded_masks[state]
+                    del starts[state]
+                    continue
+                value = value[-1][1]
+            elif value < cutoff:
+                active &= ~(1 << state)
+                del starts[state]
+                continue
+            if value < oldest:
+                oldest = value
+        # Initial states stay active, their start is always the current event
+        active |= self.automaton.initial_mask
+        run.active = active
+        run.oldest = oldest
+        return active
+
+    def _advance(self,
+                 active: int,
+                 starts: Dict[int, Union[float, List[List[float]]]],
+                 transitions: List[Tuple[int, int, Tuple[int, ...], Tuple[int, ...], int]],
+                 timestamp: float) -> Tuple[int, Dict[int, float], List[Tuple[_NegationRule, float]]]:
+        """
+        Compute the states entered by an event without applying them.
+
+        :return: The mask of entered states, their new timestamps and the negations fired together with the fork time
+            of the completed negated match.
+        """
+        initial = self.automaton.initial_mask
+        entered = 0
+        pending: Dict[int, float] = {}
+        for source, entered_mask, inheriting, stamped, owner in transitions:
+            if active >> source & 1:
+                if initial >> source & 1:
+                    start = timestamp
+                elif owner < 0:
+                    start = starts[source]
+                else:
+                    start = starts[owner][0][1]
+                entered |= entered_mask
+                for state in inheriting:
+                    if pending.get(state, _NO_START) < start:
+                        pending[state] = start
+                for state in stamped:
+                    pending[state] = timestamp
+        if not entered:
+            return 0, pending, []
+
+        current = active | entered
+        fired: List[Tuple[_NegationRule, float]] = []
+        for rule in self.automaton.rules:
+            if rule.__class__ is _JoinRule:
+                required_mask = rule.required_mask
+                if entered & required_mask and current & required_mask == required_mask:
+                    start = _join_start(rule.required, active, entered, starts, pending)
+                    entered |= rule.closure_mask
+                    current |= rule.closure_mask
+                    for state in rule.closure:
+                        if pending.get(state, _NO_START) < start:
+                            pending[state] = start
+                    for state in rule.stamped:
+                        pending[state] = timestamp
+            elif entered >> rule.trigger & 1 and active >> rule.waiting & 1 \
+                    and pending[rule.trigger] >= starts[rule.waiting][0][0]:
+                fired.append((rule, pending[rule.trigger]))
+        return entered, pending, fired
+
+    def run(self, events: Iterable[Tuple[Hashable, str, float]]) -> Iterator[Match]:
+        """
+        Consume an event stream and yield matches incrementally.
+
+        :param events: (case_id, activity, timestamp) tuples.
+        :return: An iterator over the matches in the order they are completed.
+        """
+        process = self.process
+        for case_id, activity, timestamp in events:
+            yield from process(case_id, activity, timestamp)
+
+    def close_case(self, case_id: Hashable) -> None:
+        """
+        Drop all partial matches of a finished case.
+
+        :param case_id: The finished case.
+        """
+        self._runs.pop(case_id, None)
+
+
+def _join_start(required: Tuple[int, ...], active: int, entered: int, starts: Dict[int, float],
+                pending: Dict[int, float]) -> float:
+    """
+    The latest start of an AND match completed by the current event: a branch that accepted with this event, combined
+    with the latest earlier or current match of every other branch.
+    """
+    best = _NO_START
+    for position, state in enumerate(required):
+        if not entered >> state & 1:
+            continue
+        start = pending[state]
+        for other_position, other in enumerate(required):
+            if other_position == position:
+                continue
+            other_start = starts[other] if active >> other & 1 else _NO_START
+            if entered >> other & 1 and pending[other] > other_start:
+                other_start = pending[other]
+            if other_start < start:
+                start = other_start
+        if start > best:
+            best = start
+    return best
+
+
+def compile_query(query: PatternQuery,
+                  predicates: Optional[Dict[str, Callable[..., bool]]] = None,
+                  pattern_id: Optional[Hashable] = None) -> PatternMatcher:
+    """
+    Build a matcher for a parsed query, with its WHERE clause compiled once and its WITHIN clause as time window.
+
+    :param query: The parsed query, see `parse_query`.
+    :param predicates: The functions implementing the predicates used in the WHERE clause.
+    :param pattern_id: The identifier reported in the emitted matches.
+    :return: The matcher.
+    :raises ValueError: If the query cannot be matched, e.g. because it contains unexpanded template blocks.
+    """
+    where = None if query.where is None else compile_where(query.where, predicates or {})
+    window = None if query.within is None else query.within.seconds
+    return PatternMatcher(compile_pattern(query.pattern), pattern_id, window, where)
+
+
+def _drop_negated(rule: _NegationRule, fork: float, active: int,
+                  starts: Dict[int, Union[float, List[List[float]]]]) -> int:
+    """
+    Drop the partial matches that entered the waiting state of a negation at or before the fork time of a completed
+    negated match, and the runs of the negated fragment forked from them.
+
+    :return: The remaining active states.
+    """
+    frontier = starts.get(rule.waiting)
+    if frontier is not None:
+        while frontier and frontier[0][0] <= fork:
+            frontier.pop(0)
+        if not frontier:
+            active &= ~rule.guarded_mask
+            del starts[rule.waiting]
+            frontier = None
+    for state in rule.negated:
+        if active >> state & 1 and (frontier is None or starts[state] <= fork):
+            active &= ~(1 << state)
+            del starts[state]
+    return active
@@ -0,0 +1,302 @@
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.cep.events import Match
+from src.parsers.pattern_parser import AnyPatternNode
+from src.utils.operators import Operators
+
+_NONE = -1
+
+
+class EncodedLog:
+    """
+    Event log encoded for evaluating patterns on all of its events at once.
+
+    The events are sorted by case and, within a case, by timestamp, keeping the log order of equal timestamps, and
+    activities are replaced by integer codes. A pattern is then evaluated bottom-up with one array per node holding,
+    for every event position, the latest start of a match of the node that ends exactly at that event, or -1.
+    Operators combine these arrays with masks and running and range maxima per case, so every node costs a few passes
+    over the log in NumPy instead of a Python step per event.
+
+    The matches are those `PatternMatcher` reports: one per event that completes a match, with the latest start a
+    match ending at that event can have.
+    """
+
+    def __init__(self, case_ids: Sequence, activities: Sequence[str], timestamps: Optional[Sequence] = None):
+        """
+        Encode a log given as columns.
+
+        :param case_ids: The case of every event.
+        :param activities: The activity of every event.
+        :param timestamps: The timestamp of every event, None to take the events of a case in log order.
+        """
+        if len(case_ids) != len(activities) or timestamps is not None and len(timestamps) != len(case_ids):
+            raise ValueError("The columns of the log differ in length")
+        case_codes, self.cases = pd.factorize(np.asarray(case_ids), sort=False)
+        activity_codes, activities = pd.factorize(np.asarray(activities), sort=False)
+        self.activity_codes: Dict[str, int] = {activity: code for code, activity in enumerate(activities)}
+        if timestamps is None:
+            order = np.argsort(case_codes, kind="stable")
+            self.timestamps = np.arange(len(case_codes), dtype=np.float64)[order]
+        else:
+            timestamps = np.asarray(timestamps)
+            order = np.lexsort((timestamps, case_codes))
+            self.timestamps = timestamps[order]
+        self.case_codes = case_codes[order]
+        self.activities = activity_codes[order].astype(np.int32)
+        self.positions = np.arange(len(order), dtype=np.int64)
+        # Every position is mapped to the first position of its case, so a case's arrays start where it starts
+        boundaries = np.flatnonzero(np.diff(self.case_codes, prepend=_NONE))
+        self.case_starts = np.repeat(boundaries, np.diff(np.append(boundaries, len(order))))
+
+    @classmethod
+    def from_dataframe(cls,
+                       log: pd.DataFrame,
+                       case_key: str = "case:concept:name",
+                       activity_key: str = "concept:name",
+                       timestamp_key: Optional[str] = "time:timestamp") -> "EncodedLog":
+        """
+        :param log: The log, by default with the pm4py column names.
+        :param timestamp_key: The timestamp column, None to take the events of a case in log order.
+        :return: The encoded log.
+        """
+        return cls(log[case_key].to_numpy(), log[activity_key].to_numpy(),
+                   None if timestamp_key is None else log[timestamp_key].to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def match_ends(self, pattern: AnyPatternNode) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param pattern: The pattern.
+        :return: The positions of the events that complete a match, and the position of the first event of each of
+            these matches, in the sorted order of the log.
+        :raises ValueError: If the pattern uses an operator in a position the batch evaluation does not support.
+        """
+        starts = _Evaluator(self).evaluate(pattern, self.positions)
+        ends = np.flatnonzero(starts >= self.case_starts)
+        return ends, starts[ends]
+
+    def matches(self, pattern: AnyPatternNode, pattern_id: Optional[Hashable] = None) -> List[Match]:
+        """
+        :return: All matches of the pattern, ordered by case and end.
+        """
+        ends, starts = self.match_ends(pattern)
+        return [Match(case_id, start, end, pattern_id) for case_id, start, end in
+                zip(self.cases[self.case_codes[ends]].tolist(), self.timestamps[starts].tolist(),
+                    self.timestamps[ends].tolist())]
+
+    def evaluate(self, pattern: AnyPatternNode) -> pd.DataFrame:
+        """
+        :param pattern: The pattern.
+        :return: Per case, in the order cases first appear in the log: whether the pattern matched, the number of
+            events completing a match, and the start and end timestamps of the first completed match.
+        """
+        ends, starts = self.match_ends(pattern)
+        cases = self.case_codes[ends]
+        counts = np.bincount(cases, minlength=len(self.cases))
+        matched_cases, first = np.unique(cases, return_index=True)
+        all_cases = range(len(self.cases))
+        result = pd.DataFrame({
+            "matched": counts > 0, "matches": counts,
+            # Cases without a match get NaN or NaT
+            "start": pd.Series(self.timestamps[starts[first]], index=matched_cases).reindex(all_cases).to_numpy(),
+            "end": pd.Series(self.timestamps[ends[first]], index=matched_cases).reindex(all_cases).to_numpy()})
+        result.index = pd.Index(self.cases, name="case")
+        return result
+
+
+def evaluate_patterns(log: pd.DataFrame,
+                      patterns: Mapping[Hashable, AnyPatternNode],
+                      case_key: str = "case:concept:name",
+                      activity_key: str = "concept:name",
+                      timestamp_key: Optional[str] = "time:timestamp") -> pd.DataFrame:
+    """
+    Evaluate patterns on a whole log at once.
+
+    :param log: The log, by default with the pm4py column names.
+    :param patterns: The patterns by id.
+    :param timestamp_key: The timestamp column, None to take the events of a case in log order.
+    :return: Per case whether each pattern matched, with one boolean column per pattern id.
+    :raises ValueError: If a pattern uses an operator in a position the batch evaluation does not support.
+    """
+    encoded = EncodedLog.from_dataframe(log, case_key, activity_key, timestamp_key)
+    return pd.DataFrame({pattern_id: encoded.evaluate(pattern)["matched"] for pattern_id, pattern in patterns.items()})
+
+
+class _Evaluator:
+    """
+    Evaluates a pattern tree on an encoded log.
+
+    A node is evaluated for an array `entry` giving, per position, the start that a match of the node beginning at
+    that position continues: the position itself for a node on its own, the start of the previous elements of a SEQ
+    otherwise. The result holds per position the best entry of a match ending there. Entries of SEQ elements are the
+    running maximum of the previous element's result, so they never decrease within a case; only the element behind
+    a NOT gets an entry that may decrease, and therefore has to begin with a single event.
+
+    Any value before the start of the position's case means no match. Positions grow from case to case, so running
+    maxima and shifts over the whole log never have to restart at case borders: what they carry over from the
+    previous case is such a value.
+    """
+
+    def __init__(self, log: EncodedLog):
+        self.log = log
+
+    def evaluate(self, node: AnyPatternNode, entry: np.ndarray) -> np.ndarray:
+        node_type = node.node_type
+        children = node.children
+        if not children:
+            if node_type in Operators.OPERATORS:
+                raise ValueError(f"Operator {node_type} has no children")
+            if node_type == "TEMPLATE" or node_type.startswith("∀"):
+                raise ValueError(f"Pattern contains an unexpanded template block: {node_type}")
+            code = self.log.activity_codes.get(node_type)
+            if code is None:
+                return np.full(len(self.log), _NONE, dtype=np.int64)
+            return np.where(self.log.activities == code, entry, _NONE)
+
+        if node_type == Operators.SEQ:
+            return self.evaluate_seq(_flatten_seq(node), entry)
+        if node_type == Operators.NEGATION:
+            raise ValueError("NOT is only supported between two elements of a SEQ")
+        for child in children:
+            if child.node_type == Operators.NEGATION and child.children:
+                raise ValueError("NOT is only supported between two elements of a SEQ")
+
+        if node_type == Operators.OR:
+            result = self.evaluate(children[0], entry)
+            for child in children[1:]:
+                np.maximum(result, self.evaluate(child, entry), out=result)
+            return result
+        if node_type == Operators.AND:
+            # One branch ends at the position, the others at or before it; the match begins with the earliest branch
+            ends = [self.evaluate(child, entry) for child in children]
+            latest = [self.running_max(end) for end in ends]
+            result = np.full(len(self.log), _NONE, dtype=np.int64)
+            for branch, end in enumerate(ends):
+                candidate = end.copy()
+                for other, other_latest in enumerate(latest):
+                    if other != branch:
+                        np.minimum(candidate, other_latest, out=candidate)
+                np.maximum(result, candidate, out=result)
+            return result
+        if node_type == Operators.KLEENE_CLOSURE:
+            if len(children) not in (1, 2):
+                raise ValueError(f"Operator * expects one or two children, got {len(children)}")
+            # With nondecreasing entries a single repetition is the best match ending at a position; the redo part
+            # only matters between repetitions
+            return self.evaluate(children[0], entry)
+        raise ValueError(f"Unknown operator: {node_type}")
+
+    def evaluate_seq(self, children: List[AnyPatternNode], entry: np.ndarray) -> np.ndarray:
+        if children[0].node_type == Operators.NEGATION or children[-1].node_type == Operators.NEGATION:
+            raise ValueError("NOT is only supported between two elements of a SEQ")
+        result = self.evaluate(children[0], entry)
+        negated: List[AnyPatternNode] = []
+        for child in children[1:]:
+            if child.node_type == Operators.NEGATION and child.children:
+                negated.extend(child.children)
+                continue
+            if negated:
+                if not _begins_with_event(child):
+                    raise ValueError(f"The element {child} behind a NOT has to begin with a single event for the "
+                                     f"batch evaluation, use the PatternMatcher for it")
+                entry = self.window_max(result, self.latest_negated_start(negated))
+                negated = []
+            else:
+                entry = self.shift(self.running_max(result))
+            result = self.evaluate(child, entry)
+        return result
+
+    def latest_negated_start(self, negated: List[AnyPatternNode]) -> np.ndarray:
+        """
+        :return: Per position the latest start of a match of any negated pattern ending at or before it.
+        """
+        latest = np.full(len(self.log), _NONE, dtype=np.int64)
+        for node in negated:
+            if _contains_negation(node):
+                raise ValueError("NOT cannot be nested inside a negated pattern")
+            np.maximum(latest, self.running_max(self.evaluate(node, self.log.positions)), out=latest)
+        return latest
+
+    @staticmethod
+    def running_max(values: np.ndarray) -> np.ndarray:
+        return np.maximum.accumulate(values)
+
+    @staticmethod
+    def shift(values: np.ndarray) -> np.ndarray:
+        """
+        :return: The values moved one position on, -1 at the first position.
+        """
+        shifted = np.empty_like(values)
+        shifted[0:1] = _NONE
+        shifted[1:] = values[:-1]
+        return shifted
+
+    def window_max(self, values: np.ndarray, lower: np.ndarray) -> np.ndarray:
+        """
+        :param values: The result of the element before a NOT.
+        :param lower: Per position t the latest start of a negated match ending at or before t.
+        :return: Per position t the maximum of the values at positions k with lower[t] <= k < t in the case of t,
+            so no negated match lies between k and t.
+        """
+        log = self.log
+        # The windows only move on where a negated match completes, so they are split into segments of equal lower
+        # bound: the part before the segment is one range maximum per segment, the rest a running maximum
+        lower = np.maximum(lower, log.case_starts)
+        first = np.flatnonzero((log.positions == log.case_starts) | (np.diff(lower, prepend=_NONE) != 0))
+        segments = np.repeat(np.arange(len(first)), np.diff(np.append(first, len(lower))))
+        before = np.full(len(first), _NONE, dtype=np.int64)
+        nonempty = lower[first] < first
+        if nonempty.any():
+            bounds = np.column_stack((lower[first][nonempty], first[nonempty])).ravel()
+            before[nonempty] = np.maximum.reduceat(values, bounds)[::2]
+        shifted = self.shift(values)
+        shifted[first] = _NONE
+        return np.maximum(before[segments], _grouped_running_max(shifted, segments, len(values)))
+
+
+def _grouped_running_max(values: np.ndarray, groups: np.ndarray, size: int) -> np.ndarray:
+    """
+    :param values: Values in [-1, size).
+    :param groups: Nondecreasing group ids.
+    :return: The running maximum of the values restarting at every group.
+    """
+    # Offsetting every group above all values of the previous ones lets one running maximum restart per group
+    offsets = groups.astype(np.int64) * (size + 1)
+    return np.maximum.accumulate(values + 1 + offsets) - offsets - 1
+
+
+def _flatten_seq(node: AnyPatternNode) -> List[AnyPatternNode]:
+    children = []
+    for child in node.children:
+        if child.node_type == Operators.SEQ and child.children:
+            children.extend(_flatten_seq(child))
+        else:
+            children.append(child)
+    return children
+
+
+def _begins_with_event(node: AnyPatternNode) -> bool:
+    """
+    :return: Whether every match of the node begins with a single leaf, so its first event is where it is entered.
+    """
+    if not node.children:
+        return True
+    if node.node_type == Operators.OR:
+        return all(_begins_with_event(child) for child in node.children)
+    if node.node_type == Operators.SEQ:
+        return _begins_with_event(_flatten_seq(node)[0])
+    return False
+
+
+def _contains_negation(node: AnyPatternNode) -> bool:
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.node_type == Operators.NEGATION and current.children:
+            return True
+        stack.extend(current.children)
+    return False
@@ -0,0 +1,83 @@
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from src.cep.events import Match
+from src.parsers.query_parser import Argument, Condition, PredicateCall, WhereClause
+from src.utils.operators import Operators
+
+CompiledCondition = Callable[[Mapping[str, Any]], bool]
+
+
+def match_environment(match: Match) -> Dict[str, Any]:
+    """
+    The variables a WHERE clause can refer to for a match.
+
+    :param match: The match to evaluate the condition for.
+    :return: The fields of the match and its duration.
+    """
+    environment = match._asdict()
+    environment["duration"] = match.end - match.start
+    return environment
+
+
+def _always(_: Mapping[str, Any]) -> bool:
+    return True
+
+
+def _compile_argument(argument: Argument) -> Callable[[Mapping[str, Any]], Any]:
+    """
+    Compile a predicate argument to a getter. Numbers are constants, names are looked up in the environment the
+    condition is evaluated in and stand for themselves if they are not bound there.
+
+    :raises ValueError: If the argument is an unexpanded template variable.
+    """
+    if isinstance(argument, str):
+        if argument.startswith("∀"):
+            raise ValueError(f"Condition contains an unexpanded template variable: {argument}")
+        return lambda environment: environment.get(argument, argument)
+    return lambda _: argument
+
+
+def compile_where(condition: Optional[WhereClause],
+                  predicates: Dict[str, Callable[..., bool]]) -> CompiledCondition:
+    """
+    Compile a WHERE clause into one closure, so evaluating it does not walk the condition tree again.
+
+    :param condition: The parsed condition, or None for a query without WHERE clause.
+    :param predicates: The functions implementing the predicates by name; they are called with the resolved
+        arguments.
+    :return: A function that evaluates the condition in an environment mapping variable names to values.
+    :raises ValueError: If the condition calls an unknown predicate or contains unexpanded template variables.
+    """
+    if condition is None:
+        return _always
+
+    if isinstance(condition, PredicateCall):
+        function = predicates.get(condition.name)
+        if function is None:
+            raise ValueError(f"Unknown predicate: {condition.name}")
+        getters = [_compile_argument(argument) for argument in condition.arguments]
+        if len(getters) == 1:
+            get = getters[0]
+            return lambda environment: bool(function(get(environment)))
+        if len(getters) == 2:
+            get_first, get_second = getters
+            return lambda environment: bool(function(get_first(environment), get_second(environment)))
+        return lambda environment: bool(function(*[get(environment) for get in getters]))
+
+    operands = [compile_where(operand, predicates) for operand in condition.operands]
+    if condition.operator == Operators.NEGATION:
+        operand = operands[0]
+        return lambda environment: not operand(environment)
+    if len(operands) == 1:
+        return operands[0]
+    if condition.operator == Operators.AND:
+        if len(operands) == 2:
+            first, second = operands
+            return lambda environment: first(environment) and second(environment)
+        return lambda environment: all(operand(environment) for operand in operands)
+    if condition.operator == Operators.OR:
+        if len(operands) == 2:
+            first, second = operands
+            return lambda environment: first(environment) or second(environment)
+        return lambda environment: any(operand(environment) for operand in operands)
+    raise ValueError(f"Unknown operator: {condition.operator}")
@@ -0,0 +1,14 @@
+from typing import Hashable, NamedTuple, Optional
+
+
+class Event(NamedTuple):
+    case_id: Hashable
+    activity: str
+    timestamp: float
+
+
+class Match(NamedTuple):
+    case_id: Hashable
+    start: float  # timestamp of the first event of the match
+    end: float  # timestamp of the event that completed the match
+    pattern: Optional[Hashable] = None
@@ -0,0 +1,625 @@
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
+from itertools import count
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from src.cep.conditions import compile_where, match_environment
+from src.cep.events import Match
+from src.cep.planner import PatternPlanner
+from src.parsers.pattern_parser import AnyPatternNode
+from src.parsers.query_parser import PatternQuery
+from src.utils.operators import Operators
+
+_NO_START = float("-inf")
+
+
+class _NetworkNode:
+    """
+    One distinct subpattern of the network.
+
+    A SEQ is split into a chain of binary prefix nodes, so `children` of a SEQ node are the prefix, the element and
+    the negations between them. Nodes keeping `full` history record every start per end, the others only the latest.
+
+    Only the matches its parents look up are kept of a node: none if they only use the matches ending with the current
+    event, all of them if a node with full history reads them (`history`), and otherwise the latest one, or for the
+    prefixes and negations of SEQs (`readers`) those the SEQs can still combine with a new match of their element,
+    see `PatternNetwork._lookup_cutoff`.
+    """
+    __slots__ = ("node_id", "node_type", "children", "full", "height", "triggers", "pattern_ids", "stored", "history",
+                 "readers")
+
+    def __init__(self, node_id: int, node_type: str, children: Tuple[int, ...], full: bool, height: int):
+        self.node_id = node_id
+        self.node_type = node_type
+        self.children = children
+        self.full = full
+        self.height = height
+        # Parents to evaluate when this node gains a match
+        self.triggers: List[int] = []
+        self.pattern_ids: List[Hashable] = []
+        self.stored = False
+        self.history = False
+        self.readers: List[int] = []
+
+
+class _Memory:
+    """
+    The matches of one node within one case, as (end, start) intervals ordered by end, with the running maximum of
+    the starts, and the ends and starts of the matches starting before every later one, for the minimum start of the
+    matches ending after some time.
+    """
+    __slots__ = ("ends", "starts", "best", "minimum_ends", "minimum_starts")
+
+    def __init__(self):
+        self.ends: List[float] = []
+        self.starts: List[float] = []
+        self.best: List[float] = []
+        self.minimum_ends: List[float] = []
+        self.minimum_starts: List[float] = []
+
+    def append(self, end: float, starts: List[float]) -> None:
+        best = self.best[-1] if self.best else _NO_START
+        minimum_ends = self.minimum_ends
+        minimum_starts = self.minimum_starts
+        for start in starts:
+            self.ends.append(end)
+            self.starts.append(start)
+            if start > best:
+                best = start
+            self.best.append(best)
+            while minimum_starts and minimum_starts[-1] >= start:
+                minimum_ends.pop()
+                minimum_starts.pop()
+            minimum_ends.append(end)
+            minimum_starts.append(start)
+
+    def forget_before(self, end: float) -> None:
+        """
+        Forget the matches that ended before `end` except the last of them, whose running maximum answers every later
+        lookup up to an end at or after `end`.
+        """
+        self._drop(bisect_left(self.ends, end) - 1)
+
+    def prune(self, end: float) -> None:
+        """
+        Forget the matches that ended before `end`.
+        """
+        self._drop(bisect_left(self.ends, end))
+
+    def _drop(self, count: int) -> None:
+        if count > 0:
+            del self.ends[:count]
+            del self.starts[:count]
+            del self.best[:count]
+            del self.minimum_starts[:bisect_left(self.minimum_ends, self.ends[0]) if self.ends else None]
+            del self.minimum_ends[:len(self.minimum_ends) - len(self.minimum_starts)]
+
+    def latest_start_until(self, end: float) -> float:
+        """
+        :return: The latest start of a match ending at or before `end`.
+        """
+        index = bisect_right(self.ends, end)
+        return self.best[index - 1] if index else _NO_START
+
+    def earliest_start_from(self, end: float) -> float:
+        """
+        :return: The earliest start of a match ending at or after `end`.
+        """
+        index = bisect_left(self.minimum_ends, end)
+        return self.minimum_starts[index] if index < len(self.minimum_starts) else float("inf")
+
+
+class _CaseState:
+    __slots__ = ("memories", "last", "expiry")
+
+    def __init__(self):
+        self.memories: Dict[int, _Memory] = {}
+        self.last = _NO_START
+        self.expiry = _NO_START
+
+
+class PatternNetwork:
+    """
+    Evaluates many patterns at once over one event stream.
+
+    Structurally equal subpatterns of all registered patterns are merged into one node, in the style of a Rete network.
+    An event only touches the leaf of its activity and the nodes above it that gain a match, each of them once, no
+    matter how many patterns share it.
+
+    Matches have the same semantics as `PatternMatcher`: for every registered pattern and every event that completes
+    one of its matches, the latest start of such a match is reported. Since the network joins matched intervals rather
+    than automaton states, it also handles a NOT nested in a negated pattern and an AND directly behind a negation
+    exactly. Per case and node the matched intervals its parents can still look up are kept; only the elements
+    following a negation, and what they are built from, need every start, all other nodes keep the latest start per
+    end. Without a time window this is usually the latest interval per node, and cases without a kept interval are
+    not stored at all.
+
+    With a time window, matches starting longer than the window ago are not kept, intervals that ended before it are
+    forgotten, and cases without events within the window are evicted through a heap ordered by expiry.
+
+    With a planner, registered patterns are normalized first. If the planner has statistics, the network feeds them
+    every activity it processes, and patterns registered later are ordered by the frequencies seen so far.
+    """
+
+    def __init__(self, window: Optional[float] = None, planner: Optional[PatternPlanner] = None):
+        """
+        Initialize an empty network.
+
+        :param window: The longest WITHIN of the patterns to register, None if some pattern is not time-bounded.
+        :param planner: Rewrites the patterns before they are registered, None to register them as they are.
+        """
+        self.window = window
+        self.planner = planner
+        self._statistics = None if planner is None else planner.statistics
+        self._nodes: List[_NetworkNode] = []
+        self._keys: Dict[Tuple, int] = {}
+        # Interned subtrees shared by several patterns are only walked once
+        self._built: Dict[Tuple[AnyPatternNode, bool], int] = {}
+        self._leaves: Dict[str, int] = {}
+        self._roots: Dict[Hashable, int] = {}
+        self._filters: Dict[Hashable, Tuple[Optional[float], Optional[Callable[[Mapping[str, Any]], bool]]]] = {}
+        self._cases: Dict[Hashable, _CaseState] = {}
+        self._now = _NO_START
+        self._expiries: List[Tuple[float, int, Hashable]] = []
+        self._sequence = count()
+
+    @property
+    def node_count(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def pattern_ids(self) -> List[Hashable]:
+        return list(self._roots)
+
+    def add_pattern(self,
+                    pattern_id: Hashable,
+                    pattern: AnyPatternNode,
+                    within: Optional[float] = None,
+                    where: Optional[Callable[[Mapping[str, Any]], bool]] = None) -> None:
+        """
+        Register a pattern, reusing every subpattern that is already part of the network.
+
+        :param pattern_id: The identifier reported in the matches of the pattern.
+        :param pattern: The root of the pattern tree.
+        :param within: The maximum time between the first and the last event of a match, None for no limit.
+        :param where: A compiled condition a match has to satisfy, evaluated in `match_environment(match)`.
+        :raises ValueError: If the identifier is taken, the pattern uses an operator in an unsupported position, or
+            its time window is longer than the one of the network.
+        """
+        if pattern_id in self._roots:
+            raise ValueError(f"Pattern {pattern_id} is already registered")
+        if self.window is not None and (within is None or within > self.window):
+            raise ValueError(f"Pattern {pattern_id} is not bounded by the network window of {self.window}")
+        if self.planner is not None:
+            pattern = self.planner.plan(pattern)
+        root = self._build(pattern, False)
+        self._roots[pattern_id] = root
+        self._nodes[root].pattern_ids.append(pattern_id)
+        if within is not None or where is not None:
+            self._filters[pattern_id] = (within, where)
+
+    def add_query(self,
+                  pattern_id: Hashable,
+                  query: PatternQuery,
+                  predicates: Optional[Dict[str, Callable[..., bool]]] = None) -> None:
+        """
+        Register a parsed query, with its WHERE clause compiled once and its WITHIN clause as time window.
+
+        :param pattern_id: The identifier reported in the matches of the query.
+        :param query: The parsed query, see `parse_query`.
+        :param predicates: The functions implementing the predicates used in the WHERE clause.
+        :raises ValueError: If the query cannot be registered, see `add_pattern`.
+        """
+        where = None if query.where is None else compile_where(query.where, predicates or {})
+        within = None if query.within is None else query.within.seconds
+        self.add_pattern(pattern_id, query.pattern, within, where)
+
+    def _add_node(self, node_type: str, children: Tuple[int, ...], full: bool, triggered_by: Tuple[int, ...]) -> int:
+        key = (node_type, children, full)
+        node_id = self._keys.get(key)
+        if node_id is not None:
+            return node_id
+        node_id = len(self._nodes)
+        height = 1 + max(self._nodes[child].height for child in children) if children else 0
+        self._nodes.append(_NetworkNode(node_id, node_type, children, full, height))
+        self._keys[key] = node_id
+        for child in triggered_by:
+            if node_id not in self._nodes[child].triggers:
+                self._nodes[child].triggers.append(node_id)
+        self._register_lookups(self._nodes[node_id])
+        return node_id
+
+    def _register_lookups(self, node: _NetworkNode) -> None:
+        """
+        Record which matches of its children, and of itself, a new node looks up, see `_NetworkNode`.
+        """
+        nodes = self._nodes
+        children = node.children
+        if node.node_type == Operators.AND:
+            for child in children:
+                nodes[child].stored = True
+                nodes[child].history |= node.full
+        elif node.node_type == Operators.KLEENE_CLOSURE:
+            if node.full:
+                for looked_up in (node.node_id,) + children[1:]:
+                    nodes[looked_up].stored = nodes[looked_up].history = True
+        elif node.node_type == Operators.SEQ:
+            for looked_up in children[:1] + children[2:]:
+                nodes[looked_up].stored = True
+                if node.node_id not in nodes[looked_up].readers:
+                    nodes[looked_up].readers.append(node.node_id)
+            nodes[children[0]].history |= node.full and len(children) == 2
+
+    def _build(self, node: AnyPatternNode, full: bool) -> int:
+        built = self._built.get((node, full))
+        if built is None:
+            built = self._built[(node, full)] = self._build_node(node, full)
+        return built
+
+    def _build_node(self, node: AnyPatternNode, full: bool) -> int:
+        node_type = node.node_type
+        children = node.children
+
+        if not children:
+            if node_type in Operators.OPERATORS:
+                raise ValueError(f"Operator {node_type} has no children")
+            if node_type == "TEMPLATE" or node_type.startswith("∀"):
+                raise ValueError(f"Pattern contains an unexpanded template block: {node_type}")
+            leaf = self._add_node(node_type, (), False, ())
+            self._leaves[node_type] = leaf
+            return leaf
+
+        if node_type == Operators.SEQ:
+            return self._build_seq(children, full)
+        if node_type == Operators.NEGATION:
+            raise ValueError("NOT is only supported between two elements of a SEQ")
+        for child in children:
+            if child.node_type == Operators.NEGATION and child.children:
+                raise ValueError("NOT is only supported between two elements of a SEQ")
+
+        if node_type == Operators.OR or node_type == Operators.AND:
+            child_ids = tuple(self._build(child, full) for child in children)
+            return self._add_node(node_type, child_ids, full, child_ids)
+        if node_type == Operators.KLEENE_CLOSURE:
+            if len(children) not in (1, 2):
+                raise ValueError(f"Operator * expects one or two children, got {len(children)}")
+            # Every match of the closure ends with a repetition; of a redo part only the latest start matters
+            child_ids = (self._build(children[0], full),) + tuple(self._build(child, False) for child in children[1:])
+            return self._add_node(node_type, child_ids, full, child_ids[:1])
+        raise ValueError(f"Unknown operator: {node_type}")
+
+    def _build_seq(self, children: Sequence[AnyPatternNode], full: bool) -> int:
+        for position, child in enumerate(children):
+            if child.node_type == Operators.NEGATION and child.children \
+                    and (position == 0 or position == len(children) - 1):
+                raise ValueError("NOT is only supported between two elements of a SEQ")
+
+        prefix = self._build(children[0], full)
+        negations: List[int] = []
+        for child in children[1:]:
+            if child.node_type == Operators.NEGATION and child.children:
+                negations.extend(self._build(negated, False) for negated in child.children)
+                continue
+            # The starts an element may take depend on the negations in front of it, so it needs all of them
+            element = self._build(child, full or bool(negations))
+            prefix = self._add_node(Operators.SEQ, (prefix, element) + tuple(negations), full, (element,))
+            negations = []
+        return prefix
+
+    def process(self, case_id: Hashable, activity: str, timestamp: float) -> List[Match]:
+        """
+        Consume one event.
+
+        :param case_id: The case the event belongs to.
+        :param activity: The activity of the event.
+        :param timestamp: The timestamp of the event; the events of a case must arrive with increasing timestamps.
+        :return: The matches of all registered patterns completed by this event.
+        """
+        window = self.window
+        if window is not None and self._expiries and self._expiries[0][0] < timestamp:
+            self.advance_time(timestamp)
+        if self._statistics is not None:
+            self._statistics.observe(activity)
+        leaf = self._leaves.get(activity)
+        if leaf is None:
+            return []
+        case = self._cases.get(case_id)
+        memories = {} if case is None else case.memories
+        cutoff = _NO_START if window is None else timestamp - window
+
+        nodes = self._nodes
+        matches: List[Match] = []
+        fresh: Dict[int, List[float]] = {}
+        bounds: Dict[int, float] = {}
+        queue: List[Tuple[int, int]] = [(0, leaf)]
+        queued = {leaf}
+        while queue:
+            _, node_id = heappop(queue)
+            node = nodes[node_id]
+            if node_id == leaf:
+                starts = [timestamp]
+            else:
+                starts = self._evaluate(node, memories, fresh, timestamp)
+                if starts and starts[0] < cutoff:
+                    starts = [start for start in starts if start >= cutoff]
+                if not starts:
+                    continue
+                if not node.full:
+                    starts = [max(starts)]
+            fresh[node_id] = starts
+            if node.stored:
+                memory = memories.get(node_id)
+                if memory is None:
+                    memory = memories[node_id] = _Memory()
+                elif memory.ends and memory.ends[0] < cutoff:
+                    memory.prune(cutoff)
+                memory.append(timestamp, starts)
+                if not node.history:
+                    memory.forget_before(min((self._lookup_cutoff(reader, node_id, memories, timestamp, bounds)
+                                              for reader in node.readers), default=float("inf")))
+
+            latest = starts[-1] if len(starts) == 1 else max(starts)
+            for pattern_id in node.pattern_ids:
+                match = Match(case_id, latest, timestamp, pattern_id)
+                filters = self._filters.get(pattern_id)
+                if filters is not None:
+                    within, where = filters
+                    if within is not None and match.end - match.start > within:
+                        continue
+                    if where is not None and not where(match_environment(match)):
+                        continue
+                matches.append(match)
+            for parent in node.triggers:
+                if parent not in queued:
+                    queued.add(parent)
+                    heappush(queue, (nodes[parent].height, parent))
+
+        # Cases without a kept match are not stored at all
+        if case is not None:
+            case.last = timestamp
+        elif memories:
+            case = self._cases[case_id] = _CaseState()
+            case.memories = memories
+            case.last = timestamp
+            if window is not None:
+                case.expiry = timestamp + window
+                heappush(self._expiries, (case.expiry, next(self._sequence), case_id))
+        return matches
+
+    def _lookup_cutoff(self, reader_id: int, node_id: int, memories: Dict[int, _Memory], timestamp: float,
+                       bounds: Dict[int, float]) -> float:
+        """
+        :return: The time before which a SEQ only needs the running maximum of the starts of the matches of its prefix
+            or negation `node_id`, for every match of its element that is still to come.
+        """
+        children = self._nodes[reader_id].children
+        element_bound = self._start_bound(children[1], memories, timestamp, bounds)
+        # A negation is looked up by the latest start of its matches ending before the element starts
+        cutoff = element_bound if node_id in children[2:] else float("inf")
+        if node_id != children[0]:
+            return cutoff
+        if len(children) == 2:
+            return min(cutoff, element_bound)
+        # The prefix is looked up from the latest negated match before the element on, or if there is none yet, by
+        # the running maximum up to the element or from the next negated match on
+        negated_end = max((memories[child].latest_start_until(element_bound) for child in children[2:]
+                           if child in memories), default=_NO_START)
+        if negated_end == _NO_START:
+            if self._nodes[reader_id].full:
+                return _NO_START
+            negated_end = min([element_bound] + [self._start_bound(child, memories, timestamp, bounds)
+                                                 for child in children[2:]])
+        return min(cutoff, negated_end)
+
+    def _start_bound(self, node_id: int, memories: Dict[int, _Memory], timestamp: float,
+                     bounds: Dict[int, float]) -> float:
+        """
+        A lower bound of the starts of the matches of a node that end with the current event or later, computed from
+        the matches kept so far. It never decreases, so the matches of a prefix that ended before the bound of the
+        next element only matter by their running maximum.
+
+        :param bounds: The bounds computed for the current event so far.
+        """
+        bound = bounds.get(node_id)
+        if bound is not None:
+            return bound
+        node = self._nodes[node_id]
+        children = node.children
+        node_type = node.node_type
+        if not children:
+            bound = timestamp
+        elif node_type == Operators.OR:
+            bound = min(self._start_bound(child, memories, timestamp, bounds) for child in children)
+        elif node_type == Operators.KLEENE_CLOSURE:
+            bound = self._start_bound(children[0], memories, timestamp, bounds)
+            memory = memories.get(node_id)
+            if node.full and memory is not None:
+                bound = min(bound, memory.earliest_start_from(_NO_START))
+        elif node_type == Operators.AND:
+            # A new match joins a new match of one branch with the latest, or with full history any, matches of the
+            # others
+            bound = float("inf")
+            for child in children:
+                bound = min(bound, self._start_bound(child, memories, timestamp, bounds))
+                memory = memories.get(child)
+                if memory is not None and memory.best:
+                    bound = min(bound, memory.earliest_start_from(_NO_START) if node.full else memory.best[-1])
+        else:
+            element_bound = self._start_bound(children[1], memories, timestamp, bounds)
+            memory = memories.get(children[0])
+            index = 0 if memory is None else bisect_left(memory.ends, element_bound)
+            negated_end = max((memories[child].latest_start_until(element_bound) for child in children[2:]
+                               if child in memories), default=_NO_START)
+            bound = self._start_bound(children[0], memories, timestamp, bounds)
+            if memory is None:
+                pass
+            elif node.full or negated_end > _NO_START:
+                # A new match takes a prefix ending before the element starts and after the latest negated match
+                bound = min(bound, memory.earliest_start_from(negated_end))
+            else:
+                # Until a negated match comes, a new match takes the latest prefix ending before the element starts
+                bound = memory.best[index - 1] if index else min(bound, memory.earliest_start_from(_NO_START))
+                if len(children) > 2:
+                    negated_bound = min(self._start_bound(child, memories, timestamp, bounds) for child in children[2:])
+                    bound = min(bound, self._start_bound(children[0], memories, timestamp, bounds),
+                                memory.earliest_start_from(negated_bound))
+        bounds[node_id] = bound
+        return bound
+
+    def _evaluate(self, node: _NetworkNode, memories: Dict[int, _Memory], fresh: Dict[int, List[float]],
+                  timestamp: float) -> List[float]:
+        """
+        Compute the starts of the matches of a node that end with the current event. The memories of its children
+        already contain the matches ending with the current event.
+
+        :return: The distinct starts, or only the latest one for nodes without full history.
+        """
+        node_type = node.node_type
+        children = node.children
+
+        if node_type == Operators.OR:
+            starts = set()
+            for child in children:
+                starts.update(fresh.get(child, ()))
+            return sorted(starts)
+
+        if node_type == Operators.KLEENE_CLOSURE:
+            repeated = fresh.get(children[0])
+            if not repeated or not node.full:
+                return repeated or []
+            # A repetition extends every earlier match of the closure that ended before it started, or before a match
+            # of the redo part started that ended before the repetition started
+            memory = memories.get(node.node_id)
+            starts = set(repeated)
+            if memory is not None:
+                redo = memories.get(children[1]) if len(children) == 2 else None
+                for start in repeated:
+                    if len(children) == 2:
+                        if redo is None:
+                            break
+                        index = bisect_left(redo.ends, start)
+                        start = redo.best[index - 1] if index else _NO_START
+                    starts.update(memory.starts[:bisect_left(memory.ends, start)])
+            return sorted(starts)
+
+        if node_type == Operators.AND:
+            return _and_starts(node, memories, fresh, timestamp)
+
+        # SEQ: a match of the prefix that ends before the element starts, with no match of a negation starting after
+        # the prefix and ending before or with the first event of the element
+        prefix_memory = memories.get(children[0])
+        if prefix_memory is None:
+            return []
+        negation_memories = [memories[child] for child in children[2:] if child in memories]
+        starts = set()
+        for element_start in fresh[children[1]]:
+            lowest_end = _NO_START
+            for memory in negation_memories:
+                negated_start = memory.latest_start_until(element_start)
+                if negated_start > lowest_end:
+                    lowest_end = negated_start
+            high = bisect_left(prefix_memory.ends, element_start)
+            if lowest_end == _NO_START:
+                if node.full:
+                    starts.update(prefix_memory.starts[:high])
+                elif high:
+                    starts.add(prefix_memory.best[high - 1])
+            else:
+                low = bisect_left(prefix_memory.ends, lowest_end)
+                if low < high:
+                    if node.full:
+                        starts.update(prefix_memory.starts[low:high])
+                    else:
+                        starts.add(max(prefix_memory.starts[low:high]))
+        return sorted(starts)
+
+    def run(self, events: Iterable[Tuple[Hashable, str, float]]) -> Iterator[Match]:
+        """
+        Consume an event stream and yield matches incrementally.
+
+        :param events: (case_id, activity, timestamp) tuples.
+        :return: An iterator over the matches in the order they are completed.
+        """
+        process = self.process
+        for case_id, activity, timestamp in events:
+            yield from process(case_id, activity, timestamp)
+
+    def advance_time(self, timestamp: float) -> None:
+        """
+        Evict the cases that saw no event within the window before `timestamp`. Called by `process`; call it directly
+        to bound memory while no events arrive.
+
+        :param timestamp: The current time.
+        """
+        if timestamp > self._now:
+            self._now = timestamp
+        window = self.window
+        if window is None:
+            return
+        expiries = self._expiries
+        while expiries and expiries[0][0] < self._now:
+            expiry, _, case_id = heappop(expiries)
+            case = self._cases.get(case_id)
+            if case is None or case.expiry != expiry:
+                continue
+            if case.last + window < self._now:
+                del self._cases[case_id]
+            else:
+                case.expiry = case.last + window
+                heappush(expiries, (case.expiry, next(self._sequence), case_id))
+
+    @property
+    def open_cases(self) -> int:
+        return len(self._cases)
+
+    def close_case(self, case_id: Hashable) -> None:
+        """
+        Drop the matched intervals of a finished case.
+
+        :param case_id: The finished case.
+        """
+        self._cases.pop(case_id, None)
+
+
+def _and_starts(node: _NetworkNode, memories: Dict[int, _Memory], fresh: Dict[int, List[float]],
+                timestamp: float) -> List[float]:
+    """
+    The starts of the AND matches ending with the current event: one match per branch, at least one of them ending
+    with the current event, starting with the earliest of them.
+    """
+    children = node.children
+    latest: List[float] = []
+    latest_fresh: List[float] = []
+    for child in children:
+        memory = memories.get(child)
+        if memory is None:
+            return []
+        latest.append(memory.best[-1])
+        latest_fresh.append(max(fresh[child]) if child in fresh else _NO_START)
+
+    if not node.full:
+        best = _NO_START
+        for position, child_fresh in enumerate(latest_fresh):
+            if child_fresh == _NO_START:
+                continue
+            start = child_fresh
+            for other_position, other_latest in enumerate(latest):
+                if other_position != position and other_latest < start:
+                    start = other_latest
+            if start > best:
+                best = start
+        return [best]
+
+    starts = set()
+    for position, child in enumerate(children):
+        # The earliest branch has to be overtaken by every other branch's latest start
+        bound = min((other for other_position, other in enumerate(latest) if other_position != position),
+                    default=float("inf"))
+        memory = memories[child]
+        for end, start in zip(memory.ends, memory.starts):
+            if start > bound or start in starts:
+                continue
+            if end == timestamp or any(other_fresh >= start for other_position, other_fresh in enumerate(latest_fresh)
+                                       if other_position != position):
+                starts.add(start)
+    return sorted(starts)
@@ -0,0 +1,167 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from src.parsers.pattern_parser import AnyPatternNode, InternedPatternNode
+from src.utils.operators import Operators
+
+
+class SelectivityStatistics:
+    """
+    Relative frequencies of the activities observed in an event stream.
+
+    With a horizon, all counts are halved whenever that many events have been observed since the last halving, so the
+    frequencies follow a drifting stream instead of its whole history.
+    """
+
+    def __init__(self, horizon: Optional[int] = None):
+        """
+        :param horizon: The number of events after which the counts are halved, None to never forget.
+        """
+        if horizon is not None and horizon <= 0:
+            raise ValueError(f"The horizon has to be positive, got {horizon}")
+        self.horizon = horizon
+        self.counts: Dict[str, float] = {}
+        self.total = 0.0
+        self._since_halving = 0
+
+    def observe(self, activity: str) -> None:
+        counts = self.counts
+        counts[activity] = counts.get(activity, 0.0) + 1.0
+        self.total += 1.0
+        if self.horizon is not None:
+            self._since_halving += 1
+            if self._since_halving >= self.horizon:
+                self._halve()
+
+    def observe_events(self, events: Iterable[Tuple[Hashable, str, float]]) -> None:
+        """
+        :param events: (case_id, activity, timestamp) tuples.
+        """
+        for _, activity, _ in events:
+            self.observe(activity)
+
+    def _halve(self) -> None:
+        self.counts = {activity: count / 2 for activity, count in self.counts.items() if count >= 1.0}
+        self.total = sum(self.counts.values())
+        self._since_halving = 0
+
+    def frequency(self, activity: str) -> float:
+        """
+        :return: The share of the observed events with the activity, 0 for an activity never observed.
+        """
+        return self.counts.get(activity, 0.0) / self.total if self.total else 0.0
+
+
+class PatternPlanner:
+    """
+    Rewrites patterns into an equivalent form that is cheaper to evaluate.
+
+    - AND, OR and SEQ nodes nested in a node of the same type are flattened into it, as are nested one-child Kleene
+      closures.
+    - Duplicate children of AND and OR nodes are removed; the branches of an AND may share events, so AND(a, a)
+      matches the same as a.
+    - Nodes left with a single child are replaced by it.
+    - With statistics, the children of AND nodes are ordered from the rarest to the most frequent, and the children of
+      OR nodes from the most frequent to the rarest. Equal subpatterns of different patterns then get the same order
+      and are shared by a `PatternNetwork`, whose AND evaluation also gives up at the first branch without a match.
+      A `PatternMatcher` evaluates every transition of an event whatever the order, so for it only the flattening and
+      the removed duplicates make a difference.
+
+    The rewritten patterns report the same matches as the original ones.
+    """
+
+    def __init__(self, statistics: Optional[SelectivityStatistics] = None):
+        """
+        :param statistics: The activity frequencies used to order AND and OR children, None to keep their order.
+        """
+        self.statistics = statistics
+
+    def plan(self, pattern: AnyPatternNode) -> AnyPatternNode:
+        """
+        Normalize a pattern and order its children by the current statistics.
+
+        :param pattern: The root of the pattern tree, made of PatternNodes or InternedPatternNodes.
+        :return: The root of the rewritten tree, built from nodes of the same class.
+        """
+        return self._plan(pattern)[0]
+
+    def estimate(self, pattern: AnyPatternNode) -> float:
+        """
+        :return: The estimated share of events completing a match of the pattern.
+        """
+        return self._plan(pattern)[1]
+
+    def _plan(self, node: AnyPatternNode) -> Tuple[AnyPatternNode, float]:
+        node_type = node.node_type
+        if not node.children:
+            return node, self._estimate(node)
+
+        planned: List[Tuple[AnyPatternNode, float]] = []
+        if node_type == Operators.SEQ:
+            for child in node.children:
+                child, estimate = self._plan(child)
+                if child.node_type == Operators.SEQ and not _is_negation(child.children[0]) \
+                        and not _is_negation(child.children[-1]):
+                    planned.extend((grandchild, self._estimate(grandchild)) for grandchild in child.children)
+                else:
+                    planned.append((child, estimate))
+        else:
+            for child in node.children:
+                child, estimate = self._plan(child)
+                if child.node_type == node_type and node_type != Operators.NEGATION \
+                        and (node_type != Operators.KLEENE_CLOSURE or len(node.children) == len(child.children) == 1):
+                    planned.extend((grandchild, self._estimate(grandchild)) for grandchild in child.children)
+                else:
+                    planned.append((child, estimate))
+
+        if node_type == Operators.OR or node_type == Operators.AND:
+            seen = set()
+            unique = []
+            for child, estimate in planned:
+                key = _structural_key(child)
+                if key not in seen:
+                    seen.add(key)
+                    unique.append((child, estimate))
+            planned = unique
+        if self.statistics is not None:
+            if node_type == Operators.AND:
+                planned.sort(key=lambda child: child[1])
+            elif node_type == Operators.OR:
+                planned.sort(key=lambda child: -child[1])
+
+        estimate = _combine_estimates(node_type, planned)
+        if len(planned) == 1 and node_type in (Operators.AND, Operators.OR, Operators.SEQ):
+            return planned[0][0], estimate
+        return type(node)(node_type, [child for child, _ in planned]), estimate
+
+    def _estimate(self, node: AnyPatternNode) -> float:
+        if not node.children:
+            return self.statistics.frequency(node.node_type) if self.statistics is not None else 1.0
+        return _combine_estimates(node.node_type, [(child, self._estimate(child)) for child in node.children])
+
+
+def _combine_estimates(node_type: str, children: List[Tuple[AnyPatternNode, float]]) -> float:
+    """
+    An OR matches whenever one of its children does, every other node needs a match of each child that is not negated.
+    """
+    estimates = [estimate for child, estimate in children if not _is_negation(child)]
+    if node_type == Operators.OR:
+        return min(1.0, sum(estimates))
+    return min(estimates, default=0.0)
+
+
+def _is_negation(node: AnyPatternNode) -> bool:
+    return node.node_type == Operators.NEGATION and bool(node.children)
+
+
+def _structural_key(node: AnyPatternNode) -> Hashable:
+    return node if isinstance(node, InternedPatternNode) else repr(node)
+
+
+def normalize(pattern: AnyPatternNode) -> AnyPatternNode:
+    """
+    Flatten nested operators, remove duplicate children and collapse single-child nodes, see `PatternPlanner`.
+
+    :param pattern: The root of the pattern tree.
+    :return: The root of the equivalent normalized tree.
+    """
+    return PatternPlanner().plan(pattern)
@@ -0,0 +1,221 @@
+import math
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from pm4py import PetriNet, Marking
+from pm4py.algo.discovery.inductive import algorithm as inductive_miner
+from pm4py.objects.conversion.process_tree import converter as process_tree_converter
+from pm4py.objects.dfg.obj import DFG
+
+Relation = Tuple[str, str]
+
+
+class _LossyCounter:
+    """
+    Approximate frequencies of the items of a stream with Lossy Counting.
+
+    Every entry holds the counted frequency and the maximum number of occurrences it may have missed before it was
+    inserted. Entries whose upper bound does not exceed the current bucket are pruned, so the counter keeps
+    O(1 / error * log(error * n)) entries after n items and undercounts any frequency by at most error * n.
+    """
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        self.entries: Dict[Hashable, List[int]] = {}
+
+    def add(self, item: Hashable, bucket: int) -> None:
+        entry = self.entries.get(item)
+        if entry is None:
+            self.entries[item] = [1, bucket - 1]
+        else:
+            entry[0] += 1
+
+    def prune(self, bucket: int) -> None:
+        entries = self.entries
+        for item in [item for item, (frequency, error) in entries.items() if frequency + error <= bucket]:
+            del entries[item]
+
+    def frequencies(self, min_frequency: int = 0) -> Dict[Hashable, int]:
+        return {item: frequency for item, (frequency, _) in self.entries.items() if frequency >= min_frequency}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class OnlineDFG:
+    """
+    Directly-follows graph of an unbounded event stream in bounded memory.
+
+    Activities, directly-follows relations and start activities are counted with Lossy Counting. The last activity of
+    the open cases is kept in a table of at most max_cases entries, which evicts the case that has been idle for the
+    longest time; an evicted case that sends another event starts over as a new case. An activity ends a case as often
+    as it occurs without being followed, so end activities are derived from the counts of activities and relations.
+
+    After n events, the counters hold O(1 / error * log(error * n)) entries each and undercount any frequency by at
+    most error * n, as long as no more than max_cases cases run concurrently. Nothing of the log is kept beyond these
+    tables.
+    """
+
+    def __init__(self, error: float = 0.001, max_cases: int = 10_000):
+        """
+        Initialize the engine.
+
+        :param error: The maximum undercount of a frequency relative to the number of events, in (0, 1).
+        :param max_cases: The maximum number of open cases whose last activity is kept.
+        """
+        if not 0 < error < 1:
+            raise ValueError(f"The error has to be in (0, 1), got {error}")
+        if max_cases <= 0:
+            raise ValueError(f"The number of cases has to be positive, got {max_cases}")
+        self.error = error
+        self.max_cases = max_cases
+        self.bucket_width = math.ceil(1 / error)
+        self.event_count = 0
+        self._bucket = 1
+        self._activities = _LossyCounter()
+        self._relations = _LossyCounter()
+        self._starts = _LossyCounter()
+        # The last activity per case, least recently active first
+        self._cases: OrderedDict[Hashable, str] = OrderedDict()
+
+    @property
+    def open_cases(self) -> int:
+        return len(self._cases)
+
+    @property
+    def table_sizes(self) -> Dict[str, int]:
+        """
+        :return: The number of entries per table, which bounds the memory of the engine.
+        """
+        return {"activities": len(self._activities), "relations": len(self._relations),
+                "start_activities": len(self._starts), "cases": len(self._cases)}
+
+    def process(self, case_id: Hashable, activity: str, timestamp: Optional[float] = None) -> None:
+        """
+        Consume one event.
+
+        :param case_id: The case the event belongs to.
+        :param activity: The activity of the event.
+        :param timestamp: The timestamp of the event, accepted for symmetry with the matchers; the events of a case
+            must arrive in order.
+        """
+        bucket = self._bucket
+        cases = self._cases
+        self._activities.add(activity, bucket)
+        last = cases.get(case_id)
+        if last is None:
+            self._starts.add(activity, bucket)
+            if len(cases) >= self.max_cases:
+                cases.popitem(last=False)
+        else:
+            self._relations.add((last, activity), bucket)
+            cases.move_to_end(case_id)
+        cases[case_id] = activity
+
+        self.event_count += 1
+        if self.event_count % self.bucket_width == 0:
+            for counter in (self._activities, self._relations, self._starts):
+                counter.prune(bucket)
+            self._bucket += 1
+
+    def run(self, events: Iterable[Tuple[Hashable, str, float]]) -> None:
+        """
+        Consume an event stream.
+
+        :param events: (case_id, activity, timestamp) tuples.
+        """
+        process = self.process
+        for case_id, activity, timestamp in events:
+            process(case_id, activity, timestamp)
+
+    def close_case(self, case_id: Hashable) -> None:
+        """
+        Forget the last activity of a finished case.
+
+        :param case_id: The finished case.
+        """
+        self._cases.pop(case_id, None)
+
+    def activities(self, min_frequency: int = 0) -> Dict[str, int]:
+        """
+        :return: The approximate frequency per activity, of the activities seen at least min_frequency times.
+        """
+        return self._activities.frequencies(min_frequency)
+
+    def directly_follows(self, min_frequency: int = 0) -> Dict[Relation, int]:
+        """
+        :return: The approximate frequency per directly-follows relation, of the relations seen at least
+            min_frequency times.
+        """
+        return self._relations.frequencies(min_frequency)
+
+    def start_activities(self, min_frequency: int = 0) -> Dict[str, int]:
+        return self._starts.frequencies(min_frequency)
+
+    def end_activities(self, min_frequency: int = 0) -> Dict[str, int]:
+        """
+        :return: The approximate frequency per end activity, the occurrences of an activity that no other activity
+            followed, of finished cases and the last activities of open ones.
+        """
+        ends = self._activities.frequencies()
+        for (source, _), frequency in self._relations.entries.items():
+            if source in ends:
+                ends[source] -= frequency[0]
+        return {activity: frequency for activity, frequency in ends.items()
+                if frequency >= min_frequency and frequency > 0}
+
+    def to_dfg(self, noise_threshold: float = 0.0) -> DFG:
+        """
+        Build the current directly-follows graph.
+
+        :param noise_threshold: Relations, start and end activities below this fraction of the number of events are
+            dropped. It should be at least the error, as frequencies up to error * n may be missing.
+        :return: The graph as pm4py DFG.
+        """
+        if not 0 <= noise_threshold < 1:
+            raise ValueError(f"The noise threshold has to be in [0, 1), got {noise_threshold}")
+        min_frequency = max(1, math.ceil(noise_threshold * self.event_count))
+        activities = self.activities(min_frequency)
+        relations = {relation: frequency for relation, frequency in self.directly_follows(min_frequency).items()
+                     if relation[0] in activities and relation[1] in activities}
+        starts = {activity: frequency for activity, frequency in self.start_activities(min_frequency).items()
+                  if activity in activities}
+        ends = {activity: frequency for activity, frequency in self.end_activities(min_frequency).items()
+                if activity in activities}
+        return DFG(relations, starts, ends)
+
+    def discover(self, noise_threshold: float = 0.0) -> Tuple[PetriNet, Marking, Marking]:
+        """
+        Discover a Petri net from the current directly-follows graph with the Inductive Miner on DFGs. The net is
+        block-structured, so it can be passed to `identify_patterns` and, with `drop_skips` if some activities are
+        optional, to `convert_petri_net_to_pattern`.
+
+        :param noise_threshold: See `to_dfg`.
+        :return: The net, its initial marking and its final marking.
+        :raises ValueError: If no start activity is frequent enough to discover a net from.
+        """
+        dfg = self.to_dfg(noise_threshold)
+        if not dfg.start_activities or not dfg.end_activities:
+            raise ValueError("The stream has no frequent start and end activities to discover a net from")
+        tree = inductive_miner.apply(dfg, variant=inductive_miner.Variants.IMd)
+        return process_tree_converter.apply(tree)
+
+    def snapshots(self,
+                  events: Iterable[Tuple[Hashable, str, float]],
+                  every: int,
+                  noise_threshold: float = 0.0) -> Iterator[Tuple[PetriNet, Marking, Marking]]:
+        """
+        Consume an event stream and discover a net after every `every` events.
+
+        :param events: (case_id, activity, timestamp) tuples.
+        :param every: The number of events between two discoveries.
+        :param noise_threshold: See `to_dfg`.
+        :return: An iterator over the discovered nets with their initial and final markings.
+        """
+        if every <= 0:
+            raise ValueError(f"The discovery interval has to be positive, got {every}")
+        process = self.process
+        for case_id, activity, timestamp in events:
+            process(case_id, activity, timestamp)
+            if self.event_count % every == 0:
+                yield self.discover(noise_threshold)
@@ -0,0 +1,372 @@
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Set, Tuple, Union
+
+from pm4py import PetriNet
+
+from src.utils.operators import Operators
+
+Element = Union[PetriNet.Place, PetriNet.Transition]
+
+
+class DetectedPattern(NamedTuple):
+    kind: str  # Operators.SEQ, Operators.AND or Operators.OR
+    anchor: Element  # the first place of a SEQ chain, or the transition / place that splits
+    elements: Union[Tuple[Element, ...], FrozenSet[Element]]  # the chain in order, or the connected elements
+
+
+class PatternDiff(NamedTuple):
+    appeared: Tuple[DetectedPattern, ...]
+    disappeared: Tuple[DetectedPattern, ...]
+
+    def __bool__(self) -> bool:
+        return bool(self.appeared or self.disappeared)
+
+
+class IncrementalPatternDetector:
+    """
+    Keeps the SEQ chains, AND splits and OR splits of a Petri net up to date while the net is edited.
+
+    AND and OR splits are those of `identify_patterns`. A SEQ link leads from a place with a single successor
+    transition through that transition, if it has a single successor place itself, to that place. The links form
+    chains: maximal paths whose inner places have exactly one incoming and one outgoing link. Every link belongs to
+    exactly one chain, and a cycle of links without entry is a chain starting and ending at its oldest place. Unlike
+    the greedy walk of `identify_patterns`, the chains do not depend on the order in which places are visited, which is
+    what allows updating them locally.
+
+    An edit only revisits the splits of the edited elements, the links of the places in front of an edited transition
+    and the chains through the places whose link changed, and reports the patterns that appeared and disappeared.
+    """
+
+    def __init__(self):
+        self._place_successors: Dict[PetriNet.Place, Dict[PetriNet.Transition, int]] = {}
+        self._place_predecessors: Dict[PetriNet.Place, Dict[PetriNet.Transition, int]] = {}
+        self._transition_successors: Dict[PetriNet.Transition, Dict[PetriNet.Place, int]] = {}
+        self._transition_predecessors: Dict[PetriNet.Transition, Dict[PetriNet.Place, int]] = {}
+        self._arcs: Dict[Element, Set[PetriNet.Arc]] = {}
+        self._order: Dict[PetriNet.Place, int] = {}
+        self._next_order = 0
+        # SEQ links place -> (transition, place) and their reverse
+        self._links: Dict[PetriNet.Place, Tuple[PetriNet.Transition, PetriNet.Place]] = {}
+        self._linked_from: Dict[PetriNet.Place, Set[PetriNet.Place]] = {}
+        # Chains by first place, and the first places of the chains every place is part of
+        self._chains: Dict[PetriNet.Place, DetectedPattern] = {}
+        self._chains_of: Dict[PetriNet.Place, Set[PetriNet.Place]] = {}
+        self._and_patterns: Dict[PetriNet.Transition, DetectedPattern] = {}
+        self._or_patterns: Dict[PetriNet.Place, DetectedPattern] = {}
+        self._subscribers: List[Callable[[PatternDiff], None]] = []
+
+    @classmethod
+    def from_net(cls, net: PetriNet) -> "IncrementalPatternDetector":
+        return cls.from_elements(net.places, net.transitions, net.arcs)
+
+    @classmethod
+    def from_elements(cls,
+                      places: Iterable[PetriNet.Place],
+                      transitions: Iterable[PetriNet.Transition],
+                      arcs: Iterable[PetriNet.Arc]) -> "IncrementalPatternDetector":
+        """
+        Build a detector for an existing net.
+
+        :param places: The places.
+        :param transitions: The transitions.
+        :param arcs: The arcs between them.
+        :return: The detector.
+        :raises ValueError: If an arc connects elements that are not part of the net.
+        """
+        detector = cls()
+        for place in places:
+            detector.add_place(place)
+        for transition in transitions:
+            detector.add_transition(transition)
+        for arc in arcs:
+            detector._connect(arc, 1)
+        for place, successors in detector._place_successors.items():
+            detector._update_split(detector._or_patterns, Operators.OR, place, successors, set(), set())
+            detector._update_link(place, {})
+        for transition, successors in detector._transition_successors.items():
+            detector._update_split(detector._and_patterns, Operators.AND, transition, successors, set(), set())
+        detector._build_chains(place for place in detector._links if not detector._is_inner(place))
+        # Whatever is linked but not part of a chain yet lies on cycles without entry
+        for place in list(detector._links):
+            if place not in detector._chains_of:
+                detector._build_chains([detector._chain_start(place)])
+        return detector
+
+    def subscribe(self, callback: Callable[[PatternDiff], None]) -> None:
+        """
+        :param callback: Called with the diff of every edit that changed the detected patterns.
+        """
+        self._subscribers.append(callback)
+
+    @property
+    def patterns(self) -> Set[DetectedPattern]:
+        return set(self._chains.values()) | set(self._and_patterns.values()) | set(self._or_patterns.values())
+
+    def identify_patterns(self) -> Tuple[
+        List[List[Element]],
+        Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]],
+        Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]]
+    ]:
+        """
+        :return: The current patterns in the format of `identify_patterns`.
+        """
+        return ([list(chain.elements) for chain in self._chains.values()],
+                {(pattern.anchor, tuple(pattern.elements)) for pattern in self._and_patterns.values()},
+                {(pattern.anchor, tuple(pattern.elements)) for pattern in self._or_patterns.values()})
+
+    def add_place(self, place: PetriNet.Place) -> PatternDiff:
+        if place not in self._order:
+            self._place_successors[place] = {}
+            self._place_predecessors[place] = {}
+            self._arcs[place] = set()
+            self._linked_from[place] = set()
+            self._order[place] = self._next_order
+            self._next_order += 1
+        return PatternDiff((), ())
+
+    def add_transition(self, transition: PetriNet.Transition) -> PatternDiff:
+        if transition not in self._transition_successors:
+            self._transition_successors[transition] = {}
+            self._transition_predecessors[transition] = {}
+            self._arcs[transition] = set()
+        return PatternDiff((), ())
+
+    def remove_place(self, place: PetriNet.Place) -> PatternDiff:
+        """
+        Remove a place together with its arcs.
+
+        :raises ValueError: If the place is not part of the net.
+        """
+        if place not in self._order:
+            raise ValueError(f"Unknown place: {place}")
+        diff = self._remove_arcs(place)
+        for mapping in (self._place_successors, self._place_predecessors, self._arcs, self._linked_from,
+                        self._order, self._chains_of):
+            mapping.pop(place, None)
+        return diff
+
+    def remove_transition(self, transition: PetriNet.Transition) -> PatternDiff:
+        """
+        Remove a transition together with its arcs.
+
+        :raises ValueError: If the transition is not part of the net.
+        """
+        if transition not in self._transition_successors:
+            raise ValueError(f"Unknown transition: {transition}")
+        diff = self._remove_arcs(transition)
+        for mapping in (self._transition_successors, self._transition_predecessors, self._arcs):
+            mapping.pop(transition, None)
+        return diff
+
+    def _remove_arcs(self, element: Element) -> PatternDiff:
+        appeared: Set[DetectedPattern] = set()
+        disappeared: Set[DetectedPattern] = set()
+        for arc in list(self._arcs[element]):
+            _merge(appeared, disappeared, *self._edit_arc(arc, -1))
+        return self._publish(appeared, disappeared)
+
+    def add_arc(self, arc: PetriNet.Arc) -> PatternDiff:
+        """
+        Add an arc between a place and a transition of the net.
+
+        :return: The patterns that appeared and disappeared.
+        :raises ValueError: If the arc does not connect a place and a transition of the net.
+        """
+        return self._publish(*self._edit_arc(arc, 1))
+
+    def remove_arc(self, arc: PetriNet.Arc) -> PatternDiff:
+        """
+        Remove an arc of the net.
+
+        :return: The patterns that appeared and disappeared.
+        :raises ValueError: If the arc is not part of the net.
+        """
+        return self._publish(*self._edit_arc(arc, -1))
+
+    def _connect(self, arc: PetriNet.Arc, change: int) -> bool:
+        """
+        Add (change 1) or remove (change -1) an arc from the adjacency.
+
+        :return: Whether the set of successors of the source changed; parallel arcs count once, like in the sets of
+            identify_patterns.
+        :raises ValueError: If the arc cannot be added or removed.
+        """
+        source, target = arc.source, arc.target
+        if source in self._order and target in self._transition_successors:
+            successors, predecessors = self._place_successors[source], self._transition_predecessors[target]
+        elif source in self._transition_successors and target in self._order:
+            successors, predecessors = self._transition_successors[source], self._place_predecessors[target]
+        else:
+            raise ValueError(f"Arc does not connect a place and a transition of the net: {arc}")
+
+        arcs = self._arcs[source]
+        if change > 0:
+            if arc in arcs:
+                return False
+            arcs.add(arc)
+            self._arcs[target].add(arc)
+        else:
+            if arc not in arcs:
+                raise ValueError(f"Unknown arc: {arc}")
+            arcs.discard(arc)
+            self._arcs[target].discard(arc)
+
+        count = successors.get(target, 0) + change
+        if count:
+            successors[target] = predecessors[source] = count
+        else:
+            del successors[target]
+            del predecessors[source]
+        return count == (1 if change > 0 else 0)
+
+    def _edit_arc(self, arc: PetriNet.Arc, change: int) -> Tuple[Set[DetectedPattern], Set[DetectedPattern]]:
+        """
+        Add (change 1) or remove (change -1) an arc and update the patterns around it.
+
+        :return: The patterns that appeared and disappeared; a pattern rebuilt unchanged is in both.
+        """
+        appeared: Set[DetectedPattern] = set()
+        disappeared: Set[DetectedPattern] = set()
+        if not self._connect(arc, change):
+            return appeared, disappeared
+
+        source = arc.source
+        # The places whose link changed, and the inner status every place around them had before
+        relinked: Set[PetriNet.Place] = set()
+        was_inner: Dict[PetriNet.Place, bool] = {}
+        if source in self._order:
+            successors = self._place_successors[source]
+            self._update_split(self._or_patterns, Operators.OR, source, successors, appeared, disappeared)
+            if self._update_link(source, was_inner):
+                relinked.add(source)
+        else:
+            successors = self._transition_successors[source]
+            self._update_split(self._and_patterns, Operators.AND, source, successors, appeared, disappeared)
+            for place in self._transition_predecessors[source]:
+                if self._update_link(place, was_inner):
+                    relinked.add(place)
+
+        dirty = relinked | {place for place, inner in was_inner.items() if self._is_inner(place) != inner}
+        for place in dirty:
+            for start in list(self._chains_of.get(place, ())):
+                chain = self._chains.pop(start)
+                disappeared.add(chain)
+                for element in chain.elements[::2]:
+                    self._chains_of[element].discard(start)
+        # Every chain that changed passes through a dirty place
+        starts = set()
+        for place in dirty:
+            if place in self._links:
+                starts.add(self._chain_start(place))
+            if not self._is_inner(place):
+                starts.update(self._chain_start(previous) for previous in self._linked_from[place])
+        appeared.update(self._build_chains(starts))
+        return appeared, disappeared
+
+    def _publish(self, appeared: Set[DetectedPattern], disappeared: Set[DetectedPattern]) -> PatternDiff:
+        unchanged = appeared & disappeared
+        diff = PatternDiff(tuple(appeared - unchanged), tuple(disappeared - unchanged))
+        if diff:
+            for callback in self._subscribers:
+                callback(diff)
+        return diff
+
+    @staticmethod
+    def _update_split(patterns: Dict[Element, DetectedPattern], kind: str, element: Element,
+                      successors: Dict[Element, int], appeared: Set[DetectedPattern],
+                      disappeared: Set[DetectedPattern]) -> None:
+        old = patterns.pop(element, None)
+        if old is not None:
+            disappeared.add(old)
+        if len(successors) > 1:
+            new = patterns[element] = DetectedPattern(kind, element, frozenset(successors))
+            appeared.add(new)
+
+    def _update_link(self, place: PetriNet.Place, was_inner: Dict[PetriNet.Place, bool]) -> bool:
+        """
+        Recompute the SEQ link of a place.
+
+        :param was_inner: Receives the inner status before the change of the place and the places it led and leads to.
+        :return: Whether the link changed.
+        """
+        link = None
+        successors = self._place_successors[place]
+        if len(successors) == 1:
+            transition = next(iter(successors))
+            following = self._transition_successors[transition]
+            if len(following) == 1:
+                link = (transition, next(iter(following)))
+        old = self._links.get(place)
+        if old == link:
+            return False
+        for neighbour in (place, old and old[1], link and link[1]):
+            if neighbour is not None and neighbour not in was_inner:
+                was_inner[neighbour] = self._is_inner(neighbour)
+        if old is not None:
+            self._linked_from[old[1]].discard(place)
+            del self._links[place]
+        if link is not None:
+            self._linked_from[link[1]].add(place)
+            self._links[place] = link
+        return True
+
+    def _is_inner(self, place: PetriNet.Place) -> bool:
+        return place in self._links and len(self._linked_from[place]) == 1
+
+    def _chain_start(self, place: PetriNet.Place) -> PetriNet.Place:
+        """
+        :return: The first place of the chain that leaves `place` through its link.
+        """
+        if not self._is_inner(place):
+            return place
+        oldest = current = place
+        while True:
+            current = next(iter(self._linked_from[current]))
+            if current == place:
+                return oldest  # a cycle without entry starts at its oldest place
+            if not self._is_inner(current):
+                return current
+            if self._order[current] < self._order[oldest]:
+                oldest = current
+
+    def _build_chains(self, starts: Iterable[PetriNet.Place]) -> List[DetectedPattern]:
+        """
+        Build the chains from the given first places that do not exist yet.
+
+        :return: The new chains.
+        """
+        built = []
+        for start in starts:
+            if start in self._chains:
+                continue
+            elements: List[Element] = [start]
+            current = start
+            while True:
+                transition, following = self._links[current]
+                elements.append(transition)
+                elements.append(following)
+                if following == start or not self._is_inner(following):
+                    break
+                current = following
+            chain = self._chains[start] = DetectedPattern(Operators.SEQ, start, tuple(elements))
+            built.append(chain)
+            for element in elements[::2]:
+                self._chains_of.setdefault(element, set()).add(start)
+        return built
+
+
+def _merge(appeared: Set[DetectedPattern], disappeared: Set[DetectedPattern],
+           edit_appeared: Set[DetectedPattern], edit_disappeared: Set[DetectedPattern]) -> None:
+    """
+    Fold the changes of a later edit into the accumulated changes of earlier edits.
+    """
+    unchanged = edit_appeared & edit_disappeared
+    for pattern in edit_disappeared - unchanged:
+        if pattern in appeared:
+            appeared.discard(pattern)
+        else:
+            disappeared.add(pattern)
+    for pattern in edit_appeared - unchanged:
+        if pattern in disappeared:
+            disappeared.discard(pattern)
+        else:
+            appeared.add(pattern)
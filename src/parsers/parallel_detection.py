@@ -0,0 +1,216 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+import os
+
+import numpy as np
+from pm4py import PetriNet
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from src.petri_nets.graph_index import PetriNetIndex, _gc_paused
+
+Element = Union[PetriNet.Place, PetriNet.Transition]
+
+
+class _Partition(NamedTuple):
+    """
+    The SEQ links of the places of one partition. Only integer arrays are sent to the workers.
+    """
+    places: np.ndarray  # global ids of the places, ascending
+    transitions: np.ndarray  # link transition of each place, as len(places of the net) + its id, -1 without link
+    following: np.ndarray  # global id of the place the link leads to, -1 without link
+    following_local: np.ndarray  # local index of that place, -1 without link
+
+
+def _walk_chains(partition: _Partition) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Walk the SEQ chains of one partition like `identify_patterns`: from every place in id order that is not part of a
+    chain yet, follow the links until they lead to a place that is.
+
+    :return: The global ids of the chains, alternating places and transitions, concatenated, and the offsets of the
+        chains in them.
+    """
+    places, transitions, following = (array.tolist() for array in partition[:3])
+    following_local = partition.following_local.tolist()
+    flat: List[int] = []
+    offsets = [0]
+    visited = bytearray(len(places))
+    with _gc_paused():
+        for start in range(len(places)):
+            if visited[start] or following_local[start] < 0:
+                continue
+            begin = len(flat)
+            flat.append(places[start])
+            current = start
+            while True:
+                next_local = following_local[current]
+                if next_local < 0 or visited[next_local]:
+                    break
+                visited[next_local] = 1
+                flat.append(transitions[current])
+                flat.append(following[current])
+                current = next_local
+            if len(flat) - begin > 1:
+                visited[start] = 1
+                offsets.append(len(flat))
+            else:
+                del flat[begin:]
+    return np.array(flat, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+class ParallelPatternDetector:
+    """
+    Detects the patterns of large Petri nets in a pool of worker processes.
+
+    SEQ chains are those of `identify_patterns`, which walks the links from the places in id order and stops where it
+    reaches a place of an earlier chain. A walk never leaves the weakly connected component of the links it starts in,
+    so components can be walked independently: they are packed whole into balanced partitions of consecutive
+    components, and every worker walks its partition exactly like `identify_patterns` on integer arrays. Ordering the
+    chains by their first place afterwards gives the result of `identify_patterns`. A component is never cut, so a net
+    whose links form one giant component, like a single long chain, is walked by one worker. AND and OR splits are
+    those of `identify_patterns`.
+
+    Only integer work runs in the workers. The chains and splits are turned into places and transitions in the calling
+    process, which bounds the speedup on many cores by that serial part.
+
+    The pool is kept between calls; close the detector, or use it as a context manager, to shut it down.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, partitions_per_worker: int = 2,
+                 min_partition_size: int = 50_000):
+        """
+        :param max_workers: The number of worker processes, the number of CPUs by default.
+        :param partitions_per_worker: The number of partitions per worker, more balance the load better.
+        :param min_partition_size: The minimum number of places of a partition; smaller nets are processed in this
+            process without a pool.
+        """
+        if partitions_per_worker <= 0 or min_partition_size <= 0:
+            raise ValueError("The number of partitions per worker and the minimum partition size have to be positive")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.partitions_per_worker = partitions_per_worker
+        self.min_partition_size = min_partition_size
+        self._executor: Optional[Executor] = None
+
+    def __enter__(self) -> "ParallelPatternDetector":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @staticmethod
+    def partition(link_places: np.ndarray, partition_count: int) -> np.ndarray:
+        """
+        Assign the linked places of a net to balanced partitions of whole link components.
+
+        :param link_places: Per place, the place its SEQ link leads to, -1 without link, see `PetriNetIndex.seq_links`.
+        :param partition_count: The number of partitions.
+        :return: The partition of every place, -1 for the places without link to or from them.
+        """
+        place_count = len(link_places)
+        linked = np.flatnonzero(link_places >= 0)
+        graph = csr_matrix((np.ones(len(linked), dtype=np.int8), (linked, link_places[linked])),
+                           shape=(place_count, place_count))
+        _, labels = connected_components(graph, directed=True, connection="weak")
+        sizes = np.bincount(labels)
+        # Components with a link; a place whose link leads back to itself is a component of its own
+        used = np.bincount(labels[linked], minlength=len(sizes)) > 0
+        before = np.cumsum(np.where(used, sizes, 0)) - sizes
+        total = int(sizes[used].sum())
+        component_partitions = np.where(used, before * partition_count // max(total, 1), -1)
+        return component_partitions[labels].astype(np.int32)
+
+    def _partitions(self, index: PetriNetIndex, partition_count: int) -> List[_Partition]:
+        link_transitions, link_places = index.seq_links()
+        place_count = len(index.places)
+        # Chains hold places and transitions in one id space, transitions after the places
+        link_transitions = np.where(link_transitions >= 0, link_transitions.astype(np.int64) + place_count, -1)
+        link_places = link_places.astype(np.int64)
+
+        if partition_count == 1:
+            return [_Partition(np.arange(place_count), link_transitions, link_places, link_places)]
+        assignment = self.partition(link_places, partition_count)
+        used = np.flatnonzero(assignment >= 0)
+        local = np.empty(place_count, dtype=np.int64)
+        partitions = []
+        # A stable sort keeps the places of every partition in id order
+        order = used[np.argsort(assignment[used], kind="stable")]
+        for places in np.split(order, np.flatnonzero(np.diff(assignment[order])) + 1):
+            local[places] = np.arange(len(places))
+            following = link_places[places]
+            partitions.append(_Partition(places, link_transitions[places], following,
+                                         np.where(following >= 0, local[np.maximum(following, 0)], -1)))
+        return partitions
+
+    def detect(self, index: PetriNetIndex) -> Tuple[
+        List[List[Element]],
+        Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]],
+        Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]]
+    ]:
+        """
+        Detect the SEQ chains, AND splits and OR splits of a net.
+
+        :param index: The index of the net.
+        :return: The patterns of `identify_patterns`, with the chains in the same order.
+        """
+        # One pause for the whole detection, every resumption of the collector costs a full collection
+        with _gc_paused():
+            return self._detect(index)
+
+    def _detect(self, index: PetriNetIndex) -> Tuple[
+        List[List[Element]],
+        Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]],
+        Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]]
+    ]:
+        place_count = len(index.places)
+        partition_count = min(self.max_workers * self.partitions_per_worker, place_count // self.min_partition_size)
+        partitions = self._partitions(index, max(partition_count, 1) if self.max_workers > 1 else 1)
+        if len(partitions) > 1:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.max_workers)
+            chains = list(self._executor.map(_walk_chains, partitions))
+        else:
+            chains = [_walk_chains(partition) for partition in partitions]
+
+        bases = np.cumsum([0] + [len(flat) for flat, _ in chains])
+        flat = np.concatenate([flat for flat, _ in chains])
+        begins = np.concatenate([offsets[:-1] + base for (_, offsets), base in zip(chains, bases)])
+        ends = np.concatenate([offsets[1:] + base for (_, offsets), base in zip(chains, bases)])
+
+        nodes = np.empty(place_count + len(index.transitions), dtype=object)
+        nodes[:place_count] = index.places
+        nodes[place_count:] = index.transitions
+        elements = nodes[flat]
+        # Every place starts at most one chain, and `identify_patterns` finds them in the order of their first place
+        order = np.argsort(flat[begins], kind="stable")
+        seq_patterns = [elements[begin:end].tolist()
+                        for begin, end in zip(begins[order].tolist(), ends[order].tolist())]
+        and_patterns, or_patterns = index.splits()
+        return seq_patterns, and_patterns, or_patterns
+
+
+def identify_patterns_parallel(
+        places: Iterable[PetriNet.Place],
+        transitions: Iterable[PetriNet.Transition],
+        arcs: Iterable[PetriNet.Arc],
+        max_workers: Optional[int] = None
+) -> Tuple[
+    List[List[Element]],
+    Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]],
+    Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]]
+]:
+    """
+    Detect SEQ chains, AND splits and OR splits in worker processes, see `ParallelPatternDetector`.
+
+    :param places: The places of the net.
+    :param transitions: The transitions of the net.
+    :param arcs: The arcs of the net.
+    :param max_workers: The number of worker processes, the number of CPUs by default.
+    :return: The patterns of `identify_patterns`.
+    """
+    with ParallelPatternDetector(max_workers) as detector:
+        return detector.detect(PetriNetIndex.from_elements(places, transitions, arcs))
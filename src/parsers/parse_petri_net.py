@@ -1,7 +1,10 @@
-from typing import Set, Tuple, Dict, List, Union
+from typing import Set, Tuple, List, Optional, Union
 
 from pm4py import PetriNet
 
+from src.petri_nets.graph_index import NetPatterns, PetriNetIndex
+from src.utils.disk_cache import DiskLRUCache
+from src.utils.net_fingerprint import net_fingerprint
 from tests.parse_petri_net_test_file import online_order_petri_net, online_order_simple_petri_net, render_petri_net
 
 
@@ -14,57 +17,64 @@ def identify_patterns(
     Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place]]],  # AND patterns: (transition, tuple of connected places)
     Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition]]]  # OR patterns: (place, tuple of connected transitions)
 ]:
-    seq_patterns: List[List[Union[PetriNet.Place, PetriNet.Transition]]] = []
-    and_patterns: Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place]]] = set()
-    or_patterns: Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition]]] = set()
-
-    # Mapping von Quellen und Zielen für Transitionen und Stellen
-    place_to_transitions: Dict[PetriNet.Place, Set[PetriNet.Transition]] = {place: set() for place in places}
-    transition_to_places: Dict[PetriNet.Transition, Set[PetriNet.Place]] = {transition: set() for transition in
-                                                                            transitions}
-
-    for arc in arcs:
-        if isinstance(arc.source, PetriNet.Place) and isinstance(arc.target, PetriNet.Transition):
-            place_to_transitions[arc.source].add(arc.target)
-        elif isinstance(arc.source, PetriNet.Transition) and isinstance(arc.target, PetriNet.Place):
-            transition_to_places[arc.source].add(arc.target)
-
-    # Funktion zum Finden von SEQ-Ketten
-    def find_seq_chain(start_place: PetriNet.Place, visited: Set[PetriNet.Place]) -> List[
-        Union[PetriNet.Place, PetriNet.Transition]]:
-        chain = [start_place]
-        current_place = start_place
-        while current_place in place_to_transitions and len(place_to_transitions[current_place]) == 1:
-            transition = next(iter(place_to_transitions[current_place]))
-            if len(transition_to_places[transition]) == 1:
-                next_place = next(iter(transition_to_places[transition]))
-                if next_place in visited:
-                    break  # Beende die Schleife, wenn wir eine bereits besuchte Stelle erreichen
-                visited.add(next_place)
-                chain.append(transition)
-                chain.append(next_place)
-                current_place = next_place
-            else:
-                break
-        return chain
-
-    visited_places = set()
-    for place in places:
-        if place not in visited_places:
-            chain = find_seq_chain(place, visited_places)
-            if len(chain) > 1:
-                seq_patterns.append(chain)
-                visited_places.update([elem for elem in chain if isinstance(elem, PetriNet.Place)])  # nur die Stellen
-
-    for transition, connected_places in transition_to_places.items():
-        if len(connected_places) > 1:
-            and_patterns.add((transition, tuple(connected_places)))
-
-    for place, connected_transitions in place_to_transitions.items():
-        if len(connected_transitions) > 1:
-            or_patterns.add((place, tuple(connected_transitions)))
-
-    return seq_patterns, and_patterns, or_patterns
+    # Detection runs on integer ids and CSR adjacency arrays instead of dicts of sets
+    return PetriNetIndex.from_elements(places, transitions, arcs).identify_patterns()
+
+
+def identify_all_patterns(
+        places: Set[PetriNet.Place],
+        transitions: Set[PetriNet.Transition],
+        arcs: Set[PetriNet.Arc]
+) -> NetPatterns:
+    """
+    Detect the patterns of `identify_patterns` together with loops, XOR joins and AND joins in one pass over the net.
+    Loops are the strongly connected components of the net, found with an iterative Tarjan pass, so cycles such as a
+    login retry are reported even though SEQ chains stop where they revisit a place.
+
+    :param places: The places of the net.
+    :param transitions: The transitions of the net.
+    :param arcs: The arcs of the net.
+    :return: The SEQ chains, AND and OR splits, loops, XOR joins and AND joins.
+    """
+    return PetriNetIndex.from_elements(places, transitions, arcs).identify_all_patterns()
+
+
+def identify_patterns_cached(net: PetriNet, cache: DiskLRUCache, fingerprint: Optional[str] = None) -> Tuple[
+    List[List[Union[PetriNet.Place, PetriNet.Transition]]],
+    Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place]]],
+    Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition]]]
+]:
+    """
+    Detect the patterns of a net, reusing the result stored for a net with the same fingerprint.
+
+    The result is stored by element name and mapped back to the elements of the given net, so nets whose places or
+    transitions do not have unique names are always detected from scratch.
+
+    :param net: The net.
+    :param cache: The cache of the results.
+    :param fingerprint: The `net_fingerprint` of the net with names, computed if not given.
+    :return: The patterns in the format of `identify_patterns`.
+    """
+    places = {place.name: place for place in net.places}
+    transitions = {transition.name: transition for transition in net.transitions}
+    if len(places) != len(net.places) or len(transitions) != len(net.transitions):
+        return identify_patterns(net.places, net.transitions, net.arcs)
+
+    key = f"patterns:{fingerprint or net_fingerprint(net)}"
+    stored = cache.get(key)
+    if stored is None:
+        seq, and_p, or_p = identify_patterns(net.places, net.transitions, net.arcs)
+        cache.put(key, ([[element.name for element in chain] for chain in seq],
+                        [(transition.name, tuple(p.name for p in connected)) for transition, connected in and_p],
+                        [(place.name, tuple(t.name for t in connected)) for place, connected in or_p]))
+        return seq, and_p, or_p
+
+    seq_names, and_names, or_names = stored
+    # SEQ chains alternate places and transitions, starting with a place
+    return ([[places[name] if position % 2 == 0 else transitions[name] for position, name in enumerate(chain)]
+             for chain in seq_names],
+            {(transitions[name], tuple(places[place] for place in connected)) for name, connected in and_names},
+            {(places[place], tuple(transitions[name] for name in connected)) for place, connected in or_names})
 
 
 if __name__ == "__main__":
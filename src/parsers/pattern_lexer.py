@@ -0,0 +1,64 @@
+from typing import List, NamedTuple
+import re
+
+
+class TokenKind(object):
+    IDENT = "IDENT"
+    NUMBER = "NUMBER"
+    LPAREN = "LPAREN"
+    RPAREN = "RPAREN"
+    COMMA = "COMMA"
+    STAR = "STAR"
+    VAR = "VAR"  # {{ ... }}
+    STMT = "STMT"  # {% ... %}
+    EOF = "EOF"
+
+
+class Token(NamedTuple):
+    kind: str
+    value: str
+    start: int
+    end: int
+
+
+_TOKEN_RE = re.compile(r"""
+      (?P<WS>\s+)
+    | \{\{(?P<VAR>.*?)\}\}
+    | \{%(?P<STMT>.*?)%\}
+    | (?P<NUMBER>\d+(?:\.\d+)?)(?![\w.])
+    | (?P<IDENT>\w+)
+    | (?P<LPAREN>\()
+    | (?P<RPAREN>\))
+    | (?P<COMMA>,)
+    | (?P<STAR>\*)
+""", re.VERBOSE | re.DOTALL)
+
+
+def tokenize(pattern: str) -> List[Token]:
+    """
+    Split a pattern string into tokens in a single left-to-right pass.
+
+    Whitespace is dropped, template blocks are kept as single VAR/STMT tokens whose value is the stripped block
+    content. The returned list always ends with an EOF token.
+
+    :param pattern: The pattern string to tokenize.
+    :return: The list of tokens with their start and end offsets in the pattern string.
+    :raises ValueError: If the pattern contains a character that does not start any token.
+    """
+    tokens: List[Token] = []
+    match_at = _TOKEN_RE.match
+    position = 0
+    length = len(pattern)
+    while position < length:
+        match = match_at(pattern, position)
+        if match is None:
+            raise ValueError(f"Unexpected pattern format: {pattern[position:]}")
+        kind = match.lastgroup
+        if kind != "WS":
+            value = match.group(kind)
+            if kind == TokenKind.VAR or kind == TokenKind.STMT:
+                value = value.strip()
+            tokens.append(Token(kind, value, position, match.end()))
+        position = match.end()
+    tokens.append(Token(TokenKind.EOF, "", length, length))
+    return tokens
@@ -1,6 +1,8 @@
-from typing import List, Tuple, Literal, Self
+from typing import Callable, Dict, List, Tuple, Literal, Self, Sequence, Union
 import re
+import weakref
 
+from src.parsers.pattern_lexer import Token, TokenKind, tokenize
 from src.utils.operators import Operators
 
 
@@ -30,86 +32,222 @@ class PatternNode:
         return f"{suffix}({prefix})"
 
 
-def parse_node(pattern: str) -> Tuple[PatternNode, str]:
+class InternedPatternNode:
     """
-    Parse a pattern string into a PatternNode and return the remaining pattern string.
+    Immutable, hash-consed variant of PatternNode.
 
-    :param pattern: The pattern string to parse.
-    :return: A tuple containing the parsed PatternNode and the remaining pattern string.
-    :raises ValueError: If the pattern format is unexpected.
+    Structurally equal nodes are the same object: constructing a node that already exists returns the existing one.
+    Equality is therefore identity and the structural hash is computed once, so nodes are cheap to compare and to use
+    as dict keys, and equal subtrees of an expanded pattern are stored only once.
+    """
+    __slots__ = ("node_type", "children", "_hash", "__weakref__")
+
+    _table: "weakref.WeakValueDictionary[Tuple[str, Tuple[InternedPatternNode, ...]], InternedPatternNode]" = \
+        weakref.WeakValueDictionary()
+
+    def __new__(cls, node_type: str, children: Sequence["InternedPatternNode"] = ()):
+        """
+        Return the node with the given type and children, creating it if it does not exist yet.
+
+        :param node_type: The type of the node, e.g., "AND", "OR", "SEQ", "*", "NOT", or an event/condition.
+        :param children: The interned child nodes.
+        """
+        children = tuple(children)
+        key = (node_type, children)
+        node = cls._table.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            object.__setattr__(node, "node_type", node_type)
+            object.__setattr__(node, "children", children)
+            object.__setattr__(node, "_hash", hash(key))
+            cls._table[key] = node
+        return node
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self):
+        return InternedPatternNode, (self.node_type, self.children)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the node, in the same format as PatternNode.
+
+        :return: A string representing the node and its children.
+        """
+        if len(self.children) == 0:
+            return f"{self.node_type}"
+        return f"{self.node_type}({', '.join(map(str, self.children))})"
+
+    @classmethod
+    def from_node(cls, node: Union[PatternNode, "InternedPatternNode"]) -> "InternedPatternNode":
+        """
+        Intern a PatternNode tree. The tree is walked with an explicit stack, so arbitrarily deep trees, such as
+        those converted from large Petri nets, can be interned.
+
+        :param node: The root of the tree.
+        :return: The interned root.
+        """
+        if isinstance(node, cls):
+            return node
+        interned: Dict[int, InternedPatternNode] = {}
+        stack = [(node, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if isinstance(current, cls) or id(current) in interned:
+                continue
+            if expanded or not current.children:
+                interned[id(current)] = cls(current.node_type, [
+                    child if isinstance(child, cls) else interned[id(child)] for child in current.children])
+            else:
+                stack.append((current, True))
+                stack.extend((child, False) for child in current.children)
+        return interned[id(node)]
+
+    @classmethod
+    def interned_count(cls) -> int:
+        """
+        :return: The number of distinct nodes currently alive.
+        """
+        return len(cls._table)
+
+
+AnyPatternNode = Union[PatternNode, InternedPatternNode]
+
+_TEMPLATE_VARIABLE_RE = re.compile(r"(\w+)\.\w+")
+
+
+class PatternParser:
     """
-    pattern = pattern.strip()
-
-    for operator in Operators.OPERATORS:
-        if pattern.startswith(f"{operator}("):
-            return parse_logical_node(pattern, operator)
-
-    # Base case: it's an event or condition or template
-    match = re.match(r"(\w+)", pattern)
-    if match:
-        node = PatternNode(match.group(1))
-        return node, pattern[match.end():]
-    else:
-        # Check if it's a template block
-        template_match = re.search(r"{{\s*(\w+)\.\w+\s*}}", pattern)
-        if template_match:
+    Recursive-descent parser over the token stream produced by `tokenize`.
+
+    The parser only moves an index through the token list; the pattern text is never sliced while parsing, which
+    keeps parsing linear in the length of the pattern.
+    """
+
+    def __init__(self, tokens: List[Token], pattern: str = "",
+                 node_factory: Callable[[str, List[AnyPatternNode]], AnyPatternNode] = PatternNode):
+        """
+        Initialize the parser.
+
+        :param tokens: The tokens to parse, terminated by an EOF token.
+        :param pattern: The original pattern string, only used for error messages.
+        :param node_factory: Builds a node from its type and children, PatternNode or InternedPatternNode.
+        """
+        self.tokens = tokens
+        self.pattern = pattern
+        self.position = 0
+        self.node_factory = node_factory
+
+    def peek(self) -> Token:
+        return self.tokens[self.position]
+
+    def error(self, token: Token, message: str = "Unexpected pattern format") -> ValueError:
+        return ValueError(f"{message}: {self.pattern[token.start:]}")
+
+    def is_operator_start(self) -> bool:
+        """
+        Check whether the current token opens a logical node, i.e. an operator immediately followed by "(".
+
+        :return: True if the current and next token form "AND(", "OR(", "SEQ(", "*(" or "NOT(".
+        """
+        token = self.tokens[self.position]
+        if token.kind == TokenKind.STAR or (token.kind == TokenKind.IDENT and token.value in Operators.OPERATORS):
+            following = self.tokens[self.position + 1]
+            return following.kind == TokenKind.LPAREN and following.start == token.end
+        return False
+
+    def parse_node(self) -> AnyPatternNode:
+        """
+        Parse the node starting at the current token.
+
+        :return: The parsed node.
+        :raises ValueError: If the pattern format is unexpected.
+        """
+        token = self.tokens[self.position]
+
+        if self.is_operator_start():
+            return self.parse_logical_node()
+
+        # Base case: it's an event or condition or template
+        if token.kind == TokenKind.IDENT or token.kind == TokenKind.NUMBER:
+            self.position += 1
+            return self.node_factory(token.value, [])
+        if token.kind == TokenKind.VAR:
+            template_match = _TEMPLATE_VARIABLE_RE.fullmatch(token.value)
+            if template_match is None:
+                raise self.error(token)
+            self.position += 1
             # Create a node with the event or condition name
-            node = PatternNode("∀" + template_match.group(1))
-            remaining_pattern = pattern[template_match.end():]
-            return node, remaining_pattern.strip()
+            return self.node_factory("∀" + template_match.group(1), [])
+        if token.kind == TokenKind.STMT:
+            self.position += 1
+            return self.node_factory("TEMPLATE", [])
+        raise self.error(token)
+
+    def parse_logical_node(self) -> AnyPatternNode:
+        """
+        Parse a logical node starting at the current operator token.
 
-        if pattern.startswith("{%") and "%}" in pattern:
-            # Skip over the template block
-            end_template_index = pattern.find("%}") + 2
-            remaining_pattern = pattern[end_template_index:]
-            return PatternNode("TEMPLATE", []), remaining_pattern.strip()
-        else:
-            raise ValueError(f"Unexpected pattern format: {pattern}")
+        :return: The parsed logical node.
+        :raises ValueError: If the children are not closed by ")".
+        """
+        node_type = Operators.KLEENE_CLOSURE if self.tokens[self.position].kind == TokenKind.STAR \
+            else self.tokens[self.position].value
+        self.position += 2  # Skip over "AND(", "OR(", etc.
+
+        tokens = self.tokens
+        children: List[AnyPatternNode] = []
+        while tokens[self.position].kind != TokenKind.RPAREN:
+            kind = tokens[self.position].kind
+            # Skip over template blocks
+            if kind == TokenKind.STMT:
+                self.position += 1
+                continue
+            if kind == TokenKind.EOF:
+                raise self.error(tokens[self.position], "Unexpected end of pattern")
+
+            children.append(self.parse_node())
+            if tokens[self.position].kind == TokenKind.COMMA:
+                self.position += 1
+
+        self.position += 1  # Skip over ")"
+        return self.node_factory(node_type, children)
+
+    def remaining(self) -> str:
+        """
+        :return: The part of the pattern string that has not been consumed yet.
+        """
+        return self.pattern[self.tokens[self.position].start:]
 
 
-def parse_logical_node(pattern_element: str, node_type: str) -> Tuple[PatternNode, str]:
+def parse_node(pattern: str) -> Tuple[PatternNode, str]:
     """
-    Parse a logical node from the pattern string.
+    Parse a pattern string into a PatternNode and return the remaining pattern string.
 
-    :param pattern_element: The pattern string starting with a logical node.
-    :param node_type: The type of logical node, e.g., "AND", "OR", "SEQ", "*", or "NOT".
-    :return: A tuple containing the parsed logical PatternNode and the remaining pattern string.
+    :param pattern: The pattern string to parse.
+    :return: A tuple containing the parsed PatternNode and the remaining pattern string.
+    :raises ValueError: If the pattern format is unexpected.
     """
-    assert pattern_element.startswith(f"{node_type}(")
-    pattern_element = pattern_element[len(node_type) + 1:]  # Skip over "AND(", "OR(", etc.
-
-    children: List[PatternNode] = []
-    while not pattern_element.startswith(")"):
-        # Detect and handle templates
-        if pattern_element.strip().startswith("{%"):
-            # Skip over the template block
-            end_template_index = pattern_element.find("%}") + 2
-            pattern_element = pattern_element[end_template_index:].strip()
-            continue
-
-        child, pattern_element = parse_node(pattern_element)
-        # Only add non-template children
-        if child.node_type != "TEMPLATE":
-            children.append(child)
-        pattern_element = pattern_element.strip()
-        if pattern_element.startswith(","):
-            pattern_element = pattern_element[1:].strip()  # Skip over ","
-
-    pattern_element = pattern_element[1:]  # Skip over ")"
-    return PatternNode(node_type, children), pattern_element
-
-
-def parse_pattern(pattern: str) -> PatternNode:
+    parser = PatternParser(tokenize(pattern), pattern)
+    node = parser.parse_node()
+    return node, parser.remaining()
+
+
+def parse_pattern(pattern: str, interned: bool = False) -> AnyPatternNode:
     """
     Parse a full pattern string into a root PatternNode.
 
     :param pattern: The pattern string to parse.
-    :return: The root PatternNode of the parsed pattern.
+    :param interned: Whether to build InternedPatternNodes instead of PatternNodes.
+    :return: The root node of the parsed pattern.
     :raises ValueError: If there is unexpected remaining content in the pattern string.
     """
-    root, remaining_pattern = parse_node(pattern)
-    if remaining_pattern.strip():
-        raise ValueError(f"Unexpected remaining pattern content: {remaining_pattern}")
+    parser = PatternParser(tokenize(pattern), pattern, InternedPatternNode if interned else PatternNode)
+    root = parser.parse_node()
+    if parser.peek().kind != TokenKind.EOF:
+        raise ValueError(f"Unexpected remaining pattern content: {parser.remaining()}")
     return root
-
-
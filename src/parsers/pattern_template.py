@@ -0,0 +1,247 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Hashable, List, Mapping, NamedTuple, Optional, Tuple, Union
+import re
+
+from src.parsers.pattern_lexer import Token, TokenKind, tokenize
+from src.parsers.pattern_parser import AnyPatternNode, InternedPatternNode, PatternNode, PatternParser
+from src.parsers.query_parser import PatternQuery, QueryParser
+
+_FOR_RE = re.compile(r"for\s+(\w+)\s+in\s+(\w+(?:\.\w+)*)")
+_PATH_RE = re.compile(r"\w+(?:\.\w+)*")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+class _Placeholder(NamedTuple):
+    path: Tuple[str, ...]  # e.g. ("event", "name") for {{ event.name }}
+    token: Token
+
+
+class _Loop(NamedTuple):
+    variable: str
+    iterable: Tuple[str, ...]
+    body: Tuple["_Segment", ...]
+    token: Token
+
+
+_Segment = Union[Token, _Placeholder, _Loop]
+
+
+class TemplateCache:
+    """
+    Least recently used cache for expanded templates.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        :param maxsize: The maximum number of expansions kept.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        :return: The cached value, or None if the key is not cached.
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+expansion_cache = TemplateCache()
+
+
+def _freeze(value: Any) -> Hashable:
+    """
+    Convert bindings into an equal hashable value, so they can be part of a cache key. Every value is tagged with its
+    type, since equal values of different types, like 1, 1.0 and True, are rendered differently.
+
+    :raises TypeError: If the bindings contain a value that is neither hashable nor a mapping or collection.
+    """
+    if isinstance(value, Mapping):
+        return type(value), frozenset((_freeze(key), _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return type(value), frozenset(_freeze(item) for item in value)
+    hash(value)
+    return type(value), value
+
+
+class PatternTemplate:
+    """
+    A pattern or query template with {% for x in xs %} ... {% endfor %} blocks and {{ x.attribute }} placeholders,
+    lexed once.
+
+    Expanding the template with bindings replaces every placeholder by a token and repeats loop bodies on the token
+    level, then parses the resulting tokens; the template text is never lexed again. Expansions are memoized by
+    (template, bindings) in a TemplateCache, so instantiating a template for an activity set seen before is a lookup.
+    Bound values must not be changed after they were used, as cached expansions would not reflect the change.
+    """
+
+    def __init__(self, template: str, cache: Optional[TemplateCache] = None):
+        """
+        :param template: The template text.
+        :param cache: The cache for expansions, the module-wide `expansion_cache` by default.
+        :raises ValueError: If a statement is unknown or a for block is not closed.
+        """
+        self.template = template
+        self.cache = expansion_cache if cache is None else cache
+        self.segments = self._compile(tokenize(template))
+
+    def _compile(self, tokens: List[Token]) -> Tuple[_Segment, ...]:
+        stack: List[Tuple[Optional[Token], List[_Segment]]] = [(None, [])]
+        for token in tokens:
+            body = stack[-1][1]
+            if token.kind == TokenKind.VAR:
+                if _PATH_RE.fullmatch(token.value) is None:
+                    raise ValueError(f"Unexpected template variable: {self.template[token.start:]}")
+                body.append(_Placeholder(tuple(token.value.split(".")), token))
+            elif token.kind == TokenKind.STMT:
+                if token.value == "endfor":
+                    if len(stack) == 1:
+                        raise ValueError(f"Unexpected endfor: {self.template[token.start:]}")
+                    loop_token, loop_body = stack.pop()
+                    variable, iterable = _FOR_RE.fullmatch(loop_token.value).groups()
+                    stack[-1][1].append(_Loop(variable, tuple(iterable.split(".")), tuple(loop_body), loop_token))
+                elif _FOR_RE.fullmatch(token.value) is not None:
+                    stack.append((token, []))
+                else:
+                    raise ValueError(f"Unknown template statement: {self.template[token.start:]}")
+            else:
+                body.append(token)
+        if len(stack) > 1:
+            raise ValueError(f"Unclosed for block: {self.template[stack[-1][0].start:]}")
+        return tuple(stack[0][1])
+
+    def _resolve(self, path: Tuple[str, ...], scope: Mapping[str, Any], token: Token) -> Any:
+        """
+        Look up a dotted path, first among the loop variables and then among the bindings. Attributes are read with
+        item access on mappings and attribute access otherwise.
+
+        :raises ValueError: If a name or attribute is not bound.
+        """
+        name = path[0]
+        if name not in scope:
+            raise ValueError(f"Unbound template variable {name}: {self.template[token.start:]}")
+        value = scope[name]
+        for attribute in path[1:]:
+            try:
+                value = value[attribute] if isinstance(value, Mapping) else getattr(value, attribute)
+            except (KeyError, AttributeError):
+                raise ValueError(f"Template variable {name} has no attribute {attribute}: "
+                                 f"{self.template[token.start:]}") from None
+        return value
+
+    def _expand(self, segments: Tuple[_Segment, ...], scope: Mapping[str, Any], tokens: List[Token]) -> None:
+        for segment in segments:
+            if isinstance(segment, _Placeholder):
+                value = self._resolve(segment.path, scope, segment.token)
+                text = str(value)
+                kind = TokenKind.NUMBER if isinstance(value, (int, float)) or _NUMBER_RE.fullmatch(text) \
+                    else TokenKind.IDENT
+                tokens.append(Token(kind, text, segment.token.start, segment.token.end))
+            elif isinstance(segment, _Loop):
+                inner = dict(scope)
+                for item in self._resolve(segment.iterable, scope, segment.token):
+                    inner[segment.variable] = item
+                    self._expand(segment.body, inner, tokens)
+            else:
+                tokens.append(segment)
+
+    def expand_tokens(self, bindings: Mapping[str, Any]) -> List[Token]:
+        """
+        Expand the template on the token level, without caching.
+
+        :param bindings: The values of the template variables, e.g. {"events": [...], "conditions": [...]}.
+        :return: The expanded tokens, terminated by an EOF token. Their offsets point into the template text.
+        :raises ValueError: If a template variable is not bound.
+        """
+        tokens: List[Token] = []
+        self._expand(self.segments, bindings, tokens)
+        return tokens
+
+    def _cached(self, kind: str, bindings: Mapping[str, Any], interned: bool):
+        try:
+            key: Optional[Hashable] = (self, kind, interned, _freeze(bindings))
+        except TypeError:
+            key = None
+        if key is not None:
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+
+        tokens = self.expand_tokens(bindings)
+        node_factory = InternedPatternNode if interned else PatternNode
+        if kind == "query":
+            result = QueryParser(tokens, self.template, node_factory).parse_query()
+        else:
+            parser = PatternParser(tokens, self.template, node_factory)
+            result = parser.parse_node()
+            if parser.peek().kind != TokenKind.EOF:
+                raise ValueError(f"Unexpected remaining pattern content: {parser.remaining()}")
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    def expand(self, bindings: Mapping[str, Any], interned: bool = True) -> AnyPatternNode:
+        """
+        Expand a pattern template into a pattern tree.
+
+        :param bindings: The values of the template variables.
+        :param interned: Whether to build InternedPatternNodes. Cached trees are shared between callers, so
+            PatternNode trees returned with interned=False must not be modified.
+        :return: The root of the expanded pattern.
+        :raises ValueError: If a template variable is not bound or the expansion is not a valid pattern.
+        """
+        return self._cached("pattern", bindings, interned)
+
+    def expand_query(self, bindings: Mapping[str, Any], interned: bool = True) -> PatternQuery:
+        """
+        Expand a query template, see `expand`.
+
+        :return: The expanded query.
+        :raises ValueError: If a template variable is not bound or the expansion is not a valid query.
+        """
+        return self._cached("query", bindings, interned)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PatternTemplate) and other.template == self.template
+
+    def __hash__(self) -> int:
+        return hash(self.template)
+
+    def __repr__(self) -> str:
+        return f"PatternTemplate({self.template!r})"
+
+
+@lru_cache(maxsize=256)
+def compile_template(template: str) -> PatternTemplate:
+    """
+    Compile a template, reusing the compiled template for a text compiled before.
+
+    :param template: The template text.
+    :return: The compiled template.
+    :raises ValueError: If a statement is unknown or a for block is not closed.
+    """
+    return PatternTemplate(template)
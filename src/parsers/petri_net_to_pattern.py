@@ -0,0 +1,252 @@
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Union
+
+from pm4py import PetriNet
+
+from src.parsers.pattern_parser import AnyPatternNode, InternedPatternNode, PatternNode
+from src.utils.operators import Operators
+
+Element = Union[PetriNet.Place, PetriNet.Transition]
+Fragment = Optional[PatternNode]  # None for a silent part
+
+
+def _is(fragment: Fragment, node_type: str) -> bool:
+    return fragment is not None and fragment.node_type == node_type and bool(fragment.children)
+
+
+def _combine(node_type: str, fragments: Iterable[Fragment]) -> Fragment:
+    """
+    Combine fragments with an associative operator, flattening nested nodes of the same type in place and dropping
+    silent fragments.
+    """
+    combined: Fragment = None
+    for fragment in fragments:
+        if fragment is None:
+            continue
+        if combined is None:
+            combined = fragment
+            continue
+        if not _is(combined, node_type):
+            combined = PatternNode(node_type, [combined])
+        combined.children.extend(fragment.children if _is(fragment, node_type) else [fragment])
+    return combined
+
+
+def _loop(do: Fragment, redo: Fragment) -> Fragment:
+    """
+    :return: The fragment repeating `do` with `redo` in between, the repetition of the visible part if one is silent.
+    """
+    if do is None or redo is None:
+        body = redo if do is None else do
+        if body is None or _is(body, Operators.KLEENE_CLOSURE) and len(body.children) == 1:
+            return body
+        return PatternNode(Operators.KLEENE_CLOSURE, [body])
+    return PatternNode(Operators.KLEENE_CLOSURE, [do, redo])
+
+
+class _NetReducer:
+    """
+    Reduces a block-structured Petri net to a single transition whose fragment is the pattern of the whole net.
+
+    Transitions carry the fragment they stand for, places carry nothing. Every rule replaces a block of the net, whose
+    inner places and transitions are not connected to anything outside the block, by one transition:
+
+    - SEQ: a place that is the only output of its only producer and the only input of its only consumer merges the two
+      transitions.
+    - OR: transitions with the same input and output places are alternatives.
+    - AND: branches place -> transition -> place from one split transition to one join transition run in parallel;
+      a branch that is only a place is silent.
+    - Loop: a transition x -> y that is the only way out of x and into y, and a transition y -> x, form a loop.
+
+    Every rule removes elements, and after each one only the elements around the block are checked again, so the
+    reduction takes time linear in the size of the net for nets of bounded degree. It works on a queue and never
+    recurses.
+
+    Patterns cannot express that a part may be skipped. A choice between a silent and a visible alternative, and a loop
+    whose do part is silent but whose redo part is not, are therefore rejected, unless `drop_skips` is set: then the
+    visible parts are kept as if they could not be skipped.
+    """
+
+    def __init__(self, net: PetriNet, drop_skips: bool = False):
+        self.drop_skips = drop_skips
+        # Dicts are used as ordered sets so that the result does not depend on hashing by identity
+        self.inputs: Dict[Element, Dict[Element, None]] = {}
+        self.outputs: Dict[Element, Dict[Element, None]] = {}
+        self.fragments: Dict[PetriNet.Transition, Fragment] = {}
+        for place in sorted(net.places, key=lambda place: str(place.name)):
+            self.inputs[place], self.outputs[place] = {}, {}
+        for transition in sorted(net.transitions, key=lambda transition: str(transition.name)):
+            self.inputs[transition], self.outputs[transition] = {}, {}
+            self.fragments[transition] = None if transition.label is None else PatternNode(transition.label)
+        for arc in sorted(net.arcs, key=lambda arc: (str(arc.source.name), str(arc.target.name))):
+            self.outputs[arc.source][arc.target] = None
+            self.inputs[arc.target][arc.source] = None
+
+        self.queue: Deque[Element] = deque(self.inputs)
+        self.queued = set(self.inputs)
+
+    def push(self, elements: Iterable[Element]) -> None:
+        for element in elements:
+            if element not in self.queued and element in self.inputs:
+                self.queued.add(element)
+                self.queue.append(element)
+
+    def push_around(self, element: Element) -> None:
+        """
+        Queue the elements up to two arcs away from a changed element, which covers every block whose rule the change
+        can enable: an AND block is checked from its split and from its join, and each of its elements is at most two
+        arcs away from one of them.
+        """
+        self.push([element])
+        for neighbours in (self.inputs[element], self.outputs[element]):
+            self.push(neighbours)
+            for neighbour in neighbours:
+                self.push(self.inputs[neighbour])
+                self.push(self.outputs[neighbour])
+
+    def remove(self, element: Element) -> None:
+        for source in self.inputs.pop(element):
+            self.outputs[source].pop(element, None)
+            self.push_around(source)
+        for target in self.outputs.pop(element):
+            self.inputs[target].pop(element, None)
+            self.push_around(target)
+        self.fragments.pop(element, None)
+
+    def connect(self, source: Element, target: Element) -> None:
+        self.outputs[source][target] = None
+        self.inputs[target][source] = None
+
+    def reduce(self) -> Fragment:
+        """
+        Apply the rules until none applies anymore.
+
+        :return: The fragment of the net.
+        :raises ValueError: If the net does not reduce to a single transition.
+        """
+        while self.queue:
+            element = self.queue.popleft()
+            self.queued.discard(element)
+            if element not in self.inputs:
+                continue
+            if element in self.fragments:
+                if self.reduce_loop(element) or self.reduce_parallel(element, self.outputs, self.inputs) \
+                        or self.reduce_parallel(element, self.inputs, self.outputs):
+                    self.push_around(element)
+            elif not self.reduce_sequence(element):
+                self.reduce_choice(element)
+
+        if len(self.fragments) != 1:
+            raise ValueError(f"The net is not block-structured: {len(self.fragments)} transitions could not be reduced "
+                             f"into one")
+        return next(iter(self.fragments.values()))
+
+    def only(self, elements: Dict[Element, None]) -> Optional[Element]:
+        return next(iter(elements)) if len(elements) == 1 else None
+
+    def reduce_sequence(self, place: PetriNet.Place) -> bool:
+        first, second = self.only(self.inputs[place]), self.only(self.outputs[place])
+        if first is None or second is None or first is second \
+                or len(self.outputs[first]) != 1 or len(self.inputs[second]) != 1:
+            return False
+        self.fragments[first] = _combine(Operators.SEQ, [self.fragments[first], self.fragments[second]])
+        targets = list(self.outputs[second])
+        self.remove(place)
+        self.remove(second)
+        for target in targets:
+            self.connect(first, target)
+        self.push_around(first)
+        return True
+
+    def reduce_choice(self, place: PetriNet.Place) -> bool:
+        alternatives: Dict[tuple, List[PetriNet.Transition]] = {}
+        for transition in self.outputs[place]:
+            key = (frozenset(self.inputs[transition]), frozenset(self.outputs[transition]))
+            alternatives.setdefault(key, []).append(transition)
+        reduced = False
+        for transitions in alternatives.values():
+            if len(transitions) < 2:
+                continue
+            fragments = [self.fragments[transition] for transition in transitions]
+            if not self.drop_skips and None in fragments and any(fragment is not None for fragment in fragments):
+                raise ValueError(f"The choice {_combine(Operators.OR, fragments)} can be skipped, which a pattern "
+                                 f"cannot express")
+            self.fragments[transitions[0]] = _combine(Operators.OR, fragments)
+            for transition in transitions[1:]:
+                self.remove(transition)
+            reduced = True
+        return reduced
+
+    def reduce_loop(self, do: PetriNet.Transition) -> bool:
+        entry, exit_ = self.only(self.inputs[do]), self.only(self.outputs[do])
+        if entry is None or exit_ is None or entry is exit_ \
+                or len(self.outputs[entry]) != 1 or len(self.inputs[exit_]) != 1:
+            return False
+        for redo in self.outputs[exit_]:
+            if redo is not do and self.only(self.inputs[redo]) is exit_ and self.only(self.outputs[redo]) is entry:
+                if not self.drop_skips and self.fragments[do] is None and self.fragments[redo] is not None:
+                    raise ValueError(f"The loop over {self.fragments[redo]} can be skipped, which a pattern cannot "
+                                     f"express")
+                self.fragments[do] = _loop(self.fragments[do], self.fragments[redo])
+                self.remove(redo)
+                return True
+        return False
+
+    def reduce_parallel(self, split: PetriNet.Transition, outputs: Dict[Element, Dict[Element, None]],
+                        inputs: Dict[Element, Dict[Element, None]]) -> bool:
+        """
+        Merge the parallel branches leaving a split transition. With inputs and outputs swapped, the split is a join
+        and the branches are followed backwards.
+        """
+        # Per join transition, the branches (first place, transition, last place); None for a branch of one place
+        branches: Dict[PetriNet.Transition, List[tuple]] = {}
+        for place in outputs[split]:
+            consumer = self.only(outputs[place])
+            if consumer is None or self.only(inputs[place]) is not split:
+                continue
+            last = self.only(outputs[consumer])
+            if len(inputs[consumer]) == 1 and last is not None and self.only(inputs[last]) is consumer:
+                join = self.only(outputs[last])
+                if join is not None and join is not split:
+                    branches.setdefault(join, []).append((place, consumer, last))
+            elif len(inputs[consumer]) > 1 and consumer is not split:
+                branches.setdefault(consumer, []).append((place, None, None))
+
+        reduced = False
+        for join, parallel in branches.items():
+            if len(parallel) < 2:
+                continue
+            parallel.sort(key=lambda branch: branch[1] is None)
+            kept_place, kept_transition, _ = parallel[0]
+            if kept_transition is not None:
+                self.fragments[kept_transition] = _combine(
+                    Operators.AND, [self.fragments[transition] for _, transition, _ in parallel if transition])
+            for place, transition, last in parallel[1:]:
+                for element in (place, transition, last):
+                    if element is not None:
+                        self.remove(element)
+            self.push_around(kept_place)
+            reduced = True
+        return reduced
+
+
+def convert_petri_net_to_pattern(net: PetriNet, interned: bool = False, drop_skips: bool = False) -> AnyPatternNode:
+    """
+    Decompose a block-structured Petri net, such as the ones discovered by the inductive miner, into one pattern.
+
+    Detected SEQ, AND, OR and loop blocks are collapsed bottom-up until the whole net is a single block. Visible
+    transitions become events named by their label, silent ones are dropped, and a loop becomes *(do, redo), or *(do)
+    if the redo part is silent.
+
+    :param net: The net to decompose.
+    :param interned: Whether to return InternedPatternNodes instead of PatternNodes.
+    :param drop_skips: Whether to convert parts that can be skipped, like the optional activities of nets discovered
+        by the inductive miner, as if they were mandatory. The pattern then only matches the runs that do not skip.
+    :return: The root of the pattern.
+    :raises ValueError: If the net is not block-structured, has no visible transition or, without `drop_skips`, has a
+        part that can be skipped.
+    """
+    pattern = _NetReducer(net, drop_skips).reduce()
+    if pattern is None:
+        raise ValueError("The net has no visible transition")
+    return InternedPatternNode.from_node(pattern) if interned else pattern
@@ -0,0 +1,337 @@
+from array import array
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+import sys
+import time
+from xml.parsers import expat
+
+import numpy as np
+from pm4py import PetriNet, Marking
+from pm4py.objects.petri_net.utils.petri_utils import add_arc_from_to
+from pm4py.util import constants
+
+from src.petri_nets.graph_index import PetriNetIndex
+
+_UNKNOWN, _PLACE, _TRANSITION = 0, 1, 2
+
+
+class PnmlGraph:
+    """
+    Integer-indexed Petri net read from PNML, without pm4py objects.
+
+    Places and transitions are numbered in document order. Transition labels are interned: transition i has the label
+    labels[transition_labels[i]], or is silent if transition_labels[i] is -1. Arcs are kept in two directions,
+    place_transition_arcs from places to transitions and transition_place_arcs from transitions to places, each as
+    arrays of source ids, target ids and weights.
+    """
+
+    def __init__(self,
+                 name: str,
+                 place_ids: List[str],
+                 place_names: List[str],
+                 transition_ids: List[str],
+                 transition_names: List[str],
+                 labels: List[str],
+                 transition_labels: np.ndarray,
+                 place_transition_arcs: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                 transition_place_arcs: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                 initial_marking: Dict[int, int],
+                 final_marking: Optional[Dict[int, int]]):
+        """
+        Initialize the graph. Use `read_pnml` to read one from a file.
+
+        :param name: The name of the net.
+        :param place_ids: The PNML ids of the places.
+        :param place_names: The names of the places.
+        :param transition_ids: The PNML ids of the transitions.
+        :param transition_names: The names of the transitions, also of the silent ones.
+        :param labels: The distinct labels of the visible transitions.
+        :param transition_labels: Per transition, the index of its label, or -1 if it is silent.
+        :param place_transition_arcs: The place ids, transition ids and weights of the arcs from places to transitions.
+        :param transition_place_arcs: The transition ids, place ids and weights of the arcs from transitions to places.
+        :param initial_marking: The tokens per place id of the initial marking.
+        :param final_marking: The tokens per place id of the final marking, None if the file has none.
+        """
+        self.name = name
+        self.place_ids = place_ids
+        self.place_names = place_names
+        self.transition_ids = transition_ids
+        self.transition_names = transition_names
+        self.labels = labels
+        self.transition_labels = transition_labels
+        self.place_transition_arcs = place_transition_arcs
+        self.transition_place_arcs = transition_place_arcs
+        self.initial_marking = initial_marking
+        self.final_marking = final_marking
+
+    def label_of(self, transition: int) -> Optional[str]:
+        """
+        :return: The label of the transition, None if it is silent.
+        """
+        label = self.transition_labels[transition]
+        return None if label < 0 else self.labels[label]
+
+    def guessed_final_marking(self) -> Dict[int, int]:
+        """
+        :return: The final marking of the file, or one token in every place without output arcs like pm4py guesses it.
+        """
+        if self.final_marking is not None:
+            return self.final_marking
+        sources, _, _ = self.place_transition_arcs
+        has_output = np.zeros(len(self.place_ids), dtype=bool)
+        has_output[sources] = True
+        return {place: 1 for place in np.flatnonzero(~has_output).tolist()}
+
+    def to_index(self) -> PetriNetIndex:
+        """
+        Build the compact adjacency of the net. Its elements are the PNML ids of the places and transitions.
+
+        :return: The index.
+        """
+        sources, targets, _ = self.place_transition_arcs
+        place_transition = (sources, targets)
+        sources, targets, _ = self.transition_place_arcs
+        return PetriNetIndex(self.place_ids, self.transition_ids, place_transition, (sources, targets))
+
+    def to_petri_net(self) -> Tuple[PetriNet, Marking, Marking]:
+        """
+        Convert the graph into pm4py objects, as `pm4py.read_pnml` returns them: elements are named by their PNML ids
+        and the element names are kept in their properties. Without a final marking in the file it is guessed.
+
+        :return: The net, its initial marking and its final marking.
+        """
+        net = PetriNet(self.name)
+        places = []
+        for place_id, place_name in zip(self.place_ids, self.place_names):
+            place = PetriNet.Place(place_id)
+            place.properties[constants.PLACE_NAME_TAG] = place_name
+            net.places.add(place)
+            places.append(place)
+        transitions = []
+        for transition, (transition_id, transition_name) in enumerate(zip(self.transition_ids,
+                                                                          self.transition_names)):
+            element = PetriNet.Transition(transition_id, self.label_of(transition))
+            element.properties[constants.TRANS_NAME_TAG] = transition_name
+            net.transitions.add(element)
+            transitions.append(element)
+
+        for sources, targets, weights, source_elements, target_elements in (
+                (*self.place_transition_arcs, places, transitions),
+                (*self.transition_place_arcs, transitions, places)):
+            for source, target, weight in zip(sources.tolist(), targets.tolist(), weights.tolist()):
+                add_arc_from_to(source_elements[source], target_elements[target], net, weight=weight)
+
+        initial_marking = Marking({places[place]: tokens for place, tokens in self.initial_marking.items()})
+        final_marking = Marking({places[place]: tokens for place, tokens in self.guessed_final_marking().items()})
+        return net, initial_marking, final_marking
+
+    def __len__(self) -> int:
+        return len(self.place_ids) + len(self.transition_ids)
+
+
+class _PnmlHandler:
+    """
+    Callbacks of the expat parser, collecting the graph while the document streams through.
+
+    Start and end tags are dispatched by their name to the methods of the few elements the graph needs. Character data
+    is only received inside text elements.
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        # Nodes are numbered by their id on first sight, in an arc or a declaration, and resolved at the end
+        self.node_ids: Dict[str, int] = {}
+        self.node_kinds = bytearray()
+        self.node_positions = array("i")
+        self.arc_sources, self.arc_targets, self.arc_weights = array("i"), array("i"), array("i")
+
+        self.place_ids: List[str] = []
+        self.place_names: List[str] = []
+        self.transition_ids: List[str] = []
+        self.transition_names: List[str] = []
+        self.label_ids: Dict[str, int] = {}
+        self.transition_labels = array("i")
+        self.initial_marking: Dict[int, int] = {}
+        self.final_tokens: Optional[List[Tuple[str, int]]] = None
+
+        self.net_name: Optional[str] = None
+        self.in_element = False
+        self.in_final_markings = False
+        self.element_id: Optional[str] = None
+        self.texts: List[str] = []
+        self.text: Optional[str] = None
+        self.name: Optional[str] = None
+        self.tokens = 0
+        self.weight = 1
+        self.invisible = False
+        self.arc_ends: Tuple[str, str] = ("", "")
+
+        self.starts = {"text": self.start_text, "place": self.start_element, "transition": self.start_element,
+                       "arc": self.start_arc, "name": self.start_value, "initialMarking": self.start_value,
+                       "inscription": self.start_value, "toolspecific": self.start_toolspecific,
+                       "finalmarkings": self.start_final_markings}
+        self.ends = {"text": self.end_text, "name": self.end_name, "initialMarking": self.end_number,
+                     "inscription": self.end_number, "place": self.end_place, "transition": self.end_transition,
+                     "arc": self.end_arc, "finalmarkings": self.end_final_markings}
+
+    def node(self, node_id: str) -> int:
+        number = self.node_ids.get(node_id)
+        if number is None:
+            number = self.node_ids[node_id] = len(self.node_kinds)
+            self.node_kinds.append(_UNKNOWN)
+            self.node_positions.append(-1)
+        return number
+
+    def declare(self, node_id: str, kind: int, position: int) -> None:
+        number = self.node(node_id)
+        if self.node_kinds[number] == _UNKNOWN:
+            self.node_kinds[number] = kind
+            self.node_positions[number] = position
+
+    def start(self, tag: str, attributes: Dict[str, str]) -> None:
+        method = self.starts.get(tag)
+        if method is None and ":" in tag:
+            method = self.starts.get(tag[tag.rfind(":") + 1:])
+        if method is not None:
+            method(attributes)
+
+    def end(self, tag: str) -> None:
+        method = self.ends.get(tag)
+        if method is None and ":" in tag:
+            method = self.ends.get(tag[tag.rfind(":") + 1:])
+        if method is not None:
+            method()
+
+    def characters(self, data: str) -> None:
+        self.texts.append(data)
+
+    def start_text(self, _: Dict[str, str]) -> None:
+        self.texts = []
+        self.parser.CharacterDataHandler = self.characters
+
+    def end_text(self) -> None:
+        self.parser.CharacterDataHandler = None
+        self.text = "".join(self.texts)
+
+    def start_element(self, attributes: Dict[str, str]) -> None:
+        self.in_element = True
+        self.element_id = attributes.get("idref" if self.in_final_markings else "id")
+        self.text, self.name, self.tokens, self.weight, self.invisible = None, None, 0, 1, False
+
+    def start_arc(self, attributes: Dict[str, str]) -> None:
+        self.start_element(attributes)
+        self.arc_ends = (attributes.get("source"), attributes.get("target"))
+
+    def start_value(self, _: Dict[str, str]) -> None:
+        self.text = None
+
+    def start_toolspecific(self, attributes: Dict[str, str]) -> None:
+        if "ProM" in attributes.get("tool", "") and "invisible" in attributes.get("activity", ""):
+            self.invisible = True
+
+    def start_final_markings(self, _: Dict[str, str]) -> None:
+        self.in_final_markings = True
+        self.final_tokens = []
+
+    def end_name(self) -> None:
+        if not self.in_element:
+            if self.net_name is None:
+                self.net_name = self.text
+        elif self.name is None and self.text:
+            self.name = self.text
+
+    def end_number(self) -> None:
+        if self.text is not None:
+            self.tokens = self.weight = int(self.text)
+
+    def end_place(self) -> None:
+        self.in_element = False
+        if self.in_final_markings:
+            if self.text is not None:
+                self.final_tokens.append((self.element_id, int(self.text)))
+            return
+        place_id = sys.intern(self.element_id)
+        position = len(self.place_ids)
+        self.declare(place_id, _PLACE, position)
+        if self.tokens > 0:
+            self.initial_marking[position] = self.tokens
+        self.place_ids.append(place_id)
+        self.place_names.append(place_id if self.name is None else self.name)
+
+    def end_transition(self) -> None:
+        self.in_element = False
+        transition_id = sys.intern(self.element_id)
+        self.declare(transition_id, _TRANSITION, len(self.transition_ids))
+        self.transition_ids.append(transition_id)
+        transition_name = transition_id if self.name is None else sys.intern(self.name)
+        self.transition_names.append(transition_name)
+        if self.invisible:
+            self.transition_labels.append(-1)
+        else:
+            self.transition_labels.append(self.label_ids.setdefault(transition_name, len(self.label_ids)))
+
+    def end_arc(self) -> None:
+        self.in_element = False
+        source, target = self.arc_ends
+        self.arc_sources.append(self.node(source))
+        self.arc_targets.append(self.node(target))
+        self.arc_weights.append(self.weight)
+
+    def end_final_markings(self) -> None:
+        self.in_final_markings = False
+
+    def graph(self) -> PnmlGraph:
+        kinds = np.frombuffer(self.node_kinds, dtype=np.uint8) if self.node_kinds else np.zeros(0, dtype=np.uint8)
+        positions = np.frombuffer(self.node_positions, dtype=np.int32)
+        sources = np.frombuffer(self.arc_sources, dtype=np.int32)
+        targets = np.frombuffer(self.arc_targets, dtype=np.int32)
+        weights = np.frombuffer(self.arc_weights, dtype=np.int32)
+
+        def arcs(source_kind: int, target_kind: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            selected = (kinds[sources] == source_kind) & (kinds[targets] == target_kind)
+            return positions[sources[selected]], positions[targets[selected]], weights[selected]
+
+        final_marking = None
+        if self.final_tokens is not None:
+            final_marking = {}
+            for place_id, tokens in self.final_tokens:
+                number = self.node_ids.get(place_id)
+                if number is None or self.node_kinds[number] != _PLACE:
+                    raise ValueError(f"The final marking refers to the unknown place {place_id!r}")
+                if tokens > 0:
+                    final_marking[self.node_positions[number]] = tokens
+
+        return PnmlGraph(self.net_name or f"imported_{time.time()}", self.place_ids, self.place_names,
+                         self.transition_ids, self.transition_names, list(self.label_ids),
+                         np.array(self.transition_labels, dtype=np.int32), arcs(_PLACE, _TRANSITION),
+                         arcs(_TRANSITION, _PLACE), self.initial_marking, final_marking)
+
+
+def read_pnml(source: Union[str, BinaryIO]) -> PnmlGraph:
+    """
+    Read a PNML file in one streaming pass.
+
+    The document is fed to expat in chunks and every element is handled by callbacks as it is parsed, without building
+    a tree, so the memory needed grows with the graph only, not with the size of the document. Places and transitions
+    of all pages are read. Arcs may refer to elements declared after them; arcs between two places or two transitions,
+    or to unknown elements, are ignored like pm4py does. Transitions are silent if a ProM tool-specific entry marks
+    their activity invisible.
+
+    :param source: The path or binary file object of the PNML document.
+    :return: The graph of the net.
+    :raises ValueError: If the document is not well-formed, a marking or inscription is not an integer, or the final
+        marking refers to an unknown place.
+    """
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    handler = _PnmlHandler(parser)
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    try:
+        if isinstance(source, str):
+            with open(source, "rb") as file:
+                parser.ParseFile(file)
+        else:
+            parser.ParseFile(source)
+    except expat.ExpatError as error:
+        raise ValueError(f"Malformed PNML document: {error}") from error
+    return handler.graph()
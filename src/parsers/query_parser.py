@@ -0,0 +1,254 @@
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from src.parsers.pattern_lexer import Token, TokenKind, tokenize
+from src.parsers.pattern_parser import AnyPatternNode, InternedPatternNode, PatternNode, PatternParser
+from src.utils.operators import Operators
+
+# Predicate arguments are variable names, numbers, or "∀" + path for unexpanded template variables
+Argument = Union[str, float]
+
+
+class PredicateCall(NamedTuple):
+    name: str
+    arguments: Tuple[Argument, ...]
+
+    def __repr__(self) -> str:
+        return f"{self.name}({', '.join(map(str, self.arguments))})"
+
+
+class Condition(NamedTuple):
+    operator: str  # "AND", "OR" or "NOT"
+    operands: Tuple[Union["Condition", PredicateCall], ...]
+
+    def __repr__(self) -> str:
+        return f"{self.operator}({', '.join(map(repr, self.operands))})"
+
+
+WhereClause = Union[Condition, PredicateCall]
+
+
+class TimeWindow(NamedTuple):
+    amount: Argument  # a number, or "∀" + name for an unexpanded template variable
+    unit: str
+
+    @property
+    def seconds(self) -> float:
+        """
+        :return: The length of the window in seconds.
+        :raises ValueError: If the amount is still a template variable.
+        """
+        if isinstance(self.amount, str):
+            raise ValueError(f"Time window contains an unexpanded template variable: {self.amount}")
+        return self.amount * TIME_UNITS[self.unit]
+
+
+class PatternQuery(NamedTuple):
+    pattern: AnyPatternNode
+    where: Optional[WhereClause] = None
+    within: Optional[TimeWindow] = None
+
+
+TIME_UNITS = {
+    "ms": 0.001, "millisecond": 0.001, "milliseconds": 0.001,
+    "s": 1.0, "sec": 1.0, "second": 1.0, "seconds": 1.0,
+    "min": 60.0, "minute": 60.0, "minutes": 60.0,
+    "h": 3600.0, "hour": 3600.0, "hours": 3600.0,
+    "d": 86400.0, "day": 86400.0, "days": 86400.0,
+}
+
+_KEYWORDS = {"PATTERN", "WHERE", "WITHIN"}
+_CONNECTIVES = {Operators.AND, Operators.OR}
+
+
+class QueryParser(PatternParser):
+    """
+    Parser for full queries of the form
+
+        [PATTERN] <pattern> [WHERE <condition>] [WITHIN <amount> [<unit>]]
+
+    The condition combines predicate calls such as related(a, b) with AND, OR, NOT and parentheses. Connectives that
+    dangle, i.e. are followed by another connective, a closing parenthesis or the end of the clause, are dropped and
+    close the group they follow. Expanding "{% for %} p(...) OR {% endfor %} AND" therefore yields an AND of ORs.
+    """
+
+    def is_connective(self, offset: int = 0) -> bool:
+        token = self.tokens[self.position + offset]
+        return token.kind == TokenKind.IDENT and token.value in _CONNECTIVES
+
+    def is_keyword(self, token: Token) -> bool:
+        return token.kind == TokenKind.IDENT and token.value in _KEYWORDS
+
+    def at_clause_end(self, offset: int = 0) -> bool:
+        token = self.tokens[self.position + offset]
+        return token.kind in (TokenKind.RPAREN, TokenKind.EOF) or self.is_keyword(token)
+
+    def dangles(self) -> bool:
+        """
+        :return: True if the connective at the current token is not followed by an operand.
+        """
+        return self.is_connective(1) or self.at_clause_end(1)
+
+    def parse_query(self) -> PatternQuery:
+        """
+        Parse a full query.
+
+        :return: The parsed query.
+        :raises ValueError: If the query format is unexpected.
+        """
+        token = self.peek()
+        if token.kind == TokenKind.IDENT and token.value == "PATTERN":
+            self.position += 1
+        pattern = self.parse_node()
+
+        where = None
+        within = None
+        token = self.peek()
+        if token.kind == TokenKind.IDENT and token.value == "WHERE":
+            self.position += 1
+            where = self.parse_where()
+            token = self.peek()
+        if token.kind == TokenKind.IDENT and token.value == "WITHIN":
+            self.position += 1
+            within = self.parse_within()
+            token = self.peek()
+        if token.kind != TokenKind.EOF:
+            raise ValueError(f"Unexpected remaining query content: {self.remaining()}")
+        return PatternQuery(pattern, where, within)
+
+    def parse_where(self) -> Optional[WhereClause]:
+        """
+        Parse a condition up to the next keyword or the end of the query.
+
+        :return: The condition, or None if the clause contains no predicate at all.
+        """
+        # Template statements carry no meaning inside a condition
+        self.tokens = self.tokens[:self.position] + \
+            [token for token in self.tokens[self.position:] if token.kind != TokenKind.STMT]
+        condition = self.parse_groups()
+        if not self.at_clause_end() or self.peek().kind == TokenKind.RPAREN:
+            raise self.error(self.peek())
+        return condition
+
+    def parse_groups(self) -> Optional[WhereClause]:
+        """
+        Parse groups closed by dangling connectives and combine them with the connective that follows each of them.
+        """
+        while self.is_connective():
+            self.position += 1
+        if self.at_clause_end():
+            return None
+        condition = self.parse_or()
+        while self.is_connective():
+            operator = self.peek().value
+            self.position += 1
+            if self.is_connective() or self.at_clause_end():
+                continue
+            condition = _combine(operator, condition, self.parse_or())
+        return condition
+
+    def parse_or(self) -> Optional[WhereClause]:
+        condition = self.parse_and()
+        while self.is_connective() and self.peek().value == Operators.OR:
+            if self.dangles():
+                self.position += 1
+                break
+            self.position += 1
+            condition = _combine(Operators.OR, condition, self.parse_and())
+        return condition
+
+    def parse_and(self) -> Optional[WhereClause]:
+        condition = self.parse_not()
+        while self.is_connective() and self.peek().value == Operators.AND:
+            if self.dangles():
+                self.position += 1
+                break
+            self.position += 1
+            condition = _combine(Operators.AND, condition, self.parse_not())
+        return condition
+
+    def parse_not(self) -> Optional[WhereClause]:
+        token = self.peek()
+        if token.kind == TokenKind.IDENT and token.value == Operators.NEGATION:
+            self.position += 1
+            operand = self.parse_not()
+            return None if operand is None else Condition(Operators.NEGATION, (operand,))
+        return self.parse_primary()
+
+    def parse_primary(self) -> Optional[WhereClause]:
+        token = self.peek()
+        if token.kind == TokenKind.LPAREN:
+            self.position += 1
+            condition = self.parse_groups()
+            if self.peek().kind != TokenKind.RPAREN:
+                raise self.error(self.peek(), "Expected ) in WHERE clause")
+            self.position += 1
+            return condition
+        if token.kind == TokenKind.IDENT and not self.is_keyword(token) and token.value not in _CONNECTIVES \
+                and self.tokens[self.position + 1].kind == TokenKind.LPAREN:
+            self.position += 2
+            arguments: List[Argument] = []
+            while self.peek().kind != TokenKind.RPAREN:
+                arguments.append(self.parse_argument())
+                if self.peek().kind == TokenKind.COMMA:
+                    self.position += 1
+            self.position += 1
+            return PredicateCall(token.value, tuple(arguments))
+        raise self.error(token, "Expected a predicate in WHERE clause")
+
+    def parse_argument(self) -> Argument:
+        token = self.peek()
+        self.position += 1
+        if token.kind == TokenKind.NUMBER:
+            return float(token.value)
+        if token.kind == TokenKind.IDENT:
+            return token.value
+        if token.kind == TokenKind.VAR:
+            return "∀" + token.value
+        raise self.error(token, "Unexpected predicate argument")
+
+    def parse_within(self) -> TimeWindow:
+        token = self.peek()
+        if token.kind == TokenKind.NUMBER:
+            amount: Argument = float(token.value)
+        elif token.kind == TokenKind.VAR:
+            amount = "∀" + token.value
+        else:
+            raise self.error(token, "Expected a time amount after WITHIN")
+        self.position += 1
+
+        unit = "seconds"
+        token = self.peek()
+        if token.kind == TokenKind.IDENT:
+            if token.value not in TIME_UNITS:
+                raise self.error(token, "Unknown time unit")
+            unit = token.value
+            self.position += 1
+        return TimeWindow(amount, unit)
+
+
+def _combine(operator: str, left: Optional[WhereClause], right: Optional[WhereClause]) -> Optional[WhereClause]:
+    """
+    Combine two conditions, flattening chains of the same connective and dropping empty operands.
+    """
+    if left is None or right is None:
+        return right if left is None else left
+    operands: Tuple[WhereClause, ...] = ()
+    for condition in (left, right):
+        if isinstance(condition, Condition) and condition.operator == operator:
+            operands += condition.operands
+        else:
+            operands += (condition,)
+    return Condition(operator, operands)
+
+
+def parse_query(query: str, interned: bool = False) -> PatternQuery:
+    """
+    Parse a query string with an optional PATTERN keyword and optional WHERE and WITHIN clauses.
+
+    :param query: The query string to parse.
+    :param interned: Whether to build InternedPatternNodes instead of PatternNodes for the pattern.
+    :return: The parsed query.
+    :raises ValueError: If the query format is unexpected.
+    """
+    parser = QueryParser(tokenize(query), query, InternedPatternNode if interned else PatternNode)
+    return parser.parse_query()
@@ -0,0 +1,357 @@
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, NamedTuple, Sequence, Set, Tuple, Union
+import gc
+
+import numpy as np
+from pm4py import PetriNet
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Pause the cyclic garbage collector. Building many small lists next to the millions of element objects of a large
+    net otherwise triggers full collections that take longer than the work itself.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _csr(rows: np.ndarray, columns: np.ndarray, row_count: int, column_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a compressed sparse row adjacency from (row, column) pairs, dropping duplicate pairs.
+
+    :return: The row pointers, of length row_count + 1, and the column indices sorted per row.
+    """
+    stride = max(column_count, 1)
+    keys = np.sort(rows.astype(np.int64) * stride + columns)
+    if len(keys):
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    indptr = np.zeros(row_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // stride, minlength=row_count), out=indptr[1:])
+    return indptr, (keys % stride).astype(np.int32)
+
+
+def _ids_of(elements: Sequence[object], object_ids: np.ndarray) -> np.ndarray:
+    """
+    Map object identities to the positions of the objects in a sequence.
+
+    :return: Per identity, the position of its object in `elements`, or -1 if it is not one of them.
+    """
+    keys = np.fromiter((id(element) for element in elements), dtype=np.int64, count=len(elements))
+    order = np.argsort(keys).astype(np.int32)
+    keys = keys[order]
+    if not len(keys):
+        return np.full(len(object_ids), -1, dtype=np.int32)
+    positions = np.minimum(np.searchsorted(keys, object_ids), len(keys) - 1)
+    return np.where(keys[positions] == object_ids, order[positions], -1).astype(np.int32)
+
+
+Element = Union[PetriNet.Place, PetriNet.Transition]
+
+
+class NetPatterns(NamedTuple):
+    """
+    The structural patterns of a Petri net, see `PetriNetIndex.identify_all_patterns`.
+    """
+    seq: List[List[Element]]  # SEQ chains, alternating places and transitions
+    and_splits: Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]]  # (transition, output places)
+    or_splits: Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]]  # (place, output transitions)
+    loops: List[Tuple[Element, ...]]  # the places and transitions of each cycle-carrying strongly connected component
+    xor_joins: Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]]  # (place, input transitions)
+    and_joins: Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]]  # (transition, input places)
+
+
+class PetriNetIndex:
+    """
+    Compact, array-backed adjacency of a Petri net.
+
+    Places and transitions get integer ids in the order they are given. Arcs are stored as CSR arrays in both
+    directions: the successors of place i are the transitions
+    place_successors[place_successor_indptr[i]:place_successor_indptr[i + 1]], and likewise for the successors of
+    transitions and the predecessors of both. Parallel arcs are stored once.
+    """
+
+    def __init__(self,
+                 places: Sequence[PetriNet.Place],
+                 transitions: Sequence[PetriNet.Transition],
+                 place_transition_arcs: Tuple[np.ndarray, np.ndarray],
+                 transition_place_arcs: Tuple[np.ndarray, np.ndarray]):
+        """
+        Initialize the index. Use `from_net` or `from_elements` to build one from a Petri net.
+
+        :param places: The places, indexed by their id.
+        :param transitions: The transitions, indexed by their id.
+        :param place_transition_arcs: The place ids and transition ids of the arcs from places to transitions.
+        :param transition_place_arcs: The transition ids and place ids of the arcs from transitions to places.
+        """
+        self.places = list(places)
+        self.transitions = list(transitions)
+        place_count, transition_count = len(self.places), len(self.transitions)
+        sources, targets = place_transition_arcs
+        self.place_successor_indptr, self.place_successors = _csr(sources, targets, place_count, transition_count)
+        self.transition_predecessor_indptr, self.transition_predecessors = \
+            _csr(targets, sources, transition_count, place_count)
+        sources, targets = transition_place_arcs
+        self.transition_successor_indptr, self.transition_successors = \
+            _csr(sources, targets, transition_count, place_count)
+        self.place_predecessor_indptr, self.place_predecessors = _csr(targets, sources, place_count, transition_count)
+
+    @classmethod
+    def from_elements(cls,
+                      places: Iterable[PetriNet.Place],
+                      transitions: Iterable[PetriNet.Transition],
+                      arcs: Iterable[PetriNet.Arc]) -> "PetriNetIndex":
+        """
+        Build the index from the elements of a Petri net. Arcs from or to elements outside the given places and
+        transitions are ignored.
+
+        :param places: The places.
+        :param transitions: The transitions.
+        :param arcs: The arcs between them.
+        :return: The index.
+        """
+        places = list(places)
+        transitions = list(transitions)
+        # Elements hash by identity, so arcs are resolved by matching the ids of their ends against sorted arrays of
+        # the element ids; this needs neither isinstance checks nor the elements' Python-level __hash__
+        with _gc_paused():
+            ends = np.fromiter(((id(arc.source), id(arc.target)) for arc in arcs), dtype=np.dtype((np.int64, 2)))
+        ends = ends.reshape(-1, 2)
+        source_places, target_places = _ids_of(places, ends[:, 0]), _ids_of(places, ends[:, 1])
+        source_transitions, target_transitions = _ids_of(transitions, ends[:, 0]), _ids_of(transitions, ends[:, 1])
+
+        place_transition = (source_places >= 0) & (target_transitions >= 0)
+        transition_place = (source_transitions >= 0) & (target_places >= 0)
+        return cls(places, transitions,
+                   (source_places[place_transition], target_transitions[place_transition]),
+                   (source_transitions[transition_place], target_places[transition_place]))
+
+    @classmethod
+    def from_net(cls, net: PetriNet) -> "PetriNetIndex":
+        return cls.from_elements(net.places, net.transitions, net.arcs)
+
+    @property
+    def place_out_degrees(self) -> np.ndarray:
+        return np.diff(self.place_successor_indptr)
+
+    @property
+    def transition_out_degrees(self) -> np.ndarray:
+        return np.diff(self.transition_successor_indptr)
+
+    @property
+    def place_in_degrees(self) -> np.ndarray:
+        return np.diff(self.place_predecessor_indptr)
+
+    @property
+    def transition_in_degrees(self) -> np.ndarray:
+        return np.diff(self.transition_predecessor_indptr)
+
+    def successors_of_place(self, place: int) -> np.ndarray:
+        return self.place_successors[self.place_successor_indptr[place]:self.place_successor_indptr[place + 1]]
+
+    def successors_of_transition(self, transition: int) -> np.ndarray:
+        return self.transition_successors[
+            self.transition_successor_indptr[transition]:self.transition_successor_indptr[transition + 1]]
+
+    def seq_links(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the steps a SEQ chain can take: from a place with a single successor transition, through that transition
+        if it has a single successor place itself.
+
+        :return: Per place, the transition and the next place of its step, or -1 for both if it has none.
+        """
+        place_count = len(self.places)
+        link_transitions = np.full(place_count, -1, dtype=np.int32)
+        link_places = np.full(place_count, -1, dtype=np.int32)
+        single = np.flatnonzero(self.place_out_degrees == 1)
+        transitions = self.place_successors[self.place_successor_indptr[single]]
+        linked = self.transition_out_degrees[transitions] == 1
+        single, transitions = single[linked], transitions[linked]
+        link_transitions[single] = transitions
+        link_places[single] = self.transition_successors[self.transition_successor_indptr[transitions]]
+        return link_transitions, link_places
+
+    def identify_patterns(self) -> Tuple[
+        List[List[Union[PetriNet.Place, PetriNet.Transition]]],
+        Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]],
+        Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]]
+    ]:
+        """
+        Detect SEQ chains, AND splits and OR splits, see `identify_patterns` in `src/parsers/parse_petri_net.py`.
+
+        Chains are followed from the places in their id order, so they are the same as those of the set-based
+        detection for places given in the same order. The elements of AND and OR patterns are ordered by id.
+
+        :return: The SEQ chains, the AND patterns (transition, places) and the OR patterns (place, transitions).
+        """
+        places, transitions = self.places, self.transitions
+        link_transitions, link_places = (links.tolist() for links in self.seq_links())
+        seq_patterns: List[List[Union[PetriNet.Place, PetriNet.Transition]]] = []
+
+        with _gc_paused():
+            visited = bytearray(len(places))
+            for start in range(len(places)):
+                if visited[start]:
+                    continue
+                chain = [places[start]]
+                current = start
+                while True:
+                    following = link_places[current]
+                    if following < 0 or visited[following]:
+                        break
+                    visited[following] = 1
+                    chain.append(transitions[link_transitions[current]])
+                    chain.append(places[following])
+                    current = following
+                if len(chain) > 1:
+                    visited[start] = 1
+                    seq_patterns.append(chain)
+
+        and_patterns, or_patterns = self.splits()
+        return seq_patterns, and_patterns, or_patterns
+
+    def splits(self) -> Tuple[
+        Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]],
+        Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]]
+    ]:
+        """
+        Find the AND splits, transitions with several output places, and the OR splits, places with several output
+        transitions.
+
+        :return: The AND patterns (transition, places) and the OR patterns (place, transitions), ordered by id.
+        """
+        places, transitions = self.places, self.transitions
+        and_patterns: Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]] = set()
+        or_patterns: Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]] = set()
+        with _gc_paused():
+            indptr, successors = self.transition_successor_indptr, self.transition_successors
+            for transition in np.flatnonzero(self.transition_out_degrees > 1).tolist():
+                connected = successors[indptr[transition]:indptr[transition + 1]].tolist()
+                and_patterns.add((transitions[transition], tuple(places[place] for place in connected)))
+
+            indptr, successors = self.place_successor_indptr, self.place_successors
+            for place in np.flatnonzero(self.place_out_degrees > 1).tolist():
+                connected = successors[indptr[place]:indptr[place + 1]].tolist()
+                or_patterns.add((places[place], tuple(transitions[transition] for transition in connected)))
+        return and_patterns, or_patterns
+
+    def strongly_connected_components(self) -> Tuple[np.ndarray, int]:
+        """
+        Label the strongly connected components of the net with an iterative Tarjan pass, linear in the number of
+        places, transitions and arcs and independent of the recursion limit.
+
+        :return: Per node, the label of its component, with places first and transitions after them (transition i is
+            node len(places) + i), and the number of components. Components are labelled in the order Tarjan's
+            algorithm completes them, i.e. in reverse topological order of the condensed net.
+        """
+        place_count = len(self.places)
+        node_count = place_count + len(self.transitions)
+        indptr = np.concatenate((self.place_successor_indptr,
+                                 self.transition_successor_indptr[1:] + self.place_successor_indptr[-1])).tolist()
+        successors = np.concatenate((self.place_successors.astype(np.int64) + place_count,
+                                     self.transition_successors)).tolist()
+
+        order = [-1] * node_count
+        low = [0] * node_count
+        labels = [-1] * node_count
+        next_arc = indptr[:-1]
+        on_stack = bytearray(node_count)
+        stack: List[int] = []
+        counter = component_count = 0
+        with _gc_paused():
+            for root in range(node_count):
+                if order[root] >= 0:
+                    continue
+                order[root] = low[root] = counter
+                counter += 1
+                stack.append(root)
+                on_stack[root] = 1
+                path = [root]
+                while path:
+                    node = path[-1]
+                    arc = next_arc[node]
+                    if arc < indptr[node + 1]:
+                        next_arc[node] = arc + 1
+                        successor = successors[arc]
+                        if order[successor] < 0:
+                            order[successor] = low[successor] = counter
+                            counter += 1
+                            stack.append(successor)
+                            on_stack[successor] = 1
+                            path.append(successor)
+                        elif on_stack[successor] and order[successor] < low[node]:
+                            low[node] = order[successor]
+                        continue
+                    path.pop()
+                    if path and low[node] < low[path[-1]]:
+                        low[path[-1]] = low[node]
+                    if low[node] == order[node]:
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = 0
+                            labels[member] = component_count
+                            if member == node:
+                                break
+                        component_count += 1
+        return np.array(labels, dtype=np.int32), component_count
+
+    def loops(self) -> List[Tuple[Element, ...]]:
+        """
+        Find the loops of the net: the strongly connected components with more than one node. A net is bipartite, so
+        every cycle runs through at least one place and one transition.
+
+        :return: Per loop, its places and then its transitions, each ordered by id. Loops are ordered by their first
+            place.
+        """
+        labels, component_count = self.strongly_connected_components()
+        sizes = np.bincount(labels, minlength=component_count)
+        nodes = np.flatnonzero(sizes[labels] > 1)
+        # Stable sort by label keeps the nodes of a component in id order, places before transitions
+        nodes = nodes[np.argsort(labels[nodes], kind="stable")]
+        bounds = np.flatnonzero(np.diff(labels[nodes])) + 1
+        components = sorted((component.tolist() for component in np.split(nodes, bounds)) if len(nodes) else [])
+        place_count = len(self.places)
+        with _gc_paused():
+            return [tuple(self.places[node] if node < place_count else self.transitions[node - place_count]
+                          for node in component) for component in components]
+
+    def joins(self) -> Tuple[
+        Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]],
+        Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]]
+    ]:
+        """
+        Find the joins of the net, the counterparts of the OR and AND splits: places with several input transitions
+        merge alternative paths, transitions with several input places synchronize parallel ones.
+
+        :return: The XOR joins (place, input transitions) and the AND joins (transition, input places), with inputs
+            ordered by id.
+        """
+        places, transitions = self.places, self.transitions
+        xor_joins: Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition, ...]]] = set()
+        and_joins: Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place, ...]]] = set()
+        with _gc_paused():
+            indptr, predecessors = self.place_predecessor_indptr, self.place_predecessors
+            for place in np.flatnonzero(self.place_in_degrees > 1).tolist():
+                connected = predecessors[indptr[place]:indptr[place + 1]].tolist()
+                xor_joins.add((places[place], tuple(transitions[transition] for transition in connected)))
+
+            indptr, predecessors = self.transition_predecessor_indptr, self.transition_predecessors
+            for transition in np.flatnonzero(self.transition_in_degrees > 1).tolist():
+                connected = predecessors[indptr[transition]:indptr[transition + 1]].tolist()
+                and_joins.add((transitions[transition], tuple(places[place] for place in connected)))
+        return xor_joins, and_joins
+
+    def identify_all_patterns(self) -> NetPatterns:
+        """
+        Detect the SEQ chains, splits, loops and joins of the net in one linear-time pass over the index.
+
+        :return: The patterns.
+        """
+        seq_patterns, and_splits, or_splits = self.identify_patterns()
+        xor_joins, and_joins = self.joins()
+        return NetPatterns(seq_patterns, and_splits, or_splits, self.loops(), xor_joins, and_joins)
@@ -0,0 +1,217 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+import csv
+import os
+
+import numpy as np
+from pm4py import Marking, PetriNet
+
+from src.simulation.token_game import NO_FIRING, TokenGame
+
+_FORMATS = ("csv", "feather")
+
+
+class LogSummary(NamedTuple):
+    path: str
+    case_count: int
+    event_count: int
+    truncated_cases: int  # cases stopped at max_trace_length before reaching the final marking or a dead marking
+
+
+class _Simulation(NamedTuple):
+    """
+    Everything a worker needs to play cases, without pm4py objects.
+    """
+    pre: np.ndarray
+    post: np.ndarray
+    codes: np.ndarray  # per transition the code of its label, -1 for silent transitions
+    initial: np.ndarray
+    final: np.ndarray
+    max_trace_length: int
+    start_time: float
+    case_interval: float
+    event_interval: float
+
+
+class _Shard(NamedTuple):
+    first_case: int
+    case_count: int
+    seed: np.random.SeedSequence
+
+
+_simulation: Optional[_Simulation] = None
+
+
+def _init_worker(simulation: _Simulation) -> None:
+    global _simulation
+    _simulation = simulation
+
+
+def _play_shard(shard: _Shard, simulation: Optional[_Simulation] = None) -> Tuple[
+    np.ndarray, np.ndarray, np.ndarray, int
+]:
+    """
+    Play the cases of one shard as a batch until each reaches the final marking, a dead marking or the maximum
+    length. Case i arrives at start_time + i * case_interval, and every visible event follows the previous one of its
+    case after an exponentially distributed delay.
+
+    :return: The case ids, activity codes and timestamps of the visible events ordered by timestamp, and the number
+        of truncated cases.
+    """
+    simulation = _simulation if simulation is None else simulation
+    rng = np.random.default_rng(shard.seed)
+    game = TokenGame.from_incidence(simulation.pre, simulation.post, rng)
+    case_ids = np.arange(shard.first_case, shard.first_case + shard.case_count, dtype=np.int64)
+    clocks = simulation.start_time + case_ids * simulation.case_interval
+    markings = np.repeat(simulation.initial[None], shard.case_count, axis=0)
+    # The indices of the running cases; finished ones are dropped so a few long cases do not replay the whole batch
+    active = np.arange(shard.case_count)
+    columns: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    for _ in range(simulation.max_trace_length):
+        chosen = game.choose(game.enabled(markings))
+        chosen[~(markings != simulation.final).any(axis=1)] = NO_FIRING
+        running = chosen != NO_FIRING
+        if not running.all():
+            active, markings, chosen = active[running], markings[running], chosen[running]
+            if not len(active):
+                break
+        markings = game.fire(markings, chosen)
+        codes = simulation.codes[chosen]
+        cases = active[codes >= 0]
+        codes = codes[codes >= 0]
+        clocks[cases] += rng.exponential(simulation.event_interval, len(cases))
+        columns.append((case_ids[cases], codes, clocks[cases]))
+
+    unfinished = (markings != simulation.final).any(axis=1) & game.enabled(markings).any(axis=1)
+    truncated = int(unfinished.sum())
+    if not columns:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0), truncated
+    cases, codes, timestamps = (np.concatenate(column) for column in zip(*columns))
+    order = np.argsort(timestamps, kind="stable")
+    return cases[order], codes[order].astype(np.int32), timestamps[order], truncated
+
+
+class _CsvWriter:
+    def __init__(self, path: str, labels: List[str]):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(("case_id", "activity", "timestamp"))
+        self.labels = np.array(labels, dtype=object)
+
+    def write(self, cases: np.ndarray, codes: np.ndarray, timestamps: np.ndarray) -> None:
+        self.writer.writerows(zip(cases.tolist(), self.labels[codes].tolist(), timestamps.tolist()))
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _FeatherWriter:
+    """
+    Writes an Arrow IPC file, which is the Feather V2 format, with one record batch per shard and the activities
+    dictionary-encoded.
+    """
+
+    def __init__(self, path: str, labels: List[str]):
+        try:
+            import pyarrow
+        except ImportError as error:
+            raise ImportError("Writing Feather logs needs pyarrow, install it or write CSV") from error
+        self.pyarrow = pyarrow
+        self.labels = pyarrow.array(labels, type=pyarrow.string())
+        self.schema = pyarrow.schema([("case_id", pyarrow.int64()),
+                                      ("activity", pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+                                      ("timestamp", pyarrow.float64())])
+        self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, cases: np.ndarray, codes: np.ndarray, timestamps: np.ndarray) -> None:
+        pyarrow = self.pyarrow
+        activities = pyarrow.DictionaryArray.from_arrays(pyarrow.array(codes, type=pyarrow.int32()), self.labels)
+        self.writer.write_batch(pyarrow.record_batch([pyarrow.array(cases), activities, pyarrow.array(timestamps)],
+                                                     schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def generate_log(net: PetriNet,
+                 initial_marking: Marking,
+                 final_marking: Marking,
+                 case_count: int,
+                 path: str,
+                 file_format: Optional[str] = None,
+                 seed: int = 0,
+                 max_workers: Optional[int] = None,
+                 shard_size: int = 10_000,
+                 max_trace_length: int = 1_000,
+                 start_time: float = 0.0,
+                 case_interval: float = 1.0,
+                 event_interval: float = 60.0) -> LogSummary:
+    """
+    Simulate cases of a net in a process pool and write their visible events as a log.
+
+    Cases are split into shards of shard_size consecutive case ids. Every shard is played as one batch of the
+    `TokenGame` with its own random generator, spawned from the seed, so the log is the same for every number of
+    workers. Shards are written in case order as one record batch each, with the events of a shard ordered by
+    timestamp; shards overlap in time only at their borders. The log has the columns case_id, activity and timestamp,
+    in seconds.
+
+    :param net: The net.
+    :param initial_marking: The marking every case starts in.
+    :param final_marking: The marking at which a case ends; cases also end in dead markings.
+    :param case_count: The number of cases.
+    :param path: The file to write.
+    :param file_format: "csv" or "feather", by default from the file extension. Feather needs pyarrow.
+    :param seed: The seed of the simulation.
+    :param max_workers: The number of worker processes, the number of CPUs by default. Runs in this process if 1.
+    :param shard_size: The number of cases per shard and record batch.
+    :param max_trace_length: The maximum number of firings per case, so live loops end.
+    :param start_time: The arrival time of the first case.
+    :param case_interval: The time between the arrivals of consecutive cases.
+    :param event_interval: The mean time between two events of a case.
+    :return: The numbers of cases, events and truncated cases.
+    """
+    if file_format is None:
+        file_format = "feather" if os.path.splitext(path)[1].lower() in (".feather", ".arrow") else "csv"
+    if file_format not in _FORMATS:
+        raise ValueError(f"Unknown log format {file_format!r}, expected one of {_FORMATS}")
+    if case_count < 0 or shard_size <= 0 or max_trace_length <= 0:
+        raise ValueError("The case count must not be negative, shard size and maximum trace length must be positive")
+    max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+
+    game = TokenGame.from_net(net)
+    labels = sorted({transition.label for transition in game.transitions if transition.label is not None})
+    label_codes = {label: code for code, label in enumerate(labels)}
+    simulation = _Simulation(
+        game.pre, game.post,
+        np.array([label_codes.get(transition.label, -1) for transition in game.transitions], dtype=np.int32),
+        game.marking_vector(initial_marking), game.marking_vector(final_marking),
+        max_trace_length, start_time, case_interval, event_interval)
+    firsts = range(0, case_count, shard_size)
+    shards = [_Shard(first, min(shard_size, case_count - first), shard_seed)
+              for first, shard_seed in zip(firsts, np.random.SeedSequence(seed).spawn(len(firsts)))]
+
+    writer = _FeatherWriter(path, labels) if file_format == "feather" else _CsvWriter(path, labels)
+    event_count = truncated_cases = 0
+    try:
+        for cases, codes, timestamps, truncated in _play(simulation, shards, max_workers):
+            writer.write(cases, codes, timestamps)
+            event_count += len(cases)
+            truncated_cases += truncated
+    finally:
+        writer.close()
+    return LogSummary(path, case_count, event_count, truncated_cases)
+
+
+def _play(simulation: _Simulation, shards: List[_Shard], max_workers: int) -> Iterator[Tuple[
+    np.ndarray, np.ndarray, np.ndarray, int
+]]:
+    """
+    :return: The events of the shards in shard order.
+    """
+    if max_workers <= 1 or len(shards) <= 1:
+        for shard in shards:
+            yield _play_shard(shard, simulation)
+        return
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(simulation,)) as executor:
+        yield from executor.map(_play_shard, shards)
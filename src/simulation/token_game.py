@@ -0,0 +1,193 @@
+from typing import Callable, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+from pm4py import PetriNet
+
+FiringListener = Callable[[np.ndarray, np.ndarray], None]
+# A seed for np.random.default_rng, or a generator that is used as is
+Seed = Union[int, np.random.Generator, None]
+
+NO_FIRING = -1
+
+
+class TokenGame:
+    """
+    Headless token game of a Petri net on its incidence matrices.
+
+    Places and transitions are numbered in the given order. The arcs are kept as the input matrix `pre` and the
+    output matrix `post`, both transitions x places with the arc weights, and their difference `change`. The input
+    places of the transitions are also kept as columns padded to the largest number of inputs, so enabledness costs
+    one vectorized comparison per input column for a whole batch.
+
+    All operations work on a batch of markings at once, an int array of shape (batch, places), and a single marking
+    of shape (places,) is treated as a batch of one. Listeners subscribed to the game are called after every step
+    with the fired transition per marking and the new markings.
+    """
+
+    def __init__(self,
+                 places: Sequence[PetriNet.Place],
+                 transitions: Sequence[PetriNet.Transition],
+                 arcs: Sequence[PetriNet.Arc],
+                 seed: Seed = None):
+        """
+        Initialize the game. Use `from_net` to build one from a Petri net.
+
+        :param places: The places, indexed by their id.
+        :param transitions: The transitions, indexed by their id.
+        :param arcs: The arcs between them; arcs to or from other elements are ignored.
+        :param seed: The seed of the random choice between enabled transitions, or the generator to draw it with.
+        """
+        self.places = list(places)
+        self.transitions = list(transitions)
+        place_ids = {id(place): index for index, place in enumerate(self.places)}
+        transition_ids = {id(transition): index for index, transition in enumerate(self.transitions)}
+        self.pre = np.zeros((len(self.transitions), len(self.places)), dtype=np.int32)
+        self.post = np.zeros((len(self.transitions), len(self.places)), dtype=np.int32)
+        for arc in arcs:
+            weight = getattr(arc, "weight", 1)
+            if id(arc.source) in place_ids and id(arc.target) in transition_ids:
+                self.pre[transition_ids[id(arc.target)], place_ids[id(arc.source)]] += weight
+            elif id(arc.source) in transition_ids and id(arc.target) in place_ids:
+                self.post[transition_ids[id(arc.source)], place_ids[id(arc.target)]] += weight
+        self._index_inputs(seed)
+
+    @classmethod
+    def from_incidence(cls, pre: np.ndarray, post: np.ndarray, seed: Seed = None) -> "TokenGame":
+        """
+        Build the game from its input and output matrices, for instance in a worker process that should not receive
+        the pm4py objects. Places and transitions are then only their ids.
+
+        :param pre: The input arc weights, transitions x places.
+        :param post: The output arc weights, transitions x places.
+        :param seed: The seed of the random choice between enabled transitions, or the generator to draw it with.
+        :return: The game.
+        """
+        if pre.shape != post.shape:
+            raise ValueError(f"The input and output matrices differ in shape, {pre.shape} and {post.shape}")
+        game = cls.__new__(cls)
+        game.places = list(range(pre.shape[1]))
+        game.transitions = list(range(pre.shape[0]))
+        game.pre = np.asarray(pre, dtype=np.int32)
+        game.post = np.asarray(post, dtype=np.int32)
+        game._index_inputs(seed)
+        return game
+
+    def _index_inputs(self, seed: Seed) -> None:
+        self.change = self.post - self.pre
+        # Column j holds the j-th input place and weight of every transition, padded with weight 0 on place 0
+        transitions_of_inputs, input_places = np.nonzero(self.pre)
+        counts = np.bincount(transitions_of_inputs, minlength=len(self.transitions))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        columns = np.arange(len(transitions_of_inputs)) - starts[transitions_of_inputs]
+        width = int(counts.max()) if len(counts) else 0
+        self._input_places = np.zeros((width, len(self.transitions)), dtype=np.intp)
+        self._input_weights = np.zeros((width, len(self.transitions)), dtype=np.int32)
+        self._input_places[columns, transitions_of_inputs] = input_places
+        self._input_weights[columns, transitions_of_inputs] = self.pre[transitions_of_inputs, input_places]
+        self.rng = np.random.default_rng(seed)
+        self._listeners: List[FiringListener] = []
+
+    @classmethod
+    def from_net(cls, net: PetriNet, seed: Seed = None) -> "TokenGame":
+        """
+        :return: The game of the net, with places and transitions ordered by name.
+        """
+        return cls(sorted(net.places, key=lambda place: place.name),
+                   sorted(net.transitions, key=lambda transition: transition.name), list(net.arcs), seed)
+
+    def marking_vector(self, marking: Mapping[PetriNet.Place, int]) -> np.ndarray:
+        """
+        :return: The marking as a vector of token counts indexed by place id.
+        """
+        vector = np.zeros(len(self.places), dtype=np.int32)
+        for index, place in enumerate(self.places):
+            vector[index] = marking.get(place, 0)
+        return vector
+
+    def subscribe(self, listener: FiringListener) -> None:
+        """
+        Call the listener after every step with the fired transition ids, NO_FIRING for a marking without enabled
+        transitions, and the markings after the step.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: FiringListener) -> None:
+        self._listeners.remove(listener)
+
+    def enabled(self, markings: np.ndarray) -> np.ndarray:
+        """
+        :param markings: A marking or a batch of markings.
+        :return: Per marking and transition whether the transition is enabled, of shape (batch, transitions).
+        """
+        markings = np.atleast_2d(markings)
+        if not len(self._input_places) or not len(self.places):
+            return np.ones((len(markings), len(self.transitions)), dtype=bool)
+        enabled = markings[:, self._input_places[0]] >= self._input_weights[0]
+        for places, weights in zip(self._input_places[1:], self._input_weights[1:]):
+            enabled &= markings[:, places] >= weights
+        return enabled
+
+    def fire(self, markings: np.ndarray, transitions: Union[np.ndarray, Sequence[int]]) -> np.ndarray:
+        """
+        Fire one transition per marking without checking that it is enabled.
+
+        :param markings: A marking or a batch of markings.
+        :param transitions: The transition id per marking, NO_FIRING to keep a marking.
+        :return: The new markings, of shape (batch, places).
+        """
+        markings = np.atleast_2d(markings)
+        transitions = np.asarray(transitions)
+        fired = transitions != NO_FIRING
+        if fired.all():
+            return markings + self.change[transitions]
+        result = markings.copy()
+        result[fired] += self.change[transitions[fired]]
+        return result
+
+    def choose(self, enabled: np.ndarray) -> np.ndarray:
+        """
+        :param enabled: The enabled transitions per marking, as returned by `enabled`.
+        :return: Per marking an enabled transition drawn uniformly at random, NO_FIRING if none is enabled.
+        """
+        # The r-th enabled transition for a uniform r below the number of enabled ones
+        dtype = np.int16 if enabled.shape[1] < 2 ** 15 else np.int64
+        ranks = np.cumsum(enabled, axis=1, dtype=dtype)
+        counts = ranks[:, -1] if enabled.shape[1] else np.zeros(len(enabled), dtype=dtype)
+        drawn = (self.rng.random(len(enabled)) * counts).astype(dtype)
+        chosen = np.argmax(ranks > drawn[:, None], axis=1)
+        chosen[counts == 0] = NO_FIRING
+        return chosen
+
+    def step(self, markings: np.ndarray) -> np.ndarray:
+        """
+        Fire one random enabled transition in every marking and notify the listeners.
+
+        :param markings: A marking or a batch of markings.
+        :return: The new markings, of shape (batch, places). Dead markings stay the same.
+        """
+        chosen = self.choose(self.enabled(markings))
+        markings = self.fire(markings, chosen)
+        for listener in self._listeners:
+            listener(chosen, markings)
+        return markings
+
+    def run(self, markings: np.ndarray, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Play up to `steps` steps, stopping early once all markings are dead.
+
+        :param markings: A marking or a batch of markings.
+        :param steps: The maximum number of steps.
+        :return: The final markings and the fired transitions, of shape (batch, places) and (batch, steps). Steps
+            after a marking died are NO_FIRING.
+        """
+        markings = np.atleast_2d(markings)
+        fired = np.full((len(markings), steps), NO_FIRING, dtype=np.intp)
+        for step in range(steps):
+            chosen = self.choose(self.enabled(markings))
+            if (chosen == NO_FIRING).all():
+                break
+            markings = self.fire(markings, chosen)
+            fired[:, step] = chosen
+            for listener in self._listeners:
+                listener(chosen, markings)
+        return markings, fired
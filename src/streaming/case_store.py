@@ -0,0 +1,257 @@
+from array import array
+from typing import Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+_NONE = -1
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+EvictionCallback = Callable[[int, int, str], None]
+
+
+class CaseStateStore:
+    """
+    Fixed-capacity store of per-case state in preallocated arrays.
+
+    Every open case occupies one slot. A slot holds the code of the case's last activity, its last timestamp and a
+    marking vector of marking_size token counts; slots are reused after their case is evicted or removed. Case ids,
+    which have to fit into 64 bits, are mapped to slots by an open-addressing hash table with linear probing in an
+    array as well, so all memory of the store is allocated up front and fixed by its capacity.
+
+    Slots are kept in a doubly linked list ordered by their last update. Updating a case moves it to the end, so the
+    least recently updated case is evicted when a new case needs a slot of a full store, and with a TTL the cases not
+    updated for longer than the TTL are expired from the front of the list. The TTL relies on the stream's timestamps
+    being nondecreasing; out-of-order timestamps only delay the expiry of their cases.
+    """
+
+    def __init__(self,
+                 capacity: int,
+                 marking_size: int = 0,
+                 ttl: Optional[float] = None,
+                 on_evict: Optional[EvictionCallback] = None):
+        """
+        Initialize the store.
+
+        :param capacity: The maximum number of open cases.
+        :param marking_size: The number of places of the marking vector per case, 0 for none.
+        :param ttl: The time after its last update at which a case expires, None for no expiry.
+        :param on_evict: Called with the case id, its slot and the reason, "lru", "ttl" or "removed", before the slot
+            of a case is released, so the callback can still read the case's state.
+        """
+        if capacity <= 0:
+            raise ValueError(f"The capacity has to be positive, got {capacity}")
+        if marking_size < 0:
+            raise ValueError(f"The marking size must not be negative, got {marking_size}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"The TTL has to be positive, got {ttl}")
+        self.capacity = capacity
+        self.marking_size = marking_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.evictions: Dict[str, int] = {"lru": 0, "ttl": 0, "removed": 0}
+
+        self._size = 0
+        # At most half full, so probe sequences stay short
+        self._bits = max(1, (2 * capacity - 1).bit_length())
+        self._table = array("i", [_NONE]) * (1 << self._bits)
+        self._table_mask = (1 << self._bits) - 1
+        self._case_ids = array("q", [_NONE]) * capacity
+        self._activities = array("i", [_NONE]) * capacity
+        self._timestamps = array("d", [0.0]) * capacity
+        self.markings = np.zeros((capacity, marking_size), dtype=np.int32)
+        # The linked list of the used slots from the least to the most recently updated one
+        self._previous = array("i", [_NONE]) * capacity
+        self._next = array("i", [_NONE]) * capacity
+        self._head = _NONE
+        self._tail = _NONE
+        # Slots never used are handed out in order, released ones are reused first
+        self._free = array("i")
+        self._unused = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, case_id: int) -> bool:
+        return self.slot_of(case_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        """
+        :return: The ids of the open cases, from the least to the most recently updated one.
+        """
+        slot = self._head
+        while slot != _NONE:
+            yield self._case_ids[slot]
+            slot = self._next[slot]
+
+    def slot_of(self, case_id: int) -> Optional[int]:
+        """
+        :return: The slot of an open case, None if the case is not stored.
+        """
+        table, case_ids, mask = self._table, self._case_ids, self._table_mask
+        position = (case_id * _MULTIPLIER & _MASK64) >> (64 - self._bits)
+        while True:
+            slot = table[position]
+            if slot == _NONE:
+                return None
+            if case_ids[slot] == case_id:
+                return slot
+            position = (position + 1) & mask
+
+    def _insert(self, case_id: int, slot: int) -> None:
+        table, mask = self._table, self._table_mask
+        position = (case_id * _MULTIPLIER & _MASK64) >> (64 - self._bits)
+        while table[position] != _NONE:
+            position = (position + 1) & mask
+        table[position] = slot
+
+    def _delete(self, case_id: int) -> None:
+        """
+        Remove a case from the hash table, shifting the following entries of its probe sequence back.
+        """
+        table, case_ids, mask, shift = self._table, self._case_ids, self._table_mask, 64 - self._bits
+        position = (case_id * _MULTIPLIER & _MASK64) >> shift
+        while case_ids[table[position]] != case_id:
+            position = (position + 1) & mask
+        following = position
+        while True:
+            following = (following + 1) & mask
+            slot = table[following]
+            if slot == _NONE:
+                break
+            home = (case_ids[slot] * _MULTIPLIER & _MASK64) >> shift
+            # The entry may move to the gap if its home is not cyclically within (gap, entry]
+            if (following - home) & mask >= (following - position) & mask:
+                table[position] = slot
+                position = following
+        table[position] = _NONE
+
+    def last_activity(self, slot: int) -> int:
+        """
+        :return: The code of the last activity of the case in the slot, -1 if none was recorded.
+        """
+        return self._activities[slot]
+
+    def last_timestamp(self, slot: int) -> float:
+        return self._timestamps[slot]
+
+    def case_id(self, slot: int) -> int:
+        return self._case_ids[slot]
+
+    def marking(self, slot: int) -> np.ndarray:
+        """
+        :return: The marking vector of the case in the slot, a writable view into the store.
+        """
+        return self.markings[slot]
+
+    def update(self, case_id: int, activity: int, timestamp: float) -> int:
+        """
+        Record an event of a case, opening the case if it is not stored. Cases expired by the TTL at this timestamp
+        are evicted first; if the store is still full, the least recently updated case makes room for a new one.
+
+        :param case_id: The case.
+        :param activity: The code of the event's activity.
+        :param timestamp: The timestamp of the event.
+        :return: The slot of the case. The marking of a new case is zero.
+        """
+        if self.ttl is not None and self._head != _NONE and self._timestamps[self._head] < timestamp - self.ttl:
+            self.expire(timestamp)
+        slot = self.slot_of(case_id)
+        if slot is None:
+            slot = self._open(case_id)
+        elif slot != self._tail:
+            self._unlink(slot)
+            self._append(slot)
+        self._activities[slot] = activity
+        self._timestamps[slot] = timestamp
+        return slot
+
+    def _open(self, case_id: int) -> int:
+        if self._free:
+            slot = self._free.pop()
+        elif self._unused < self.capacity:
+            slot = self._unused
+            self._unused += 1
+        else:
+            slot = self._head
+            self._release(slot, "lru")
+            self._free.pop()
+        self._case_ids[slot] = case_id
+        self._insert(case_id, slot)
+        self._size += 1
+        self._activities[slot] = _NONE
+        if self.marking_size:
+            self.markings[slot] = 0
+        self._append(slot)
+        return slot
+
+    def _append(self, slot: int) -> None:
+        self._previous[slot] = self._tail
+        self._next[slot] = _NONE
+        if self._tail == _NONE:
+            self._head = slot
+        else:
+            self._next[self._tail] = slot
+        self._tail = slot
+
+    def _unlink(self, slot: int) -> None:
+        previous, following = self._previous[slot], self._next[slot]
+        if previous == _NONE:
+            self._head = following
+        else:
+            self._next[previous] = following
+        if following == _NONE:
+            self._tail = previous
+        else:
+            self._previous[following] = previous
+
+    def _release(self, slot: int, reason: str) -> None:
+        case_id = self._case_ids[slot]
+        if self.on_evict is not None:
+            self.on_evict(case_id, slot, reason)
+        self._unlink(slot)
+        self._delete(case_id)
+        self._size -= 1
+        self._case_ids[slot] = _NONE
+        self._free.append(slot)
+        self.evictions[reason] += 1
+
+    def remove(self, case_id: int) -> bool:
+        """
+        Remove a finished case.
+
+        :return: Whether the case was stored.
+        """
+        slot = self.slot_of(case_id)
+        if slot is None:
+            return False
+        self._release(slot, "removed")
+        return True
+
+    def expire(self, now: float) -> int:
+        """
+        Evict the cases not updated for longer than the TTL before `now`.
+
+        :return: The number of evicted cases.
+        """
+        if self.ttl is None:
+            return 0
+        cutoff = now - self.ttl
+        expired = 0
+        while self._head != _NONE and self._timestamps[self._head] < cutoff:
+            self._release(self._head, "ttl")
+            expired += 1
+        return expired
+
+    @property
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        :return: The bytes used per part of the store, all allocated up front except the free list, which holds at
+            most one entry per slot.
+        """
+        fields = sum(fields.itemsize * len(fields)
+                     for fields in (self._case_ids, self._activities, self._timestamps, self._previous, self._next))
+        usage = {"fields": fields, "markings": self.markings.nbytes,
+                 "index": self._table.itemsize * len(self._table), "free_list": self._free.itemsize * len(self._free)}
+        usage["total"] = sum(usage.values())
+        return usage
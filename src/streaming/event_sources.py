@@ -0,0 +1,358 @@
+import asyncio
+import csv
+import math
+import os
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from src.cep.events import Event, Match
+
+DROP_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+EventConsumer = Callable[[Event], Union[None, Awaitable[None], Any]]
+
+_CLOSED = object()
+
+
+def parse_event(line: str) -> Event:
+    """
+    Parse one CSV line case_id,activity,timestamp, as written by `generate_log`. The case id is kept as a string.
+
+    :raises ValueError: If the line does not have three fields or the timestamp is not a number.
+    """
+    fields = next(csv.reader([line]))
+    if len(fields) != 3:
+        raise ValueError(f"Expected the fields case_id,activity,timestamp, got {line!r}")
+    return Event(fields[0], fields[1], float(fields[2]))
+
+
+class BoundedEventQueue:
+    """
+    Queue of at most maxsize events with a policy for a full queue:
+
+    - "block": `put` waits until the consumer took an event, so a slow consumer slows down the producer.
+    - "drop_newest": the new event is dropped.
+    - "drop_oldest": the oldest queued event is dropped to make room for the new one.
+
+    Dropped events are counted in `dropped`.
+    """
+
+    def __init__(self, maxsize: int = 1_000, policy: str = "block"):
+        """
+        Initialize the queue.
+
+        :param maxsize: The maximum number of queued events.
+        :param policy: The policy for a full queue, one of DROP_POLICIES.
+        """
+        if maxsize <= 0:
+            raise ValueError(f"The queue size has to be positive, got {maxsize}")
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {policy!r}, expected one of {DROP_POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._closed = False
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, event: Event) -> bool:
+        """
+        :return: Whether the event was queued.
+        """
+        if self._closed:
+            raise ValueError("Cannot put events into a closed queue")
+        queue = self._queue
+        if not queue.full():
+            queue.put_nowait(event)
+            return True
+        if self.policy == "block":
+            await queue.put(event)
+            return True
+        self.dropped += 1
+        if self.policy == "drop_newest":
+            queued = False
+        else:
+            queue.get_nowait()
+            queue.put_nowait(event)
+            queued = True
+        # Give the consumer a turn, so a source that never waits does not starve it
+        await asyncio.sleep(0)
+        return queued
+
+    async def close(self) -> None:
+        """
+        Mark the end of the stream once the queued events are taken; the marker itself never drops events.
+        """
+        if not self._closed:
+            self._closed = True
+            await self._queue.put(_CLOSED)
+
+    def __aiter__(self) -> AsyncIterator[Event]:
+        return self._events()
+
+    async def _events(self) -> AsyncIterator[Event]:
+        queue = self._queue
+        while True:
+            event = await queue.get()
+            if event is _CLOSED:
+                return
+            yield event
+
+
+class _Subscription:
+    def __init__(self, name: str, consumer: EventConsumer, queue: BoundedEventQueue):
+        self.name = name
+        self.consumer = consumer
+        self.queue = queue
+        self.delivered = 0
+        self.task: Optional[asyncio.Task] = None
+
+    async def drain(self) -> None:
+        consumer = self.consumer
+        async for event in self.queue:
+            result = consumer(event)
+            if asyncio.iscoroutine(result):
+                await result
+            self.delivered += 1
+
+
+class EventHub:
+    """
+    Fans the events of one source out to several consumers, each behind its own bounded queue.
+
+    A consumer is called with every event and may be a plain function or a coroutine function. With the "block"
+    policy the hub only reads the next event from the source once every blocking queue has room, so the slowest such
+    consumer sets the pace and memory stays bounded by the queue sizes. Consumers with a drop policy never hold the
+    source back and lose events instead when they fall behind.
+    """
+
+    def __init__(self, maxsize: int = 1_000, policy: str = "block"):
+        """
+        Initialize the hub.
+
+        :param maxsize: The default queue size of the consumers.
+        :param policy: The default drop policy of the consumers, one of DROP_POLICIES.
+        """
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {policy!r}, expected one of {DROP_POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.event_count = 0
+        self._subscriptions: List[_Subscription] = []
+
+    def subscribe(self,
+                  consumer: EventConsumer,
+                  name: Optional[str] = None,
+                  maxsize: Optional[int] = None,
+                  policy: Optional[str] = None) -> str:
+        """
+        Add a consumer. Consumers have to be added before `run`.
+
+        :param consumer: Called with every event.
+        :param name: The name of the consumer in the statistics, its position by default.
+        :param maxsize: The size of its queue, the hub's default if not given.
+        :param policy: The drop policy of its queue, the hub's default if not given.
+        :return: The name of the consumer.
+        """
+        name = str(len(self._subscriptions)) if name is None else name
+        if any(subscription.name == name for subscription in self._subscriptions):
+            raise ValueError(f"A consumer named {name!r} is already subscribed")
+        queue = BoundedEventQueue(self.maxsize if maxsize is None else maxsize,
+                                  self.policy if policy is None else policy)
+        self._subscriptions.append(_Subscription(name, consumer, queue))
+        return name
+
+    @property
+    def statistics(self) -> Dict[str, Dict[str, int]]:
+        """
+        :return: Per consumer the number of delivered, dropped and queued events.
+        """
+        return {subscription.name: {"delivered": subscription.delivered, "dropped": subscription.queue.dropped,
+                                    "queued": len(subscription.queue)}
+                for subscription in self._subscriptions}
+
+    async def run(self, source: AsyncIterable[Event]) -> Dict[str, Dict[str, int]]:
+        """
+        Pass every event of the source to all consumers until the source ends, then wait until the consumers took
+        all queued events. If a consumer raises, the other consumers are cancelled and the error is raised.
+
+        :param source: The events.
+        :return: The statistics, see `statistics`.
+        """
+        subscriptions = self._subscriptions
+        for subscription in subscriptions:
+            subscription.task = asyncio.create_task(subscription.drain())
+        try:
+            async for event in source:
+                for subscription in subscriptions:
+                    queue = subscription.queue
+                    if len(queue) < queue.maxsize or queue.policy != "block":
+                        await queue.put(event)
+                    else:
+                        await self._put_waiting(subscription, event)
+                self.event_count += 1
+            for subscription in subscriptions:
+                await self._put_waiting(subscription, None)
+            await asyncio.gather(*(subscription.task for subscription in subscriptions))
+        finally:
+            for subscription in subscriptions:
+                subscription.task.cancel()
+        return self.statistics
+
+    @staticmethod
+    async def _put_waiting(subscription: _Subscription, event: Optional[Event]) -> None:
+        """
+        Wait for room in a consumer's queue, raising the consumer's error if it fails meanwhile instead of waiting
+        forever. Closes the queue if the event is None.
+        """
+        put = asyncio.ensure_future(subscription.queue.put(event) if event is not None
+                                    else subscription.queue.close())
+        await asyncio.wait((put, subscription.task), return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            subscription.task.result()
+            raise RuntimeError(f"The consumer {subscription.name!r} stopped before the end of the stream")
+        put.result()
+
+
+async def tail_log(path: str,
+                   poll_interval: float = 0.1,
+                   from_start: bool = True,
+                   stop: Optional[asyncio.Event] = None) -> AsyncIterator[Event]:
+    """
+    Follow a CSV log that another process appends to, like `tail -f`. A header line case_id,activity,timestamp is
+    skipped, and a line is only parsed once it is terminated, so half-written lines are not lost.
+
+    :param path: The log file.
+    :param poll_interval: The seconds to wait for new lines at the end of the file.
+    :param from_start: Whether to read the lines already in the file, or only the ones appended later.
+    :param stop: Ends the iteration at the end of the file once set; the log is followed forever without one.
+    :return: An iterator over the events.
+    """
+    with open(path, "r", newline="") as file:
+        if not from_start:
+            file.seek(0, os.SEEK_END)
+        partial = ""
+        while True:
+            line = file.readline()
+            if not line:
+                if stop is not None and stop.is_set():
+                    return
+                await asyncio.sleep(poll_interval)
+                continue
+            line = partial + line
+            if not line.endswith("\n"):
+                partial = line
+                continue
+            partial = ""
+            line = line.rstrip("\r\n")
+            if line and not line.startswith("case_id,"):
+                yield parse_event(line)
+
+
+async def socket_events(host: str, port: int) -> AsyncIterator[Event]:
+    """
+    Read events as CSV lines from a TCP connection until the server closes it.
+
+    :param host: The host of the event server.
+    :param port: Its port.
+    :return: An iterator over the events.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        async for line in reader:
+            line = line.decode().rstrip("\r\n")
+            if line:
+                yield parse_event(line)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def serve_events(events: Iterable[Event], host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+    """
+    Start a local stand-in for an event server, which sends the events as CSV lines to every client and then closes
+    the connection. Writes wait for the client's reads, so a slow client slows down the server and not its memory.
+
+    :param events: The events sent to every client.
+    :param host: The host to listen on.
+    :param port: The port to listen on, 0 for a free one; `server.sockets[0].getsockname()[1]` returns it.
+    :return: The started server, to be closed by the caller.
+    """
+    events = list(events)
+
+    async def send(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            for case_id, activity, timestamp in events:
+                writer.write(f"{case_id},{activity},{timestamp!r}\n".encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(send, host, port)
+
+
+async def replay(events: Iterable[Event], speedup: float = 1.0) -> AsyncIterator[Event]:
+    """
+    Emit recorded events at the pace of their timestamps.
+
+    :param events: The events, ordered by timestamp.
+    :param speedup: The factor by which the replay is faster than the recording, math.inf for no waiting.
+    :return: An iterator over the events.
+    """
+    if speedup <= 0:
+        raise ValueError(f"The speed-up has to be positive, got {speedup}")
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first: Optional[float] = None
+    for event in events:
+        if first is None:
+            first = event.timestamp
+        if speedup != math.inf:
+            delay = started + (event.timestamp - first) / speedup - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield event
+
+
+def _feather_events(path: str) -> Iterable[Event]:
+    try:
+        import pyarrow.ipc
+    except ImportError as error:
+        raise ImportError("Replaying Feather logs needs pyarrow, install it or replay a CSV log") from error
+    with pyarrow.ipc.open_file(path) as reader:
+        for batch in range(reader.num_record_batches):
+            columns = reader.get_batch(batch).to_pydict()
+            for event in zip(columns["case_id"], columns["activity"], columns["timestamp"]):
+                yield Event(*event)
+
+
+async def replay_feather(path: str, speedup: float = 1.0) -> AsyncIterator[Event]:
+    """
+    Replay a Feather log with the columns case_id, activity and timestamp, as written by `generate_log`. Needs
+    pyarrow.
+
+    :param path: The log file.
+    :param speedup: See `replay`.
+    :return: An iterator over the events.
+    """
+    async for event in replay(_feather_events(path), speedup):
+        yield event
+
+
+def matcher_consumer(matcher: Any, on_match: Callable[[Match], None]) -> EventConsumer:
+    """
+    :param matcher: A `PatternMatcher`, `PatternNetwork` or anything else with process(case_id, activity, timestamp).
+    :param on_match: Called with every match the matcher reports.
+    :return: A consumer feeding the matcher.
+    """
+    process = matcher.process
+
+    def consume(event: Event) -> None:
+        for match in process(*event):
+            on_match(match)
+
+    return consume
@@ -2,19 +2,25 @@ import datetime
 import faulthandler
 import sys
 import time
-from typing import Optional
+from concurrent.futures import Future
+from typing import Optional, Tuple
 
 import pm4py
-from PyQt5.QtCore import QSize, QPoint, Qt, QSettings, QFile, QTextStream, pyqtSlot
+from PyQt5.QtCore import QSize, QPoint, Qt, QSettings, QFile, QTextStream, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QApplication, QMainWindow, QSplitter, QVBoxLayout, QTableWidget, QTableWidgetItem, QWidget, \
-    QHeaderView, QTabWidget, QAction, QFileDialog, QMessageBox
+    QHeaderView, QTabWidget, QAction, QFileDialog, QMessageBox, QLabel
 from graphviz import Digraph
-from src.parsers.parse_petri_net import identify_patterns
+from src.cep.events import Event
+from src.parsers.parse_petri_net import identify_patterns_cached
+from src.parsers.pnml_reader import read_pnml
 from src.ui.ui_generic_elements import TransitionGraphicsItem
 from src.ui.ui_petri_net_view import PetriNetEditorView
 from src.utils.color_iterator import ColorIterator
-from src.utils.petri_net_renderer import render_petri_net
+from src.utils.disk_cache import DiskLRUCache
+from src.utils.layered_layout import layout_petri_net_layered
+from src.utils.layout_jobs import LayoutCancelled, LayoutExecutor, LayoutJob
+from src.utils.petri_net_renderer import layout_petri_net_cached, render_petri_net
 from tests.parse_petri_net_test_file import online_order_petri_net
 
 
@@ -23,11 +29,20 @@ class CoolTransition(pm4py.PetriNet.Transition):
         super().__init__(name)
 
 
-def load_and_parse_petri_net() -> Digraph:
-    net = online_order_petri_net()
-    # net, im, fm = pm4py.read_pnml("model2012.pnml")
+layout_executor = LayoutExecutor()
+# The ways to lay out a net: graphviz, or the built-in layered layout that needs no external executable
+LAYOUT_ENGINES = ("graphviz", "layered")
 
-    seq, and_p, or_p = identify_patterns(net.places, net.transitions, net.arcs)
+
+def color_seq_patterns(net: pm4py.PetriNet, cache: DiskLRUCache) -> None:
+    """
+    Give the elements of every SEQ pattern of a net a color of their own. Patterns of a net seen before are read from
+    the cache.
+
+    :param net: The net, whose elements get a "color" property.
+    :param cache: The cache of detected patterns.
+    """
+    seq, and_p, or_p = identify_patterns_cached(net, cache)
 
     color_iterator = ColorIterator()
 
@@ -36,14 +51,39 @@ def load_and_parse_petri_net() -> Digraph:
         for elem in pattern:
             elem.properties["color"] = col
 
-    return render_petri_net(net, False)
+
+def analyze_petri_net(net: pm4py.PetriNet, cache: DiskLRUCache, job: Optional[LayoutJob] = None,
+                      layout_engine: str = "graphviz") -> Tuple[Optional[Digraph], dict]:
+    """
+    Render a net and lay it out. The graphviz layout of a net laid out before is read from the cache.
+
+    :param net: The net.
+    :param cache: The cache of layouts.
+    :param job: The background job running the analysis, checked for cancellation before the layout.
+    :param layout_engine: One of `LAYOUT_ENGINES`. The layered layout is computed directly from the net, without
+        rendering it.
+    :return: The rendered graph, None for the layered layout, and the layout in graphviz JSON form.
+    :raises ValueError: If the layout engine is unknown.
+    """
+    if layout_engine not in LAYOUT_ENGINES:
+        raise ValueError(f"Unknown layout engine {layout_engine!r}, expected one of {LAYOUT_ENGINES}")
+    if layout_engine == "layered":
+        return None, layout_petri_net_layered(net, job)
+    dot = render_petri_net(net, False)
+    if job is not None:
+        job.check()
+    return dot, layout_petri_net_cached(dot, cache, job)
 
 
 class TerminalView(QWidget):
+    # Emit an Event to show it as a row, also from a thread running an EventHub: the row is added in the UI thread
+    on_event = pyqtSignal(object)
+
     def __init__(self, columns: list[str]) -> None:
         super().__init__()
         self.columns = columns
         self.init_ui()
+        self.on_event.connect(self.add_event)
 
     def init_ui(self) -> None:
         self.layout = QVBoxLayout()
@@ -80,33 +120,107 @@ class TerminalView(QWidget):
 
         self.table.scrollToBottom()
 
+    @pyqtSlot(object)
+    def add_event(self, event: Event) -> None:
+        self.add_row([str(datetime.datetime.fromtimestamp(event.timestamp)), str(event.case_id), event.activity])
+
 
-def open_and_parse_file(file_name: str) -> Optional[Digraph]:
+def read_petri_net_file(file_name: str) -> Optional[pm4py.PetriNet]:
+    """
+    Read a PNML file with the streaming reader. The editor renders and lays out pm4py objects, so the whole net is
+    converted with `PnmlGraph.to_petri_net`; that conversion takes about as long as `pm4py.read_pnml`, and only the
+    peak memory of loading is lower.
+
+    :param file_name: The file.
+    :return: The net, None if the file is not a PNML file.
+    """
     if file_name.endswith(".pnml"):
-        net, im, fm = pm4py.read_pnml(file_name)
-        return render_petri_net(net, False)
+        net, im, fm = read_pnml(file_name).to_petri_net()
+        return net
+
+
+def open_petri_net(file_name: Optional[str], cache: DiskLRUCache, job: Optional[LayoutJob] = None,
+                   layout_engine: str = "graphviz") -> Tuple[Optional[Digraph], dict]:
+    """
+    Read a net and analyze it, see `analyze_petri_net`. Runs as layout job, so parsing a large file does not block the
+    UI thread. The SEQ patterns of the example net are colored.
+
+    :param file_name: The file of the net, None for the example net.
+    :param cache: The cache of patterns and layouts.
+    :param job: The background job running the analysis, checked for cancellation after reading the file.
+    :param layout_engine: One of `LAYOUT_ENGINES`.
+    :return: The rendered graph, None for the layered layout, and the layout in graphviz JSON form.
+    :raises ValueError: If the file is not a PNML file.
+    """
+    if file_name is None:
+        net = online_order_petri_net()
+        color_seq_patterns(net, cache)
+    else:
+        net = read_petri_net_file(file_name)
+        if net is None:
+            raise ValueError("Failed to parse Petri net file.")
+    if job is not None:
+        job.check()
+    return analyze_petri_net(net, cache, job, layout_engine)
 
 
 class PetriNetTab(QWidget):
-    def __init__(self, current: int) -> None:
+    # Emitted from the layout worker with the finished future, so the scene is built in the UI thread
+    on_layout_finished = pyqtSignal(object)
+
+    def __init__(self, current: int, cache: DiskLRUCache, layout_engine: str = "graphviz") -> None:
+        """
+        :param current: The number of tabs open before; the first tab shows the example net, later ones ask for a file.
+        :param cache: The cache of patterns and layouts.
+        :param layout_engine: How to lay out the net, one of `LAYOUT_ENGINES`.
+        """
         super().__init__()
+        self.main_layout = QVBoxLayout(self)
+        self.setLayout(self.main_layout)
 
-        if current == 0:
-            self.init_editor(load_and_parse_petri_net())
-        else:
+        file_name: Optional[str] = None
+        if current != 0:
             file_name, _ = QFileDialog.getOpenFileName(self, "Open Petri Net File", "",
                                                        "Petri Net Files (*.pnml *.xml);;All Files (*)")
             if not file_name:
                 raise FileNotFoundError("No file selected. Please select a valid Petri net file.")
 
-            dot: Optional[Digraph] = open_and_parse_file(file_name)
-            if dot is None:
-                raise ValueError("Failed to parse Petri net file.")
-            self.init_editor(dot)
-
-    def init_editor(self, dot: Digraph) -> None:
-        time.sleep(3)
-        self.graph_view = PetriNetEditorView(dot)
+        self.placeholder = QLabel("Loading the Petri net...")
+        self.placeholder.setAlignment(Qt.AlignCenter)
+        self.main_layout.addWidget(self.placeholder)
+
+        self.on_layout_finished.connect(self._on_layout_finished)
+        self.layout_job: Optional[LayoutJob] = layout_executor.submit(open_petri_net, file_name, cache,
+                                                                      layout_engine=layout_engine)
+        job = self.layout_job
+        job.future.add_done_callback(lambda future: None if job.cancelled else self.on_layout_finished.emit(future))
+
+    @pyqtSlot(object)
+    def _on_layout_finished(self, future: Future) -> None:
+        if future.cancelled() or self.layout_job is None or self.layout_job.future is not future:
+            return
+        self.layout_job = None
+        try:
+            dot, layout = future.result()
+        except LayoutCancelled:
+            return
+        except Exception as error:
+            self.placeholder.setText(f"Failed to load the Petri net: {error}")
+            return
+        self.init_editor(dot, layout)
+
+    def close_tab(self) -> None:
+        """
+        Cancel the layout if it is still running.
+        """
+        if self.layout_job is not None:
+            self.layout_job.cancel()
+            self.layout_job = None
+
+    def init_editor(self, dot: Optional[Digraph], layout: Optional[dict] = None) -> None:
+        self.main_layout.removeWidget(self.placeholder)
+        self.placeholder.deleteLater()
+        self.graph_view = PetriNetEditorView(dot, layout)
         self.terminal_view = TerminalView(['Timestamp', 'CaseID', 'Activity'])
 
         self.splitter = QSplitter(Qt.Vertical)
@@ -114,16 +228,14 @@ class PetriNetTab(QWidget):
         self.splitter.addWidget(self.terminal_view)
         self.splitter.setSizes([1080, 360])
 
-        layout = QVBoxLayout(self)
-        layout.addWidget(self.splitter)
-        self.setLayout(layout)
+        self.main_layout.addWidget(self.splitter)
 
         self.graph_view.scene.on_transition_fired.connect(self.on_transition_fired)
 
     @pyqtSlot(TransitionGraphicsItem)
     def on_transition_fired(self, transition: TransitionGraphicsItem) -> None:
         activity: str = transition.text_item.toPlainText() if transition.text_item else "No Activity"
-        self.terminal_view.add_row([str(datetime.datetime.now()), "sfefwef", activity])
+        self.terminal_view.add_event(Event(self.graph_view.case_id, activity, time.time()))
 
 
 class MainWindow(QMainWindow):
@@ -133,8 +245,12 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 1920, 1080)
 
         self.tabs = QTabWidget()
+        self.tabs.setTabsClosable(True)
+        self.tabs.tabCloseRequested.connect(self.close_tab)
         self.setCentralWidget(self.tabs)
         self.settings = QSettings('petri_net_editor', 'pn_editor')
+        # Created with the window rather than on import, so importing the module does not touch the cache directory
+        self.analysis_cache = DiskLRUCache()
 
         self.resize(self.settings.value("size", QSize(1920, 1080)))
         self.move(self.settings.value("pos", QPoint(100, 100)))
@@ -149,14 +265,28 @@ class MainWindow(QMainWindow):
 
         new_tab_action = QAction('New Tab', self)
         new_tab_action.setShortcut('Ctrl+T')
-        new_tab_action.triggered.connect(self.add_tab)
+        new_tab_action.triggered.connect(lambda: self.add_tab())
         file_menu.addAction(new_tab_action)
 
-    def add_tab(self) -> None:
-        new_tab = PetriNetTab(self.tabs.count())
+        new_layered_tab_action = QAction('New Tab (Built-in Layout)', self)
+        new_layered_tab_action.setShortcut('Ctrl+Shift+T')
+        new_layered_tab_action.triggered.connect(lambda: self.add_tab("layered"))
+        file_menu.addAction(new_layered_tab_action)
+
+    def add_tab(self, layout_engine: str = "graphviz") -> None:
+        new_tab = PetriNetTab(self.tabs.count(), self.analysis_cache, layout_engine)
         self.tabs.addTab(new_tab, f"Tab {self.tabs.count() + 1}")
 
+    def close_tab(self, index: int) -> None:
+        tab: PetriNetTab = self.tabs.widget(index)
+        tab.close_tab()
+        self.tabs.removeTab(index)
+        tab.deleteLater()
+
     def closeEvent(self, e) -> None:
+        for index in range(self.tabs.count()):
+            self.tabs.widget(index).close_tab()
+        layout_executor.shutdown()
         self.settings.setValue("size", self.size())
         self.settings.setValue("pos", self.pos())
         e.accept()
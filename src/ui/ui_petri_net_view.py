@@ -1,20 +1,35 @@
-import json
-import random
+import itertools
 import time
 import typing
-from typing import Tuple, List, Any
+from typing import Tuple, List, Any, Optional, Callable, Dict, Hashable
 
 from PyQt5.QtCore import pyqtSignal, QTimer, Qt
 from PyQt5.QtGui import QPainter
 from PyQt5.QtWidgets import QGraphicsView, QGraphicsScene, QPushButton, QVBoxLayout, QWidget
 from graphviz import Digraph
+import numpy as np
 from pm4py import PetriNet, Marking
 from pm4py.objects.petri_net.utils import petri_utils
 
+from src.simulation.token_game import NO_FIRING, TokenGame
 from src.ui.ui_functions import create_connection
 from src.ui.ui_generic_elements import CustomQGraphicsItem, CustomLineItem, PlaceGraphicsItem, \
-    TransitionGraphicsItem, get_post_area, get_marked_places, extr_e, create_styled_button, LINE_ANIMATION_DURATION
-from src.utils.petri_net_renderer import render_petri_net
+    TransitionGraphicsItem, create_styled_button, LINE_ANIMATION_DURATION
+from src.utils.layered_layout import POINTS_PER_INCH, layout_petri_net_incremental
+from src.utils.petri_net_renderer import layout_petri_net, render_petri_net
+
+# Where an element added through a direction button is wanted, in inches from the element it was added to
+NEW_ELEMENT_OFFSETS = {"right": (2.0, 0.0), "left": (-2.0, 0.0), "top": (0.0, -1.5), "bottom": (0.0, 1.5)}
+
+
+def _new_name(prefix: str, names: typing.Set[str]) -> str:
+    """
+    :return: The first of prefix1, prefix2, ... that is not in names.
+    """
+    number = 1
+    while f"{prefix}{number}" in names:
+        number += 1
+    return f"{prefix}{number}"
 
 
 class CustomScene(QGraphicsScene):
@@ -29,7 +44,11 @@ class CustomScene(QGraphicsScene):
 
 class PetriNetEditorView(QGraphicsView):
 
-    def __init__(self, graph: Digraph = None):
+    def __init__(self, graph: Digraph = None, layout: Optional[dict] = None):
+        """
+        :param graph: The graph to show.
+        :param layout: The graphviz JSON layout of the graph, computed from the graph if not given.
+        """
         super().__init__()
         self.setRenderHint(QPainter.Antialiasing)
         self.setDragMode(QGraphicsView.ScrollHandDrag)
@@ -38,6 +57,10 @@ class PetriNetEditorView(QGraphicsView):
         self.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
         self.setStyleSheet("background-color: lightgrey; border-radius: 25px;")
         self.animation_timer: QTimer = None
+        self.token_game: Optional[TokenGame] = None
+        self._simulated_places: List[PlaceGraphicsItem] = []
+        # The case of the fired transitions; a new one begins after the simulation finished
+        self.case_id = 1
 
         self.scene = CustomScene(self)
         self.element_cache: List[Tuple[str, CustomQGraphicsItem]] = []
@@ -58,8 +81,19 @@ class PetriNetEditorView(QGraphicsView):
         else:
             dot = Digraph(comment='')
 
-        json_string = dot.pipe('json').decode()
-        json_dict = json.loads(json_string)
+        # Keys of the shown elements by name, when they are identified by something else, see `update_net`
+        self._element_keys: Dict[str, Hashable] = {}
+        self._show_layout(layout if layout is not None else layout_petri_net(dot))
+
+    def _show_layout(self, json_dict: dict) -> None:
+        """
+        Replace the shown elements and connections by those of a layout.
+        """
+        if self.line_cache:
+            self.scene.on_element_moved.disconnect()
+        self.scene.clear()
+        self.element_cache = []
+        self.line_cache = []
 
         for element in json_dict.get("objects", []):
             if element.get("_draw_", None) is not None:
@@ -78,25 +112,73 @@ class PetriNetEditorView(QGraphicsView):
             l: CustomLineItem = create_connection(head_element[1], tail_element[1], scene=self.scene)
             self.line_cache.append(l)
 
+    def element_positions(self) -> Dict[str, Tuple[float, float]]:
+        """
+        :return: Per element name, where the element is shown now, in the coordinates of the layout it was placed by.
+        """
+        positions = {}
+        for name, item in self.element_cache:
+            x, y = map(float, item.attributes["pos"].split(","))
+            positions[name] = (x + item.pos().x(), y + item.pos().y())
+        return positions
+
+    def update_net(self, net: PetriNet, key: Optional[Callable[[Any], Hashable]] = None) -> None:
+        """
+        Show a new version of the net, e.g. from online discovery. The elements still in it stay where they are shown
+        now and only the new ones are placed, see `layout_petri_net_incremental`.
+
+        :param net: The new version of the net.
+        :param key: Identifies the elements across versions of the net, e.g. `structural_key` for discovered nets
+            whose elements are named anew every time. By default, by name.
+        """
+        positions = {self._element_keys.get(name, name): position
+                     for name, position in self.element_positions().items()}
+        self._show_layout(layout_petri_net_incremental(net, positions, key=key))
+        self._element_keys = {} if key is None else \
+            {element.name: key(element) for element in itertools.chain(net.places, net.transitions)}
+        self.token_game = None
+
     def on_new_element_requested_event(self,
                                        element: tuple[
                                            CustomQGraphicsItem,
                                            typing.Literal["top", "bottom", "right", "left"]]
                                        ):
+        """
+        Add an element of the other kind next to an element, connected to it by an arc that leaves it to the right and
+        bottom and enters it from the left and top. Only the new element is placed; the others stay where they are.
+        """
         q_cf_element: CustomQGraphicsItem = element[0]
 
         direction: str = element[1]
-        attributes: dict = {}
+        net, _, _ = self.to_pm4py_petri_net()
+        name = next(name for name, item in self.element_cache if item is q_cf_element)
+        names = {name for name, _ in self.element_cache}
+        existing = next(existing for existing in itertools.chain(net.places, net.transitions) if existing.name == name)
 
+        new_element: typing.Union[PetriNet.Place, PetriNet.Transition]
         if isinstance(q_cf_element, PlaceGraphicsItem):
-            node_item = PlaceGraphicsItem(attributes)
-            self.scene.addItem(node_item)
+            new_name = _new_name("t", names)
+            new_element = PetriNet.Transition(new_name, new_name)
+            net.transitions.add(new_element)
         elif isinstance(q_cf_element, TransitionGraphicsItem):
-            node_item = TransitionGraphicsItem(attributes)
-            self.scene.addItem(node_item)
+            new_element = PetriNet.Place(_new_name("p", names))
+            net.places.add(new_element)
         else:
             raise ValueError("Wrong process item instance")
-
+        source, target = (existing, new_element) if direction in ("right", "bottom") else (new_element, existing)
+        petri_utils.add_arc_from_to(source, target, net)
+
+        positions = self.element_positions()
+        x, y = positions[name]
+        offset_x, offset_y = NEW_ELEMENT_OFFSETS[direction]
+        layout = layout_petri_net_incremental(net, positions, hints={
+            new_element.name: (x + offset_x * POINTS_PER_INCH, y + offset_y * POINTS_PER_INCH)})
+        attributes = next(attributes for attributes in layout["objects"] if attributes["name"] == new_element.name)
+        self._parse_dot_output(attributes)
+        items = dict(self.element_cache)
+        self.line_cache.append(create_connection(items[target.name], items[source.name], scene=self.scene))
+        # The structure changed, the simulation is rebuilt on the next step
+        self.token_game = None
 
     def _on_full_animation(self):
         def on_interval():
@@ -110,31 +192,39 @@ class PetriNetEditorView(QGraphicsView):
 
         self._on_next_simulation_step()
 
-    def _on_next_simulation_step(self) -> bool:
-        if any([line.ANIMATION_FLAG for line in self.line_cache]):
-            return None
-
-        marked_places: List[PlaceGraphicsItem] = get_marked_places(extr_e(self.element_cache))
-
-        can_finish: List[bool] = []
+    def _init_token_game(self) -> TokenGame:
+        """
+        Build the headless simulation of the shown net and animate the transitions it fires.
+        """
+        net, _, _ = self.to_pm4py_petri_net()
+        token_game = TokenGame.from_net(net)
+        items = dict(self.element_cache)
+        places = [items[place.name] for place in token_game.places]
+        transitions = [items[transition.name] for transition in token_game.transitions]
 
-        for curr_p in marked_places:
-            post_tr: List[TransitionGraphicsItem] = get_post_area(curr_p, self.line_cache)
+        def on_fired(fired: np.ndarray, _: np.ndarray) -> None:
+            if fired[0] != NO_FIRING:
+                transitions[fired[0]].fire(self.line_cache)
 
-            active_tr: List[TransitionGraphicsItem] = [tr for tr in post_tr if tr.can_fire(self.line_cache)]
+        token_game.subscribe(on_fired)
+        self._simulated_places = places
+        return token_game
 
-            if len(active_tr) > 0:
-                winning_tr: TransitionGraphicsItem = random.choice(active_tr)
-                winning_tr.fire(self.line_cache)
-                can_finish.append(False)
-            else:
-                can_finish.append(True)
+    def _on_next_simulation_step(self) -> bool:
+        if any([line.ANIMATION_FLAG for line in self.line_cache]):
+            return None
+        if self.token_game is None:
+            self.token_game = self._init_token_game()
 
-        if all(can_finish):
+        # Tokens can be added and removed in the view, so the marking is read from it on every step
+        marking = np.fromiter((len(place.markings) for place in self._simulated_places), dtype=np.int32,
+                              count=len(self._simulated_places))
+        if not self.token_game.enabled(marking).any():
             print("Simulation finished")
+            self.case_id += 1
             return False
-        else:
-            return True
+        self.token_game.step(marking)
+        return True
 
     def _on_timer(self):
         for element in self.element_cache:
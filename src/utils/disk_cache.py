@@ -0,0 +1,127 @@
+from hashlib import blake2b
+from typing import Any, Optional
+import os
+import pickle
+import tempfile
+
+_SUFFIX = ".pickle"
+
+
+def default_cache_directory() -> str:
+    """
+    :return: The directory for the editor's caches, below $XDG_CACHE_HOME or ~/.cache.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "petri_net_editor")
+
+
+class DiskLRUCache:
+    """
+    Size-bounded cache of picklable values in a directory, evicting the least recently used entries.
+
+    Every entry is one file named by a hash of its key. Reading an entry updates the modification time of its file,
+    which orders the eviction, so processes using the same directory share the cache and its recency. Files are
+    replaced atomically, and unreadable entries count as misses and are removed.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        """
+        :param directory: The directory of the entries, created if missing. `default_cache_directory()` by default.
+        :param max_bytes: The maximum total size of the entries.
+        """
+        if max_bytes <= 0:
+            raise ValueError(f"The cache size has to be positive, got {max_bytes}")
+        self.directory = default_cache_directory() if directory is None else directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, blake2b(key.encode(), digest_size=20).hexdigest() + _SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        :return: The cached value, or None if the key is not cached.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                stored_key, value = pickle.load(file)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, EOFError, ValueError, TypeError, AttributeError, ImportError, pickle.UnpicklingError):
+            self._remove(path)
+            self.misses += 1
+            return None
+        if stored_key != key:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a value, then evict the least recently used entries until the cache fits its size again.
+        """
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump((key, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            self._remove(temporary)
+            raise
+        self._evict()
+
+    def _entries(self):
+        """
+        :return: (modification time, size, path) of every entry.
+        """
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            self._remove(path)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        """
+        :return: The total size of the entries in bytes.
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def __len__(self) -> int:
+        return len(self._entries())
@@ -0,0 +1,707 @@
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+import itertools
+
+import numpy as np
+from pm4py import PetriNet
+
+from src.petri_nets.graph_index import _gc_paused
+from src.utils.layout_jobs import LayoutJob
+from src.utils.petri_net_renderer import wrap_label
+
+# Graphviz coordinates are in points, 72 to the inch
+POINTS_PER_INCH = 72.0
+FONT_SIZE = 14.0
+# Weights pulling the two ends of an edge segment level, highest between dummies so long edges run straight
+SEGMENT_WEIGHTS = (1.0, 2.0, 8.0)
+
+Element = Union[PetriNet.Place, PetriNet.Transition]
+
+
+class LayeredLayout(NamedTuple):
+    """
+    Layered drawing of a directed graph, see `layered_layout`. Nodes from the real node count on are dummies, one per
+    layer an edge passes through.
+    """
+    # Per node, its layer and its position within the layer
+    layers: np.ndarray
+    positions: np.ndarray
+    # Per node, its coordinates in points: x grows with the layer, y with the position
+    x: np.ndarray
+    y: np.ndarray
+    # Per edge, whether it was reversed to break a cycle
+    reversed_edges: np.ndarray
+    # Per edge, the nodes it runs through from its source to its target, in compressed sparse row form
+    path_indptr: np.ndarray
+    path_nodes: np.ndarray
+
+    def edge_path(self, edge: int) -> np.ndarray:
+        return self.path_nodes[self.path_indptr[edge]:self.path_indptr[edge + 1]]
+
+    def segments(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: The sources and targets of the edge segments between neighbouring layers, oriented from the lower
+            layer to the higher one. Self-loops have no segments.
+        """
+        ends = self.path_indptr[1:-1] - 1
+        keep = np.ones(max(len(self.path_nodes) - 1, 0), dtype=bool)
+        keep[ends] = False
+        keep &= self.path_nodes[:-1] != self.path_nodes[1:]
+        sources, targets = self.path_nodes[:-1][keep], self.path_nodes[1:][keep]
+        flip = self.layers[sources] > self.layers[targets]
+        return np.where(flip, targets, sources), np.where(flip, sources, targets)
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    :return: The concatenated ranges `starts[i]:starts[i] + counts[i]`.
+    """
+    total = int(counts.sum())
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(total)
+
+
+def _back_edges(node_count: int, sources: np.ndarray, targets: np.ndarray) -> Tuple[
+    np.ndarray, np.ndarray, List[int]
+]:
+    """
+    Find a set of edges whose reversal makes the graph acyclic with an iterative depth-first search, started from the
+    nodes without predecessors first.
+
+    :return: Per edge, whether it leads back to a node on the search path, per node, when it was discovered, and the
+        nodes in the order the search finished them. Every edge that is not a back edge leads from a node finished
+        later to one finished earlier, and every back edge the other way, so with the back edges reversed the
+        reversed finishing order is topological.
+    """
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=node_count), out=indptr[1:])
+    has_predecessor = np.bincount(targets, minlength=node_count) > 0
+    roots = np.concatenate((np.flatnonzero(~has_predecessor), np.flatnonzero(has_predecessor))).tolist()
+
+    edge_ids, edge_targets = order.tolist(), targets[order].tolist()
+    ends = indptr[1:].tolist()
+    next_arc = indptr[:-1].tolist()
+    state = bytearray(node_count)
+    discovered = np.empty(node_count, dtype=np.int64)
+    discovery = []
+    finished = []
+    back = []
+    for root in roots:
+        if state[root]:
+            continue
+        state[root] = 1
+        discovery.append(root)
+        path = [root]
+        while path:
+            node = path[-1]
+            arc = next_arc[node]
+            if arc < ends[node]:
+                next_arc[node] = arc + 1
+                target = edge_targets[arc]
+                if not state[target]:
+                    state[target] = 1
+                    discovery.append(target)
+                    path.append(target)
+                elif state[target] == 1:
+                    back.append(edge_ids[arc])
+                continue
+            state[node] = 2
+            finished.append(node)
+            path.pop()
+    result = np.zeros(len(sources), dtype=bool)
+    result[back] = True
+    discovered[discovery] = np.arange(node_count)
+    return result, discovered, finished
+
+
+def _longest_path_layers(node_count: int, sources: np.ndarray, targets: np.ndarray,
+                         topological: List[int]) -> np.ndarray:
+    """
+    Layer an acyclic graph so every edge points to a higher layer, in one pass over its nodes in topological order.
+    Nodes without predecessors are moved up to just before their first successor, so they do not drag long edges from
+    the first layer.
+
+    :param topological: The nodes in topological order.
+    :return: Per node, its layer.
+    """
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=node_count), out=indptr[1:])
+    edge_targets = targets[order].tolist()
+    starts, ends = indptr[:-1].tolist(), indptr[1:].tolist()
+    longest = [0] * node_count
+    for node in topological:
+        layer = longest[node] + 1
+        for target in edge_targets[starts[node]:ends[node]]:
+            if longest[target] < layer:
+                longest[target] = layer
+    layers = np.array(longest, dtype=np.int64)
+
+    starts = np.bincount(targets, minlength=node_count) == 0
+    from_start = starts[sources]
+    first = np.full(node_count, np.iinfo(np.int64).max)
+    np.minimum.at(first, sources[from_start], layers[targets[from_start]] - 1)
+    return np.where(starts & (first < np.iinfo(np.int64).max), first, layers)
+
+
+def _inversions(values: np.ndarray) -> int:
+    """
+    Count the pairs i < j with values[i] > values[j] by a bottom-up merge sort, one vectorized pass per level. A stable
+    sort of two sorted runs is a merge, and where an element of the right run lands tells how many elements of the
+    left run are greater.
+    """
+    count = len(values)
+    values = np.unique(values, return_inverse=True)[1].reshape(-1).astype(np.int64)
+    span = count + 1
+    indices = np.arange(count)
+    merged = np.empty(count, dtype=np.int64)
+    total = 0
+    width = 1
+    while width < count:
+        starts = indices // (2 * width) * (2 * width)
+        keys = starts * span + values
+        order = np.argsort(keys, kind="stable")
+        merged[order] = indices
+        right = indices - starts >= width
+        left_sizes = np.minimum(width, count - starts[right])
+        not_greater = merged[right] - indices[right] + width
+        total += int((left_sizes - not_greater).sum())
+        values = values[order]
+        width *= 2
+    return total
+
+
+def count_crossings(layout: LayeredLayout) -> int:
+    """
+    :return: The number of crossings between the edge segments of a layout.
+    """
+    upper, lower = layout.segments()
+    order = np.lexsort((layout.positions[lower], layout.positions[upper], layout.layers[upper]))
+    span = int(layout.positions.max(initial=0)) + 1
+    return _inversions(layout.layers[upper][order] * span + layout.positions[lower][order])
+
+
+class _Layers:
+    """
+    The nodes of every layer with the edge segments reaching them from the layer before and the layer after.
+    """
+
+    def __init__(self, layers: np.ndarray, upper: np.ndarray, lower: np.ndarray):
+        layer_count = int(layers.max(initial=-1)) + 1
+        by_layer = np.argsort(layers, kind="stable")
+        indptr = np.zeros(layer_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(layers, minlength=layer_count), out=indptr[1:])
+        slots = np.empty(len(layers), dtype=np.int64)
+        slots[by_layer] = np.arange(len(layers)) - indptr[layers[by_layer]]
+
+        def split(keys: np.ndarray) -> List[np.ndarray]:
+            order = np.argsort(keys, kind="stable")
+            bounds = np.searchsorted(keys[order], np.arange(layer_count + 1))
+            return [order[bounds[layer]:bounds[layer + 1]] for layer in range(layer_count)]
+
+        nodes = by_layer.tolist()
+        bounds = indptr.tolist()
+        self.nodes = [nodes[bounds[layer]:bounds[layer + 1]] for layer in range(layer_count)]
+        sizes = np.diff(indptr).tolist()
+        # Per layer and direction, the slots of its nodes and the neighbours on the other side of each segment
+        # reaching them, the degree of every node and the scale from the position of a node without such segments
+        # to the neighbouring layer
+        self.from_above = [self._sweep_step(slots[lower[segments]], upper[segments], sizes[layer],
+                                            sizes[layer - 1] if layer else 0)
+                           for layer, segments in enumerate(split(layers[lower]))]
+        self.from_below = [self._sweep_step(slots[upper[segments]], lower[segments], sizes[layer],
+                                            sizes[layer + 1] if layer + 1 < layer_count else 0)
+                           for layer, segments in enumerate(split(layers[upper]))]
+
+    @staticmethod
+    def _sweep_step(slots: np.ndarray, neighbours: np.ndarray, size: int, other_size: int) -> Optional[
+        Tuple[List[int], List[int], List[int], float]
+    ]:
+        """
+        :return: What `sweep` needs to reorder a layer, None if the layer is never reordered from that side.
+        """
+        if size < 2 or not len(slots):
+            return None
+        return slots.tolist(), neighbours.tolist(), np.bincount(slots, minlength=size).tolist(), other_size / size
+
+    def sweep(self, positions: np.ndarray, downwards: bool) -> None:
+        """
+        Reorder every layer by the barycenters of its neighbours in the layer ordered before it. Nodes without such
+        neighbours keep their relative position.
+
+        Most layers hold a handful of nodes, for which Python lists are faster than a few NumPy calls per layer.
+        """
+        count = len(self.nodes)
+        steps = self.from_above if downwards else self.from_below
+        current = positions.tolist()
+        for layer in range(1, count) if downwards else range(count - 2, -1, -1):
+            step = steps[layer]
+            if step is None:
+                continue
+            slots, neighbours, degrees, scale = step
+            nodes = self.nodes[layer]
+            sums = [0.0] * len(nodes)
+            for slot, neighbour in zip(slots, neighbours):
+                sums[slot] += current[neighbour]
+            keys = sorted((total / degree if degree else current[node] * scale, current[node], node)
+                          for total, degree, node in zip(sums, degrees, nodes))
+            for position, (_, _, node) in enumerate(keys):
+                current[node] = position
+        positions[:] = current
+
+
+def _assign_coordinates(layers: np.ndarray, positions: np.ndarray, extents: np.ndarray, upper: np.ndarray,
+                        lower: np.ndarray, weights: np.ndarray, iterations: int) -> np.ndarray:
+    """
+    Place the nodes of every layer along the layer axis, keeping their order and `(extent_a + extent_b) / 2` apart
+    while moving each toward the weighted mean of its neighbours. All layers move at once: every iteration computes
+    the wanted coordinates and projects them onto the separation constraints, as the mean of the tightest packing
+    from the top and from the bottom.
+
+    :return: Per node, its coordinate along the layer.
+    """
+    order = np.lexsort((positions, layers))
+    sorted_layers = layers[order]
+    sorted_extents = extents[order]
+    first = np.concatenate(([True], sorted_layers[1:] != sorted_layers[:-1]))
+    layer_starts = np.flatnonzero(first)
+    # The minimum distance of every node from the first node of its layer
+    cumulative = np.cumsum(sorted_extents)
+    start_of = np.repeat(layer_starts, np.diff(np.append(layer_starts, len(order))))
+    offsets = cumulative - cumulative[start_of] - (sorted_extents - sorted_extents[start_of]) / 2
+    # Keyed by a per-layer offset larger than any coordinate, running maxima and minima do not cross layers
+    separation = 4 * (float(cumulative[-1]) if len(cumulative) else 0.0) + 1.0
+    keys = sorted_layers * separation
+
+    coordinates = np.empty(len(layers))
+    coordinates[order] = offsets - offsets[np.repeat(np.append(layer_starts[1:] - 1, len(order) - 1),
+                                                     np.diff(np.append(layer_starts, len(order))))] / 2
+    total_weights = np.bincount(upper, weights=weights, minlength=len(layers)) \
+        + np.bincount(lower, weights=weights, minlength=len(layers))
+    for _ in range(iterations):
+        sums = np.bincount(upper, weights=weights * coordinates[lower], minlength=len(layers)) \
+            + np.bincount(lower, weights=weights * coordinates[upper], minlength=len(layers))
+        wanted = np.where(total_weights > 0, sums / np.maximum(total_weights, 1e-12), coordinates)[order]
+        shifted = wanted - offsets + keys
+        from_top = np.maximum.accumulate(shifted) - keys + offsets
+        from_bottom = np.minimum.accumulate(shifted[::-1])[::-1] - keys + offsets
+        coordinates[order] = (from_top + from_bottom) / 2
+    return coordinates
+
+
+def layered_layout(node_count: int, sources: np.ndarray, targets: np.ndarray, extents: Optional[np.ndarray] = None,
+                   layer_distance: float = 2 * POINTS_PER_INCH, dummy_extent: float = POINTS_PER_INCH / 4,
+                   sweeps: int = 8, iterations: int = 30) -> LayeredLayout:
+    """
+    Lay out a directed graph in layers, in the style of Sugiyama: cycles are broken by reversing the back edges of a
+    depth-first search, nodes are layered by longest paths, edges spanning several layers are split by dummy nodes,
+    crossings are reduced by barycenter sweeps and the nodes are spread along their layers by `_assign_coordinates`.
+
+    :param node_count: The number of nodes.
+    :param sources: Per edge, its source node.
+    :param targets: Per edge, its target node.
+    :param extents: Per node, the space it takes along its layer including the gap to its neighbours, in points.
+        Defaults to one and a half inch.
+    :param layer_distance: The distance between neighbouring layers, in points.
+    :param dummy_extent: The space a dummy node takes along its layer, in points.
+    :param sweeps: The number of crossing reduction sweeps, alternating downward and upward.
+    :param iterations: The number of coordinate assignment iterations.
+    :return: The layout.
+    :raises ValueError: If an edge refers to a node that does not exist.
+    """
+    sources = np.asarray(sources, dtype=np.int64).reshape(-1)
+    targets = np.asarray(targets, dtype=np.int64).reshape(-1)
+    if len(sources) != len(targets):
+        raise ValueError("Every edge needs a source and a target")
+    if len(sources) and (min(sources.min(), targets.min()) < 0 or max(sources.max(), targets.max()) >= node_count):
+        raise ValueError("Edge refers to a node that does not exist")
+    extents = np.full(node_count, 1.5 * POINTS_PER_INCH) if extents is None else np.asarray(extents, dtype=float)
+
+    loops = sources == targets
+    back_edges, discovered, finished = _back_edges(node_count, sources, targets)
+    reversed_edges = back_edges & ~loops
+    heads = np.where(reversed_edges, targets, sources)
+    tails = np.where(reversed_edges, sources, targets)
+    layers = _longest_path_layers(node_count, heads[~loops], tails[~loops], finished[::-1])
+
+    # Split every edge into one segment per layer it crosses
+    spans = np.where(loops, 0, layers[tails] - layers[heads])
+    dummy_counts = np.maximum(spans - 1, 0)
+    dummy_total = int(dummy_counts.sum())
+    dummy_layers = np.repeat(layers[heads] + 1, dummy_counts) \
+        + np.arange(dummy_total) - np.repeat(np.cumsum(dummy_counts) - dummy_counts, dummy_counts)
+    layers = np.concatenate((layers, dummy_layers))
+    path_indptr = np.zeros(len(sources) + 1, dtype=np.int64)
+    np.cumsum(dummy_counts + 2, out=path_indptr[1:])
+    path_nodes = np.empty(path_indptr[-1], dtype=np.int64)
+    inner = np.ones(len(path_nodes), dtype=bool)
+    inner[path_indptr[:-1]] = inner[path_indptr[1:] - 1] = False
+    path_nodes[path_indptr[:-1]] = heads
+    path_nodes[path_indptr[1:] - 1] = tails
+    path_nodes[inner] = node_count + np.arange(dummy_total)
+    # Paths run from the source to the target of their edge, also for reversed edges
+    flip = np.repeat(reversed_edges, dummy_counts + 2)
+    edge_of = np.repeat(np.arange(len(sources)), dummy_counts + 2)
+    mirrored = path_indptr[edge_of] + path_indptr[edge_of + 1] - 1 - np.arange(len(path_nodes))
+    path_nodes = np.where(flip, path_nodes[mirrored], path_nodes)
+
+    layout = LayeredLayout(layers, np.zeros(len(layers), dtype=np.int64), np.zeros(len(layers)),
+                           np.zeros(len(layers)), reversed_edges, path_indptr, path_nodes)
+    upper, lower = layout.segments()
+    # Start from the order in which the depth-first search discovered the nodes, dummies next to their edge's source
+    positions = layout.positions
+    discovery = np.concatenate((discovered, discovered[np.repeat(heads, dummy_counts)]))
+    order = np.lexsort((np.arange(len(layers)), discovery, layers))
+    sorted_layers = layers[order]
+    positions[order] = np.arange(len(order)) - np.searchsorted(sorted_layers, sorted_layers)
+    index = _Layers(layers, upper, lower)
+    best, fewest = positions.copy(), count_crossings(layout)
+    for sweep in range(sweeps):
+        if not fewest:
+            break
+        index.sweep(positions, downwards=sweep % 2 == 0)
+        crossings = count_crossings(layout)
+        if crossings < fewest:
+            best, fewest = positions.copy(), crossings
+    positions[:] = best
+
+    is_dummy = np.arange(len(layers)) >= node_count
+    weights = np.array(SEGMENT_WEIGHTS)[is_dummy[upper].astype(int) + is_dummy[lower]]
+    all_extents = np.concatenate((extents, np.full(dummy_total, dummy_extent)))
+    layout.x[:] = layers * layer_distance
+    layout.y[:] = _assign_coordinates(layers, positions, all_extents, upper, lower, weights, iterations)
+    return layout
+
+
+def _label_operations(label: str, x: float, y: float) -> List[dict]:
+    """
+    :return: The graphviz drawing operations of a label centered at (x, y), which are rounded to two decimals.
+    """
+    lines = label.split("\n")
+    operations: List[dict] = [{"op": "F", "size": FONT_SIZE, "face": "Times-Roman"},
+                              {"op": "c", "grad": "none", "color": "#000000"}]
+    for number, line in enumerate(lines):
+        baseline = y + 1.2 * FONT_SIZE * ((len(lines) - 1) / 2 - number) - 0.27 * FONT_SIZE
+        operations.append({"op": "T", "pt": [x, round(baseline, 2)], "align": "c",
+                           "width": round(0.5 * FONT_SIZE * len(line), 2), "text": line})
+    return operations
+
+
+def _shape_operations(shape: str, fillcolor: str, x: float, y: float, radius: float) -> List[dict]:
+    """
+    :return: The graphviz drawing operations of a filled circle or box of the given radius centered at (x, y), which
+        are rounded to two decimals.
+    """
+    if shape == "circle":
+        outline = {"op": "E", "rect": [x, y, radius, radius]}
+    else:
+        corners = [[x + radius, y - radius], [x + radius, y + radius], [x - radius, y + radius],
+                   [x - radius, y - radius]]
+        outline = {"op": "P", "points": [[round(a, 2), round(b, 2)] for a, b in corners]}
+    return [{"op": "C", "grad": "none", "color": fillcolor}, {"op": "c", "grad": "none", "color": "#000000"},
+            outline]
+
+
+def _edge_splines(path_indptr: np.ndarray, path_nodes: np.ndarray, x: np.ndarray, y: np.ndarray,
+                  radius: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draw every edge as a piecewise cubic Bezier curve along its path, from the border of its source to the border of
+    its target. Dummies on a straight stretch of a path are left out.
+
+    :param path_indptr: Per edge, the range of its path in `path_nodes`, as in `LayeredLayout`.
+    :param path_nodes: The nodes the edges run through, each path with at least two nodes.
+
+    :return: Per edge, the range of its control points in compressed sparse row form, and the control points, in the
+        `3n + 1` form of graphviz edge positions.
+    """
+    path_lengths = np.diff(path_indptr)
+    edge_of = np.repeat(np.arange(len(path_lengths)), path_lengths)
+    along = np.arange(len(edge_of)) - path_indptr[edge_of]
+    points = np.column_stack((x[path_nodes], y[path_nodes]))
+    keep = np.ones(len(points), dtype=bool)
+    inner = np.flatnonzero((along > 0) & (along < path_lengths[edge_of] - 1))
+    keep[inner] = np.abs(points[inner - 1] + points[inner + 1] - 2 * points[inner]).max(axis=1, initial=0) > 0.01
+    points, edge_of = points[keep], edge_of[keep]
+    counts = np.bincount(edge_of, minlength=len(path_lengths))
+    starts = np.cumsum(counts) - counts
+    ends = starts + counts - 1
+
+    moves = []
+    for end, neighbour in ((starts, starts + 1), (ends, ends - 1)):
+        direction = points[neighbour] - points[end]
+        length = np.hypot(direction[:, 0], direction[:, 1])
+        moves.append(np.where((length > 2 * radius)[:, None], direction * (radius / np.maximum(length, 1))[:, None], 0))
+    points[starts] += moves[0]
+    points[ends] += moves[1]
+
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(3 * counts - 2, out=indptr[1:])
+    controls = np.empty((indptr[-1], 2))
+    controls[indptr[1:] - 1] = points[ends]
+    is_last = np.zeros(len(points), dtype=bool)
+    is_last[ends] = True
+    segment_starts = np.flatnonzero(~is_last)
+    edges = edge_of[segment_starts]
+    bases = indptr[edges] + 3 * (segment_starts - starts[edges])
+    steps = points[segment_starts + 1] - points[segment_starts]
+    for step in range(3):
+        controls[bases + step] = points[segment_starts] + steps * step / 3
+    return indptr, controls
+
+
+def _format_points(points: np.ndarray) -> List[str]:
+    """
+    :return: Per point, its coordinates as "x,y", formatted in a single pass.
+    """
+    return ("%.2f,%.2f\0" * len(points) % tuple(points.ravel().tolist())).split("\0")[:-1]
+
+
+def _net_graph(net: PetriNet) -> Tuple[List[Element], np.ndarray, np.ndarray]:
+    """
+    :return: The places and then the transitions of a net, both in the order of their names, and per arc in the order
+        of its source and target names, the positions of its source and target among them.
+    """
+    elements = sorted(net.places, key=lambda place: place.name) \
+        + sorted(net.transitions, key=lambda transition: transition.name)
+    ids = {id(element): number for number, element in enumerate(elements)}
+    arcs = sorted(net.arcs, key=lambda arc: (arc.source.name, arc.target.name))
+    sources = np.fromiter((ids[id(arc.source)] for arc in arcs), dtype=np.int64, count=len(arcs))
+    targets = np.fromiter((ids[id(arc.target)] for arc in arcs), dtype=np.int64, count=len(arcs))
+    return elements, sources, targets
+
+
+def _graphviz_json(elements: List[Element], place_count: int, sources: np.ndarray, targets: np.ndarray,
+                   centers: np.ndarray, edge_positions: List[str], margin: float) -> dict:
+    """
+    :param centers: Per element, the coordinates of its center.
+    :param edge_positions: Per edge, its `pos` attribute.
+    :param margin: The space around the element centers in the bounding box, which includes the origin.
+    :return: A layout in the form of the graphviz JSON output.
+    """
+    radius = POINTS_PER_INCH / 2
+    centers = np.round(centers, 2)
+    center_texts = _format_points(centers)
+    objects = []
+    for number, (element, (center_x, center_y)) in enumerate(zip(elements, centers.tolist())):
+        shape = "circle" if number < place_count else "box"
+        label = wrap_label(element.label if hasattr(element, "label") else element.name, 10)
+        fillcolor = element.properties.get("color", "white")
+        objects.append({"_gvid": number, "name": element.name, "fixedsize": "true", "height": "1", "width": "1",
+                        "label": label, "labelloc": "c", "shape": shape, "style": "filled", "fillcolor": fillcolor,
+                        "pos": center_texts[number],
+                        "_draw_": _shape_operations(shape, fillcolor, center_x, center_y, radius),
+                        "_ldraw_": _label_operations(label, center_x, center_y)})
+    edges = [{"_gvid": number, "tail": tail, "head": head, "pos": position}
+             for number, (tail, head, position) in enumerate(zip(sources.tolist(), targets.tolist(), edge_positions))]
+
+    low = centers.min(axis=0, initial=np.inf) if len(centers) else np.zeros(2)
+    high = centers.max(axis=0, initial=-np.inf) if len(centers) else np.zeros(2)
+    bounds = np.concatenate((np.minimum(low - margin, 0), high + margin))
+    return {"name": "%3", "directed": True, "strict": False, "rankdir": "LR", "bb": ",".join(_format_points(
+        bounds.reshape(2, 2))), "_subgraph_cnt": 0, "objects": objects, "edges": edges}
+
+
+def _edge_positions(path_indptr: np.ndarray, path_nodes: np.ndarray, x: np.ndarray, y: np.ndarray) -> List[str]:
+    """
+    :return: Per edge, its `pos` attribute, see `_edge_splines`.
+    """
+    indptr, controls = _edge_splines(path_indptr, path_nodes, x, y, POINTS_PER_INCH / 2)
+    texts = _format_points(controls)
+    return [" ".join(texts[start:end]) for start, end in zip(indptr[:-1].tolist(), indptr[1:].tolist())]
+
+
+def layout_petri_net_layered(net: PetriNet, job: Optional[LayoutJob] = None, layer_distance: float = 2.0,
+                             node_separation: float = 0.5) -> dict:
+    """
+    Lay out a net with `layered_layout` instead of graphviz, from left to right like `render_petri_net`.
+
+    :param net: The net.
+    :param job: The background job running the layout, checked for cancellation between the steps.
+    :param layer_distance: The distance between neighbouring layers, in inches.
+    :param node_separation: The gap between neighbouring elements of a layer, in inches.
+    :return: A layout in the form of the graphviz JSON output, with the positions, labels and drawing instructions
+        `PetriNetEditorView` reads. Places come first and transitions after them, both in the order of their names.
+    """
+    # One pause for the whole layout, the JSON output alone consists of about ten small objects per element
+    with _gc_paused():
+        elements, sources, targets = _net_graph(net)
+        if job is not None:
+            job.check()
+
+        extents = np.full(len(elements), (1.0 + node_separation) * POINTS_PER_INCH)
+        layout = layered_layout(len(elements), sources, targets, extents,
+                                layer_distance=layer_distance * POINTS_PER_INCH)
+        if job is not None:
+            job.check()
+
+        # Graphviz puts the origin at the bottom left and ranks from the top down
+        margin = POINTS_PER_INCH / 2 + 4
+        x = layout.x + margin
+        y = layout.y.max(initial=0) - layout.y + margin + node_separation * POINTS_PER_INCH / 2
+        centers = np.column_stack((x[:len(elements)], y[:len(elements)]))
+        edge_positions = _edge_positions(layout.path_indptr, layout.path_nodes, x, y)
+        return _graphviz_json(elements, len(net.places), sources, targets, centers, edge_positions, margin)
+
+
+def structural_key(element: Element) -> Hashable:
+    """
+    Identify an element by its neighbourhood instead of its name, for nets that are discovered again and again with new
+    names, like those of `OnlineDFG.discover`. A visible transition is identified by its label, a place by the labels
+    of the transitions before and after it and a silent transition by the keys of the places around it.
+    """
+    if isinstance(element, PetriNet.Transition):
+        if element.label is not None:
+            return "transition", element.label
+        return ("silent", tuple(sorted(structural_key(arc.source) for arc in element.in_arcs)),
+                tuple(sorted(structural_key(arc.target) for arc in element.out_arcs)))
+    return ("place", tuple(sorted(str(arc.source.label) for arc in element.in_arcs)),
+            tuple(sorted(str(arc.target.label) for arc in element.out_arcs)))
+
+
+def layout_positions(layout: dict, net: Optional[PetriNet] = None,
+                     key: Optional[Callable[[Element], Hashable]] = None) -> Dict[Hashable, Tuple[float, float]]:
+    """
+    :param layout: A layout in the form of the graphviz JSON output.
+    :param net: The net of the layout, needed to identify its elements by `key`.
+    :param key: See `layout_petri_net_incremental`.
+    :return: The centers of the elements of the layout, by name or by `key`.
+    """
+    positions = {element["name"]: tuple(map(float, element["pos"].split(",")))
+                 for element in layout.get("objects", []) if "pos" in element}
+    if key is None:
+        return positions
+    return {key(element): positions[element.name] for element in itertools.chain(net.places, net.transitions)
+            if element.name in positions}
+
+
+def _free_position(centers: np.ndarray, x: float, y: float, spacing: float) -> float:
+    """
+    :return: The coordinate along the layer nearest to y, in steps of `spacing`, where a node at x keeps `spacing` from
+        all placed nodes. Unplaced nodes have NaN coordinates.
+    """
+    others = centers[np.abs(centers[:, 0] - x) < spacing, 1]
+    if not len(others):
+        return y
+    # Every placed node blocks at most two candidates, so one of these is free
+    steps = np.arange(1, len(others) + 2)
+    candidates = y + spacing * np.concatenate(([0], np.column_stack((steps, -steps)).ravel()))
+    free = ~np.any(np.abs(candidates[:, None] - others[None, :]) < spacing - 1e-6, axis=1)
+    return float(candidates[np.argmax(free)])
+
+
+def _place_new_nodes(centers: np.ndarray, sources: np.ndarray, targets: np.ndarray, wanted: np.ndarray,
+                     layer_distance: float, spacing: float) -> None:
+    """
+    Place the nodes without coordinates in `centers` in place, see `layout_petri_net_incremental`.
+
+    :param wanted: Per node, the center wanted for it, or NaN.
+    """
+    node_count = len(centers)
+    placed = ~np.isnan(centers[:, 0])
+    ends = np.concatenate((sources, targets))
+    others = np.concatenate((targets, sources))
+    order = np.argsort(ends, kind="stable")
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=node_count), out=indptr[1:])
+    neighbours, is_successor = others[order], order < len(sources)
+
+    # Visit the new nodes breadth first from the placed ones, so each has a placed neighbour when it is placed
+    reached = placed | ~np.isnan(wanted[:, 0])
+    frontier = np.flatnonzero(reached)
+    visits = [np.flatnonzero(~placed & reached)]
+    while len(frontier):
+        found = neighbours[_ranges(indptr[frontier], indptr[frontier + 1] - indptr[frontier])]
+        frontier = np.unique(found[~reached[found]])
+        reached[frontier] = True
+        visits.append(frontier)
+
+    for node in np.concatenate(visits).tolist():
+        if not np.isnan(wanted[node, 0]):
+            x, y = wanted[node]
+        else:
+            adjacent = slice(indptr[node], indptr[node + 1])
+            known = placed[neighbours[adjacent]]
+            near = neighbours[adjacent][known]
+            x = float(np.mean(centers[near, 0] + np.where(is_successor[adjacent][known], -1, 1) * layer_distance))
+            y = float(np.mean(centers[near, 1]))
+        centers[node] = x, _free_position(centers, x, y, spacing)
+        placed[node] = True
+
+    # Parts of the net without any placed element are laid out on their own beside the others
+    rest = np.flatnonzero(~placed)
+    if len(rest):
+        local = np.full(node_count, -1)
+        local[rest] = np.arange(len(rest))
+        inside = (local[sources] >= 0) & (local[targets] >= 0)
+        part = layered_layout(len(rest), local[sources[inside]], local[targets[inside]],
+                              np.full(len(rest), spacing), layer_distance)
+        low = np.nanmin(centers, axis=0)
+        centers[rest, 0] = low[0] + part.x[:len(rest)]
+        centers[rest, 1] = low[1] - spacing - (part.y[:len(rest)] - part.y.min(initial=0))
+
+
+def layout_petri_net_incremental(net: PetriNet, positions: Dict[Hashable, Tuple[float, float]],
+                                 previous: Optional[dict] = None,
+                                 hints: Optional[Dict[Hashable, Tuple[float, float]]] = None,
+                                 key: Optional[Callable[[Element], Hashable]] = None, job: Optional[LayoutJob] = None,
+                                 layer_distance: float = 2.0, node_separation: float = 0.5) -> dict:
+    """
+    Lay out a net that changed since it was laid out, keeping the elements that were there before where they are.
+
+    Only the new elements are placed, breadth first from the kept ones: right of their predecessors and left of their
+    successors like in `layout_petri_net_layered`, at the nearest position where they do not overlap another element.
+    New parts of the net without a kept element are laid out on their own beside the rest. Only the edges with a new or
+    moved end are routed again; the others keep their route from the previous layout.
+
+    :param net: The net.
+    :param positions: The centers of the elements to keep in place, by name or by `key`, e.g. from `layout_positions`
+        or from where the elements are shown now.
+    :param previous: The layout the net had before, to reuse the routes of the edges whose ends did not move.
+    :param hints: Wanted centers of new elements, by name or by `key`. They are placed at the nearest free position.
+    :param key: Identifies the elements across versions of the net, e.g. `structural_key`. By default, by name.
+    :param job: The background job running the layout, checked for cancellation between the steps.
+    :param layer_distance: See `layout_petri_net_layered`.
+    :param node_separation: See `layout_petri_net_layered`.
+    :return: The layout in the form of the graphviz JSON output, see `layout_petri_net_layered`. A net without any
+        element to keep is laid out from scratch.
+    """
+    elements, sources, targets = _net_graph(net)
+    keys = [element.name for element in elements] if key is None else [key(element) for element in elements]
+    hints = hints or {}
+    centers = np.full((len(elements), 2), np.nan)
+    wanted = np.full((len(elements), 2), np.nan)
+    kept = set()
+    for number, element_key in enumerate(keys):
+        # Elements sharing a key are told apart by their order, only the first keeps the position
+        if element_key in positions and element_key not in kept:
+            centers[number] = positions[element_key]
+            kept.add(element_key)
+        elif element_key in hints:
+            wanted[number] = hints[element_key]
+    if not kept:
+        return layout_petri_net_layered(net, job, layer_distance, node_separation)
+    pinned = ~np.isnan(centers[:, 0])
+    _place_new_nodes(centers, sources, targets, wanted, layer_distance * POINTS_PER_INCH,
+                     (1.0 + node_separation) * POINTS_PER_INCH)
+    if job is not None:
+        job.check()
+
+    edge_positions: List[Optional[str]] = [None] * len(sources)
+    if previous is not None:
+        names = [element["name"] for element in previous.get("objects", [])]
+        before = layout_positions(previous)
+        routes = {(names[edge["tail"]], names[edge["head"]]): edge["pos"]
+                  for edge in previous.get("edges", []) if "pos" in edge}
+        unmoved = pinned & np.array([np.allclose(before.get(element.name, np.nan), center, atol=0.01)
+                                     for element, center in zip(elements, centers)], dtype=bool)
+        for number in np.flatnonzero(unmoved[sources] & unmoved[targets]).tolist():
+            edge_positions[number] = routes.get((elements[sources[number]].name, elements[targets[number]].name))
+    rerouted = np.array([position is None for position in edge_positions], dtype=bool)
+    if rerouted.any():
+        path_nodes = np.column_stack((sources[rerouted], targets[rerouted])).ravel()
+        path_indptr = np.arange(0, len(path_nodes) + 1, 2)
+        for number, position in zip(np.flatnonzero(rerouted).tolist(),
+                                    _edge_positions(path_indptr, path_nodes, centers[:, 0], centers[:, 1])):
+            edge_positions[number] = position
+    return _graphviz_json(elements, len(net.places), sources, targets, centers, edge_positions,
+                          POINTS_PER_INCH / 2 + 4)
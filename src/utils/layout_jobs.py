@@ -0,0 +1,120 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+import subprocess
+import threading
+
+from graphviz import Digraph, ExecutableNotFound
+
+
+class LayoutCancelled(Exception):
+    """
+    Raised by a layout job that was cancelled while running.
+    """
+
+
+class LayoutJob:
+    """
+    Handle of a layout running in the background.
+
+    The result is delivered through `future`. Cancelling a job that has not started yet cancels its future; a running
+    job is told to stop, which kills the external process it waits for and makes it raise `LayoutCancelled`, so its
+    worker is free again at once.
+    """
+
+    def __init__(self):
+        self.future: Future = Future()
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        self.future.cancel()
+        with self._lock:
+            if self._process is not None:
+                self._process.kill()
+
+    def check(self) -> None:
+        """
+        Stop a running job between two steps if it was cancelled.
+
+        :raises LayoutCancelled: If the job was cancelled.
+        """
+        if self._cancelled.is_set():
+            raise LayoutCancelled()
+
+    def run_process(self, command: List[str], data: bytes) -> bytes:
+        """
+        Run an external command that can be killed by cancelling the job.
+
+        :param command: The command line.
+        :param data: The standard input of the command.
+        :return: The standard output of the command.
+        :raises LayoutCancelled: If the job was cancelled.
+        :raises subprocess.CalledProcessError: If the command failed.
+        """
+        with self._lock:
+            self.check()
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             stderr=subprocess.PIPE)
+        try:
+            output, errors = self._process.communicate(data)
+        finally:
+            with self._lock:
+                process, self._process = self._process, None
+        self.check()
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, command, output, errors)
+        return output
+
+    def run_graphviz(self, dot: Digraph, output_format: str = "json") -> bytes:
+        """
+        Lay out a graph like `dot.pipe`, but in a process the job can kill.
+
+        :raises ExecutableNotFound: If graphviz is not installed.
+        """
+        command = ["dot", f"-K{dot.engine}", f"-T{output_format}"]
+        try:
+            return self.run_process(command, dot.source.encode(dot.encoding))
+        except FileNotFoundError as error:
+            raise ExecutableNotFound(command) from error
+
+
+class LayoutExecutor:
+    """
+    Thread pool for layout jobs. The workers mostly wait for graphviz processes, so several tabs can be laid out at
+    the same time while the UI thread stays free.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="layout")
+
+    def submit(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> LayoutJob:
+        """
+        Run a layout function in the background. It is passed the job as keyword argument `job`, to check for
+        cancellation and to run graphviz through it.
+
+        :return: The job; its future holds the function's result or exception.
+        """
+        job = LayoutJob()
+
+        def run() -> None:
+            if not job.future.set_running_or_notify_cancel():
+                return
+            try:
+                result = function(*args, job=job, **kwargs)
+            except BaseException as error:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+        # Jobs dropped by a shutdown never run, so their futures are cancelled here
+        self._executor.submit(run).add_done_callback(lambda task: task.cancelled() and job.future.cancel())
+        return job
+
+    def shutdown(self, cancel_jobs: bool = True) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=cancel_jobs)
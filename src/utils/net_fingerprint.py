@@ -0,0 +1,89 @@
+from hashlib import blake2b
+from typing import Optional
+
+import numpy as np
+from pm4py import PetriNet
+
+from src.petri_nets.graph_index import PetriNetIndex
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_INPUTS = np.uint64(0x632BE59BD9B4E019)
+_OUTPUTS = np.uint64(0x85EBCA77C2B2AE63)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """
+    The splitmix64 finalizer, applied element-wise with wrapping uint64 arithmetic.
+    """
+    values = values + _GOLDEN
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _row_sums(values: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """
+    :return: The wrapping sum of the values of every CSR row, an order-independent hash of the row's multiset.
+    """
+    sums = np.concatenate(([np.uint64(0)], np.cumsum(values, dtype=np.uint64)))
+    return sums[indptr[1:]] - sums[indptr[:-1]]
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def net_fingerprint(net: PetriNet, include_names: bool = True, max_rounds: Optional[int] = 32) -> str:
+    """
+    Compute a canonical hash of the structure of a Petri net with Weisfeiler-Lehman refinement.
+
+    Every place and transition starts with a color derived from its kind, its label and, with include_names, its name.
+    In each round, a node's color is rehashed together with the multisets of the colors of its input and output
+    neighbors, until the partition of the nodes by color no longer changes or max_rounds is reached. The fingerprint
+    hashes the multiset of the final colors, so it does not depend on the order of the net's sets.
+
+    With names, which are unique in a net read from PNML, equal fingerprints mean equal nets up to hash collisions, so
+    results stored by element name can be reused for them. Without names the fingerprint identifies nets up to
+    isomorphism, but like any Weisfeiler-Lehman hash it may also be equal for some non-isomorphic nets.
+
+    :param net: The net.
+    :param include_names: Whether the names of places and transitions are part of the fingerprint.
+    :param max_rounds: The maximum number of refinement rounds, None for no limit.
+    :return: The fingerprint as a hex string.
+    """
+    index = PetriNetIndex.from_net(net)
+    place_count = len(index.places)
+    node_count = place_count + len(index.transitions)
+
+    def initial(kind: str, element, label: Optional[str]) -> int:
+        name = element.name if include_names else ""
+        return _digest(f"{kind}\0{'' if label is None else label}\0{name}\0{label is None}")
+
+    colors = np.fromiter(
+        [initial("place", place, None) for place in index.places] +
+        [initial("transition", transition, transition.label) for transition in index.transitions],
+        dtype=np.uint64, count=node_count)
+
+    distinct = len(np.unique(colors))
+    rounds = 0
+    while max_rounds is None or rounds < max_rounds:
+        mixed = _mix(colors)
+        places, transitions = mixed[:place_count], mixed[place_count:]
+        inputs = np.concatenate((_row_sums(transitions[index.place_predecessors], index.place_predecessor_indptr),
+                                 _row_sums(places[index.transition_predecessors],
+                                           index.transition_predecessor_indptr)))
+        outputs = np.concatenate((_row_sums(transitions[index.place_successors], index.place_successor_indptr),
+                                  _row_sums(places[index.transition_successors],
+                                            index.transition_successor_indptr)))
+        colors = _mix(colors ^ _mix(inputs ^ _INPUTS) ^ _mix(outputs + _OUTPUTS))
+        rounds += 1
+        refined = len(np.unique(colors))
+        if refined == distinct:
+            break
+        distinct = refined
+
+    arc_count = len(index.place_successors) + len(index.transition_successors)
+    digest = blake2b(f"{place_count}\0{node_count - place_count}\0{arc_count}\0{include_names}".encode(),
+                     digest_size=16)
+    digest.update(np.sort(colors).tobytes())
+    return digest.hexdigest()
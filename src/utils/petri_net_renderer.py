@@ -1,9 +1,23 @@
-from typing import Set, Dict
-
-from graphviz import Digraph
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional, Union
+import json
+import os
+import shutil
+
+import graphviz
+from graphviz import Digraph, ExecutableNotFound
+from graphviz.quoting import attr_list, quote, quote_edge
 from pm4py import PetriNet
 
+from src.utils.disk_cache import DiskLRUCache
+from src.utils.layout_jobs import LayoutJob
+
+# The version per graphviz executable, identified by its path, modification time and size
+_graphviz_versions: Dict[str, str] = {}
 
+
+@lru_cache(maxsize=4096)
 def wrap_label(label: str, max_length: int) -> str:
     if not label:
         return ""
@@ -27,70 +41,140 @@ def wrap_label(label: str, max_length: int) -> str:
     return '\n'.join(lines)
 
 
-def add_places(dot: Digraph, places: Set[PetriNet.Place], max_label_length: int) -> None:
-    for place in places:
-        label = place.label if hasattr(place, 'label') else place.name
-        wrapped_label = wrap_label(label, max_label_length)
-        fillcolor = place.properties.get("color", "white")
-        dot.node(place.name,
-                 shape='circle',
-                 label=wrapped_label,
-                 style='filled',
-                 fillcolor=fillcolor)
-
-
-def add_transitions(dot: Digraph, transitions: Set[PetriNet.Transition], max_label_length: int) -> None:
-    for transition in transitions:
-        label = transition.label if hasattr(transition, 'label') else transition.name
-        wrapped_label = wrap_label(label, max_label_length)
-        fillcolor = transition.properties.get("color", "white")
-        dot.node(transition.name,
-                 shape='box',
-                 style='filled',
-                 fillcolor=fillcolor,
-                 label=wrapped_label)
-
-
-def add_arcs(dot: Digraph, arcs: Set[PetriNet.Arc], ranks: Dict[str, Set[str]]) -> None:
-    for arc in arcs:
-        dot.edge(arc.source.name, arc.target.name)
-        source_rank = ranks.get(arc.source.name, set())
-        source_rank.add(arc.target.name)
-        ranks[arc.source.name] = source_rank
+def _node_statement(element: Union[PetriNet.Place, PetriNet.Transition], shape: str, max_label_length: int) -> str:
+    label = element.label if hasattr(element, 'label') else element.name
+    attributes = {"fillcolor": element.properties.get("color", "white"), "shape": shape, "style": "filled"}
+    return f"\t{quote(element.name)}{attr_list(wrap_label(label, max_label_length), attributes)}\n"
 
 
-def apply_ranks(dot: Digraph, ranks: Dict[str, Set[str]]) -> None:
-    for rank, elements in ranks.items():
-        with dot.subgraph() as s:
-            s.attr(rank='same')
-            for element in elements:
-                s.node(element)
+def rank_groups(arcs: Iterable[PetriNet.Arc]) -> List[List[str]]:
+    """
+    The targets of the arcs of each source are put on the same rank. Graphviz merges groups sharing an element, so
+    they are merged here instead of being written one per source, and groups of a single element are left out as
+    they constrain nothing.
 
+    :return: The disjoint groups of element names on the same rank, each sorted, in the order of their first names.
+    """
+    parents: Dict[str, str] = {}
 
-def render_petri_net(net: PetriNet, render: bool = True) -> Digraph:
-    dot = Digraph(comment='ONLINE ORDER SIMPLE')
+    def root(name: str) -> str:
+        while parents[name] != name:
+            parents[name] = parents[parents[name]]
+            name = parents[name]
+        return name
 
-    default_width = "1"
-    default_height = "1"
+    first_targets: Dict[str, str] = {}
+    for arc in arcs:
+        target = arc.target.name
+        parents.setdefault(target, target)
+        first = first_targets.setdefault(arc.source.name, target)
+        parents[root(target)] = root(first)
+    groups: Dict[str, List[str]] = {}
+    for name in parents:
+        groups.setdefault(root(name), []).append(name)
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+
+def render_petri_net(net: PetriNet, render: bool = True, max_ranked_elements: int = 2000) -> Digraph:
+    """
+    Render a net as graphviz graph. Elements are written in the order of their names, so the same net always gives
+    the same DOT source and its layout can be cached by the source. The source is written in one pass instead of
+    through a call of the graph per statement.
+
+    :param net: The net.
+    :param render: Whether to show the rendered graph.
+    :param max_ranked_elements: Up to this number of places and transitions, the targets of each element are put on
+        the same rank, see `rank_groups`. Graphviz takes much longer to solve these constraints on larger nets, which
+        are laid out without them.
+    """
     max_label_length = 10
-
-    dot.attr(rankdir='LR')
-    dot.attr(splines='ortho')
-    dot.attr(kw="node", fixedsize='true')
-    dot.attr(kw="node", labelloc='c')
-    dot.attr(kw="node", width=default_width)
-    dot.attr(kw="node", height=default_height)
-    dot.attr(nodesep='3.0')
-    dot.attr(splines="ortho")
-
-    ranks = {}
-
-    add_places(dot, net.places, max_label_length)
-    add_transitions(dot, net.transitions, max_label_length)
-    add_arcs(dot, net.arcs, ranks)
-    apply_ranks(dot, ranks)
-
+    body = ["\trankdir=LR\n",
+            "\tsplines=ortho\n",
+            "\tnode [fixedsize=true]\n",
+            "\tnode [labelloc=c]\n",
+            "\tnode [width=1]\n",
+            "\tnode [height=1]\n",
+            "\tnodesep=3.0\n",
+            "\tsplines=ortho\n"]
+
+    body.extend(_node_statement(place, 'circle', max_label_length)
+                for place in sorted(net.places, key=lambda place: place.name))
+    body.extend(_node_statement(transition, 'box', max_label_length)
+                for transition in sorted(net.transitions, key=lambda transition: transition.name))
+    arcs = sorted(net.arcs, key=lambda arc: (arc.source.name, arc.target.name))
+    endpoints: Dict[str, str] = {}
+    for arc in arcs:
+        source = endpoints.get(arc.source.name) or endpoints.setdefault(arc.source.name, quote_edge(arc.source.name))
+        target = endpoints.get(arc.target.name) or endpoints.setdefault(arc.target.name, quote_edge(arc.target.name))
+        body.append(f"\t{source} -> {target}\n")
+    if len(net.places) + len(net.transitions) <= max_ranked_elements:
+        for group in rank_groups(arcs):
+            body.append("\t{\n\t\trank=same\n")
+            body.extend(f"\t\t{quote(name)}\n" for name in group)
+            body.append("\t}\n")
+
+    dot = Digraph(comment='ONLINE ORDER SIMPLE', body=body)
     if render:
         dot.view()
     return dot
 
+
+def layout_petri_net(dot: Digraph, job: Optional[LayoutJob] = None) -> dict:
+    """
+    Lay out a rendered net with graphviz.
+
+    :param dot: The graph from `render_petri_net`.
+    :param job: The background job running the layout, which can kill graphviz when it is cancelled.
+    :return: The graphviz JSON output with the positions and drawing instructions of all elements.
+    """
+    output = dot.pipe('json') if job is None else job.run_graphviz(dot, 'json')
+    return json.loads(output.decode())
+
+
+def graphviz_version(cache: Optional[DiskLRUCache] = None) -> str:
+    """
+    :param cache: A cache to keep the version of the executable in, so other processes need not run it either.
+    :return: The version of the installed graphviz, queried once per executable and process.
+    :raises ExecutableNotFound: If graphviz is not installed.
+    """
+    path = shutil.which("dot")
+    if path is None:
+        raise ExecutableNotFound(["dot"])
+    stat = os.stat(path)
+    key = f"graphviz-version:{path}:{stat.st_mtime_ns}:{stat.st_size}"
+    version = _graphviz_versions.get(key)
+    if version is None and cache is not None:
+        version = cache.get(key)
+    if version is None:
+        version = ".".join(map(str, graphviz.version()))
+        if cache is not None:
+            cache.put(key, version)
+    _graphviz_versions[key] = version
+    return version
+
+
+def layout_cache_key(dot: Digraph, version: str) -> str:
+    """
+    :return: The key of the layout of the graph by graphviz of the given version.
+    """
+    digest = blake2b(dot.source.encode(dot.encoding), digest_size=20).hexdigest()
+    return f"layout:{dot.engine}:{version}:{digest}"
+
+
+def layout_petri_net_cached(dot: Digraph, cache: DiskLRUCache, job: Optional[LayoutJob] = None) -> dict:
+    """
+    Lay out a rendered net, reusing the layout stored for the same DOT source and graphviz version, so graphviz only
+    runs for a graph it has not laid out before.
+
+    :param dot: The graph from `render_petri_net`.
+    :param cache: The cache of the layouts.
+    :param job: See `layout_petri_net`.
+    :return: The graphviz JSON output.
+    :raises ExecutableNotFound: If graphviz is not installed.
+    """
+    key = layout_cache_key(dot, graphviz_version(cache))
+    layout = cache.get(key)
+    if layout is None:
+        layout = layout_petri_net(dot, job)
+        cache.put(key, layout)
+    return layout
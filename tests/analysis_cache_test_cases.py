@@ -0,0 +1,120 @@
+import os
+import tempfile
+import time
+
+import pm4py
+from graphviz import ExecutableNotFound
+from pm4py import PetriNet
+from pm4py.objects.petri_net.utils.petri_utils import add_arc_from_to, remove_arc
+
+from src.parsers.parse_petri_net import identify_patterns, identify_patterns_cached
+from src.utils.disk_cache import DiskLRUCache
+from src.utils.net_fingerprint import net_fingerprint
+from src.utils.petri_net_renderer import layout_cache_key, layout_petri_net_cached, render_petri_net
+from tests.parse_petri_net_test_file import online_order_petri_net
+
+MODELS = os.path.join(os.path.dirname(__file__), os.pardir, "src", "ui")
+
+
+def by_name(result) -> tuple:
+    """
+    :return: The patterns by element name, with chains and the connected elements of splits unordered.
+    """
+    seq, and_patterns, or_patterns = result
+    return ({tuple(element.name for element in chain) for chain in seq},
+            {(transition.name, frozenset(place.name for place in places)) for transition, places in and_patterns},
+            {(place.name, frozenset(t.name for t in transitions)) for place, transitions in or_patterns})
+
+
+def renamed(net: PetriNet) -> PetriNet:
+    """
+    :return: A copy of the net with new element names and objects, in a different order.
+    """
+    copy = PetriNet(net.name)
+    elements = {}
+    for index, place in enumerate(sorted(net.places, key=lambda place: place.name, reverse=True)):
+        elements[place] = PetriNet.Place(f"place {index}")
+        copy.places.add(elements[place])
+    for index, transition in enumerate(sorted(net.transitions, key=lambda transition: transition.name, reverse=True)):
+        elements[transition] = PetriNet.Transition(f"transition {index}", transition.label)
+        copy.transitions.add(elements[transition])
+    for arc in net.arcs:
+        add_arc_from_to(elements[arc.source], elements[arc.target], copy)
+    return copy
+
+
+if __name__ == "__main__":
+    model = os.path.join(MODELS, "model.pnml")
+    first, _, _ = pm4py.read_pnml(model)
+    second, _, _ = pm4py.read_pnml(model)
+    status = "Success" if net_fingerprint(first) == net_fingerprint(second) else "Error - fingerprints differ"
+    print(f"Test Case 1: {status}")
+
+    # Names are part of the default fingerprint, the structure without names is invariant under renaming
+    net = online_order_petri_net()
+    copy = renamed(net)
+    same = net_fingerprint(net, include_names=False) == net_fingerprint(copy, include_names=False)
+    status = "Success" if same and net_fingerprint(net) != net_fingerprint(copy) else "Error - unexpected fingerprints"
+    print(f"Test Case 2: {status}")
+
+    # Removing one arc changes the fingerprint
+    arc = next(arc for arc in copy.arcs if arc.target.name == "place 0")
+    before = net_fingerprint(copy, include_names=False)
+    remove_arc(copy, arc)
+    status = "Success" if net_fingerprint(copy, include_names=False) != before else "Error - fingerprint unchanged"
+    print(f"Test Case 3: {status}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskLRUCache(directory)
+        expected = by_name(identify_patterns(first.places, first.transitions, first.arcs))
+        cached = [by_name(identify_patterns_cached(net, cache)) for net in (first, second)]
+        status = "Success" if cached == [expected, expected] and (cache.hits, cache.misses) == (1, 1) \
+            else f"Error - {cache.hits} hits, {cache.misses} misses"
+        print(f"Test Case 4: {status}")
+
+        # Another instance on the same directory sees the entries, a corrupted entry is a miss
+        reopened = DiskLRUCache(directory)
+        seq, _, _ = identify_patterns_cached(second, reopened)
+        for entry in os.listdir(directory):
+            with open(os.path.join(directory, entry), "wb") as file:
+                file.write(b"not a pickle")
+        identify_patterns_cached(second, reopened)
+        status = "Success" if (reopened.hits, reopened.misses) == (1, 1) and all(
+            isinstance(chain[0], PetriNet.Place) and chain[0] in second.places for chain in seq) \
+            else f"Error - {reopened.hits} hits, {reopened.misses} misses"
+        print(f"Test Case 5: {status}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskLRUCache(directory, max_bytes=3_000)
+        for key in ("a", "b", "c"):
+            cache.put(key, b"x" * 900)
+            time.sleep(0.01)
+        cache.get("a")
+        cache.put("d", b"x" * 900)
+        found = [key for key in ("a", "b", "c", "d") if cache.get(key) is not None]
+        status = "Success" if found == ["a", "c", "d"] and cache.size <= 3_000 else f"Error - kept {found}"
+        print(f"Test Case 6: {status}")
+
+        try:
+            DiskLRUCache(directory, max_bytes=0)
+            print("Test Case 7: Error - expected a ValueError")
+        except ValueError:
+            print("Test Case 7: Success")
+
+        net = online_order_petri_net()
+        try:
+            layouts = [layout_petri_net_cached(render_petri_net(net, False), cache) for _ in range(2)]
+            status = "Success" if layouts[0] == layouts[1] and cache.hits >= 1 else "Error - layout not reused"
+        except ExecutableNotFound:
+            status = "Skipped - graphviz is not installed"
+        print(f"Test Case 8: {status}")
+
+        # Layouts are keyed by the DOT source, which is the same for separately built copies of a net
+        dots = [render_petri_net(online_order_petri_net(), False) for _ in range(2)]
+        keys = {layout_cache_key(dot, "9.0.0") for dot in dots}
+        neato = render_petri_net(online_order_petri_net(), False)
+        neato.engine = "neato"
+        other_keys = {layout_cache_key(dots[0], "10.0.1"), layout_cache_key(neato, "9.0.0")}
+        status = "Success" if len(keys) == 1 and not keys & other_keys and len(other_keys) == 2 \
+            else "Error - unexpected layout keys"
+        print(f"Test Case 9: {status}")
@@ -0,0 +1,68 @@
+import random
+import time
+import tracemalloc
+from typing import Dict
+
+import numpy as np
+
+from src.streaming.case_store import CaseStateStore
+
+
+class CaseState:
+    """
+    Per-case state as one Python object per case, for comparison.
+    """
+
+    def __init__(self, marking_size: int):
+        self.last_activity = -1
+        self.last_timestamp = 0.0
+        self.marking = np.zeros(marking_size, dtype=np.int32)
+
+
+def arrivals(event_count: int, seed: int = 1):
+    """
+    :return: Events of cases arriving at a steady rate, each active for a random number of events.
+    """
+    rng = random.Random(seed)
+    open_cases, next_case = [], 0
+    for step in range(event_count):
+        if not open_cases or rng.random() < 0.2:
+            open_cases.append(next_case)
+            next_case += 1
+        index = rng.randrange(len(open_cases))
+        case_id = open_cases[index]
+        if rng.random() < 0.15:
+            open_cases[index] = open_cases[-1]
+            open_cases.pop()
+        yield case_id, rng.randrange(30), float(step)
+
+
+if __name__ == "__main__":
+    marking_size = 16
+    for case_count in (100_000, 1_000_000):
+        tracemalloc.start()
+        states: Dict[int, CaseState] = {}
+        for case_id in range(case_count):
+            states[case_id] = CaseState(marking_size)
+        objects = tracemalloc.get_traced_memory()[1]
+        del states
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        store = CaseStateStore(case_count, marking_size=marking_size)
+        for case_id in range(case_count):
+            store.update(case_id, 0, 0.0)
+        arrays = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{case_count} open cases: dict of objects {objects / 2 ** 20:.1f} MiB, store {arrays / 2 ** 20:.1f} MiB "
+              f"(reported {store.memory_usage['total'] / 2 ** 20:.1f} MiB)")
+
+    events = list(arrivals(2_000_000))
+    store = CaseStateStore(50_000, marking_size=marking_size, ttl=100_000.0)
+    start = time.perf_counter()
+    update = store.update
+    for case_id, activity, timestamp in events:
+        update(case_id, activity, timestamp)
+    elapsed = time.perf_counter() - start
+    print(f"{len(events)} events: {len(events) / elapsed:,.0f} updates/s, {len(store)} open cases, "
+          f"evictions {store.evictions}")
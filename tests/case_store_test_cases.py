@@ -0,0 +1,65 @@
+import random
+
+from src.streaming.case_store import CaseStateStore
+
+if __name__ == "__main__":
+    # The least recently updated case is evicted from a full store and its slot reused
+    evicted = []
+    store = CaseStateStore(3, marking_size=4, on_evict=lambda case_id, slot, reason: evicted.append(
+        (case_id, reason, store.last_activity(slot))))
+    for case_id, activity in ((1, 10), (2, 20), (3, 30), (1, 11)):
+        store.update(case_id, activity, float(case_id))
+    slot = store.update(4, 40, 4.0)
+    status = "Success" if evicted == [(2, "lru", 20)] and list(store) == [3, 1, 4] \
+        and store.slot_of(4) == slot and not store.marking(slot).any() else f"Error - evicted {evicted}"
+    print(f"Test Case 1: {status}")
+
+    # Markings are writable views, fields are kept per case
+    store.marking(store.slot_of(1))[2] = 5
+    slot = store.slot_of(1)
+    status = "Success" if store.markings[slot, 2] == 5 and store.last_activity(slot) == 11 \
+        and store.last_timestamp(slot) == 1.0 else "Error - unexpected state"
+    print(f"Test Case 2: {status}")
+
+    # Cases not updated within the TTL expire when time advances
+    store = CaseStateStore(100, ttl=10.0)
+    for case_id in range(5):
+        store.update(case_id, 0, float(case_id * 5))
+    store.update(0, 1, 20.0)
+    status = "Success" if list(store) == [2, 3, 4, 0] and store.evictions["ttl"] == 2 and store.expire(100.0) == 4 \
+        and len(store) == 0 else f"Error - open cases {list(store)}"
+    print(f"Test Case 3: {status}")
+
+    # Under random arrivals and removals the store never exceeds its capacity and agrees with a reference
+    rng = random.Random(3)
+    store = CaseStateStore(50, ttl=30.0)
+    reference = {}
+    for step in range(20_000):
+        case_id = rng.randrange(200)
+        if rng.random() < 0.1:
+            store.remove(case_id)
+            reference.pop(case_id, None)
+            continue
+        store.update(case_id, step, float(step))
+        reference[case_id] = step
+        reference = {case: last for case, last in reference.items() if last >= step - 30}
+        while len(reference) > 50:
+            del reference[min(reference, key=reference.get)]
+    same = {case_id: store.last_activity(store.slot_of(case_id)) for case_id in store} == reference
+    print(f"Test Case 4: {'Success' if same and len(store) <= 50 else 'Error - the store differs'}")
+
+    # The memory is allocated up front and does not change with the cases, also across evictions
+    store = CaseStateStore(10_000, marking_size=8)
+    before = store.memory_usage
+    for case_id in range(30_000):
+        store.update(case_id * 7919, 1, 0.0)
+    after = store.memory_usage
+    status = "Success" if before == after and after["markings"] == 10_000 * 8 * 4 and len(store) == 10_000 \
+        and all(case_id * 7919 in store for case_id in range(20_000, 30_000)) else "Error - unexpected memory use"
+    print(f"Test Case 5: {status}")
+
+    try:
+        CaseStateStore(0)
+        print("Test Case 6: Error - expected a ValueError")
+    except ValueError:
+        print("Test Case 6: Success")
@@ -0,0 +1,31 @@
+import time
+
+import pandas as pd
+
+from src.cep.automaton import PatternMatcher, compile_pattern
+from src.cep.batch import EncodedLog
+from src.parsers.pattern_parser import parse_pattern
+from tests.cep_batch_test_cases import RANDOM_PATTERNS
+from tests.cep_benchmark import generate_events
+
+if __name__ == "__main__":
+    events = generate_events(2_000_000, 20_000)
+    frame = pd.DataFrame(events, columns=["case:concept:name", "concept:name", "time:timestamp"])
+    start = time.perf_counter()
+    log = EncodedLog.from_dataframe(frame)
+    print(f"encoding {len(events):,} events: {time.perf_counter() - start:.2f}s")
+
+    # The streaming matcher only runs on a tenth of the log to keep the benchmark short
+    streamed = events[:len(events) // 10]
+    for pattern in RANDOM_PATTERNS:
+        node = parse_pattern(pattern)
+        matcher = PatternMatcher(compile_pattern(node))
+        start = time.perf_counter()
+        for _ in matcher.run(streamed):
+            pass
+        streaming = len(streamed) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        match_count = len(log.match_ends(node)[0])
+        batch = len(events) / (time.perf_counter() - start)
+        print(f"{pattern}: {match_count:,} matches, streaming {streaming:,.0f} events/s, batch {batch:,.0f} events/s, "
+              f"{batch / streaming:.0f}x")
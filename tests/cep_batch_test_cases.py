@@ -0,0 +1,70 @@
+import random
+
+import pandas as pd
+
+from src.cep.automaton import PatternMatcher, compile_pattern
+from src.cep.batch import EncodedLog, evaluate_patterns
+from src.parsers.pattern_parser import parse_pattern
+from tests.cep_benchmark import generate_events
+from tests.cep_test_cases import TEST_CASES, TRACE
+
+# Patterns the batch evaluation has to agree on with the streaming matcher
+RANDOM_PATTERNS = [
+    "SEQ(a0, a1, a2)",
+    "SEQ(a0, NOT(a3), a1)",
+    "SEQ(a0, *(OR(a1, a2, a3)), a4)",
+    "AND(SEQ(a0, a1), SEQ(a2, NOT(a5), a3), OR(a4, a6))",
+    "SEQ(AND(a0, a1), NOT(SEQ(a2, a3)), OR(a4, SEQ(a5, a6)), a1)",
+    "SEQ(OR(SEQ(a0, a1), a2), NOT(a3), a4, AND(a5, a6))",
+    "SEQ(a1, NOT(a2), NOT(SEQ(a3, a4)), a5)",
+    "SEQ(a0, NOT(AND(a1, a2)), SEQ(a3, *(a4, a5)))",
+]
+
+
+def sorted_matches(matches) -> list:
+    return sorted((match.case_id, match.start, match.end) for match in matches)
+
+
+if __name__ == "__main__":
+    log = EncodedLog(*zip(*TRACE))
+    failed = [pattern for pattern, expected in TEST_CASES
+              if sorted_matches(log.matches(parse_pattern(pattern))) != sorted(expected)]
+    print(f"Test Case 1: {'Success' if not failed else f'Error - {failed}'}")
+
+    # Out-of-order logs give the same matches as streaming them case by case in time order
+    failed = []
+    for seed in range(5):
+        events = generate_events(3_000, 20, activity_count=7, seed=seed)
+        shuffled = random.Random(seed).sample(events, len(events))
+        log = EncodedLog(*zip(*shuffled))
+        for pattern in RANDOM_PATTERNS:
+            expected = sorted_matches(PatternMatcher(compile_pattern(parse_pattern(pattern))).run(events))
+            if sorted_matches(log.matches(parse_pattern(pattern))) != expected or not expected:
+                failed.append((seed, pattern))
+    print(f"Test Case 2: {'Success' if not failed else f'Error - {failed}'}")
+
+    frame = pd.DataFrame({"case:concept:name": ["b", "a", "a", "b", "a", "c"],
+                          "concept:name": ["x", "y", "x", "y", "x", "x"],
+                          "time:timestamp": pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-01", "2024-01-04",
+                                                            "2024-01-05", "2024-01-01"])})
+    result = EncodedLog.from_dataframe(frame).evaluate(parse_pattern("SEQ(x, y)"))
+    status = "Success" if list(result.index) == ["b", "a", "c"] and result["matched"].tolist() == [True, True, False] \
+        and result["matches"].tolist() == [1, 1, 0] and result.loc["a", "start"] == pd.Timestamp("2024-01-01") \
+        and result.loc["a", "end"] == pd.Timestamp("2024-01-03") and pd.isna(result.loc["c", "end"]) \
+        else f"Error - {result}"
+    print(f"Test Case 3: {status}")
+
+    table = evaluate_patterns(frame, {"xy": parse_pattern("SEQ(x, y)"), "yx": parse_pattern("SEQ(y, x)")})
+    status = "Success" if table.to_dict("list") == {"xy": [True, True, False], "yx": [False, True, False]} \
+        else f"Error - {table}"
+    print(f"Test Case 4: {status}")
+
+    # An AND behind a NOT may begin with either branch, which the batch evaluation cannot tell apart
+    failed = []
+    for pattern in ["SEQ(a, NOT(b), AND(c, d))", "SEQ(NOT(b), c)", "AND(a, NOT(b))"]:
+        try:
+            log.matches(parse_pattern(pattern))
+            failed.append(pattern)
+        except ValueError:
+            pass
+    print(f"Test Case 5: {'Success' if not failed else f'Error - no ValueError for {failed}'}")
@@ -0,0 +1,43 @@
+import random
+import time
+from typing import List, Tuple
+
+from src.cep.automaton import PatternMatcher, compile_pattern
+from src.parsers.pattern_parser import parse_pattern
+
+PATTERNS: List[str] = [
+    "SEQ(a0, a1, a2)",
+    "SEQ(a0, NOT(a3), a4, AND(a1, a2))",
+    "SEQ(a0, *(OR(a1, a2, a3)), a4)",
+    "AND(SEQ(a0, a1), SEQ(a2, NOT(a5), a3), OR(a4, a6))",
+]
+
+
+def generate_events(event_count: int, case_count: int, activity_count: int = 10,
+                    seed: int = 42) -> List[Tuple[int, str, float]]:
+    """
+    Generate a random, interleaved event stream.
+
+    :param event_count: The number of events.
+    :param case_count: The number of concurrently running cases.
+    :param activity_count: The number of distinct activities a0, a1, ...
+    :param seed: The seed of the random generator.
+    :return: (case_id, activity, timestamp) tuples ordered by timestamp.
+    """
+    rng = random.Random(seed)
+    return [(rng.randrange(case_count), f"a{rng.randrange(activity_count)}", float(i)) for i in range(event_count)]
+
+
+if __name__ == "__main__":
+    # Without a window every case stays open; with one, idle cases are evicted as the stream moves on
+    events = generate_events(200_000, 1_000) + generate_events(200_000, 1_000, seed=43)
+    events = [(case_id + (1_000 if position >= 200_000 else 0), activity, float(position))
+              for position, (case_id, activity, _) in enumerate(events)]
+    for window in [None, 5_000.0]:
+        for pattern in PATTERNS:
+            matcher = PatternMatcher(compile_pattern(parse_pattern(pattern)), window=window)
+            start = time.perf_counter()
+            match_count = sum(1 for _ in matcher.run(events))
+            elapsed = time.perf_counter() - start
+            print(f"{pattern:<55} window {window}: {len(events) / elapsed:>10,.0f} events/s, "
+                  f"{match_count:>7} matches, {matcher.open_cases} open cases")
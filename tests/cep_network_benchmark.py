@@ -0,0 +1,75 @@
+import random
+import time
+from typing import List
+
+from src.cep.automaton import PatternMatcher, compile_pattern
+from src.cep.network import PatternNetwork
+from src.parsers.pattern_parser import parse_pattern
+from tests.cep_benchmark import generate_events
+
+SHARED_SUBPATTERNS: List[str] = [
+    "OR(a0, a1)",
+    "OR(a2, a3)",
+    "AND(a4, a5)",
+    "SEQ(a6, a7)",
+    "SEQ(a0, NOT(a8), a9)",
+]
+
+
+def generate_patterns(pattern_count: int, seed: int = 42) -> List[str]:
+    """
+    Generate patterns that combine a small pool of shared subpatterns, like the expanded templates of
+    `tests/parser_test_cases.py` do.
+
+    :param pattern_count: The number of patterns.
+    :param seed: The seed of the random generator.
+    :return: The pattern strings; repetitions are possible.
+    """
+    rng = random.Random(seed)
+    operators = ["AND", "OR", "SEQ"]
+    patterns = []
+    for _ in range(pattern_count):
+        outer, inner = rng.choice(operators), rng.choice(operators)
+        first, second, third = rng.sample(SHARED_SUBPATTERNS, 3)
+        patterns.append(f"{outer}({inner}({first}, {second}), {third})")
+    return patterns
+
+
+if __name__ == "__main__":
+    events = generate_events(10_000, 200, activity_count=20)
+    for pattern_count in [1, 10, 100, 1_000]:
+        patterns = [parse_pattern(pattern) for pattern in generate_patterns(pattern_count)]
+
+        network = PatternNetwork()
+        for pattern_id, pattern in enumerate(patterns):
+            network.add_pattern(pattern_id, pattern)
+        start = time.perf_counter()
+        network_matches = sum(1 for _ in network.run(events))
+        network_elapsed = time.perf_counter() - start
+
+        matchers = [PatternMatcher(compile_pattern(pattern), pattern_id) for pattern_id, pattern in enumerate(patterns)]
+        start = time.perf_counter()
+        matcher_matches = 0
+        for case_id, activity, timestamp in events:
+            for matcher in matchers:
+                matcher_matches += len(matcher.process(case_id, activity, timestamp))
+        matchers_elapsed = time.perf_counter() - start
+
+        print(f"{pattern_count:>5} patterns, {network.node_count:>4} shared nodes: "
+              f"network {len(events) / network_elapsed:>10,.0f} events/s, "
+              f"one matcher per pattern {len(events) / matchers_elapsed:>10,.0f} events/s "
+              f"({network_matches} / {matcher_matches} matches)")
+
+    # The same patterns registered again, e.g. once per tenant, add no node: only their matches cost anything
+    distinct = [parse_pattern(pattern) for pattern in dict.fromkeys(generate_patterns(20))]
+    for copies in [1, 10, 100]:
+        network = PatternNetwork()
+        for copy in range(copies):
+            for number, pattern in enumerate(distinct):
+                network.add_pattern((copy, number), pattern)
+        start = time.perf_counter()
+        network_matches = sum(1 for _ in network.run(events))
+        network_elapsed = time.perf_counter() - start
+        print(f"{len(network.pattern_ids):>5} patterns, {network.node_count:>4} shared nodes: "
+              f"network {len(events) / network_elapsed:>10,.0f} events/s, "
+              f"({network_matches} matches)")
@@ -0,0 +1,66 @@
+import random
+import time
+from typing import List, Tuple
+
+from src.cep.automaton import PatternMatcher, compile_pattern
+from src.cep.network import PatternNetwork
+from src.cep.planner import PatternPlanner, SelectivityStatistics, normalize
+from src.parsers.pattern_parser import parse_pattern
+from tests.cep_network_benchmark import generate_patterns
+
+# Shapes of expanded templates, written as they come out of the templates
+PATTERNS: List[str] = [
+    "AND(AND(a0, a1), AND(a2, a19))",
+    "OR(a0, AND(a1, a0), OR(a2, OR(a3, a4)))",
+    "AND(OR(a0, a1, a0), AND(a18, AND(a2, a19)))",
+    "SEQ(SEQ(a0, a1), SEQ(a2, AND(a17, AND(a3, a18))))",
+]
+
+
+def generate_skewed_events(event_count: int, case_count: int, activity_count: int = 20,
+                           seed: int = 42) -> List[Tuple[int, str, float]]:
+    """
+    Generate an interleaved event stream in which activity ai occurs about i + 1 times less often than a0.
+
+    :param event_count: The number of events.
+    :param case_count: The number of concurrently running cases.
+    :param activity_count: The number of distinct activities a0, a1, ...
+    :param seed: The seed of the random generator.
+    :return: (case_id, activity, timestamp) tuples ordered by timestamp.
+    """
+    rng = random.Random(seed)
+    activities = [f"a{i}" for i in range(activity_count)]
+    weights = [1 / (i + 1) for i in range(activity_count)]
+    chosen = rng.choices(activities, weights, k=event_count)
+    return [(rng.randrange(case_count), activity, float(i)) for i, activity in enumerate(chosen)]
+
+
+if __name__ == "__main__":
+    events = generate_skewed_events(100_000, 500)
+    warmup, measured = events[:10_000], events[10_000:]
+    statistics = SelectivityStatistics(horizon=50_000)
+    statistics.observe_events(warmup)
+    planner = PatternPlanner(statistics)
+
+    for pattern in PATTERNS:
+        results = []
+        # Normalizing alone separates what flattening gains from what ordering by frequency gains
+        for name, node in [("as written", parse_pattern(pattern)), ("normalized", normalize(parse_pattern(pattern))),
+                           ("planned", planner.plan(parse_pattern(pattern)))]:
+            matcher = PatternMatcher(compile_pattern(node))
+            start = time.perf_counter()
+            match_count = sum(1 for _ in matcher.run(measured))
+            elapsed = time.perf_counter() - start
+            results.append(f"{name} {len(measured) / elapsed:>9,.0f} events/s ({match_count} matches)")
+        print(f"{pattern:<52} {', '.join(results)}")
+
+    patterns = [parse_pattern(pattern) for pattern in generate_patterns(1_000)]
+    for name, network in [("as written", PatternNetwork()), ("normalized", PatternNetwork(planner=PatternPlanner())),
+                          ("planned", PatternNetwork(planner=planner))]:
+        for pattern_id, pattern in enumerate(patterns):
+            network.add_pattern(pattern_id, pattern)
+        start = time.perf_counter()
+        match_count = sum(1 for _ in network.run(measured[:5_000]))
+        elapsed = time.perf_counter() - start
+        print(f"Network of 1000 patterns, {name:<10}: {network.node_count:>4} nodes, "
+              f"{5_000 / elapsed:>9,.0f} events/s ({match_count} matches)")
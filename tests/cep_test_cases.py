@@ -0,0 +1,197 @@
+import random
+from typing import List, Tuple
+
+from src.cep.automaton import PatternMatcher, compile_pattern, compile_query
+from src.cep.network import PatternNetwork
+from src.cep.planner import PatternPlanner, SelectivityStatistics, normalize
+from src.parsers.pattern_parser import parse_pattern
+from src.parsers.query_parser import parse_query
+from tests.cep_benchmark import generate_events
+
+TRACE: List[Tuple[str, str, float]] = [
+    ("case1", "register", 1.0),
+    ("case2", "register", 2.0),
+    ("case1", "check", 3.0),
+    ("case2", "cancel", 4.0),
+    ("case1", "pay", 5.0),
+    ("case2", "check", 6.0),
+    ("case2", "pay", 7.0),
+    ("case1", "ship", 8.0),
+]
+
+# (pattern, expected (case, start, end) matches in the order they are completed)
+TEST_CASES: List[Tuple[str, List[Tuple[str, float, float]]]] = [
+    ("SEQ(register, pay)", [("case1", 1.0, 5.0), ("case2", 2.0, 7.0)]),
+    ("AND(pay, check)", [("case1", 3.0, 5.0), ("case2", 6.0, 7.0)]),
+    ("OR(cancel, ship)", [("case2", 4.0, 4.0), ("case1", 8.0, 8.0)]),
+    ("SEQ(register, NOT(cancel), check)", [("case1", 1.0, 3.0)]),
+    ("SEQ(register, *(OR(check, pay)), ship)", [("case1", 1.0, 8.0)]),
+    ("SEQ(register, AND(check, pay))", [("case1", 1.0, 5.0), ("case2", 2.0, 7.0)]),
+    ("SEQ(register, NOT(check), pay)", []),
+]
+
+# (pattern, events of one case as (activity, timestamp), expected (start, end) matches): full-history elements and
+# negated subpatterns that need matches of a shared prefix the network must not have forgotten
+NESTED_MEMORY_CASES: List[Tuple[str, List[Tuple[str, float]], List[Tuple[float, float]]]] = [
+    ("SEQ(d, NOT(SEQ(c, d)), *(d))", [("d", 1.0), ("d", 3.0), ("c", 8.0), ("d", 10.0)], [(1.0, 3.0), (1.0, 10.0)]),
+    ("SEQ(a, NOT(d), SEQ(b, a, b))", [("a", 1.0), ("b", 2.0), ("a", 6.0), ("a", 7.0), ("b", 8.0)], [(1.0, 8.0)]),
+    ("SEQ(a, NOT(b), SEQ(d, NOT(AND(a, d)), a))",
+     [("d", 2.0), ("a", 3.0), ("a", 4.0), ("d", 5.0), ("a", 6.0), ("a", 9.0)], [(4.0, 6.0), (4.0, 9.0)]),
+]
+
+
+def random_pattern(rng: random.Random, depth: int) -> str:
+    """
+    :return: A random pattern over the activities a0 to a3, with NOT between elements of SEQs nested in any operator.
+    """
+    if depth == 0 or rng.random() < 0.3:
+        return f"a{rng.randrange(4)}"
+    operator = rng.choice(["SEQ", "NOT", "AND", "OR", "*"])
+    if operator == "NOT":
+        return f"SEQ({random_pattern(rng, depth - 1)}, NOT({random_pattern(rng, depth - 1)}), " \
+               f"{random_pattern(rng, depth - 1)})"
+    if operator == "*":
+        return f"*({', '.join(random_pattern(rng, depth - 1) for _ in range(rng.randint(1, 2)))})"
+    return f"{operator}({', '.join(random_pattern(rng, depth - 1) for _ in range(rng.randint(2, 3)))})"
+
+
+PREDICATES = {
+    "at_most": lambda value, limit: value <= limit,
+    "is_case": lambda case_id, expected: case_id == expected,
+}
+
+# (query, expected (case, start, end) matches)
+QUERY_CASES: List[Tuple[str, List[Tuple[str, float, float]]]] = [
+    ("PATTERN SEQ(register, pay) WITHIN 4 seconds", [("case1", 1.0, 5.0)]),
+    ("PATTERN SEQ(register, pay) WITHIN 0.1 minutes", [("case1", 1.0, 5.0), ("case2", 2.0, 7.0)]),
+    ("PATTERN SEQ(register, pay) WHERE is_case(case_id, case2)", [("case2", 2.0, 7.0)]),
+    ("PATTERN AND(check, pay) WHERE (at_most(duration, 1) OR AND NOT is_case(case_id, case1) OR AND)",
+     [("case2", 6.0, 7.0)]),
+]
+
+# (pattern, expected normalized pattern)
+NORMALIZATION_CASES: List[Tuple[str, str]] = [
+    ("AND(AND(condition1, condition2), AND(condition3, condition4))",
+     "AND(condition1, condition2, condition3, condition4)"),
+    ("OR(event1, AND(event2, event1), OR(event1, event3))", "OR(event1, AND(event2, event1), event3)"),
+    ("AND(OR(event1, event1), SEQ(SEQ(event2, event3), *(*(event4))))", "AND(event1, SEQ(event2, event3, *(event4)))"),
+    ("SEQ(event1, NOT(event2), AND(event3, event3))", "SEQ(event1, NOT(event2), event3)"),
+]
+
+INVALID_PATTERNS: List[str] = [
+    "NOT(cancel)",
+    "SEQ(NOT(cancel), pay)",
+    "SEQ(register, NOT(SEQ(check, NOT(cancel), pay)), ship)",
+    "AND(register, {{ event.name }})",
+    "SEQ(register, NOT(cancel), AND(check, pay))",
+    "SEQ(register, NOT(cancel), OR(ship, AND(check, pay)))",
+]
+
+if __name__ == "__main__":
+    for i, (pattern, expected) in enumerate(TEST_CASES):
+        matcher = PatternMatcher(compile_pattern(parse_pattern(pattern)))
+        found = [(match.case_id, match.start, match.end) for match in matcher.run(TRACE)]
+        status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+        print(f"Test Case {i + 1}: {status}")
+
+    for i, (query, expected) in enumerate(QUERY_CASES):
+        matcher = compile_query(parse_query(query), PREDICATES)
+        found = [(match.case_id, match.start, match.end) for match in matcher.run(TRACE)]
+        network = PatternNetwork()
+        network.add_query(i, parse_query(query), PREDICATES)
+        found_by_network = [(match.case_id, match.start, match.end) for match in network.run(TRACE)]
+        status = "Success" if found == expected == found_by_network \
+            else f"Error - expected {expected}, got {found} and {found_by_network}"
+        print(f"Query Test Case {i + 1}: {status}")
+
+    # All test patterns registered in one network that shares their common subpatterns
+    network = PatternNetwork()
+    for i, (pattern, _) in enumerate(TEST_CASES):
+        network.add_pattern(i, parse_pattern(pattern))
+    found_per_pattern = {i: [] for i in range(len(TEST_CASES))}
+    for match in network.run(TRACE):
+        found_per_pattern[match.pattern].append((match.case_id, match.start, match.end))
+    for i, (_, expected) in enumerate(TEST_CASES):
+        found = found_per_pattern[i]
+        status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+        print(f"Network Test Case {i + 1}: {status}")
+    print(f"Network nodes: {network.node_count}")
+
+    # Without a window only the intervals a pattern can still use are kept, which must not change the matches
+    events = generate_events(20_000, 7, activity_count=6)
+    patterns = ["SEQ(a0, a1)", "SEQ(a0, AND(a1, a2))", "SEQ(SEQ(a0, a1), SEQ(AND(a2, a3), a4))",
+                "SEQ(OR(a1, SEQ(a2, a3)), AND(a4, SEQ(a5, a1)))", "SEQ(AND(a0, a1), NOT(a2), a3, *(a4, a5))"]
+    network = PatternNetwork()
+    for i, pattern in enumerate(patterns):
+        network.add_pattern(i, parse_pattern(pattern))
+    found_per_pattern = {i: [] for i in range(len(patterns))}
+    for match in network.run(events):
+        found_per_pattern[match.pattern].append(match)
+    failed = [pattern for i, pattern in enumerate(patterns)
+              if found_per_pattern[i] != list(PatternMatcher(compile_pattern(parse_pattern(pattern)), i).run(events))]
+    kept = max(len(memory.ends) for case in network._cases.values() for memory in case.memories.values())
+    or_network = PatternNetwork()
+    or_network.add_pattern(0, parse_pattern("OR(a0, a1)"))
+    or_matches = sum(1 for _ in or_network.run(events))
+    status = "Success" if not failed and kept <= 50 and or_matches and not or_network.open_cases \
+        else f"Error - differing matches for {failed}, {kept} intervals kept, {or_network.open_cases} open cases"
+    print(f"Network Memory Test Case: {status}")
+
+    for i, (pattern, events, expected) in enumerate(NESTED_MEMORY_CASES):
+        network = PatternNetwork()
+        network.add_pattern(i, parse_pattern(pattern))
+        found = [(match.start, match.end) for match in network.run(("case1", activity, timestamp)
+                                                                    for activity, timestamp in events)]
+        status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+        print(f"Nested Memory Test Case {i + 1}: {status}")
+
+    # Random patterns, several of them sharing one network, report the same matches as the automaton
+    rng = random.Random(7)
+    failed = []
+    for seed in range(100):
+        patterns = []
+        while len(patterns) < 5:
+            pattern = random_pattern(rng, 4)
+            try:
+                compile_pattern(parse_pattern(pattern))
+                PatternNetwork().add_pattern(0, parse_pattern(pattern))
+            except ValueError:
+                continue
+            patterns.append(pattern)
+        events = generate_events(60, 3, activity_count=4, seed=seed)
+        network = PatternNetwork()
+        for i, pattern in enumerate(patterns):
+            network.add_pattern(i, parse_pattern(pattern))
+        found_per_pattern = {i: [] for i in range(len(patterns))}
+        for match in network.run(events):
+            found_per_pattern[match.pattern].append(match)
+        failed.extend(pattern for i, pattern in enumerate(patterns) if found_per_pattern[i]
+                      != list(PatternMatcher(compile_pattern(parse_pattern(pattern)), i).run(events)))
+    status = "Success" if not failed else f"Error - differing matches for {failed}"
+    print(f"Random Network Test Case: {status}")
+
+    for i, (pattern, expected) in enumerate(NORMALIZATION_CASES):
+        found = repr(normalize(parse_pattern(pattern)))
+        status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+        print(f"Normalization Test Case {i + 1}: {status}")
+
+    # Planned patterns, ordered by the frequencies of the trace, report the same matches
+    statistics = SelectivityStatistics()
+    statistics.observe_events(TRACE)
+    network = PatternNetwork(planner=PatternPlanner(statistics))
+    for i, (pattern, _) in enumerate(TEST_CASES):
+        network.add_pattern(i, parse_pattern(pattern))
+    found_per_pattern = {i: [] for i in range(len(TEST_CASES))}
+    for match in network.run(TRACE):
+        found_per_pattern[match.pattern].append((match.case_id, match.start, match.end))
+    for i, (_, expected) in enumerate(TEST_CASES):
+        found = found_per_pattern[i]
+        status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+        print(f"Planned Network Test Case {i + 1}: {status}")
+
+    for i, pattern in enumerate(INVALID_PATTERNS):
+        try:
+            compile_pattern(parse_pattern(pattern))
+            print(f"Invalid Pattern {i + 1}: Error - compiled without complaint")
+        except ValueError as e:
+            print(f"Invalid Pattern {i + 1}: Success - {e}")
@@ -0,0 +1,35 @@
+import asyncio
+import time
+import tracemalloc
+
+from src.cep.events import Event
+from src.discovery.online_dfg import OnlineDFG
+from src.streaming.event_sources import EventHub
+from tests.event_sources_test_cases import from_list
+from tests.online_dfg_test_cases import interleaved_log
+
+
+async def fan_out(events, consumers: int, maxsize: int, policy: str) -> dict:
+    hub = EventHub(maxsize=maxsize, policy=policy)
+    for _ in range(consumers):
+        online_dfg = OnlineDFG()
+        hub.subscribe(lambda event, online_dfg=online_dfg: online_dfg.process(*event))
+    return await hub.run(from_list(events))
+
+
+if __name__ == "__main__":
+    events = [Event(*event) for event in interleaved_log(50_000)]
+    for consumers in (1, 3):
+        for maxsize, policy in ((64, "block"), (10_000, "block"), (64, "drop_oldest")):
+            start = time.perf_counter()
+            statistics = asyncio.run(fan_out(events, consumers, maxsize, policy))
+            elapsed = time.perf_counter() - start
+            # The queues bound the memory; measured in a second run, as tracing slows it down
+            tracemalloc.start()
+            asyncio.run(fan_out(events, consumers, maxsize, policy))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            dropped = sum(consumer["dropped"] for consumer in statistics.values())
+            print(f"{consumers} consumer(s), queue {maxsize:>6} {policy:<11}: "
+                  f"{len(events) / elapsed:,.0f} events per second, {dropped:,} dropped, "
+                  f"peak {peak / 2 ** 20:.1f} MiB")
@@ -0,0 +1,169 @@
+import asyncio
+import math
+import os
+import tempfile
+import time
+from typing import AsyncIterator, List
+
+from src.cep.automaton import PatternMatcher, compile_pattern
+from src.cep.events import Event, Match
+from src.discovery.online_dfg import OnlineDFG
+from src.parsers.pattern_parser import parse_pattern
+from src.streaming.event_sources import EventHub, matcher_consumer, replay, replay_feather, serve_events, \
+    socket_events, tail_log
+from tests.online_dfg_test_cases import interleaved_log
+
+EVENTS = [Event(str(case_id), activity, timestamp) for case_id, activity, timestamp in interleaved_log(200)]
+
+
+async def from_list(events: List[Event]) -> AsyncIterator[Event]:
+    for event in events:
+        yield event
+
+
+async def slow_consumer(_: Event) -> None:
+    await asyncio.sleep(0.0005)
+
+
+async def blocking_fan_out() -> bool:
+    """
+    A slow and a fast consumer with blocking queues receive every event, and the slow one holds the source back
+    instead of letting its queue grow.
+    """
+    hub = EventHub(maxsize=8)
+    received: List[Event] = []
+    hub.subscribe(received.append, "fast")
+    hub.subscribe(slow_consumer, "slow")
+    largest = 0
+
+    async def source() -> AsyncIterator[Event]:
+        nonlocal largest
+        for event in EVENTS:
+            largest = max(largest, hub.statistics["slow"]["queued"])
+            yield event
+
+    statistics = await hub.run(source())
+    return received == EVENTS and largest <= 8 and statistics["slow"] == {"delivered": len(EVENTS), "dropped": 0,
+                                                                          "queued": 0}
+
+
+async def dropping_fan_out(policy: str) -> bool:
+    hub = EventHub(maxsize=8, policy=policy)
+    received: List[Event] = []
+
+    async def slow(event: Event) -> None:
+        await asyncio.sleep(0.0005)
+        received.append(event)
+
+    hub.subscribe(slow, "slow")
+    statistics = (await hub.run(replay(EVENTS, speedup=50_000)))["slow"]
+    # drop_oldest keeps the newest events, so the end of the stream always arrives
+    kept_last = received[-1] == EVENTS[-1] if policy == "drop_oldest" else True
+    return statistics["dropped"] > 0 and statistics["delivered"] + statistics["dropped"] == len(EVENTS) \
+        and received == [event for event in EVENTS if event in received] and kept_last
+
+
+async def follow_file(path: str) -> List[Event]:
+    stop = asyncio.Event()
+
+    async def append() -> None:
+        with open(path, "w") as file:
+            file.write("case_id,activity,timestamp\n")
+            for index, (case_id, activity, timestamp) in enumerate(EVENTS):
+                line = f"{case_id},{activity},{timestamp!r}\n"
+                if index % 50 == 0:
+                    # A line written in two parts is only read once complete
+                    file.write(line[:3])
+                    file.flush()
+                    await asyncio.sleep(0.01)
+                    line = line[3:]
+                file.write(line)
+                file.flush()
+        stop.set()
+
+    open(path, "w").close()
+    writer = asyncio.create_task(append())
+    events = [event async for event in tail_log(path, poll_interval=0.001, stop=stop)]
+    await writer
+    return events
+
+
+async def socket_to_consumers() -> bool:
+    """
+    Events from the stand-in server reach the matcher and the discovery engine as if they were fed directly.
+    """
+    server = await serve_events(EVENTS)
+    port = server.sockets[0].getsockname()[1]
+    pattern = compile_pattern(parse_pattern("SEQ(register, decide, notify)"))
+    matches: List[Match] = []
+    online_dfg = OnlineDFG()
+    hub = EventHub(maxsize=16)
+    hub.subscribe(matcher_consumer(PatternMatcher(pattern), matches.append), "matcher")
+    hub.subscribe(lambda event: online_dfg.process(*event), "discovery")
+    async with server:
+        await hub.run(socket_events("127.0.0.1", port))
+
+    expected_dfg = OnlineDFG()
+    expected_dfg.run(EVENTS)
+    return matches == list(PatternMatcher(pattern).run(EVENTS)) and len(matches) > 0 \
+        and online_dfg.directly_follows() == expected_dfg.directly_follows()
+
+
+async def failing_consumer() -> bool:
+    def fail(event: Event) -> None:
+        if event.timestamp > 10:
+            raise KeyError("consumer failed")
+
+    hub = EventHub(maxsize=2)
+    hub.subscribe(fail)
+    try:
+        await asyncio.wait_for(hub.run(from_list(EVENTS)), timeout=5)
+    except KeyError:
+        return True
+    return False
+
+
+async def paced_replay() -> bool:
+    events = [Event("case", "tick", float(second)) for second in range(11)]
+    start = time.perf_counter()
+    replayed = [event async for event in replay(events, speedup=100)]
+    paced = time.perf_counter() - start
+    start = time.perf_counter()
+    unpaced = [event async for event in replay(events, speedup=math.inf)]
+    return replayed == unpaced == events and paced >= 0.1 and time.perf_counter() - start < 0.05
+
+
+if __name__ == "__main__":
+    print(f"Test Case 1: {'Success' if asyncio.run(blocking_fan_out()) else 'Error - blocking fan-out'}")
+
+    for number, policy in ((2, "drop_newest"), (3, "drop_oldest")):
+        print(f"Test Case {number}: {'Success' if asyncio.run(dropping_fan_out(policy)) else f'Error - {policy}'}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        followed = asyncio.run(follow_file(os.path.join(directory, "log.csv")))
+        print(f"Test Case 4: {'Success' if followed == EVENTS else 'Error - the tailed events differ'}")
+
+        try:
+            import pyarrow
+            import pyarrow.ipc
+
+            path = os.path.join(directory, "log.feather")
+            table = pyarrow.table({"case_id": [int(event.case_id) for event in EVENTS],
+                                   "activity": [event.activity for event in EVENTS],
+                                   "timestamp": [event.timestamp for event in EVENTS]})
+            with pyarrow.ipc.new_file(path, table.schema) as writer:
+                writer.write_table(table)
+
+            async def replay_all() -> List[Event]:
+                return [event async for event in replay_feather(path, speedup=math.inf)]
+
+            replayed = asyncio.run(replay_all())
+            status = "Success" if [(str(case_id), *rest) for case_id, *rest in replayed] == EVENTS \
+                else "Error - the replayed events differ"
+        except ImportError:
+            status = "Skipped - pyarrow is not installed"
+        print(f"Test Case 5: {status}")
+
+    print(f"Test Case 6: {'Success' if asyncio.run(socket_to_consumers()) else 'Error - socket fan-out'}")
+    print(f"Test Case 7: {'Success' if asyncio.run(failing_consumer()) else 'Error - the error was not raised'}")
+    print(f"Test Case 8: {'Success' if asyncio.run(paced_replay()) else 'Error - replay pacing'}")
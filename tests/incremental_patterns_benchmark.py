@@ -0,0 +1,40 @@
+import random
+import time
+
+from pm4py import PetriNet
+
+from src.parsers.incremental_patterns import IncrementalPatternDetector
+from src.parsers.parse_petri_net import identify_patterns
+from tests.petri_net_index_benchmark import generate_net
+
+if __name__ == "__main__":
+    edit_count = 1_000
+    for node_count in [1_000, 10_000, 100_000]:
+        net = generate_net(node_count)
+        places, transitions = list(net.places), list(net.transitions)
+        rng = random.Random(42)
+
+        start = time.perf_counter()
+        detector = IncrementalPatternDetector.from_net(net)
+        build_elapsed = time.perf_counter() - start
+
+        # Add random arcs and remove them again, one edit at a time
+        added = []
+        start = time.perf_counter()
+        for _ in range(edit_count // 2):
+            if rng.random() < 0.5:
+                arc = PetriNet.Arc(rng.choice(places), rng.choice(transitions))
+            else:
+                arc = PetriNet.Arc(rng.choice(transitions), rng.choice(places))
+            detector.add_arc(arc)
+            added.append(arc)
+        for arc in added:
+            detector.remove_arc(arc)
+        edit_elapsed = (time.perf_counter() - start) / edit_count
+
+        start = time.perf_counter()
+        identify_patterns(net.places, net.transitions, net.arcs)
+        full_elapsed = time.perf_counter() - start
+
+        print(f"{node_count:>7,} nodes: detector built in {build_elapsed:7.3f}s, "
+              f"{edit_elapsed * 1e6:8.1f}us per edit, full detection {full_elapsed * 1e6:12,.1f}us")
@@ -0,0 +1,71 @@
+from typing import List
+
+from pm4py import PetriNet
+
+from src.parsers.incremental_patterns import IncrementalPatternDetector, PatternDiff
+from tests.parse_petri_net_test_file import online_order_petri_net
+
+
+def describe(diff: PatternDiff) -> List[str]:
+    """
+    :return: The changed patterns as sorted "+/-KIND(names)" strings.
+    """
+    def names(pattern) -> str:
+        elements = pattern.elements if pattern.kind == "SEQ" else [pattern.anchor, *sorted(pattern.elements, key=str)]
+        return f"{pattern.kind}({', '.join(element.name for element in elements)})"
+    return sorted([f"+{names(pattern)}" for pattern in diff.appeared] +
+                  [f"-{names(pattern)}" for pattern in diff.disappeared])
+
+
+if __name__ == "__main__":
+    net = online_order_petri_net()
+    places = {place.name: place for place in net.places}
+    transitions = {transition.name: transition for transition in net.transitions}
+    arcs = {(arc.source.name, arc.target.name): arc for arc in net.arcs}
+    detector = IncrementalPatternDetector.from_net(net)
+    published: List[PatternDiff] = []
+    detector.subscribe(published.append)
+
+    # Dropping the alternative branch turns the OR split at "Show Results" into a link; "Article selected" stays a
+    # merge of two links, so the chains end there
+    before = detector.patterns
+    found = describe(detector.remove_arc(arcs[("Show Results", "t3")]))
+    expected = ["+SEQ(Alternatives article found, t4, Article selected)",
+                "+SEQ(Article selected, t6, Ready to Pay, t7, Enter Order Data)",
+                "+SEQ(Ready for Order, t1, Open Online-Shop, t2, Show Results, t5, Article selected)",
+                "-OR(Show Results, t3, t5)",
+                "-SEQ(Alternatives article found, t4, Article selected, t6, Ready to Pay, t7, Enter Order Data)",
+                "-SEQ(Ready for Order, t1, Open Online-Shop, t2, Show Results)"]
+    status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+    print(f"Test Case 1: {status}")
+
+    # Adding it again restores the patterns from before
+    diff = detector.add_arc(arcs[("Show Results", "t3")])
+    status = "Success" if detector.patterns == before and len(diff.appeared) == 3 \
+        else f"Error - patterns not restored: {describe(diff)}"
+    print(f"Test Case 2: {status}")
+
+    # A parallel arc changes nothing
+    found = describe(detector.add_arc(PetriNet.Arc(places["Show Results"], transitions["t3"])))
+    status = "Success" if found == [] else f"Error - expected no change, got {found}"
+    print(f"Test Case 3: {status}")
+
+    # Removing a transition removes its arcs, and the AND split it was
+    found = describe(detector.remove_transition(transitions["t9"]))
+    status = "Success" if "-AND(t9, Input mask for credit card details opened, Input mask for shipping details opened)" \
+        in found else f"Error - AND split of t9 not removed: {found}"
+    print(f"Test Case 4: {status}")
+
+    fresh = IncrementalPatternDetector.from_elements(
+        [place for place in places.values()], [transition for name, transition in transitions.items() if name != "t9"],
+        [arc for arc in list(net.arcs) + [PetriNet.Arc(places["Show Results"], transitions["t3"])]
+         if transitions["t9"] not in (arc.source, arc.target)])
+    status = "Success" if fresh.patterns == detector.patterns and len(published) == 3 \
+        else "Error - incremental and fresh detection differ"
+    print(f"Test Case 5: {status}")
+
+    try:
+        detector.remove_arc(PetriNet.Arc(places["Show Results"], transitions["t1"]))
+        print("Invalid Edit: Error - removed an unknown arc")
+    except ValueError as e:
+        print(f"Invalid Edit: Success - {e}")
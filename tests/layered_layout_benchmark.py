@@ -0,0 +1,34 @@
+import os
+import time
+
+import pm4py
+from graphviz import ExecutableNotFound
+
+from src.utils.layered_layout import layout_petri_net_layered
+from src.utils.petri_net_renderer import layout_petri_net, render_petri_net
+from tests.petri_net_to_pattern_benchmark import generate_block_net
+
+MODELS = os.path.join(os.path.dirname(__file__), "..", "src", "ui")
+
+if __name__ == "__main__":
+    nets = [("model.pnml", pm4py.read_pnml(os.path.join(MODELS, "model.pnml"))[0]),
+            ("model2012.pnml", pm4py.read_pnml(os.path.join(MODELS, "model2012.pnml"))[0]),
+            ("block net", generate_block_net(750)),
+            ("block net", generate_block_net(3000)),
+            ("nested block net", generate_block_net(3000, deep=True))]
+    for name, net in nets:
+        size = len(net.places) + len(net.transitions)
+        start = time.perf_counter()
+        layout_petri_net_layered(net)
+        layered = time.perf_counter() - start
+        # Graphviz takes minutes on the large nets, so it is only timed on the small ones
+        if size > 1000:
+            graphviz = "not timed"
+        else:
+            try:
+                start = time.perf_counter()
+                layout_petri_net(render_petri_net(net, False))
+                graphviz = f"{time.perf_counter() - start:.2f}s"
+            except ExecutableNotFound:
+                graphviz = "not installed"
+        print(f"{name} ({size:,} elements, {len(net.arcs):,} arcs): layered {layered:.2f}s, graphviz {graphviz}")
@@ -0,0 +1,139 @@
+import itertools
+import os
+
+import numpy as np
+import pm4py
+from pm4py import PetriNet
+from pm4py.objects.petri_net.utils import petri_utils
+
+from src.discovery.online_dfg import OnlineDFG
+from src.utils.layered_layout import count_crossings, layered_layout, layout_petri_net_incremental, \
+    layout_petri_net_layered, layout_positions, structural_key
+from tests.parse_petri_net_test_file import online_order_petri_net
+from tests.online_dfg_test_cases import interleaved_log
+from tests.petri_net_to_pattern_benchmark import generate_block_net
+
+MODELS = os.path.join(os.path.dirname(__file__), "..", "src", "ui")
+
+
+def net_edges(net: PetriNet):
+    elements = sorted(net.places, key=lambda place: place.name) \
+        + sorted(net.transitions, key=lambda transition: transition.name)
+    ids = {id(element): number for number, element in enumerate(elements)}
+    return len(elements), [ids[id(arc.source)] for arc in net.arcs], [ids[id(arc.target)] for arc in net.arcs]
+
+
+def overlapping(layout: dict) -> bool:
+    centers = np.array(list(layout_positions(layout).values()))
+    distances = np.abs(centers[:, None, :] - centers[None, :, :]).max(axis=2)
+    return bool(np.any(distances[np.triu_indices(len(centers), 1)] < 72.0 - 1e-6))
+
+
+def brute_force_crossings(layout) -> int:
+    upper, lower = layout.segments()
+    crossings = 0
+    for first, second in itertools.combinations(range(len(upper)), 2):
+        if layout.layers[upper[first]] == layout.layers[upper[second]]:
+            above = layout.positions[upper[first]] - layout.positions[upper[second]]
+            below = layout.positions[lower[first]] - layout.positions[lower[second]]
+            crossings += above * below < 0
+    return crossings
+
+
+if __name__ == "__main__":
+    net = online_order_petri_net()
+    layout = layout_petri_net_layered(net)
+    objects = layout["objects"]
+    names = [element["name"] for element in objects]
+    arcs = {(arc.source.name, arc.target.name) for arc in net.arcs}
+    shapes_match = all(element["shape"] == ("circle" if number < len(net.places) else "box")
+                       for number, element in enumerate(objects))
+    readable = all(len(element["pos"].split(",")) == 2 and element["_draw_"] and element["label"]
+                   and any(operation["op"] == "T" for operation in element["_ldraw_"]) for element in objects)
+    edges = {(names[edge["tail"]], names[edge["head"]]) for edge in layout["edges"]}
+    status = "Success" if len(objects) == len(net.places) + len(net.transitions) and shapes_match and readable \
+        and edges == arcs else "Error - the layout does not have the form of the graphviz output"
+    print(f"Test Case 1: {status}")
+
+    # Every segment joins neighbouring layers, and nodes of a layer keep their distance in the order of the layer
+    node_count, sources, targets = net_edges(generate_block_net(300))
+    layout = layered_layout(node_count, sources, targets)
+    upper, lower = layout.segments()
+    order = np.lexsort((layout.positions, layout.layers))
+    same_layer = layout.layers[order][1:] == layout.layers[order][:-1]
+    gaps = np.diff(layout.y[order])[same_layer]
+    extents = np.where(order >= node_count, 18.0, 108.0)
+    needed = ((extents[1:] + extents[:-1]) / 2)[same_layer]
+    paths_valid = all(layout.edge_path(edge)[0] == sources[edge] and layout.edge_path(edge)[-1] == targets[edge]
+                      for edge in range(len(sources)))
+    status = "Success" if np.all(layout.layers[lower] - layout.layers[upper] == 1) and np.all(gaps >= needed - 1e-6) \
+        and paths_valid else "Error - overlapping nodes or broken edges"
+    print(f"Test Case 2: {status}")
+
+    net, initial_marking, final_marking = pm4py.read_pnml(os.path.join(MODELS, "model.pnml"))
+    node_count, sources, targets = net_edges(net)
+    initial = count_crossings(layered_layout(node_count, sources, targets, sweeps=0))
+    reduced = count_crossings(layered_layout(node_count, sources, targets))
+    print(f"Test Case 3: {'Success' if reduced < initial else f'Error - {initial} crossings before, {reduced} after'}")
+
+    rng = np.random.default_rng(7)
+    failed = []
+    for seed in range(10):
+        sources, targets = rng.integers(0, 12, 30), rng.integers(0, 12, 30)
+        layout = layered_layout(12, sources, targets, sweeps=seed % 3)
+        if count_crossings(layout) != brute_force_crossings(layout):
+            failed.append(seed)
+    print(f"Test Case 4: {'Success' if not failed else f'Error - wrong crossing counts for {failed}'}")
+
+    # Cycles are laid out by reversing edges, and the same net always gets the same layout
+    layout = layered_layout(3, [0, 1, 2], [1, 2, 0])
+    path = layout.edge_path(2)
+    cyclic = layout.reversed_edges.sum() == 1 and path[0] == 2 and path[-1] == 0
+    net = generate_block_net(100, seed=3)
+    status = "Success" if cyclic and layout_petri_net_layered(net) == layout_petri_net_layered(net) \
+        else "Error - cycles or repeated layouts differ"
+    print(f"Test Case 5: {status}")
+
+    try:
+        layered_layout(2, [0], [2])
+        status = "Error - no ValueError for an unknown node"
+    except ValueError:
+        status = "Success"
+    print(f"Test Case 6: {status}")
+
+    # Adding elements keeps the others in place and the routes of the edges between them
+    net = online_order_petri_net()
+    before = layout_petri_net_layered(net)
+    positions = layout_positions(before)
+    source = sorted(net.transitions, key=lambda transition: transition.name)[0]
+    added_place = PetriNet.Place("added place")
+    added_transition = PetriNet.Transition("added transition", "added")
+    net.places.add(added_place)
+    net.transitions.add(added_transition)
+    petri_utils.add_arc_from_to(source, added_place, net)
+    petri_utils.add_arc_from_to(added_place, added_transition, net)
+    after = layout_petri_net_incremental(net, positions, previous=before)
+    kept = all(np.allclose(layout_positions(after)[name], position) for name, position in positions.items())
+    routes = {edge["pos"] for edge in before["edges"]}
+    reused = sum(edge["pos"] in routes for edge in after["edges"])
+    status = "Success" if kept and not overlapping(after) and reused == len(before["edges"]) \
+        else "Error - moved or overlapping elements, or edges routed again"
+    print(f"Test Case 7: {status}")
+
+    # Nets discovered again get new names, their elements are found by their structure
+    dfg = OnlineDFG()
+    events = interleaved_log(200)
+    dfg.run(events[:300])
+    net, _, _ = dfg.discover()
+    positions = layout_positions(layout_petri_net_layered(net), net, structural_key)
+    dfg.run(events[300:])
+    net, _, _ = dfg.discover()
+    after = layout_petri_net_incremental(net, positions, key=structural_key)
+    moved = [element_key for element_key, position in layout_positions(after, net, structural_key).items()
+             if element_key in positions and not np.allclose(position, positions[element_key])]
+    print(f"Test Case 8: {'Success' if not moved and not overlapping(after) else f'Error - moved {moved}'}")
+
+    net = generate_block_net(50, seed=5)
+    status = "Success" if layout_petri_net_incremental(net, {}) == layout_petri_net_layered(net) \
+        else "Error - a net without kept elements is not laid out from scratch"
+    print(f"Test Case 9: {status}")
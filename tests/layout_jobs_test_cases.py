@@ -0,0 +1,61 @@
+import sys
+import time
+from concurrent.futures import wait
+
+from graphviz import ExecutableNotFound
+
+from src.utils.layout_jobs import LayoutCancelled, LayoutExecutor, LayoutJob
+from src.utils.petri_net_renderer import layout_petri_net, render_petri_net
+from tests.parse_petri_net_test_file import online_order_petri_net
+
+
+def sleep_in_process(seconds: float, job: LayoutJob) -> bytes:
+    return job.run_process([sys.executable, "-c", f"import time; time.sleep({seconds}); print('done')"], b"")
+
+
+if __name__ == "__main__":
+    executor = LayoutExecutor(max_workers=3)
+
+    job = executor.submit(lambda value, job: value * 2, 21)
+    print(f"Test Case 1: {'Success' if job.future.result(timeout=5) == 42 else 'Error - unexpected result'}")
+
+    # Cancelling a running job kills its process instead of waiting for it
+    job = executor.submit(sleep_in_process, 30)
+    time.sleep(0.5)
+    start = time.perf_counter()
+    job.cancel()
+    finished = wait([job.future], timeout=5).done
+    status = "Success" if finished and isinstance(job.future.exception(), LayoutCancelled) \
+        and time.perf_counter() - start < 5 else "Error - the job kept running"
+    print(f"Test Case 2: {status}")
+
+    # Jobs run next to each other
+    start = time.perf_counter()
+    jobs = [executor.submit(sleep_in_process, 1) for _ in range(3)]
+    outputs = [job.future.result(timeout=10) for job in jobs]
+    elapsed = time.perf_counter() - start
+    status = "Success" if all(output.strip() == b"done" for output in outputs) and elapsed < 2.5 \
+        else f"Error - took {elapsed:.1f}s"
+    print(f"Test Case 3: {status}")
+
+    # A job cancelled before it started never runs
+    single = LayoutExecutor(max_workers=1)
+    calls = []
+    running = single.submit(sleep_in_process, 0.5)
+    pending = single.submit(lambda job: calls.append(job))
+    pending.cancel()
+    running.future.result(timeout=5)
+    time.sleep(0.1)
+    print(f"Test Case 4: {'Success' if pending.future.cancelled() and not calls else 'Error - the job ran'}")
+
+    net = online_order_petri_net()
+    try:
+        layout = executor.submit(lambda dot, job: layout_petri_net(dot, job), render_petri_net(net, False)) \
+            .future.result(timeout=60)
+        status = "Success" if len(layout["objects"]) == len(net.places) + len(net.transitions) \
+            else "Error - unexpected layout"
+    except ExecutableNotFound:
+        status = "Skipped - graphviz is not installed"
+    print(f"Test Case 5: {status}")
+    executor.shutdown()
+    single.shutdown()
@@ -0,0 +1,23 @@
+import os
+import tempfile
+import time
+
+import pm4py
+
+from src.simulation.log_generator import generate_log
+
+MODELS = os.path.join(os.path.dirname(__file__), os.pardir, "src", "ui")
+
+if __name__ == "__main__":
+    net, initial_marking, final_marking = pm4py.read_pnml(os.path.join(MODELS, "model.pnml"))
+    case_count = 200_000
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in sorted({1, 2, os.cpu_count() or 1}):
+            path = os.path.join(directory, f"log_{workers}.csv")
+            start = time.perf_counter()
+            summary = generate_log(net, initial_marking, final_marking, case_count, path, seed=0,
+                                   max_workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"{workers} worker(s): {summary.event_count:,} events of {case_count:,} cases in {elapsed:.1f}s, "
+                  f"{summary.event_count / elapsed:,.0f} events per second, "
+                  f"{os.path.getsize(path) / 2 ** 20:.0f} MiB")
@@ -0,0 +1,54 @@
+import filecmp
+import os
+import tempfile
+
+import pandas as pd
+import pm4py
+
+from src.simulation.log_generator import generate_log
+
+MODELS = os.path.join(os.path.dirname(__file__), os.pardir, "src", "ui")
+
+if __name__ == "__main__":
+    net, initial_marking, final_marking = pm4py.read_pnml(os.path.join(MODELS, "model.pnml"))
+    with tempfile.TemporaryDirectory() as directory:
+        # The log does not depend on the number of workers
+        paths = [os.path.join(directory, f"log_{workers}.csv") for workers in (1, 2)]
+        summaries = [generate_log(net, initial_marking, final_marking, 2_500, path, seed=3, max_workers=workers,
+                                  shard_size=1_000) for path, workers in zip(paths, (1, 2))]
+        status = "Success" if filecmp.cmp(*paths, shallow=False) and summaries[0].event_count > 0 \
+            else "Error - the logs differ"
+        print(f"Test Case 1: {status}")
+
+        # Every case is complete, its events are ordered in time and the traces fit the net
+        log = pd.read_csv(paths[0])
+        ordered = log.groupby("case_id")["timestamp"].apply(lambda timestamps: timestamps.is_monotonic_increasing)
+        log["timestamp"] = pd.to_datetime(log["timestamp"], unit="s")
+        log = pm4py.format_dataframe(log, case_id="case_id", activity_key="activity", timestamp_key="timestamp")
+        fitness = pm4py.fitness_token_based_replay(log, net, initial_marking, final_marking)["log_fitness"]
+        # Token-based replay guesses which silent transitions to fire and misjudges a few fitting traces of this net
+        status = "Success" if log["case:concept:name"].nunique() == 2_500 and ordered.all() and fitness > 0.99 \
+            and summaries[0].truncated_cases == 0 else f"Error - fitness {fitness}"
+        print(f"Test Case 2: {status}")
+
+        # Another seed gives another log
+        path = os.path.join(directory, "other.csv")
+        generate_log(net, initial_marking, final_marking, 2_500, path, seed=4, max_workers=1, shard_size=1_000)
+        print(f"Test Case 3: {'Success' if not filecmp.cmp(paths[0], path, shallow=False) else 'Error - same log'}")
+
+        path = os.path.join(directory, "log.feather")
+        try:
+            summary = generate_log(net, initial_marking, final_marking, 2_500, path, seed=3, max_workers=1,
+                                   shard_size=1_000)
+            log = pd.read_feather(path)
+            status = "Success" if len(log) == summary.event_count == summaries[0].event_count \
+                else "Error - unexpected Feather log"
+        except ImportError:
+            status = "Skipped - pyarrow is not installed"
+        print(f"Test Case 4: {status}")
+
+        try:
+            generate_log(net, initial_marking, final_marking, 10, os.path.join(directory, "log.txt"), "parquet")
+            print("Test Case 5: Error - expected a ValueError")
+        except ValueError:
+            print("Test Case 5: Success")
@@ -0,0 +1,19 @@
+import time
+
+from src.discovery.online_dfg import OnlineDFG
+from tests.online_dfg_test_cases import exact_dfg, interleaved_log
+
+if __name__ == "__main__":
+    for case_count in (20_000, 200_000):
+        events = interleaved_log(case_count, noise=0.05)
+        exact_size = len(exact_dfg(events))
+        for error in (0.01, 0.001):
+            engine = OnlineDFG(error=error, max_cases=1_000)
+            start = time.perf_counter()
+            engine.run(events)
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            engine.discover(noise_threshold=2 * error)
+            discovery = time.perf_counter() - start
+            print(f"{len(events)} events, error {error}: {len(events) / elapsed:,.0f} events/s, "
+                  f"{engine.table_sizes['relations']} of {exact_size} relations kept, discovery {discovery:.3f} s")
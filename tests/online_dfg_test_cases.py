@@ -0,0 +1,97 @@
+import random
+from collections import Counter
+from typing import Hashable, List, Tuple
+
+from src.discovery.online_dfg import OnlineDFG
+from src.parsers.parse_petri_net import identify_patterns
+
+VARIANTS = [["register", "check", "decide", "notify"],
+            ["register", "decide", "check", "notify"],
+            ["register", "check", "check", "decide", "notify"]]
+
+
+def interleaved_log(case_count: int, seed: int = 7, noise: float = 0.0) -> List[Tuple[Hashable, str, float]]:
+    """
+    :return: The events of case_count cases following the variants, interleaved with up to 20 cases in parallel.
+        With noise, that fraction of the events is replaced by a unique activity.
+    """
+    rng = random.Random(seed)
+    traces = [list(rng.choice(VARIANTS)) for _ in range(case_count)]
+    events, open_cases, next_case, timestamp = [], [], 0, 0.0
+    while open_cases or next_case < case_count:
+        if next_case < case_count and (len(open_cases) < 20 and rng.random() < 0.5 or not open_cases):
+            open_cases.append([next_case, 0])
+            next_case += 1
+        case = rng.choice(open_cases)
+        case_id, position = case
+        activity = traces[case_id][position]
+        if rng.random() < noise:
+            activity = f"noise {len(events)}"
+        timestamp += 1.0
+        events.append((case_id, activity, timestamp))
+        case[1] += 1
+        if case[1] == len(traces[case_id]):
+            open_cases.remove(case)
+    return events
+
+
+def exact_dfg(events: List[Tuple[Hashable, str, float]]) -> Counter:
+    last, relations = {}, Counter()
+    for case_id, activity, _ in events:
+        if case_id in last:
+            relations[(last[case_id], activity)] += 1
+        last[case_id] = activity
+    return relations
+
+
+if __name__ == "__main__":
+    # With an error below 1 / n nothing is pruned, so the counts are exact
+    events = interleaved_log(500)
+    engine = OnlineDFG(error=1 / (2 * len(events)))
+    engine.run(events)
+    status = "Success" if engine.directly_follows() == exact_dfg(events) \
+        and engine.start_activities() == {"register": 500} else "Error - counts differ"
+    print(f"Test Case 1: {status}")
+
+    # With noise, the tables stay bounded and every frequency is undercounted by at most error * n while the
+    # concurrent cases fit the case table
+    events = interleaved_log(20_000, noise=0.05)
+    engine = OnlineDFG(error=0.01, max_cases=100)
+    largest = 0
+    for event in events:
+        engine.process(*event)
+        largest = max(largest, sum(engine.table_sizes.values()))
+    exact = exact_dfg(events)
+    approximate = engine.directly_follows()
+    bound = engine.error * engine.event_count
+    accurate = all(exact[relation] - bound <= approximate.get(relation, 0) <= exact[relation] for relation in exact)
+    status = "Success" if accurate and largest < len(exact) // 10 else f"Error - {largest} entries of {len(exact)}"
+    print(f"Test Case 2: {status}")
+
+    # The discovered net has the frequent activities as labels and its patterns can be detected
+    net, initial_marking, final_marking = engine.discover(noise_threshold=0.02)
+    labels = {transition.label for transition in net.transitions if transition.label is not None}
+    seq, and_patterns, or_patterns = identify_patterns(net.places, net.transitions, net.arcs)
+    status = "Success" if labels == {"register", "check", "decide", "notify"} and initial_marking and final_marking \
+        and seq else f"Error - labels {labels}"
+    print(f"Test Case 3: {status}")
+
+    # Closed cases count their last activity as end activity and are forgotten
+    engine = OnlineDFG()
+    engine.run(interleaved_log(50))
+    for case_id in range(50):
+        engine.close_case(case_id)
+    status = "Success" if engine.open_cases == 0 and engine.end_activities() == {"notify": 50} \
+        else f"Error - {engine.end_activities()}"
+    print(f"Test Case 4: {status}")
+
+    events = interleaved_log(100)
+    nets = list(OnlineDFG().snapshots(events, every=100))
+    status = "Success" if len(nets) == len(events) // 100 else f"Error - {len(nets)} snapshots"
+    print(f"Test Case 5: {status}")
+
+    try:
+        OnlineDFG(error=0)
+        print("Test Case 6: Error - expected a ValueError")
+    except ValueError:
+        print("Test Case 6: Success")
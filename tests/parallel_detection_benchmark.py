@@ -0,0 +1,24 @@
+import os
+import time
+
+from src.parsers.parallel_detection import ParallelPatternDetector
+from src.petri_nets.graph_index import PetriNetIndex
+from tests.petri_net_index_benchmark import generate_net
+
+if __name__ == "__main__":
+    cpu_count = os.cpu_count() or 1
+    print(f"{cpu_count} CPUs")
+    for node_count in [100_000, 1_000_000]:
+        index = PetriNetIndex.from_net(generate_net(node_count))
+        start = time.perf_counter()
+        expected = index.identify_patterns()
+        print(f"{node_count:>9,} nodes: single-threaded {time.perf_counter() - start:8.3f}s")
+        for workers in sorted({1, 2, 4, cpu_count}):
+            with ParallelPatternDetector(workers) as detector:
+                # The first call starts the pool
+                detector.detect(index)
+                start = time.perf_counter()
+                found = detector.detect(index)
+                elapsed = time.perf_counter() - start
+                status = "same results" if found == expected else "RESULTS DIFFER"
+                print(f"{node_count:>9,} nodes: {workers:>2} workers {elapsed:8.3f}s ({status})")
@@ -0,0 +1,72 @@
+import random
+
+from pm4py import PetriNet
+
+from src.parsers.parallel_detection import ParallelPatternDetector, identify_patterns_parallel
+from src.petri_nets.graph_index import PetriNetIndex
+from tests.parse_petri_net_test_file import online_order_petri_net
+from tests.petri_net_index_benchmark import generate_net
+
+
+def normalize(result) -> tuple:
+    """
+    :return: The chains by name, in their order, and the AND and OR patterns with their elements as sets.
+    """
+    seq, and_patterns, or_patterns = result
+    return ([tuple(element.name for element in chain) for chain in seq],
+            {(transition.name, frozenset(place.name for place in places)) for transition, places in and_patterns},
+            {(place.name, frozenset(t.name for t in transitions)) for place, transitions in or_patterns})
+
+
+def expected(places, transitions, arcs) -> tuple:
+    return normalize(PetriNetIndex.from_elements(places, transitions, arcs).identify_patterns())
+
+
+if __name__ == "__main__":
+    net = online_order_petri_net()
+    found = normalize(identify_patterns_parallel(net.places, net.transitions, net.arcs, max_workers=2))
+    status = "Success" if found == expected(net.places, net.transitions, net.arcs) else f"Error - got {found}"
+    print(f"Test Case 1: {status}")
+
+    # Small partitions spread the link components over several workers
+    with ParallelPatternDetector(max_workers=2, partitions_per_worker=4, min_partition_size=20) as detector:
+        for case, (node_count, split_probability) in enumerate([(2_000, 0.1), (2_000, 0.0), (5_000, 0.3)], start=2):
+            net = generate_net(node_count, split_probability, seed=case)
+            # Shuffled place ids make the chains depend on the order in which `identify_patterns` walks them
+            places = sorted(net.places, key=lambda place: int(place.name[1:]))
+            random.Random(case).shuffle(places)
+            transitions = sorted(net.transitions, key=lambda transition: int(transition.name[1:]))
+            found = normalize(detector.detect(PetriNetIndex.from_elements(places, transitions, net.arcs)))
+            status = "Success" if found == expected(places, transitions, net.arcs) else "Error - results differ"
+            print(f"Test Case {case}: {status}")
+
+        # A cycle without entry is one component and starts at its smallest place
+        places = [PetriNet.Place(f"p{i}") for i in range(1_000)]
+        transitions = [PetriNet.Transition(f"t{i}", f"t{i}") for i in range(1_000)]
+        arcs = [PetriNet.Arc(place, transition) for place, transition in zip(places, transitions)] + \
+            [PetriNet.Arc(transition, places[(i + 1) % len(places)]) for i, transition in enumerate(transitions)]
+        places = places[500:] + places[:500]
+        chains = detector.detect(PetriNetIndex.from_elements(places, transitions, arcs))[0]
+        found = [element.name for element in chains[0]] if len(chains) == 1 else chains
+        status = "Success" if found[:3] == ["p500", "t500", "p501"] and found[-1] == "p500" and len(found) == 2_001 \
+            else f"Error - got {found[:3]}"
+        print(f"Test Case 5: {status}")
+
+        # A place whose link leads back to itself is a component of its own, also when the net is partitioned
+        places = [PetriNet.Place(f"p{i}") for i in range(201)]
+        transitions = [PetriNet.Transition(f"t{i}", f"t{i}") for i in range(101)]
+        arcs = [PetriNet.Arc(places[200], transitions[100]), PetriNet.Arc(transitions[100], places[200])]
+        for i in range(100):
+            arcs += [PetriNet.Arc(places[2 * i], transitions[i]), PetriNet.Arc(transitions[i], places[2 * i + 1])]
+        index = PetriNetIndex.from_elements(places, transitions, arcs)
+        partition_count = len(set(detector.partition(index.seq_links()[1], 8).tolist()) - {-1})
+        found = normalize(detector.detect(index))
+        status = "Success" if partition_count > 1 and found == expected(places, transitions, arcs) \
+            and ("p200", "t100", "p200") in found[0] else f"Error - {partition_count} partitions, got {found[0][-3:]}"
+        print(f"Test Case 6: {status}")
+
+    try:
+        ParallelPatternDetector(partitions_per_worker=0)
+        print("Test Case 7: Error - expected a ValueError")
+    except ValueError:
+        print("Test Case 7: Success")
@@ -5,6 +5,7 @@ from graphviz import Digraph
 from pm4py.objects.petri_net.obj import PetriNet
 
 from src.parsers.pattern_parser import PatternNode
+from src.parsers.petri_net_to_pattern import convert_petri_net_to_pattern
 from src.utils.petri_net_renderer import render_petri_net
 
 
@@ -128,5 +129,5 @@ if __name__ == "__main__":
 
     # pm4py.view_petri_net(net, None, None)
     # render_petri_net(net)
-    # pattern = convert_petri_net_to_pattern(net)
-    # print(pattern)
+    pattern = convert_petri_net_to_pattern(net)
+    print(pattern)
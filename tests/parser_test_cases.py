@@ -132,5 +132,8 @@ if __name__ == "__main__":
             pattern_tree = parse_pattern(pattern)
             print(f"Test Case {i + 1}: Success")
             print(pattern_tree)
+            interned_tree = parse_pattern(pattern, interned=True)
+            if repr(interned_tree) != repr(pattern_tree) or interned_tree is not parse_pattern(pattern, interned=True):
+                print(f"Test Case {i + 1}: Error - interned tree differs")
         except ValueError as e:
             print(f"Test Case {i + 1}: Error - {e}")
@@ -0,0 +1,90 @@
+import random
+import time
+import tracemalloc
+from typing import List
+
+from src.parsers.pattern_parser import parse_pattern
+from src.utils.operators import Operators
+
+
+def generate_pattern(node_count: int, max_children: int = 8, seed: int = 42, event_count: int = 1000) -> str:
+    """
+    Generate a random, pretty-printed pattern string with roughly `node_count` nodes.
+
+    :param node_count: The approximate number of nodes of the generated pattern.
+    :param max_children: The maximum number of children of a logical node.
+    :param seed: The seed of the random generator.
+    :param event_count: The number of distinct event names.
+    :return: The generated pattern string.
+    """
+    rng = random.Random(seed)
+    operators: List[str] = [Operators.AND, Operators.OR, Operators.SEQ]
+    parts: List[str] = []
+    budget = [node_count]
+
+    def emit(depth: int) -> None:
+        budget[0] -= 1
+        indent = "    " * depth
+        if budget[0] <= 0 or depth > 12 or rng.random() < 0.55:
+            parts.append(f"{indent}event{rng.randrange(event_count)}")
+            return
+        parts.append(f"{indent}{rng.choice(operators)}(\n")
+        children = rng.randint(2, max_children)
+        for i in range(children):
+            emit(depth + 1)
+            parts.append(",\n" if i < children - 1 else "\n")
+        parts.append(f"{indent})")
+
+    parts.append("OR(\n")
+    while budget[0] > 0:
+        emit(1)
+        parts.append(",\n" if budget[0] > 0 else "\n")
+    parts.append(")")
+    return "".join(parts)
+
+
+def count_nodes(pattern: str) -> int:
+    root = parse_pattern(pattern)
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def measure_memory(pattern: str, interned: bool) -> int:
+    """
+    :return: The number of bytes allocated while parsing the pattern and still held by the parsed tree.
+    """
+    tracemalloc.start()
+    root = parse_pattern(pattern, interned=interned)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del root
+    return size
+
+
+if __name__ == "__main__":
+    for size in [1_000, 10_000, 50_000, 100_000]:
+        pattern = generate_pattern(size)
+        nodes = count_nodes(pattern)
+
+        repetitions = 3
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            parse_pattern(pattern)
+        elapsed = (time.perf_counter() - start) / repetitions
+
+        print(f"{nodes:>8} nodes, {len(pattern):>9} chars: {elapsed * 1000:8.1f} ms "
+              f"({nodes / elapsed:,.0f} nodes/s)")
+
+    # Expanded templates repeat the same small subtrees over and over
+    pattern = generate_pattern(100_000, max_children=3, event_count=8)
+    for interned in [False, True]:
+        start = time.perf_counter()
+        parse_pattern(pattern, interned=interned)
+        elapsed = time.perf_counter() - start
+        print(f"{'interned' if interned else 'plain':>8}: {elapsed * 1000:8.1f} ms, "
+              f"{measure_memory(pattern, interned) / 1024:10,.0f} KiB")
@@ -0,0 +1,57 @@
+import random
+import time
+from typing import Any, Dict, List
+
+from src.parsers.pattern_template import PatternTemplate, TemplateCache, compile_template
+from tests.mock_querys import TEST_TEMPLATE_CEP
+
+
+def generate_bindings(binding_count: int, distinct_count: int, activity_count: int = 50,
+                      seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Generate template bindings drawn from a pool of distinct activity sets, like a rediscovery cycle that
+    instantiates the same template for mostly the same sets again.
+
+    :param binding_count: The number of bindings.
+    :param distinct_count: The number of distinct activity sets.
+    :param activity_count: The number of distinct activities a0, a1, ...
+    :param seed: The seed of the random generator.
+    :return: The bindings.
+    """
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(distinct_count):
+        activities = rng.sample(range(activity_count), rng.randint(3, 8))
+        split = rng.randint(1, len(activities) - 1)
+        pool.append({
+            "events": [{"name": f"a{a}", "var": f"e{a}"} for a in activities[:split]],
+            "conditions": [{"name": f"a{a}", "var": f"c{a}"} for a in activities[split:]],
+            "time": rng.randint(1, 60),
+        })
+    return [rng.choice(pool) for _ in range(binding_count)]
+
+
+if __name__ == "__main__":
+    bindings = generate_bindings(20_000, 1_000)
+
+    start = time.perf_counter()
+    for binding in bindings:
+        PatternTemplate(TEST_TEMPLATE_CEP, TemplateCache(maxsize=0)).expand_query(binding)
+    relexed = time.perf_counter() - start
+
+    template = PatternTemplate(TEST_TEMPLATE_CEP, TemplateCache(maxsize=0))
+    start = time.perf_counter()
+    for binding in bindings:
+        template.expand_query(binding)
+    compiled = time.perf_counter() - start
+
+    template = compile_template(TEST_TEMPLATE_CEP)
+    start = time.perf_counter()
+    for binding in bindings:
+        template.expand_query(binding)
+    cached = time.perf_counter() - start
+
+    for name, elapsed in [("lexed per instantiation", relexed), ("compiled once", compiled),
+                          ("compiled once, LRU cache", cached)]:
+        print(f"{name:<26}: {len(bindings) / elapsed:>10,.0f} instantiations/s")
+    print(f"Cache hits {template.cache.hits}, misses {template.cache.misses}")
@@ -0,0 +1,57 @@
+from typing import Any, Dict, List, Tuple
+
+from src.parsers.pattern_template import PatternTemplate, TemplateCache, compile_template
+from tests.mock_querys import TEST_STRUCTURAL_CEP, TEST_TEMPLATE_CEP
+
+BINDINGS: Dict[str, Any] = {
+    "events": [{"name": "register", "var": "e1"}, {"name": "pay", "var": "e2"}],
+    "conditions": [{"name": "check", "var": "c1"}],
+    "time": 5,
+}
+
+# (template, bindings, expected repr of the expanded pattern or query)
+TEST_CASES: List[Tuple[str, Dict[str, Any], str]] = [
+    (TEST_STRUCTURAL_CEP, BINDINGS, "AND(OR(register, pay), AND(check))"),
+    (TEST_TEMPLATE_CEP, BINDINGS,
+     "PatternQuery(pattern=AND(OR(register, pay), AND(check)), where=AND(related(e1, c1), related(e2, c1)), "
+     "within=TimeWindow(amount=5.0, unit='minutes'))"),
+    ("SEQ({% for step in steps %}{{ step }}, {% endfor %}end)", {"steps": ["a", "b", "c"]}, "SEQ(a, b, c, end)"),
+    ("SEQ({% for group in groups %}OR({% for event in group.events %}{{ event }} {% endfor %}) {% endfor %})",
+     {"groups": [{"events": ["a", "b"]}, {"events": ["c"]}]}, "SEQ(OR(a, b), OR(c))"),
+]
+
+INVALID_TEMPLATES: List[Tuple[str, Dict[str, Any]]] = [
+    ("OR({% for event in events %} {{ event.name }})", {"events": []}),
+    ("OR({% if event %} a {% endif %})", {}),
+    ("OR({% for event in events %} {{ event.name }} {% endfor %})", {}),
+    ("OR({% for event in events %} {{ event.label }} {% endfor %})", {"events": [{"name": "a"}]}),
+]
+
+if __name__ == "__main__":
+    for i, (template, bindings, expected) in enumerate(TEST_CASES):
+        compiled = compile_template(template)
+        expand = compiled.expand_query if "PATTERN" in template else compiled.expand
+        found = repr(expand(bindings))
+        status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+        print(f"Test Case {i + 1}: {status}")
+
+    # Expansions are cached by template and bindings, equal bindings hit the cache
+    template = PatternTemplate(TEST_STRUCTURAL_CEP, TemplateCache(maxsize=2))
+    first = template.expand(BINDINGS)
+    second = template.expand({key: list(value) if isinstance(value, list) else value
+                              for key, value in BINDINGS.items()})
+    status = "Success" if first is second and template.cache.hits == 1 else "Error - expansion was not cached"
+    print(f"Cache Test Case: {status}")
+
+    # Equal values of different types are rendered differently and must not share a cached expansion
+    template = PatternTemplate("SEQ(start, {{ event.name }})", TemplateCache())
+    found = [repr(template.expand({"event": {"name": value}})) for value in (1, True, 1.0)]
+    expected = ["SEQ(start, 1)", "SEQ(start, True)", "SEQ(start, 1.0)"]
+    print(f"Cache Type Test Case: {'Success' if found == expected else f'Error - expected {expected}, got {found}'}")
+
+    for i, (template, bindings) in enumerate(INVALID_TEMPLATES):
+        try:
+            PatternTemplate(template).expand(bindings)
+            print(f"Invalid Template {i + 1}: Error - expanded without complaint")
+        except ValueError as e:
+            print(f"Invalid Template {i + 1}: Success - {e}")
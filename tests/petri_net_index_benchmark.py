@@ -0,0 +1,137 @@
+import random
+import time
+from typing import Dict, List, Set, Tuple, Union
+
+from pm4py import PetriNet
+
+from src.parsers.parse_petri_net import identify_patterns
+from src.petri_nets.graph_index import PetriNetIndex
+from tests.parse_petri_net_test_file import online_order_petri_net
+
+
+def identify_patterns_with_sets(
+        places: Set[PetriNet.Place],
+        transitions: Set[PetriNet.Transition],
+        arcs: Set[PetriNet.Arc]
+) -> Tuple[
+    List[List[Union[PetriNet.Place, PetriNet.Transition]]],
+    Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place]]],
+    Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition]]]
+]:
+    """
+    The former detection on dicts of Python sets, kept as reference for results and speed.
+    """
+    seq_patterns: List[List[Union[PetriNet.Place, PetriNet.Transition]]] = []
+    and_patterns: Set[Tuple[PetriNet.Transition, Tuple[PetriNet.Place]]] = set()
+    or_patterns: Set[Tuple[PetriNet.Place, Tuple[PetriNet.Transition]]] = set()
+
+    # Mapping von Quellen und Zielen für Transitionen und Stellen
+    place_to_transitions: Dict[PetriNet.Place, Set[PetriNet.Transition]] = {place: set() for place in places}
+    transition_to_places: Dict[PetriNet.Transition, Set[PetriNet.Place]] = {transition: set() for transition in
+                                                                            transitions}
+
+    for arc in arcs:
+        if isinstance(arc.source, PetriNet.Place) and isinstance(arc.target, PetriNet.Transition):
+            place_to_transitions[arc.source].add(arc.target)
+        elif isinstance(arc.source, PetriNet.Transition) and isinstance(arc.target, PetriNet.Place):
+            transition_to_places[arc.source].add(arc.target)
+
+    # Funktion zum Finden von SEQ-Ketten
+    def find_seq_chain(start_place: PetriNet.Place, visited: Set[PetriNet.Place]) -> List[
+        Union[PetriNet.Place, PetriNet.Transition]]:
+        chain = [start_place]
+        current_place = start_place
+        while current_place in place_to_transitions and len(place_to_transitions[current_place]) == 1:
+            transition = next(iter(place_to_transitions[current_place]))
+            if len(transition_to_places[transition]) == 1:
+                next_place = next(iter(transition_to_places[transition]))
+                if next_place in visited:
+                    break  # Beende die Schleife, wenn wir eine bereits besuchte Stelle erreichen
+                visited.add(next_place)
+                chain.append(transition)
+                chain.append(next_place)
+                current_place = next_place
+            else:
+                break
+        return chain
+
+    visited_places = set()
+    for place in places:
+        if place not in visited_places:
+            chain = find_seq_chain(place, visited_places)
+            if len(chain) > 1:
+                seq_patterns.append(chain)
+                visited_places.update([elem for elem in chain if isinstance(elem, PetriNet.Place)])  # nur die Stellen
+
+    for transition, connected_places in transition_to_places.items():
+        if len(connected_places) > 1:
+            and_patterns.add((transition, tuple(connected_places)))
+
+    for place, connected_transitions in place_to_transitions.items():
+        if len(connected_transitions) > 1:
+            or_patterns.add((place, tuple(connected_transitions)))
+
+    return seq_patterns, and_patterns, or_patterns
+
+
+def generate_net(node_count: int, split_probability: float = 0.1, seed: int = 42) -> PetriNet:
+    """
+    Generate a random net of long chains with occasional AND and OR splits and back edges.
+
+    :param node_count: The approximate number of places and transitions.
+    :param split_probability: The probability of a node to get a second successor.
+    :param seed: The seed of the random generator.
+    :return: The generated net.
+    """
+    rng = random.Random(seed)
+    places = [PetriNet.Place(f"p{i}") for i in range(node_count // 2)]
+    transitions = [PetriNet.Transition(f"t{i}", f"t{i}") for i in range(node_count // 2)]
+    arcs = set()
+    for i, (place, transition) in enumerate(zip(places, transitions)):
+        arcs.add(PetriNet.Arc(place, transition))
+        if i + 1 < len(places):
+            arcs.add(PetriNet.Arc(transition, places[i + 1]))
+        if rng.random() < split_probability:
+            arcs.add(PetriNet.Arc(place, rng.choice(transitions)))
+        if rng.random() < split_probability:
+            arcs.add(PetriNet.Arc(transition, rng.choice(places)))
+    return PetriNet(f"generated {node_count}", places=set(places), transitions=set(transitions), arcs=arcs)
+
+
+def normalize_result(result) -> Tuple[List[List[str]], Set[Tuple[str, frozenset]], Set[Tuple[str, frozenset]]]:
+    """
+    :return: The result with elements by name and the elements of AND and OR patterns as unordered sets.
+    """
+    seq, and_patterns, or_patterns = result
+    return ([[element.name for element in chain] for chain in seq],
+            {(transition.name, frozenset(place.name for place in connected)) for transition, connected in and_patterns},
+            {(place.name, frozenset(t.name for t in connected)) for place, connected in or_patterns})
+
+
+if __name__ == "__main__":
+    net = online_order_petri_net()
+    same = normalize_result(identify_patterns(net.places, net.transitions, net.arcs)) == \
+        normalize_result(identify_patterns_with_sets(net.places, net.transitions, net.arcs))
+    print(f"Online order net: {'Success' if same else 'Error - results differ'}")
+
+    for node_count in [1_000, 10_000, 100_000, 1_000_000]:
+        net = generate_net(node_count)
+
+        start = time.perf_counter()
+        expected = identify_patterns_with_sets(net.places, net.transitions, net.arcs)
+        sets_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = PetriNetIndex.from_net(net)
+        build_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        found = index.identify_patterns()
+        detect_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.identify_all_patterns()
+        all_elapsed = time.perf_counter() - start
+
+        status = "same results" if normalize_result(found) == normalize_result(expected) else "RESULTS DIFFER"
+        print(f"{node_count:>9,} nodes: sets {sets_elapsed:8.3f}s, index build {build_elapsed:8.3f}s "
+              f"+ detection {detect_elapsed:8.3f}s ({status}), with loops and joins {all_elapsed:8.3f}s")
@@ -0,0 +1,57 @@
+from pm4py import PetriNet
+
+from src.parsers.parse_petri_net import identify_all_patterns
+from src.petri_nets.graph_index import PetriNetIndex
+from tests.parse_petri_net_test_file import online_order_petri_net
+
+
+def names(patterns) -> list:
+    """
+    :return: The (anchor, connected elements) patterns by name, sorted.
+    """
+    return sorted((anchor.name, tuple(sorted(element.name for element in connected))) for anchor, connected in patterns)
+
+
+if __name__ == "__main__":
+    net = online_order_petri_net()
+    patterns = identify_all_patterns(net.places, net.transitions, net.arcs)
+
+    found = sorted(sorted(element.name for element in loop) for loop in patterns.loops)
+    expected = [["Credit card details checked", "Credit card details entered",
+                 "Input mask for credit card details opened", "t11", "t14", "t15"],
+                ["Enter Order Data", "Ready to Pay", "t7", "t8"]]
+    status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+    print(f"Test Case 1: {status}")
+
+    found = names(patterns.xor_joins)
+    expected = [("Article selected", ("t4", "t5")), ("Input mask for credit card details opened", ("t15", "t9")),
+                ("Ready to Pay", ("t6", "t8"))]
+    status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+    print(f"Test Case 2: {status}")
+
+    found = names(patterns.and_joins)
+    expected = [("t13", ("Address and shipping method entered", "Credit card details verified"))]
+    status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+    print(f"Test Case 3: {status}")
+
+    # The splits and chains are those of identify_patterns
+    index = PetriNetIndex.from_net(net)
+    seq, and_splits, or_splits = index.identify_patterns()
+    same = names(patterns.and_splits) == names(and_splits) and names(patterns.or_splits) == names(or_splits) \
+        and len(patterns.seq) == len(seq)
+    status = "Success" if same else "Error - splits or chains differ"
+    print(f"Test Case 4: {status}")
+
+    # A cycle of 100,000 places and transitions is one loop, found without recursion
+    places = [PetriNet.Place(f"p{i}") for i in range(50_000)]
+    transitions = [PetriNet.Transition(f"t{i}", f"t{i}") for i in range(50_000)]
+    arcs = [PetriNet.Arc(place, transition) for place, transition in zip(places, transitions)] + \
+        [PetriNet.Arc(transition, places[(i + 1) % len(places)]) for i, transition in enumerate(transitions)]
+    loops = PetriNetIndex.from_elements(places, transitions, arcs).loops()
+    status = "Success" if len(loops) == 1 and len(loops[0]) == 100_000 else f"Error - got {len(loops)} loops"
+    print(f"Test Case 5: {status}")
+
+    # Without back arcs there is no loop
+    loops = PetriNetIndex.from_elements(places, transitions, arcs[:-1]).loops()
+    status = "Success" if loops == [] else f"Error - expected no loops, got {len(loops)}"
+    print(f"Test Case 6: {status}")
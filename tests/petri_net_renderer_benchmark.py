@@ -0,0 +1,41 @@
+import os
+import time
+
+import pm4py
+from graphviz import ExecutableNotFound
+
+from src.utils.petri_net_renderer import layout_petri_net, rank_groups, render_petri_net
+from tests.petri_net_to_pattern_benchmark import generate_block_net
+
+MODELS = os.path.join(os.path.dirname(__file__), "..", "src", "ui")
+
+
+def time_graphviz(dot) -> str:
+    try:
+        start = time.perf_counter()
+        layout_petri_net(dot)
+        return f"{time.perf_counter() - start:.2f}s"
+    except ExecutableNotFound:
+        return "not installed"
+
+
+if __name__ == "__main__":
+    nets = [("model.pnml", pm4py.read_pnml(os.path.join(MODELS, "model.pnml"))[0]),
+            ("block net", generate_block_net(100)),
+            ("block net", generate_block_net(3000))]
+    for name, net in nets:
+        size = len(net.places) + len(net.transitions)
+        start = time.perf_counter()
+        ranked = render_petri_net(net, False, max_ranked_elements=size)
+        rendering = time.perf_counter() - start
+        unranked = render_petri_net(net, False, max_ranked_elements=0)
+        # Before, every arc source got a rank group of its own
+        sources = len({arc.source for arc in net.arcs})
+        print(f"{name} ({size:,} elements, {len(net.arcs):,} arcs): rendered in {rendering * 1000:.1f}ms, "
+              f"{len(rank_groups(net.arcs)):,} rank groups instead of {sources:,}, "
+              f"DOT {len(ranked.source):,} bytes with ranks, {len(unranked.source):,} without")
+        # Graphviz takes minutes on the large nets, so it is only timed on the small ones
+        if size <= 1000:
+            print(f"    graphviz with ranks {time_graphviz(ranked)}, without {time_graphviz(unranked)}")
+        else:
+            print(f"    graphviz without ranks {time_graphviz(unranked)}")
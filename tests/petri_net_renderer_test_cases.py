@@ -0,0 +1,78 @@
+import os
+from typing import List, Set
+
+import pm4py
+from graphviz import Digraph
+from pm4py import PetriNet
+from pm4py.objects.petri_net.utils import petri_utils
+
+from src.utils.petri_net_renderer import rank_groups, render_petri_net, wrap_label
+from tests.parse_petri_net_test_file import online_order_petri_net
+from tests.petri_net_to_pattern_benchmark import generate_block_net
+
+MODELS = os.path.join(os.path.dirname(__file__), "..", "src", "ui")
+
+
+def statements(net: PetriNet) -> Set[str]:
+    """
+    :return: The node and edge statements graphviz itself writes for the net.
+    """
+    dot = Digraph()
+    for element, shape in [(place, "circle") for place in net.places] \
+            + [(transition, "box") for transition in net.transitions]:
+        label = element.label if hasattr(element, "label") else element.name
+        dot.node(element.name, label=wrap_label(label, 10), style="filled", shape=shape,
+                 fillcolor=element.properties.get("color", "white"))
+    for arc in net.arcs:
+        dot.edge(arc.source.name, arc.target.name)
+    return set(dot.body)
+
+
+def same_rank(net: PetriNet) -> List[Set[str]]:
+    """
+    :return: The sets of elements graphviz puts on the same rank for one group per source, merged where they overlap.
+    """
+    merged: List[Set[str]] = []
+    for source in {arc.source.name for arc in net.arcs}:
+        group = {arc.target.name for arc in net.arcs if arc.source.name == source}
+        overlapping = [other for other in merged if other & group]
+        for other in overlapping:
+            merged.remove(other)
+            group |= other
+        merged.append(group)
+    return sorted((group for group in merged if len(group) > 1), key=min)
+
+
+if __name__ == "__main__":
+    # Names and labels are quoted like by graphviz, also with quotes, ports and keywords
+    net = online_order_petri_net()
+    odd = [PetriNet.Place('say "hi"'), PetriNet.Place("node"), PetriNet.Place("a:b")]
+    transition = PetriNet.Transition("t\\1", 'label with "quotes" and more words')
+    net.transitions.add(transition)
+    for place in odd:
+        net.places.add(place)
+        petri_utils.add_arc_from_to(transition, place, net)
+    dot = render_petri_net(net, False)
+    missing = statements(net) - set(dot.body)
+    print(f"Test Case 1: {'Success' if not missing else f'Error - missing {sorted(missing)[:3]}'}")
+
+    groups = rank_groups(net.arcs)
+    status = "Success" if [set(group) for group in groups] == same_rank(net) \
+        and dot.source.count("rank=same") == len(groups) else "Error - rank groups differ from those of graphviz"
+    print(f"Test Case 2: {status}")
+
+    net = generate_block_net(300, seed=11)
+    size = len(net.places) + len(net.transitions)
+    ranked = render_petri_net(net, False, max_ranked_elements=size).source
+    unranked = render_petri_net(net, False, max_ranked_elements=size - 1).source
+    status = "Success" if "rank=same" in ranked and "rank=same" not in unranked \
+        and render_petri_net(net, False).source == ranked else "Error - rank constraints not dropped above the limit"
+    print(f"Test Case 3: {status}")
+
+    # Wrapped labels are computed once per label
+    net, _, _ = pm4py.read_pnml(os.path.join(MODELS, "model.pnml"))
+    wrap_label.cache_clear()
+    render_petri_net(net, False)
+    render_petri_net(net, False)
+    info = wrap_label.cache_info()
+    print(f"Test Case 4: {'Success' if info.hits >= info.misses else f'Error - {info}'}")
@@ -0,0 +1,102 @@
+import random
+import time
+from typing import List, Optional
+
+from pm4py import PetriNet
+
+from src.parsers.petri_net_to_pattern import convert_petri_net_to_pattern
+
+
+def generate_block_net(refinement_count: int, seed: int = 42, deep: bool = False) -> PetriNet:
+    """
+    Generate a block-structured Petri net by repeatedly refining a transition into a SEQ, OR, AND or loop block.
+
+    :param refinement_count: The number of refinements; the net has about 2 to 4 elements per refinement.
+    :param seed: The random seed.
+    :param deep: Whether to always refine the newest transition, which nests every block in the previous one.
+    :return: The net, with one visible transition per refinement plus one.
+    """
+    rng = random.Random(seed)
+    net = PetriNet(f"BLOCKS {refinement_count}")
+    counter = [0]
+
+    def place() -> PetriNet.Place:
+        counter[0] += 1
+        new = PetriNet.Place(f"p{counter[0]}")
+        net.places.add(new)
+        return new
+
+    def transition(label: Optional[str]) -> PetriNet.Transition:
+        counter[0] += 1
+        new = PetriNet.Transition(f"t{counter[0]}", label)
+        net.transitions.add(new)
+        return new
+
+    def arc(source, target) -> None:
+        new = PetriNet.Arc(source, target)
+        net.arcs.add(new)
+        source.out_arcs.add(new)
+        target.in_arcs.add(new)
+
+    def unlink(source, target) -> None:
+        for old in [old for old in source.out_arcs if old.target is target]:
+            net.arcs.discard(old)
+            source.out_arcs.discard(old)
+            target.in_arcs.discard(old)
+
+    first = transition("a0")
+    arc(place(), first)
+    arc(first, place())
+    # Refined transitions always have one input and one output place
+    refinable: List[PetriNet.Transition] = [first]
+    for index in range(1, refinement_count + 1):
+        current = refinable[-1] if deep else rng.choice(refinable)
+        before, = (old.source for old in current.in_arcs)
+        after, = (old.target for old in current.out_arcs)
+        added = transition(f"a{index}")
+        kind = rng.randrange(4)
+        if kind == 0:  # SEQ(current, added)
+            middle = place()
+            unlink(current, after)
+            arc(current, middle)
+            arc(middle, added)
+            arc(added, after)
+        elif kind == 1:  # OR(current, added)
+            arc(before, added)
+            arc(added, after)
+        else:  # AND(current, added) or *(current, added), wrapped in silent transitions
+            start, end = transition(None), transition(None)
+            inner_before, inner_after = place(), place()
+            unlink(before, current)
+            unlink(current, after)
+            arc(before, start)
+            arc(start, inner_before)
+            arc(inner_before, current)
+            arc(current, inner_after)
+            arc(inner_after, end)
+            arc(end, after)
+            if kind == 2:
+                added_before, added_after = place(), place()
+                arc(start, added_before)
+                arc(added_before, added)
+                arc(added, added_after)
+                arc(added_after, end)
+            else:
+                arc(inner_after, added)
+                arc(added, inner_before)
+                refinable.append(added)
+                continue
+        refinable.append(added)
+    return net
+
+
+if __name__ == "__main__":
+    for deep in (False, True):
+        for refinement_count in (1_000, 10_000, 100_000):
+            net = generate_block_net(refinement_count, deep=deep)
+            size = len(net.places) + len(net.transitions) + len(net.arcs)
+            start = time.perf_counter()
+            convert_petri_net_to_pattern(net)
+            elapsed = time.perf_counter() - start
+            print(f"{'deep' if deep else 'wide'} net, {size} elements: {elapsed:.3f} s, "
+                  f"{elapsed / size * 1e6:.2f} µs per element")
@@ -0,0 +1,102 @@
+import os
+
+import pm4py
+from pm4py import PetriNet
+from pm4py.objects.petri_net.utils.petri_utils import add_arc_from_to
+
+from src.parsers.pattern_parser import InternedPatternNode, PatternNode
+from src.parsers.petri_net_to_pattern import convert_petri_net_to_pattern
+from tests.parse_petri_net_test_file import online_order_petri_net
+from tests.petri_net_to_pattern_benchmark import generate_block_net
+
+MODELS = os.path.join(os.path.dirname(__file__), os.pardir, "src", "ui")
+
+
+def leaves(pattern: PatternNode) -> list:
+    """
+    :return: The event names of the pattern, collected without recursion.
+    """
+    names, stack = [], [pattern]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            stack.extend(node.children)
+        else:
+            names.append(node.node_type)
+    return names
+
+
+if __name__ == "__main__":
+    net = online_order_petri_net()
+    found = repr(convert_petri_net_to_pattern(net))
+    expected = ("SEQ(Open Online-Shop, Start searching, "
+                "OR(SEQ(Search alternative article, Select alternative article), Select Article), "
+                "Added to shopping cart, *(Enter login data, Login data is incorrect), Login data is correct, "
+                "AND(Enter address and shipping method, SEQ(*(SEQ(Enter credit card details, Check credit card details), "
+                "Mark credit card details as incorrect), Mark credit card details as verified)), Confirm order)")
+    status = "Success" if found == expected else f"Error - expected {expected}, got {found}"
+    print(f"Test Case 1: {status}")
+
+    pattern = convert_petri_net_to_pattern(net, interned=True)
+    status = "Success" if isinstance(pattern, InternedPatternNode) and repr(pattern) == expected \
+        else f"Error - got {pattern!r}"
+    print(f"Test Case 2: {status}")
+
+    # Discovered models with silent transitions: every visible transition appears, the silent ones do not
+    for case, model in enumerate(("model.pnml", "model2012.pnml"), start=3):
+        net, _, _ = pm4py.read_pnml(os.path.join(MODELS, model))
+        labels = sorted(transition.label for transition in net.transitions if transition.label is not None)
+        found = sorted(leaves(convert_petri_net_to_pattern(net, drop_skips=True)))
+        status = "Success" if found == labels else f"Error - expected {labels}, got {found}"
+        print(f"Test Case {case}: {status}")
+
+    # Thousands of nested blocks are reduced without recursion
+    net = generate_block_net(5000, deep=True)
+    found = len(leaves(convert_petri_net_to_pattern(net))), len(leaves(convert_petri_net_to_pattern(net, True)))
+    status = "Success" if found == (5001, 5001) else f"Error - expected 5001 events, got {found}"
+    print(f"Test Case 5: {status}")
+
+    # A net that is not block-structured: two places that are both consumed by two different transitions
+    net = PetriNet("CROSSED")
+    places = [PetriNet.Place(f"p{index}") for index in range(4)]
+    transitions = [PetriNet.Transition(f"t{index}", f"t{index}") for index in range(4)]
+    net.places.update(places)
+    net.transitions.update(transitions)
+    for source, target in [(places[0], transitions[0]), (transitions[0], places[1]), (transitions[0], places[2]),
+                           (places[1], transitions[1]), (places[1], transitions[2]), (places[2], transitions[2]),
+                           (places[2], transitions[3]), (transitions[1], places[3]), (transitions[2], places[3]),
+                           (transitions[3], places[3])]:
+        add_arc_from_to(source, target, net)
+    try:
+        convert_petri_net_to_pattern(net)
+        print("Test Case 6: Error - expected a ValueError")
+    except ValueError:
+        print("Test Case 6: Success")
+
+    net = PetriNet("SILENT")
+    start, end, silent = PetriNet.Place("start"), PetriNet.Place("end"), PetriNet.Transition("tau", None)
+    net.places.update([start, end])
+    net.transitions.add(silent)
+    add_arc_from_to(start, silent, net)
+    add_arc_from_to(silent, end, net)
+    try:
+        convert_petri_net_to_pattern(net)
+        print("Test Case 7: Error - expected a ValueError")
+    except ValueError:
+        print("Test Case 7: Success")
+
+    # A choice between a visible and a silent transition can be skipped, which no pattern expresses
+    net = PetriNet("SKIP")
+    start, end = PetriNet.Place("start"), PetriNet.Place("end")
+    visible, silent = PetriNet.Transition("pay", "pay"), PetriNet.Transition("tau", None)
+    net.places.update([start, end])
+    net.transitions.update([visible, silent])
+    for source, target in [(start, visible), (start, silent), (visible, end), (silent, end)]:
+        add_arc_from_to(source, target, net)
+    try:
+        convert_petri_net_to_pattern(net)
+        print("Test Case 8: Error - expected a ValueError")
+    except ValueError:
+        found = repr(convert_petri_net_to_pattern(net, drop_skips=True))
+        status = "Success" if found == "pay" else f"Error - expected pay, got {found}"
+        print(f"Test Case 8: {status}")
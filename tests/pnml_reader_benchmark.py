@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pm4py
+from pm4py import Marking
+
+from src.parsers.pnml_reader import read_pnml
+from tests.petri_net_to_pattern_benchmark import generate_block_net
+
+
+def resident_kib(field: str) -> int:
+    """
+    :param field: VmRSS for the current or VmHWM for the peak resident memory.
+    :return: The resident memory of the process in KiB, read from /proc on Linux.
+    """
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field + ":"))
+
+
+def load(reader: str, path: str) -> None:
+    """
+    Read the file with one reader and print the time and the peak resident memory above the memory before reading.
+    Run in a fresh process, since the DOM of pm4py's reader lives in libxml2, which tracemalloc does not see.
+    """
+    # Resets the peak to the current resident memory, so the imports do not count
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    before = resident_kib("VmRSS")
+    start = time.perf_counter()
+    if reader == "pm4py":
+        pm4py.read_pnml(path)
+    elif reader == "streaming":
+        read_pnml(path)
+    else:
+        read_pnml(path).to_petri_net()
+    elapsed = time.perf_counter() - start
+    peak = resident_kib("VmHWM") - before
+    print(f"{elapsed} {peak}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "load":
+        load(sys.argv[2], sys.argv[3])
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for refinement_count in (10_000, 50_000, 200_000):
+            net = generate_block_net(refinement_count)
+            source = min(net.places, key=lambda place: len(place.in_arcs))
+            path = os.path.join(directory, f"blocks_{refinement_count}.pnml")
+            pm4py.write_pnml(net, Marking({source: 1}), Marking(), path)
+            print(f"{len(net.places) + len(net.transitions) + len(net.arcs)} elements, "
+                  f"{os.path.getsize(path) / 2 ** 20:.1f} MiB")
+            for reader in ("pm4py", "streaming", "streaming + to_petri_net"):
+                output = subprocess.run([sys.executable, "-m", "tests.pnml_reader_benchmark", "load", reader, path],
+                                        capture_output=True, text=True, check=True).stdout
+                elapsed, peak = output.split()[-2:]
+                print(f"  {reader}: {float(elapsed):.3f} s, peak memory +{int(peak) / 1024:.1f} MiB")
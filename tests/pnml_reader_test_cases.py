@@ -0,0 +1,84 @@
+import io
+import os
+
+import pm4py
+
+from src.parsers.pnml_reader import read_pnml
+from src.petri_nets.graph_index import PetriNetIndex
+
+MODELS = os.path.join(os.path.dirname(__file__), os.pardir, "src", "ui")
+
+SMALL_NET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<pnml xmlns="http://www.pnml.org/version-2009/grammar/pnml">
+  <net id="net1" type="http://www.pnml.org/version-2009/grammar/pnmlcoremodel">
+    <name><text>small</text></name>
+    <page id="n0">
+      <arc id="a1" source="source" target="t1"/>
+      <arc id="a2" source="t1" target="sink"><inscription><text>2</text></inscription></arc>
+      <arc id="a3" source="source" target="sink"/>
+      <arc id="a4" source="t1" target="missing"/>
+      <place id="source"><name><text>Start</text></name><initialMarking><text>1</text></initialMarking></place>
+      <transition id="t1">
+        <name><text>Register</text></name>
+        <graphics><position x="1" y="2"/></graphics>
+      </transition>
+      <transition id="tau"><name><text>tau</text></name>
+        <toolspecific tool="ProM" version="6.4" activity="$invisible$"/></transition>
+      <place id="sink"/>
+    </page>
+  </net>
+</pnml>"""
+
+
+def by_name(net, initial_marking, final_marking) -> tuple:
+    """
+    :return: The places, transitions, arcs and markings of a net by element name.
+    """
+    return ({(place.name, place.properties.get("place_name_tag")) for place in net.places},
+            {(transition.name, transition.label) for transition in net.transitions},
+            {(arc.source.name, arc.target.name, arc.weight) for arc in net.arcs},
+            {place.name: tokens for place, tokens in initial_marking.items()},
+            {place.name: tokens for place, tokens in final_marking.items()})
+
+
+if __name__ == "__main__":
+    # The converted nets equal those of pm4py's reader
+    for case, model in enumerate(("model.pnml", "model2012.pnml"), start=1):
+        path = os.path.join(MODELS, model)
+        status = "Success" if by_name(*read_pnml(path).to_petri_net()) == by_name(*pm4py.read_pnml(path)) \
+            else "Error - the nets differ"
+        print(f"Test Case {case}: {status}")
+
+    # The index of the graph finds the same patterns as the converted net in document order, with the PNML ids as
+    # elements
+    graph = read_pnml(os.path.join(MODELS, "model.pnml"))
+    net, _, _ = graph.to_petri_net()
+    places = {place.name: place for place in net.places}
+    transitions = {transition.name: transition for transition in net.transitions}
+    seq, and_patterns, or_patterns = PetriNetIndex.from_elements(
+        [places[place] for place in graph.place_ids], [transitions[t] for t in graph.transition_ids],
+        net.arcs).identify_patterns()
+    index_seq, index_and, index_or = graph.to_index().identify_patterns()
+    same = {tuple(chain) for chain in index_seq} == {tuple(element.name for element in chain) for chain in seq} and \
+        {(t, frozenset(places)) for t, places in index_and} == \
+        {(t.name, frozenset(p.name for p in places)) for t, places in and_patterns} and \
+        {(p, frozenset(transitions)) for p, transitions in index_or} == \
+        {(p.name, frozenset(t.name for t in transitions)) for p, transitions in or_patterns}
+    print(f"Test Case 3: {'Success' if same else 'Error - the patterns differ'}")
+
+    # Arcs before their elements, weights, silent transitions, names and a guessed final marking
+    graph = read_pnml(io.BytesIO(SMALL_NET))
+    expected = ({("source", "Start"), ("sink", "sink")},
+                {("t1", "Register"), ("tau", None)},
+                {("source", "t1", 1), ("t1", "sink", 2)},
+                {"source": 1},
+                {"sink": 1})
+    status = "Success" if by_name(*graph.to_petri_net()) == expected and graph.name == "small" \
+        and graph.labels == ["Register"] else "Error - unexpected net"
+    print(f"Test Case 4: {status}")
+
+    try:
+        read_pnml(io.BytesIO(SMALL_NET[:-20]))
+        print("Test Case 5: Error - expected a ValueError")
+    except ValueError:
+        print("Test Case 5: Success")
@@ -0,0 +1,40 @@
+import os
+import random
+import time
+
+import numpy as np
+import pm4py
+from pm4py import PetriNet
+from pm4py.objects.petri_net import semantics
+from pm4py.objects.petri_net.utils.petri_utils import add_arc_from_to
+
+from src.simulation.token_game import NO_FIRING, TokenGame
+
+MODELS = os.path.join(os.path.dirname(__file__), os.pardir, "src", "ui")
+
+if __name__ == "__main__":
+    # The model with a silent transition from its final back to its initial marking, so the game never dies
+    net, initial_marking, final_marking = pm4py.read_pnml(os.path.join(MODELS, "model.pnml"))
+    restart = PetriNet.Transition("restart", None)
+    net.transitions.add(restart)
+    for place in final_marking:
+        add_arc_from_to(place, restart, net)
+    for place in initial_marking:
+        add_arc_from_to(restart, place, net)
+
+    steps = 2_000
+    rng = random.Random(0)
+    marking = initial_marking
+    start = time.perf_counter()
+    for _ in range(steps):
+        marking = semantics.execute(rng.choice(list(semantics.enabled_transitions(net, marking))), net, marking)
+    elapsed = time.perf_counter() - start
+    print(f"pm4py semantics: {steps / elapsed * 60:,.0f} firings per minute")
+
+    game = TokenGame.from_net(net, seed=0)
+    for batch in (1, 100, 10_000):
+        markings = np.repeat(game.marking_vector(initial_marking)[None], batch, axis=0)
+        start = time.perf_counter()
+        markings, fired = game.run(markings, steps // 10 if batch > 100 else steps)
+        elapsed = time.perf_counter() - start
+        print(f"token game, batch {batch}: {(fired != NO_FIRING).sum() / elapsed * 60:,.0f} firings per minute")
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pm4py
+from pm4py import Marking, PetriNet
+from pm4py.objects.petri_net import semantics
+from pm4py.objects.petri_net.utils.petri_utils import add_arc_from_to
+
+from src.simulation.token_game import NO_FIRING, TokenGame
+
+MODELS = os.path.join(os.path.dirname(__file__), os.pardir, "src", "ui")
+
+
+def as_marking(game: TokenGame, vector: np.ndarray) -> Marking:
+    return Marking({place: int(tokens) for place, tokens in zip(game.places, vector) if tokens})
+
+
+if __name__ == "__main__":
+    net, initial_marking, final_marking = pm4py.read_pnml(os.path.join(MODELS, "model.pnml"))
+    game = TokenGame.from_net(net, seed=5)
+    rng = np.random.default_rng(1)
+    markings = rng.integers(0, 2, size=(200, len(game.places)), dtype=np.int32)
+
+    # Enabledness of a batch agrees with pm4py's semantics for every marking
+    enabled = game.enabled(markings)
+    same = all({game.transitions[t] for t in np.flatnonzero(row)} ==
+               semantics.enabled_transitions(net, as_marking(game, marking)) for row, marking in zip(enabled, markings))
+    print(f"Test Case 1: {'Success' if same else 'Error - enabled transitions differ'}")
+
+    # Firing gives the same markings as pm4py
+    chosen = game.choose(enabled)
+    fired = game.fire(markings, chosen)
+    same = all(as_marking(game, after) == (as_marking(game, before) if transition == NO_FIRING else
+                                           semantics.execute(game.transitions[transition], net,
+                                                             as_marking(game, before)))
+               for before, after, transition in zip(markings, fired, chosen))
+    print(f"Test Case 2: {'Success' if same else 'Error - markings differ'}")
+
+    # Playing out from the initial marking reaches the final marking, reproducibly for the same seed
+    start = game.marking_vector(initial_marking)
+    runs = [TokenGame.from_net(net, seed=9).run(np.repeat(start[None], 50, axis=0), 500) for _ in range(2)]
+    (final, transitions), (again, _) = runs
+    status = "Success" if (final == game.marking_vector(final_marking)).all() and (final == again).all() \
+        and (transitions[:, -1] == NO_FIRING).all() else "Error - unexpected final markings"
+    print(f"Test Case 3: {status}")
+
+    # Arc weights are respected and listeners see every step
+    weighted = PetriNet("weighted")
+    source, sink = PetriNet.Place("source"), PetriNet.Place("sink")
+    transition = PetriNet.Transition("t", "t")
+    weighted.places.update((source, sink))
+    weighted.transitions.add(transition)
+    add_arc_from_to(source, transition, weighted, weight=2)
+    add_arc_from_to(transition, sink, weighted, weight=3)
+    game = TokenGame.from_net(weighted)
+    seen = []
+    game.subscribe(lambda fired, markings: seen.append((fired.tolist(), markings.tolist())))
+    # Places are ordered by name, sink before source
+    markings = game.step(np.array([[0, 1], [0, 2], [1, 5]]))
+    expected = ([NO_FIRING, 0, 0], [[0, 1], [3, 0], [4, 3]])
+    status = "Success" if seen == [expected] and markings.tolist() == expected[1] else f"Error - {seen}"
+    print(f"Test Case 4: {status}")